@@ -21,8 +21,11 @@ from blackfish.cli.batch import (
     list_batch_jobs,
     stop_batch_job,
     resume_batch_job,
+    show_batch_job_analytics,
     remove_batch_job,
     run_batch_job,
+    estimate_batch_job,
+    export_batch_job,
 )
 
 from blackfish.cli.profile import (
@@ -38,6 +41,7 @@ from blackfish.cli.profile import (
 )
 from blackfish.server.models.profile import get_default_profile_name
 from blackfish.cli.image import list_images
+from blackfish.cli.sync import sync_directory
 from blackfish.server.config import config
 from blackfish.server.logger import logger
 from blackfish.cli.classes import ServiceOptions
@@ -264,6 +268,7 @@ def start(reload: bool | None) -> None:  # pragma: no cover
         SSHRunner,
         LocalRunner,
     )
+    from blackfish.server.jobs.versions import ImageVersionCache
 
     async def check_tigerflow_images() -> None:
         profiles = configparser.ConfigParser()
@@ -303,6 +308,7 @@ def start(reload: bool | None) -> None:  # pragma: no cover
                     image=config.IMAGES["tigerflow_ml"],
                     provider=ContainerProvider.Apptainer,
                     cache_dir=cache_dir,
+                    versions_cache=ImageVersionCache.in_home(config.HOME_DIR),
                 )
                 versions = await client.check_health()
                 logger.info(
@@ -802,8 +808,15 @@ def batch() -> None:  # pragma: no cover
 batch.add_command(list_batch_jobs, "ls")
 batch.add_command(stop_batch_job, "stop")
 batch.add_command(resume_batch_job, "resume")
+batch.add_command(show_batch_job_analytics, "analytics")
 batch.add_command(remove_batch_job, "rm")
 batch.add_command(run_batch_job, "run")
+batch.add_command(estimate_batch_job, "estimate")
+batch.add_command(export_batch_job, "export")
+
+
+# blackfish sync [OPTIONS] SOURCE DESTINATION
+main.add_command(sync_directory, "sync")
 
 
 @main.group()
@@ -5,6 +5,7 @@ from __future__ import annotations
 import json
 import os
 import sys
+import time
 from dataclasses import asdict
 from datetime import datetime
 from typing import Any, Optional
@@ -21,14 +22,16 @@ import yaml
 
 from blackfish.server.config import config
 from blackfish.server.jobs.base import BatchJobStatus
+from blackfish.server.jobs.estimate import DEFAULT_SAMPLE_SIZE
 from blackfish.server.jobs.tasks import (
     SUPPORTED_TASKS,
     build_pipeline_config,
     get_default_input_ext,
+    get_default_output_ext,
     is_supported_task,
 )
 from blackfish.cli.profile import resolve_profile_or_exit
-from blackfish.server.models.profile import deserialize_profile
+from blackfish.server.models.profile import BlackfishProfile, deserialize_profile
 from blackfish.server.utils import (
     format_datetime,
     format_image_version,
@@ -185,6 +188,7 @@ def list_batch_jobs(
         spinner.ok(f"{LogSymbols.SUCCESS.value}")
 
     _active = {
+        BatchJobStatus.QUEUED,
         BatchJobStatus.SUBMITTED,
         BatchJobStatus.RESUBMITTED,
         BatchJobStatus.PENDING,
@@ -197,6 +201,11 @@ def list_batch_jobs(
 
     jobs = res.json()
     for job in jobs:
+        # A multi-stage job lists its stages in order.
+        job_task = " > ".join(
+            [job.get("task", "")]
+            + [stage.get("task", "") for stage in job.get("stages") or []]
+        )
         if is_active(job) or all:
             staged = int(job.get("staged") or 0)
             finished = int(job.get("finished") or 0)
@@ -205,15 +214,18 @@ def list_batch_jobs(
             progress = f"{finished}/{total}" if total else "N/A"
 
             job_status = job.get("status")
+            display_status = job_status.upper() if job_status else "NONE"
+            if job.get("queue_position") is not None:
+                display_status += f" (#{job['queue_position']})"
             tab.add_row(
                 [
                     job["id"][:DISPLAY_ID_LENGTH],
-                    job.get("task", ""),
+                    job_task,
                     format_image_version(job.get("image_ref")),
                     job.get("repo_id", ""),
                     format_datetime(datetime.fromisoformat(job["created_at"])),
                     format_datetime(datetime.fromisoformat(job["updated_at"])),
-                    job_status.upper() if job_status else "NONE",
+                    display_status,
                     progress,
                     job.get("name", ""),
                     job.get("profile", ""),
@@ -328,6 +340,125 @@ def resume_batch_job(job_id: str) -> None:  # pragma: no cover
                 spinner.ok(f"{LogSymbols.SUCCESS.value}")
 
 
+def _format_seconds(seconds: float) -> str:
+    """Format a duration as e.g. "2h 05m", "4m 10s" or "12s"."""
+    seconds = int(round(seconds))
+    if seconds >= 3600:
+        return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m {seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+def _table(*fields: str) -> PrettyTable:
+    tab = PrettyTable(field_names=list(fields))
+    tab.set_style(TableStyle.PLAIN_COLUMNS)
+    for field in tab.field_names:
+        tab.align[field] = "l"
+    tab.right_padding_width = 3
+    return tab
+
+
+@click.command(name="analytics")
+@click.argument(
+    "job_id",
+    type=str,
+    required=True,
+)
+def show_batch_job_analytics(job_id: str) -> None:  # pragma: no cover
+    """Show throughput, latency and ETA of a batch job.
+
+    Throughput is files/sec over the last 5 minutes, 15 minutes and hour;
+    latency the p50/p95/p99 duration of each task. The ETA is the remaining
+    files over the most recent throughput, and for Slurm jobs the number of
+    further allocations (restarts) its walltime needs to finish. JOB_ID can be
+    a full UUID or an abbreviated prefix.
+    """
+
+    full_job_id = _resolve_job_id(job_id)
+    if full_job_id is None:
+        return
+
+    with yaspin(text="Fetching job analytics...") as spinner:
+        try:
+            res = api.get(f"/api/jobs/{full_job_id}/analytics")
+        except requests.exceptions.ConnectionError:
+            spinner.text = (
+                f"Failed to connect to Blackfish API on port {config.PORT}. "
+                "Is the server running?"
+            )
+            spinner.fail(f"{LogSymbols.ERROR.value}")
+            return
+
+        if not res.ok:
+            spinner.text = (
+                f"Failed to fetch analytics for job {full_job_id[:DISPLAY_ID_LENGTH]} "
+                f"(status={res.status_code})."
+            )
+            spinner.fail(f"{LogSymbols.ERROR.value}")
+            try:
+                detail = res.json().get("detail", res.reason)
+                click.echo(f"Error: {detail}")
+            except Exception:
+                pass
+            return
+
+        spinner.ok(f"{LogSymbols.SUCCESS.value}")
+
+    data = res.json()
+
+    throughput = _table("WINDOW", "FILES", "FILES/SEC")
+    for window in data["throughput"]:
+        rate = window["files_per_second"]
+        throughput.add_row(
+            [
+                _format_seconds(window["window_seconds"]),
+                window["files"],
+                f"{rate:.3f}" if rate is not None else "N/A",
+            ]
+        )
+    click.echo(throughput)
+    click.echo()
+
+    if data["latency"]:
+        latency = _table("TASK", "FILES", "P50", "P95", "P99", "MAX")
+        for task in data["latency"]:
+            latency.add_row(
+                [task["task"], task["count"]]
+                + [
+                    f"{task[key] / 1000:.2f}s"
+                    for key in ("p50_ms", "p95_ms", "p99_ms", "max_ms")
+                ]
+            )
+        click.echo(latency)
+    else:
+        click.echo("No successful files yet.")
+    click.echo()
+
+    remaining = data["remaining"]
+    click.echo(f"Finished:  {data['finished']} ({data['errored']} errored)")
+    click.echo(f"Remaining: {remaining if remaining is not None else 'N/A'}")
+    if data["eta_seconds"] is not None:
+        click.echo(
+            f"ETA:       {_format_seconds(data['eta_seconds'])} "
+            f"at {data['files_per_second']:.3f} files/sec"
+        )
+    else:
+        click.echo("ETA:       N/A (no recent throughput)")
+    if data["projected_restarts"] is not None:
+        click.echo(
+            f"Restarts:  {data['projected_restarts']} more at "
+            f"{_format_seconds(data['walltime_seconds'])} per allocation "
+            f"(budget: {data['restart_budget']})"
+        )
+        if data["projected_restarts"] > data["restart_budget"]:
+            click.echo(
+                f"{LogSymbols.WARNING.value} The job will run out of restarts "
+                "before it finishes. Consider --shards, or more GPUs or a longer "
+                "time in --resources."
+            )
+
+
 @click.command(name="rm")
 @click.argument(
     "job_id",
@@ -436,96 +567,176 @@ def remove_batch_job(
                 click.echo(f"  - {error_id}: {error_msg}")
 
 
-@click.command(name="run")
-@click.option(
-    "--name",
-    "-n",
-    type=str,
-    required=True,
-    help="Name for the batch job.",
-)
-@click.option(
-    "--task",
-    "-t",
-    type=click.Choice(list(SUPPORTED_TASKS.keys())),
-    required=True,
-    help="ML task to run (e.g., transcribe, translate, detect, ocr).",
-)
-@click.option(
-    "--model",
-    "-m",
-    type=str,
-    required=True,
-    help="Model repo ID (e.g., openai/whisper-large-v3).",
-)
-@click.option(
-    "--profile",
-    "-p",
-    type=str,
-    default=None,
-    help="Blackfish profile to use (defaults to the default profile).",
-)
-@click.option(
-    "--input-dir",
-    "-i",
-    type=str,
-    required=True,
-    help="Input directory containing files to process.",
-)
-@click.option(
-    "--output-dir",
-    "-o",
-    type=str,
-    required=True,
-    help="Output directory for results.",
-)
-@click.option(
-    "--revision",
-    type=str,
-    default=None,
-    help="Model revision (commit hash). Uses latest available if not specified.",
-)
-@click.option(
-    "--image-ref",
-    type=str,
-    default=None,
-    help=(
-        "Pin the tigerflow-ml container image, e.g."
-        " 'ghcr.io/princeton-ddss/tigerflow-ml:0.1.1'. Defaults to the"
-        " configured image. See `blackfish batch ls` for the version in use."
+def _resolve_stage(raw: str, profile: BlackfishProfile) -> dict[str, Any] | None:
+    """Parse a ``--stage`` option into a stage of the job request.
+
+    Prints the problem and returns ``None`` if the stage is invalid or its
+    model isn't available.
+    """
+    try:
+        stage = json.loads(raw)
+    except json.JSONDecodeError as e:
+        click.echo(f"{LogSymbols.ERROR.value} Invalid JSON for --stage: {e}")
+        return None
+    if not isinstance(stage, dict) or "task" not in stage or "model" not in stage:
+        click.echo(
+            f'{LogSymbols.ERROR.value} Each --stage needs a "task" and a "model".'
+        )
+        return None
+
+    task, model = stage["task"], stage["model"]
+    if not is_supported_task(task):
+        supported = ", ".join(SUPPORTED_TASKS.keys())
+        click.echo(
+            f"{LogSymbols.ERROR.value} Unsupported task: '{task}'. "
+            f"Supported tasks: {supported}"
+        )
+        return None
+
+    revision = stage.get("revision")
+    try:
+        if model not in get_models(profile):
+            click.echo(
+                f"{LogSymbols.ERROR.value} Model '{model}' is unavailable for profile "
+                f"'{profile.name}'. Use `blackfish model add` to download it first."
+            )
+            return None
+        if revision is None:
+            revisions = get_revisions(model, profile)
+            if not revisions:
+                click.echo(
+                    f"{LogSymbols.ERROR.value} No revisions found for model '{model}'."
+                )
+                return None
+            revision = get_latest_commit(model, revisions)
+    except (FileNotFoundError, PermissionError, OSError) as e:
+        click.echo(
+            f"{LogSymbols.ERROR.value} Profile '{profile.name}': model directories "
+            f"not accessible: {e}"
+        )
+        sys.exit(1)
+
+    return {
+        "task": task,
+        "repo_id": model,
+        "revision": revision,
+        "params": stage.get("params"),
+        "output_ext": stage.get("output_ext"),
+    }
+
+
+# Options describing a batch job, shared by `batch run` and `batch estimate`.
+_JOB_OPTIONS = [
+    click.option(
+        "--name",
+        "-n",
+        type=str,
+        required=True,
+        help="Name for the batch job.",
     ),
-)
-@click.option(
-    "--params",
-    type=str,
-    default=None,
-    help='Task parameters as JSON string (e.g., \'{"language": "en"}\').',
-)
-@click.option(
-    "--resources",
-    type=str,
-    default=None,
-    help='Slurm resource configuration as JSON string (e.g., \'{"gpus": 1, "cpus": 4}\').',
-)
-@click.option(
-    "--max-workers",
-    type=int,
-    default=1,
-    help="Maximum number of concurrent Slurm workers.",
-)
-@click.option(
-    "--input-ext",
-    type=str,
-    default=None,
-    help="Input file extension (e.g., '.wav', '.mp4'). Uses task default if not specified.",
-)
-@click.option(
-    "--dry-run",
-    is_flag=True,
-    default=False,
-    help="Print the pipeline config without submitting the job.",
-)
-def run_batch_job(
+    click.option(
+        "--task",
+        "-t",
+        type=click.Choice(list(SUPPORTED_TASKS.keys())),
+        required=True,
+        help="ML task to run (e.g., transcribe, translate, detect, ocr).",
+    ),
+    click.option(
+        "--model",
+        "-m",
+        type=str,
+        required=True,
+        help="Model repo ID (e.g., openai/whisper-large-v3).",
+    ),
+    click.option(
+        "--profile",
+        "-p",
+        type=str,
+        default=None,
+        help="Blackfish profile to use (defaults to the default profile).",
+    ),
+    click.option(
+        "--input-dir",
+        "-i",
+        type=str,
+        required=True,
+        help="Input directory containing files to process.",
+    ),
+    click.option(
+        "--output-dir",
+        "-o",
+        type=str,
+        required=True,
+        help="Output directory for results.",
+    ),
+    click.option(
+        "--revision",
+        type=str,
+        default=None,
+        help="Model revision (commit hash). Uses latest available if not specified.",
+    ),
+    click.option(
+        "--image-ref",
+        type=str,
+        default=None,
+        help=(
+            "Pin the tigerflow-ml container image, e.g."
+            " 'ghcr.io/princeton-ddss/tigerflow-ml:0.1.1'. Defaults to the"
+            " configured image. See `blackfish batch ls` for the version in use."
+        ),
+    ),
+    click.option(
+        "--params",
+        type=str,
+        default=None,
+        help='Task parameters as JSON string (e.g., \'{"language": "en"}\').',
+    ),
+    click.option(
+        "--resources",
+        type=str,
+        default=None,
+        help='Slurm resource configuration as JSON string (e.g., \'{"gpus": 1, "cpus": 4}\').',
+    ),
+    click.option(
+        "--max-workers",
+        type=int,
+        default=1,
+        help="Maximum number of concurrent Slurm workers.",
+    ),
+    click.option(
+        "--input-ext",
+        type=str,
+        default=None,
+        help="Input file extension (e.g., '.wav', '.mp4'). Uses task default if not specified.",
+    ),
+    click.option(
+        "--output-ext",
+        type=str,
+        default=None,
+        help="Output file extension (e.g., '.txt'). Uses task default if not specified.",
+    ),
+    click.option(
+        "--stage",
+        "stages",
+        type=str,
+        multiple=True,
+        help=(
+            "Chain another task after --task in the same job, as a JSON string (e.g.,"
+            ' \'{"task": "translate", "model": "facebook/nllb-200-distilled-600M"}\').'
+            " Also accepts revision, params and output_ext. Repeat for more stages."
+        ),
+    ),
+]
+
+
+def _job_options(func: Any) -> Any:
+    """Apply the options shared by `batch run` and `batch estimate`."""
+    for option in reversed(_JOB_OPTIONS):
+        func = option(func)
+    return func
+
+
+def _job_request(
     name: str,
     task: str,
     model: str,
@@ -538,12 +749,12 @@ def run_batch_job(
     resources: Optional[str],
     max_workers: int,
     input_ext: Optional[str],
-    dry_run: bool,
-) -> None:
-    """Start a batch inference job.
+    output_ext: Optional[str],
+    stages: tuple[str, ...],
+) -> dict[str, Any] | None:
+    """Validate the `_JOB_OPTIONS` of a command into a batch job request.
 
-    Batch jobs process files in INPUT_DIR using the specified MODEL and TASK,
-    writing results to OUTPUT_DIR. Jobs are managed by TigerFlow on the cluster.
+    Returns ``None``, having reported the problem, if an option is invalid.
     """
 
     # 1. Validate profile exists (falling back to the default)
@@ -554,7 +765,7 @@ def run_batch_job(
             f"{LogSymbols.ERROR.value} Profile '{profile}' not found. "
             "Use `blackfish profile ls` to view available profiles."
         )
-        return
+        return None
 
     # 2. Validate model exists, resolve revision, and locate the model
     # directory. Any of these can fail with FileNotFoundError /
@@ -565,7 +776,7 @@ def run_batch_job(
                 f"{LogSymbols.ERROR.value} Model '{model}' is unavailable for profile "
                 f"'{profile}'. Use `blackfish model add` to download it first."
             )
-            return
+            return None
 
         if revision is None:
             revisions = get_revisions(model, matched_profile)
@@ -573,7 +784,7 @@ def run_batch_job(
                 click.echo(
                     f"{LogSymbols.ERROR.value} No revisions found for model '{model}'."
                 )
-                return
+                return None
             revision = get_latest_commit(model, revisions)
             click.echo(
                 f"{LogSymbols.WARNING.value} No revision provided. "
@@ -591,7 +802,7 @@ def run_batch_job(
             f"{LogSymbols.ERROR.value} Model directory not found. "
             f"The requested revision ({revision}) is missing."
         )
-        return
+        return None
     # cache_dir is the parent of model_dir (e.g., /scratch/.../models)
     cache_dir = os.path.dirname(model_dir)
 
@@ -602,7 +813,7 @@ def run_batch_job(
             f"{LogSymbols.ERROR.value} Unsupported task: '{task}'. "
             f"Supported tasks: {supported}"
         )
-        return
+        return None
 
     # 6. Parse JSON parameters
     params_dict: dict[str, Any] | None = None
@@ -611,7 +822,7 @@ def run_batch_job(
             params_dict = json.loads(params)
         except json.JSONDecodeError as e:
             click.echo(f"{LogSymbols.ERROR.value} Invalid JSON for --params: {e}")
-            return
+            return None
 
     resources_dict: dict[str, Any] | None = None
     if resources is not None:
@@ -619,25 +830,148 @@ def run_batch_job(
             resources_dict = json.loads(resources)
         except json.JSONDecodeError as e:
             click.echo(f"{LogSymbols.ERROR.value} Invalid JSON for --resources: {e}")
-            return
+            return None
 
-    # Resolve input extension
-    resolved_input_ext = input_ext or get_default_input_ext(task)
+    # Validate chained stages and resolve their model revisions
+    stage_list: list[dict[str, Any]] = []
+    for raw_stage in stages:
+        stage = _resolve_stage(raw_stage, matched_profile)
+        if stage is None:
+            return None
+        stage_list.append(stage)
+
+    return {
+        "name": name,
+        "task": task,
+        "repo_id": model,
+        "revision": revision,
+        "image_ref": image_ref,
+        "profile": asdict(matched_profile),
+        "input_dir": input_dir,
+        "output_dir": output_dir,
+        "input_ext": input_ext or get_default_input_ext(task),
+        "output_ext": output_ext,
+        "cache_dir": cache_dir,
+        "params": params_dict,
+        "stages": stage_list or None,
+        "resources": resources_dict,
+        "max_workers": max_workers,
+    }
+
+
+@click.command(name="run")
+@_job_options
+@click.option(
+    "--shards",
+    type=click.IntRange(min=1),
+    default=1,
+    help=(
+        "Split the input files into this many disjoint subsets, processed in"
+        " parallel by a Slurm job array. Requires a Slurm profile."
+    ),
+)
+@click.option(
+    "--result-cache",
+    is_flag=True,
+    default=False,
+    help=(
+        "Reuse the outputs of earlier jobs that ran the same pipeline on the same"
+        " file contents, and keep this job's outputs for later jobs."
+    ),
+)
+@click.option(
+    "--priority",
+    type=int,
+    default=0,
+    help=(
+        "Order of the job among the jobs waiting for an allocation, if the server"
+        " caps allocations (higher first)."
+    ),
+)
+@click.option(
+    "--dry-run",
+    is_flag=True,
+    default=False,
+    help="Print the pipeline config without submitting the job.",
+)
+def run_batch_job(
+    name: str,
+    task: str,
+    model: str,
+    profile: Optional[str],
+    input_dir: str,
+    output_dir: str,
+    revision: Optional[str],
+    image_ref: Optional[str],
+    params: Optional[str],
+    resources: Optional[str],
+    max_workers: int,
+    shards: int,
+    input_ext: Optional[str],
+    output_ext: Optional[str],
+    stages: tuple[str, ...],
+    result_cache: bool,
+    priority: int,
+    dry_run: bool,
+) -> None:
+    """Start a batch inference job.
+
+    Batch jobs process files in INPUT_DIR using the specified MODEL and TASK,
+    writing results to OUTPUT_DIR. Jobs are managed by TigerFlow on the cluster.
+    """
+
+    request = _job_request(
+        name,
+        task,
+        model,
+        profile,
+        input_dir,
+        output_dir,
+        revision,
+        image_ref,
+        params,
+        resources,
+        max_workers,
+        input_ext,
+        output_ext,
+        stages,
+    )
+    if request is None:
+        return
 
     # Handle dry-run: print config and exit
     if dry_run:
         # Build the same config that would be sent to TigerFlow
+        cache_dir = request["cache_dir"]
         task_params: dict[str, Any] = {"model": model, "cache_dir": cache_dir}
-        if revision:
-            task_params["revision"] = revision
-        if params_dict:
-            task_params.update(params_dict)
-
-        pipeline_config = build_pipeline_config(
-            task=task,
-            input_ext=resolved_input_ext,
-            params=task_params,
-        )
+        if request["revision"]:
+            task_params["revision"] = request["revision"]
+        if request["params"]:
+            task_params.update(request["params"])
+
+        try:
+            pipeline_config = build_pipeline_config(
+                task=task,
+                input_ext=request["input_ext"],
+                params=task_params,
+                output_ext=output_ext or get_default_output_ext(task),
+                stages=[
+                    {
+                        "task": stage["task"],
+                        "params": {
+                            "model": stage["repo_id"],
+                            "revision": stage["revision"],
+                            "cache_dir": cache_dir,
+                            **(stage["params"] or {}),
+                        },
+                        "output_ext": stage["output_ext"],
+                    }
+                    for stage in request["stages"] or []
+                ],
+            )
+        except ValueError as e:
+            click.echo(f"{LogSymbols.ERROR.value} {e}")
+            return
 
         click.echo("Pipeline config (dry run):\n")
         click.echo(
@@ -655,24 +989,22 @@ def run_batch_job(
             res = api.post(
                 "/api/jobs",
                 json={
-                    "name": name,
-                    "task": task,
-                    "repo_id": model,
-                    "revision": revision,
-                    "image_ref": image_ref,
-                    "profile": asdict(matched_profile),
-                    "input_dir": input_dir,
-                    "output_dir": output_dir,
-                    "input_ext": resolved_input_ext,
-                    "cache_dir": cache_dir,
-                    "params": params_dict,
-                    "resources": resources_dict,
-                    "max_workers": max_workers,
+                    **request,
+                    "shards": shards,
+                    "result_cache": result_cache,
+                    "priority": priority,
                 },
             )
             if res.ok:
-                job_id = res.json().get("id", "unknown")
-                spinner.text = f"Started batch job: {job_id[:DISPLAY_ID_LENGTH]}"
+                job = res.json()
+                job_id = job.get("id", "unknown")
+                if job.get("status") == BatchJobStatus.QUEUED:
+                    spinner.text = (
+                        f"Queued batch job: {job_id[:DISPLAY_ID_LENGTH]}"
+                        f" (position {job.get('queue_position')})"
+                    )
+                else:
+                    spinner.text = f"Started batch job: {job_id[:DISPLAY_ID_LENGTH]}"
                 spinner.ok(f"{LogSymbols.SUCCESS.value}")
             else:
                 spinner.text = f"Failed to start batch job (status={res.status_code})."
@@ -688,3 +1020,316 @@ def run_batch_job(
                 "Is the server running?"
             )
             spinner.fail(f"{LogSymbols.ERROR.value}")
+
+
+# Seconds between checks on a sampling job while waiting for its estimate.
+ESTIMATE_POLL_INTERVAL = 15
+
+_DONE_STATUSES = {
+    BatchJobStatus.STOPPED,
+    BatchJobStatus.STALLED,
+    BatchJobStatus.EXHAUSTED,
+    BatchJobStatus.BROKEN,
+    BatchJobStatus.FAILED,
+}
+
+
+@click.command(name="estimate")
+@_job_options
+@click.option(
+    "--sample",
+    type=click.IntRange(min=1),
+    default=DEFAULT_SAMPLE_SIZE,
+    help="Number of input files, picked at random, to run the job on.",
+)
+@click.option(
+    "--shards",
+    "shard_counts",
+    type=click.IntRange(min=1),
+    multiple=True,
+    help="Number of shards to project the job for. Repeat for more (default: 1, 2, 4, 8 and 16).",
+)
+def estimate_batch_job(
+    name: str,
+    task: str,
+    model: str,
+    profile: Optional[str],
+    input_dir: str,
+    output_dir: str,
+    revision: Optional[str],
+    image_ref: Optional[str],
+    params: Optional[str],
+    resources: Optional[str],
+    max_workers: int,
+    input_ext: Optional[str],
+    output_ext: Optional[str],
+    stages: tuple[str, ...],
+    sample: int,
+    shard_counts: tuple[int, ...],
+) -> None:
+    """Estimate the cost of a batch job from a sample of its inputs.
+
+    Runs the job on SAMPLE random files of INPUT_DIR, in a single allocation
+    of at most 30 minutes, and waits for it to finish. The mean time per file
+    is then projected to all of INPUT_DIR: the wall-clock time and GPU-hours
+    of the job for each number of shards, with the allocations each shard
+    needs at the time requested in --resources. Queue waits aren't included.
+    """
+
+    request = _job_request(
+        name,
+        task,
+        model,
+        profile,
+        input_dir,
+        output_dir,
+        revision,
+        image_ref,
+        params,
+        resources,
+        max_workers,
+        input_ext,
+        output_ext,
+        stages,
+    )
+    if request is None:
+        return
+
+    with yaspin(text="Starting sampling job...") as spinner:
+        try:
+            res = api.post("/api/jobs/estimate", json={**request, "sample": sample})
+        except requests.exceptions.ConnectionError:
+            spinner.text = (
+                f"Failed to connect to Blackfish API on port {config.PORT}. "
+                "Is the server running?"
+            )
+            spinner.fail(f"{LogSymbols.ERROR.value}")
+            return
+
+        if not res.ok:
+            spinner.text = f"Failed to start sampling job (status={res.status_code})."
+            spinner.fail(f"{LogSymbols.ERROR.value}")
+            try:
+                detail = res.json().get("detail", res.reason)
+                click.echo(f"Error: {detail}")
+            except Exception:
+                pass
+            return
+
+        job_id = res.json()["id"]
+        spinner.text = f"Started sampling job: {job_id[:DISPLAY_ID_LENGTH]}"
+        spinner.ok(f"{LogSymbols.SUCCESS.value}")
+
+    shards_query: dict[str, Any] | None = (
+        {"shards": list(shard_counts)} if shard_counts else None
+    )
+    with yaspin(text="Waiting for the sample to run...") as spinner:
+        try:
+            while True:
+                res = api.get(f"/api/jobs/{job_id}/estimate", params=shards_query)
+                if not res.ok:
+                    spinner.text = (
+                        f"Failed to fetch the estimate (status={res.status_code})."
+                    )
+                    spinner.fail(f"{LogSymbols.ERROR.value}")
+                    return
+                data = res.json()
+                if data["status"] in _DONE_STATUSES:
+                    break
+                spinner.text = (
+                    f"Sampling: {data['succeeded']}/{data['sampled']} files "
+                    f"(status={data['status']})"
+                )
+                time.sleep(ESTIMATE_POLL_INTERVAL)
+        except requests.exceptions.ConnectionError:
+            spinner.text = (
+                f"Failed to connect to Blackfish API on port {config.PORT}. "
+                "Is the server running?"
+            )
+            spinner.fail(f"{LogSymbols.ERROR.value}")
+            return
+        except KeyboardInterrupt:
+            spinner.text = (
+                f"Stopped waiting. Sampling job {job_id[:DISPLAY_ID_LENGTH]} keeps "
+                f"running; its estimate is at /api/jobs/{job_id}/estimate."
+            )
+            spinner.ok(f"{LogSymbols.WARNING.value}")
+            return
+        spinner.text = f"Sampled {data['succeeded']}/{data['sampled']} files."
+        spinner.ok(f"{LogSymbols.SUCCESS.value}")
+
+    if data["failed"]:
+        click.echo(f"{LogSymbols.WARNING.value} {data['failed']} sampled files failed.")
+    if not data["projections"]:
+        click.echo(
+            f"{LogSymbols.ERROR.value} No sampled file finished, so there is "
+            "nothing to estimate from. See `blackfish batch ls` for the job."
+        )
+        return
+
+    click.echo(
+        f"Time per file: {data['seconds_per_file']:.2f}s "
+        f"({data['total_files']} files, {data['gpus']} GPU(s) per shard)"
+    )
+    click.echo()
+    tab = _table("SHARDS", "FILES/SHARD", "ALLOCATIONS", "WALL CLOCK", "GPU-HOURS")
+    for projection in data["projections"]:
+        tab.add_row(
+            [
+                projection["shards"],
+                projection["files_per_shard"],
+                projection["allocations"],
+                _format_seconds(projection["wall_clock_seconds"]),
+                f"{projection['gpu_hours']:.1f}",
+            ]
+        )
+    click.echo(tab)
+
+
+# Rows per request of a JSON Lines export.
+EXPORT_PAGE_SIZE = 10_000
+
+# Seconds between checks on a followed job for newly finished files.
+EXPORT_POLL_INTERVAL = 30
+
+
+@click.command(name="export")
+@click.argument(
+    "job_id",
+    type=str,
+    required=True,
+)
+@click.option(
+    "--output",
+    "-o",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="File to write (default: JOB_ID.FORMAT).",
+)
+@click.option(
+    "--format",
+    "export_format",
+    type=click.Choice(["jsonl", "parquet"]),
+    default="jsonl",
+    help="JSON Lines, or Parquet if pyarrow is installed on the server.",
+)
+@click.option(
+    "--status",
+    "job_status",
+    type=click.Choice(["success", "error"]),
+    default=None,
+    help="Only export files with this result.",
+)
+@click.option(
+    "--task",
+    type=str,
+    default=None,
+    help="Only export the results of this task (stage).",
+)
+@click.option(
+    "--follow",
+    is_flag=True,
+    default=False,
+    help="Keep adding files as they finish until the job stops.",
+)
+def export_batch_job(
+    job_id: str,
+    output: Optional[str],
+    export_format: str,
+    job_status: Optional[str],
+    task: Optional[str],
+    follow: bool,
+) -> None:
+    """Export a batch job's per-file results and outputs to one file.
+
+    Writes a row per file and task with its input path, task, status,
+    duration and output. A JSON Lines export is appended to: its position is
+    kept in OUTPUT.cursor, so running the command again adds only the files
+    that finished since, and --follow keeps adding them while the job runs.
+    A Parquet export is written whole. JOB_ID can be a full UUID or an
+    abbreviated prefix.
+    """
+
+    if follow and export_format != "jsonl":
+        click.echo(f"{LogSymbols.ERROR.value} --follow requires --format jsonl.")
+        return
+
+    full_job_id = _resolve_job_id(job_id)
+    if full_job_id is None:
+        return
+
+    path = output or f"{full_job_id}.{export_format}"
+    cursor_path = f"{path}.cursor"
+    params: dict[str, Any] = {"format": export_format}
+    if job_status is not None:
+        params["status"] = job_status
+    if task is not None:
+        params["task"] = task
+    cursor = None
+    if export_format == "jsonl":
+        params["limit"] = EXPORT_PAGE_SIZE
+        if os.path.exists(path) and os.path.exists(cursor_path):
+            with open(cursor_path) as f:
+                cursor = f.read().strip() or None
+
+    rows = 0
+    with yaspin(text="Exporting job results...") as spinner:
+        try:
+            while True:
+                stopped = True
+                if follow:
+                    res = api.get(f"/api/jobs/{full_job_id}")
+                    if res.ok:
+                        stopped = res.json()["status"] in _DONE_STATUSES
+                while True:
+                    page = {**params, "after": cursor} if cursor else params
+                    res = api.get(f"/api/jobs/{full_job_id}/export", params=page)
+                    if not res.ok:
+                        spinner.text = (
+                            f"Failed to export job {full_job_id[:DISPLAY_ID_LENGTH]} "
+                            f"(status={res.status_code})."
+                        )
+                        spinner.fail(f"{LogSymbols.ERROR.value}")
+                        try:
+                            detail = res.json().get("detail", res.reason)
+                            click.echo(f"Error: {detail}")
+                        except Exception:
+                            pass
+                        return
+                    if export_format == "parquet":
+                        with open(path, "wb") as f:
+                            f.write(res.content)
+                        break
+                    with open(path, "ab") as f:
+                        f.write(res.content)
+                    rows += res.content.count(b"\n")
+                    next_cursor = res.headers.get("X-Next-Cursor")
+                    if next_cursor is None or next_cursor == cursor:
+                        break
+                    cursor = next_cursor
+                    with open(cursor_path, "w") as f:
+                        f.write(cursor)
+                    spinner.text = f"Exported {rows} rows..."
+                if stopped:
+                    break
+                time.sleep(EXPORT_POLL_INTERVAL)
+        except requests.exceptions.ConnectionError:
+            spinner.text = (
+                f"Failed to connect to Blackfish API on port {config.PORT}. "
+                "Is the server running?"
+            )
+            spinner.fail(f"{LogSymbols.ERROR.value}")
+            return
+        except KeyboardInterrupt:
+            spinner.text = (
+                f"Stopped following after {rows} rows. Run the command again "
+                f"to continue {path}."
+            )
+            spinner.ok(f"{LogSymbols.WARNING.value}")
+            return
+
+        if export_format == "parquet":
+            spinner.text = f"Exported job {full_job_id[:DISPLAY_ID_LENGTH]} to {path}."
+        else:
+            spinner.text = f"Exported {rows} rows to {path}."
+        spinner.ok(f"{LogSymbols.SUCCESS.value}")
@@ -0,0 +1,150 @@
+"""CLI command for syncing local directories to a cluster."""
+
+from __future__ import annotations
+
+import asyncio
+import sys
+from typing import Optional
+
+import rich_click as click
+from log_symbols.symbols import LogSymbols
+from yaspin import yaspin
+
+from blackfish.cli.profile import resolve_profile_or_exit
+from blackfish.server.config import config
+from blackfish.server.models.profile import SlurmProfile, deserialize_profile
+from blackfish.server.sync import (
+    DEFAULT_SYNC_WORKERS,
+    MAX_SYNC_WORKERS,
+    SyncPlan,
+    SyncProgress,
+    plan_sync,
+    run_sync,
+)
+
+
+def _format_bytes(size: int) -> str:
+    value = float(size)
+    for unit in ("B", "KB", "MB", "GB", "TB"):
+        if value < 1024 or unit == "TB":
+            return f"{value:.0f} {unit}" if unit == "B" else f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{size} B"  # pragma: no cover
+
+
+def _summarize_plan(plan: SyncPlan) -> str:
+    return (
+        f"{len(plan.transfers)} files to send ({_format_bytes(plan.total_bytes)}),"
+        f" {plan.unchanged} unchanged"
+    )
+
+
+@click.command(name="sync")
+@click.argument("source", type=click.Path(exists=True, file_okay=False))
+@click.argument("destination", type=str)
+@click.option(
+    "--profile",
+    "-p",
+    type=str,
+    default=None,
+    help="Remote profile to sync to (defaults to the default profile).",
+)
+@click.option(
+    "--checksum",
+    is_flag=True,
+    default=False,
+    help="Compare files of equal size by SHA-256 instead of modification time.",
+)
+@click.option(
+    "--workers",
+    "-w",
+    type=click.IntRange(1, MAX_SYNC_WORKERS),
+    default=DEFAULT_SYNC_WORKERS,
+    help="Number of files to send concurrently.",
+)
+@click.option(
+    "--dry-run",
+    is_flag=True,
+    default=False,
+    help="List the files that would be sent without sending them.",
+)
+def sync_directory(
+    source: str,
+    destination: str,
+    profile: Optional[str],
+    checksum: bool,
+    workers: int,
+    dry_run: bool,
+) -> None:  # pragma: no cover
+    """Copy new and changed files in SOURCE to DESTINATION on a cluster.
+
+    Files are compared by size and modification time (or by checksum with
+    --checksum), and only missing or changed files are sent. Files that
+    exist only in DESTINATION are left alone. Use this to stage the input
+    directory of a batch job before `blackfish batch run`.
+    """
+
+    profile = resolve_profile_or_exit(config.HOME_DIR, profile)
+    matched_profile = deserialize_profile(config.HOME_DIR, profile)
+    if matched_profile is None:
+        click.echo(
+            f"{LogSymbols.ERROR.value} Profile '{profile}' not found. "
+            "Use `blackfish profile ls` to view available profiles."
+        )
+        sys.exit(1)
+    if not isinstance(matched_profile, SlurmProfile) or matched_profile.is_local():
+        click.echo(
+            f"{LogSymbols.ERROR.value} Profile '{profile}' is not a remote profile."
+        )
+        sys.exit(1)
+    host, user = matched_profile.host, matched_profile.user
+
+    with yaspin(text="Comparing directories...") as spinner:
+        try:
+            plan = asyncio.run(
+                plan_sync(source, destination, host, user, checksum=checksum)
+            )
+        except Exception as e:
+            spinner.text = f"Failed to compare directories: {e}"
+            spinner.fail(f"{LogSymbols.ERROR.value}")
+            sys.exit(1)
+        spinner.text = _summarize_plan(plan)
+        spinner.ok(f"{LogSymbols.SUCCESS.value}")
+
+    if dry_run:
+        for file in plan.transfers:
+            click.echo(f"{file.reason:<9} {_format_bytes(file.size):>10}  {file.path}")
+        return
+    if not plan.transfers:
+        return
+
+    with yaspin(text="Sending files...") as spinner:
+
+        def report(progress: SyncProgress) -> None:
+            spinner.text = (
+                f"Sent {progress.files_done}/{progress.files_total} files"
+                f" ({_format_bytes(progress.bytes_done)}"
+                f" of {_format_bytes(progress.bytes_total)})"
+            )
+
+        try:
+            result = run_sync(plan, host, user, workers=workers, progress=report)
+        except KeyboardInterrupt:
+            spinner.text = "Sync interrupted."
+            spinner.fail(f"{LogSymbols.ERROR.value}")
+            sys.exit(1)
+        except Exception as e:
+            spinner.text = f"Sync failed: {e}"
+            spinner.fail(f"{LogSymbols.ERROR.value}")
+            sys.exit(1)
+
+        report(result)
+        if result.errors:
+            spinner.fail(f"{LogSymbols.ERROR.value}")
+        else:
+            spinner.ok(f"{LogSymbols.SUCCESS.value}")
+
+    for path, error in result.errors.items():
+        click.echo(f"{LogSymbols.ERROR.value} {path}: {error}")
+    if result.errors:
+        sys.exit(1)
@@ -0,0 +1,290 @@
+"""Streaming tar archives of local and remote directories.
+
+Archives are produced on the fly: each member's tar header is written from a
+single ``stat``, its content is read in chunks and yielded as it is read, and
+nothing is staged on disk or buffered beyond one chunk. This lets a client
+download a whole batch job's ``output_dir`` in one request without the
+server needing space (or time) to build the archive first.
+
+Members use the POSIX.1-2001 (PAX) tar format, so long paths, non-ASCII
+names and files over 8GB are stored faithfully. Only regular files are
+archived; directories are implied by member paths.
+
+Remote directories are walked and read over a dedicated SFTP channel (see
+:func:`blackfish.server.remote.channel`), so a long download doesn't hold
+the pooled session. Generators here block; Litestar runs sync iterators
+passed to ``Stream`` in a worker thread.
+"""
+
+from __future__ import annotations
+
+import fnmatch
+import os
+import posixpath
+import stat
+import tarfile
+from contextlib import ExitStack
+from dataclasses import dataclass
+from typing import IO, TYPE_CHECKING, Iterable, Iterator
+
+from litestar.exceptions import (
+    NotAuthorizedException,
+    NotFoundException,
+    ValidationException,
+)
+
+from blackfish.server import remote
+from blackfish.server.logger import logger
+
+if TYPE_CHECKING:
+    from paramiko.sftp_client import SFTPClient
+
+ARCHIVE_CHUNK_SIZE = 1024 * 1024
+
+_BLOCK_SIZE = tarfile.BLOCKSIZE
+# Two zero blocks mark the end of a tar archive.
+_END_OF_ARCHIVE = b"\0" * (2 * _BLOCK_SIZE)
+
+
+@dataclass
+class ArchiveMember:
+    """A regular file to add to an archive."""
+
+    path: str
+    arcname: str
+    size: int
+    mtime: float
+    mode: int
+
+
+def matches(relpath: str, pattern: str) -> bool:
+    """Match a member's path against a shell glob.
+
+    Patterns without a ``/`` match the file name (``*.json``); patterns with
+    one match the path relative to the archive root (``transcribe/*.json``).
+    """
+    if "/" in pattern:
+        return fnmatch.fnmatchcase(relpath, pattern)
+    return fnmatch.fnmatchcase(posixpath.basename(relpath), pattern)
+
+
+class _LocalSource:
+    def walk(self, root: str) -> Iterator[tuple[str, os.stat_result]]:
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames.sort()
+            for name in sorted(filenames):
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except OSError as e:
+                    logger.warning(f"Skipping {path} in archive: {e}")
+                    continue
+                if stat.S_ISREG(st.st_mode):
+                    yield path, st
+
+    def stat(self, path: str) -> os.stat_result:
+        return os.stat(path)
+
+    def open(self, path: str) -> IO[bytes]:
+        return open(path, "rb")
+
+    def close(self) -> None:
+        pass
+
+
+class _RemoteSource:
+    def __init__(self, host: str, user: str) -> None:
+        self._stack = ExitStack()
+        self._sftp: "SFTPClient" = self._stack.enter_context(remote.channel(host, user))
+
+    def walk(self, root: str) -> Iterator[tuple[str, os.stat_result]]:
+        stack = [root]
+        while stack:
+            directory = stack.pop()
+            try:
+                attrs = self._sftp.listdir_attr(directory)
+            except (FileNotFoundError, PermissionError) as e:
+                logger.warning(f"Skipping {directory} in archive: {e}")
+                continue
+            subdirs = []
+            for attr in sorted(attrs, key=lambda a: a.filename):
+                path = posixpath.join(directory, attr.filename)
+                mode = attr.st_mode or 0
+                if stat.S_ISDIR(mode):
+                    subdirs.append(path)
+                elif stat.S_ISREG(mode):
+                    yield path, _stat_result(attr)
+            stack.extend(reversed(subdirs))
+
+    def stat(self, path: str) -> os.stat_result:
+        return _stat_result(self._sftp.stat(path))
+
+    def open(self, path: str) -> IO[bytes]:
+        f = self._sftp.open(path, "rb")
+        # Request the whole file up front rather than one chunk per round trip.
+        f.prefetch()
+        return f  # type: ignore[return-value]
+
+    def close(self) -> None:
+        self._stack.close()
+
+
+def _stat_result(attr: object) -> os.stat_result:
+    return os.stat_result(
+        (
+            getattr(attr, "st_mode", None) or 0,
+            0,
+            0,
+            0,
+            0,
+            0,
+            getattr(attr, "st_size", None) or 0,
+            0,
+            getattr(attr, "st_mtime", None) or 0,
+            0,
+        )
+    )
+
+
+def _remote_user(user: str | None) -> str:
+    if user is None:
+        raise ValueError("A remote archive requires a user")
+    return user
+
+
+def open_source(host: str | None, user: str | None) -> _LocalSource | _RemoteSource:
+    """Open the files of ``host`` (or the local filesystem) for reading.
+
+    The caller closes the source when done with it.
+    """
+    if host is None:
+        return _LocalSource()
+    return _RemoteSource(host, _remote_user(user))
+
+
+def check_directory(
+    root: str, host: str | None = None, user: str | None = None
+) -> None:
+    """Ensure ``root`` is a readable directory before streaming starts.
+
+    Once the response has started its status can't change, so problems with
+    the root are surfaced here; later per-file errors only skip the file.
+
+    Raises:
+        NotFoundException: If the directory doesn't exist
+        NotAuthorizedException: If permission denied
+        ValidationException: If ``root`` isn't a directory
+    """
+    try:
+        if host is None:
+            mode = os.stat(root).st_mode
+        else:
+            with remote.acquire(host, _remote_user(user)) as sess:
+                mode = sess.stat(root).st_mode or 0
+    except FileNotFoundError:
+        raise NotFoundException(f"The requested path ({root}) does not exist")
+    except PermissionError:
+        raise NotAuthorizedException(f"Permission denied: {root}")
+    if not stat.S_ISDIR(mode):
+        raise ValidationException(f"Not a directory: {root}")
+
+
+def _header(member: ArchiveMember) -> bytes:
+    info = tarfile.TarInfo(member.arcname)
+    info.size = member.size
+    info.mtime = int(member.mtime)
+    info.mode = member.mode & 0o7777 or 0o644
+    info.type = tarfile.REGTYPE
+    return info.tobuf(tarfile.PAX_FORMAT, "utf-8", "surrogateescape")
+
+
+def _member_data(f: IO[bytes], member: ArchiveMember) -> Iterator[bytes]:
+    """Yield exactly ``member.size`` bytes of content plus block padding.
+
+    The header has already promised ``size`` bytes, so a file that grew is
+    truncated and one that shrank is padded with zeros.
+    """
+    remaining = member.size
+    while remaining > 0:
+        chunk = f.read(min(ARCHIVE_CHUNK_SIZE, remaining))
+        if not chunk:
+            logger.warning(f"{member.path} shrank while being archived")
+            yield b"\0" * remaining
+            break
+        remaining -= len(chunk)
+        yield chunk
+    padding = -member.size % _BLOCK_SIZE
+    if padding:
+        yield b"\0" * padding
+
+
+def stream_tar(
+    root: str,
+    *,
+    pattern: str | None = None,
+    files: Iterable[tuple[str, str]] | None = None,
+    host: str | None = None,
+    user: str | None = None,
+) -> Iterator[bytes]:
+    """Yield a tar archive of the regular files under ``root``.
+
+    Args:
+        root: Directory to archive; member names are relative to it
+        pattern: Optional glob selecting members (see :func:`matches`)
+        files: Explicit ``(path, arcname)`` pairs to archive instead of
+            walking ``root``. Missing files are skipped.
+        host: Remote host, or None for a local directory
+        user: Remote user
+
+    Yields:
+        Chunks of the archive, at most ``ARCHIVE_CHUNK_SIZE`` bytes of
+        file content each.
+    """
+    source = open_source(host, user)
+    count = 0
+    try:
+        members: Iterable[tuple[str, str, os.stat_result]]
+        if files is None:
+            members = (
+                (path, os.path.relpath(path, root).replace(os.sep, "/"), st)
+                for path, st in source.walk(root)
+            )
+        else:
+            members = _explicit_members(source, files)
+
+        for path, arcname, st in members:
+            if pattern is not None and not matches(arcname, pattern):
+                continue
+            member = ArchiveMember(
+                path=path,
+                arcname=arcname,
+                size=st.st_size,
+                mtime=st.st_mtime,
+                mode=st.st_mode,
+            )
+            try:
+                f = source.open(path)
+            except (FileNotFoundError, PermissionError) as e:
+                logger.warning(f"Skipping {path} in archive: {e}")
+                continue
+            with f:
+                yield _header(member)
+                yield from _member_data(f, member)
+            count += 1
+        yield _END_OF_ARCHIVE
+        logger.debug(f"Archived {count} files from {root}")
+    finally:
+        source.close()
+
+
+def _explicit_members(
+    source: _LocalSource | _RemoteSource, files: Iterable[tuple[str, str]]
+) -> Iterator[tuple[str, str, os.stat_result]]:
+    for path, arcname in files:
+        try:
+            st = source.stat(path)
+        except (FileNotFoundError, PermissionError) as e:
+            logger.warning(f"Skipping {path} in archive: {e}")
+            continue
+        if stat.S_ISREG(st.st_mode):
+            yield path, arcname, st
@@ -6,6 +6,8 @@ import blackfish.server.db  # noqa: F401
 
 import configparser
 import os
+import posixpath
+import stat
 from os import urandom
 import json
 import httpx
@@ -13,9 +15,10 @@ from blackfish.server.http_client import create_http_client, STREAM_TIMEOUT
 from datetime import datetime
 from dataclasses import dataclass
 from collections.abc import AsyncGenerator
-from typing import Optional, Tuple, Any, Type, Annotated, Callable
+from typing import Optional, Tuple, Any, Type, Annotated, Callable, Literal
 import asyncio
-from pathlib import Path, PurePosixPath
+from pathlib import Path
+from urllib.parse import quote
 import bcrypt
 from importlib import import_module
 from uuid import UUID
@@ -46,6 +49,7 @@ from litestar.exceptions import (
     NotAuthorizedException,
     InternalServerException,
     HTTPException,
+    ImproperlyConfiguredException,
     ValidationException,
 )
 from litestar.status_codes import HTTP_409_CONFLICT, HTTP_404_NOT_FOUND
@@ -65,7 +69,7 @@ from litestar.middleware.base import MiddlewareProtocol
 from litestar.middleware.session.client_side import CookieBackendConfig
 from litestar.response import File
 from litestar.enums import RequestEncodingType
-from litestar.params import Body
+from litestar.params import Body, Parameter
 
 from huggingface_hub import login as hf_login, HfApi, model_info as hf_model_info
 from huggingface_hub.errors import HfHubHTTPError, RepositoryNotFoundError
@@ -81,19 +85,44 @@ from blackfish.server.files import (
     validate_file_extension,
     validate_file_size,
 )
+from blackfish.server import archive
+from blackfish.server import export
 from blackfish.server import sftp
+from blackfish.server import sync
+from blackfish.server import thumbnails
+from blackfish.server import uploads
+from blackfish.server.uploads import UploadRequest, UploadStatus, ChunkReceipt
+from blackfish.server.sync import SyncPlan, SyncRequest
 from blackfish.server.services.base import Service, ServiceLaunchError, ServiceStatus
 from blackfish.server.services.speech_recognition import SpeechRecognitionConfig
 from blackfish.server.services.text_generation import TextGenerationConfig
 from blackfish.server.jobs.base import (
+    _TERMINAL_STATUSES,
     BatchJob,
     BatchJobStatus,
     create_tigerflow_client,
     create_tigerflow_client_for_profile,
 )
-from blackfish.server.jobs.tasks import (
-    get_default_output_ext,
+from blackfish.server.jobs.analytics import JobAnalytics, job_analytics
+from blackfish.server.jobs.cache import RESULTS_DIR
+from blackfish.server.jobs.queue import QueueLimits, renumber_queue, should_queue
+from blackfish.server.jobs.estimate import (
+    DEFAULT_SAMPLE_SIZE,
+    DEFAULT_SHARD_COUNTS,
+    JobEstimate,
+    estimate_job,
 )
+from blackfish.server.jobs.results import (
+    BatchJobResult,
+    ResultOrder,
+    ResultSort,
+    collect_results,
+    delete_results,
+    encode_cursor,
+    query_results,
+    replace_results,
+)
+from blackfish.server.jobs.supervisor import JobSupervisor
 from blackfish.server.config import config as blackfish_config
 from blackfish.server.utils import find_port
 from blackfish.server.models.profile import (
@@ -503,36 +532,98 @@ class FileStats:
     modified_at: datetime
 
 
-def listdir(path: str, hidden: bool = False) -> list[FileStats]:
-    scan_iter = os.scandir(path)
-    if not hidden:
-        items = list(filter(lambda x: not x.name.startswith("."), scan_iter))
+_LOCAL_SORT_KEYS: dict[str, Callable[[tuple[str, os.stat_result]], Any]] = {
+    "name": lambda item: item[0],
+    "size": lambda item: item[1].st_size,
+    "modified": lambda item: item[1].st_mtime,
+}
+
+
+def _file_stats(path: str, name: str, st: os.stat_result) -> FileStats:
+    return FileStats(
+        name=name,
+        path=os.path.join(path, name),
+        is_dir=stat.S_ISDIR(st.st_mode),
+        size=st.st_size,
+        created_at=datetime.fromtimestamp(st.st_ctime),
+        modified_at=datetime.fromtimestamp(st.st_mtime),
+    )
+
+
+def listdir(
+    path: str,
+    hidden: bool = False,
+    limit: int | None = None,
+    offset: int = 0,
+    sort: str | None = None,
+    order: str = "asc",
+) -> tuple[list[FileStats], int]:
+    """List a local directory, one ``stat`` per reported entry.
+
+    Returns ``(files, total)``, where ``total`` is the number of entries
+    after the ``hidden`` filter but before pagination. Unless sorting by
+    size or modification time, only the requested page is stat'ed.
+    Entries that disappear while listing are skipped.
+    """
+    with os.scandir(path) as scan_iter:
+        names = [e.name for e in scan_iter if hidden or not e.name.startswith(".")]
+    total = len(names)
+    end = None if limit is None else offset + limit
+
+    def stat_all(page: list[str]) -> list[tuple[str, os.stat_result]]:
+        stats = []
+        for name in page:
+            try:
+                stats.append((name, os.stat(os.path.join(path, name))))
+            except FileNotFoundError:
+                continue
+        return stats
+
+    if sort in (None, "name"):
+        if sort == "name":
+            names.sort(reverse=order == "desc")
+        elif order == "desc":
+            names.reverse()
+        items = stat_all(names[offset:end])
     else:
-        items = list(scan_iter)
-    return [
-        FileStats(
-            name=item.name,
-            path=item.path,
-            is_dir=item.is_dir(),
-            size=item.stat().st_size,
-            created_at=datetime.fromtimestamp(item.stat().st_ctime),
-            modified_at=datetime.fromtimestamp(item.stat().st_mtime),
-        )
-        for item in items
-    ]
+        items = sorted(
+            stat_all(names),
+            key=_LOCAL_SORT_KEYS[sort],
+            reverse=order == "desc",
+        )[offset:end]
+    return [_file_stats(path, name, st) for name, st in items], total
 
 
 @get("/api/files", guards=ENDPOINT_GUARDS)
 async def get_files(
     path: str = "~",
     hidden: bool = False,
+    limit: Annotated[int | None, Parameter(gt=0, le=100_000)] = None,
+    offset: Annotated[int, Parameter(ge=0)] = 0,
+    sort: Literal["name", "size", "modified"] | None = None,
+    order: Literal["asc", "desc"] = "asc",
 ) -> dict[str, Any] | HTTPException:
+    """List a local directory. Without ``limit``, every entry from ``offset``
+    on is listed; ``total`` is the number of entries either way.
+    """
     resolved_path = os.path.expanduser(path)
     if os.path.isdir(resolved_path):
         try:
+            files, total = await asyncio.to_thread(
+                listdir,
+                resolved_path,
+                hidden=hidden,
+                limit=limit,
+                offset=offset,
+                sort=sort,
+                order=order,
+            )
             return {
                 "path": resolved_path,
-                "files": listdir(resolved_path, hidden=hidden),
+                "files": files,
+                "total": total,
+                "limit": limit,
+                "offset": offset,
             }
         except PermissionError:
             logger.debug("Permission error raised")
@@ -685,6 +776,33 @@ async def get_image(path: str, profile: Optional[str] = None) -> File | Stream:
     return try_read_file(file_path)
 
 
+@get("/api/image/thumbnail", guards=ENDPOINT_GUARDS)
+async def get_image_thumbnail(
+    path: str,
+    state: State,
+    profile: Optional[str] = None,
+    size: Annotated[
+        int, Parameter(ge=16, le=thumbnails.MAX_THUMBNAIL_SIZE)
+    ] = thumbnails.DEFAULT_THUMBNAIL_SIZE,
+) -> Response[bytes]:
+    """Retrieve a downscaled preview of an image that fits in a `size` x `size` box."""
+
+    validate_file_extension(Path(path), IMAGE_EXTENSIONS)
+    remote_profile = (
+        _get_validated_remote_profile(profile) if profile is not None else None
+    )
+    cache = thumbnails.get_cache(state.HOME_DIR, state.THUMBNAIL_CACHE_SIZE)
+
+    content = await asyncio.to_thread(
+        thumbnails.get_thumbnail, cache, path, size, remote_profile
+    )
+    return Response(
+        content=content,
+        media_type=thumbnails.media_type(content),
+        headers={"Cache-Control": "private, max-age=300"},
+    )
+
+
 @put("/api/image", guards=ENDPOINT_GUARDS)
 async def update_image(
     data: Annotated[
@@ -1023,6 +1141,145 @@ async def delete_audio(path: str, profile: Optional[str] = None) -> Path | str:
     return try_delete_file(file_path)
 
 
+def _upload_profile(profile_name: str | None) -> SlurmProfile | None:
+    if profile_name is None:
+        return None
+    return _get_validated_remote_profile(profile_name)
+
+
+@post("/api/uploads", guards=ENDPOINT_GUARDS)
+async def create_upload(data: UploadRequest, state: State) -> UploadStatus:
+    """Start a resumable chunked upload to a local or remote path.
+
+    The response lists the chunks the server expects; send each one with
+    `PUT /api/uploads/{upload_id}/chunks/{index}`, then finalize the upload
+    with `POST /api/uploads/{upload_id}/complete`.
+    """
+
+    remote_profile = _upload_profile(data.profile)
+    logger.debug(f"Creating upload to {data.path} ({data.size} bytes)")
+    session = await asyncio.to_thread(
+        uploads.create_upload,
+        state.HOME_DIR,
+        data,
+        remote_profile,
+        _get_validated_remote_profile,
+    )
+    return uploads.upload_status(session)
+
+
+@get("/api/uploads/{upload_id:str}", guards=ENDPOINT_GUARDS)
+async def get_upload(upload_id: str, state: State) -> UploadStatus:
+    """Report the received byte ranges and missing chunks of an upload."""
+
+    session = uploads.load_session(state.HOME_DIR, upload_id)
+    return uploads.upload_status(session)
+
+
+@put(
+    "/api/uploads/{upload_id:str}/chunks/{index:int}",
+    guards=ENDPOINT_GUARDS,
+    request_max_body_size=uploads.MAX_CHUNK_SIZE,
+)
+async def upload_chunk(
+    upload_id: str,
+    index: int,
+    offset: int,
+    request: Request,  # type: ignore
+    state: State,
+    sha256: Optional[str] = None,
+) -> ChunkReceipt:
+    """Write one chunk of an upload. The request body is the raw chunk data."""
+
+    session = uploads.load_session(state.HOME_DIR, upload_id)
+    remote_profile = _upload_profile(session.profile)
+    content = await request.body()
+    return await asyncio.to_thread(
+        uploads.write_chunk,
+        state.HOME_DIR,
+        upload_id,
+        index,
+        offset,
+        content,
+        remote_profile,
+        sha256,
+    )
+
+
+@post("/api/uploads/{upload_id:str}/complete", guards=ENDPOINT_GUARDS)
+async def complete_upload(upload_id: str, state: State) -> FileUploadResponse:
+    """Move a fully received upload into place with an atomic rename."""
+
+    session = uploads.load_session(state.HOME_DIR, upload_id)
+    remote_profile = _upload_profile(session.profile)
+    return await asyncio.to_thread(
+        uploads.complete_upload, state.HOME_DIR, upload_id, remote_profile
+    )
+
+
+@delete("/api/uploads/{upload_id:str}", guards=ENDPOINT_GUARDS, status_code=200)
+async def abort_upload(upload_id: str, state: State) -> str:
+    """Abort an upload and discard the data received so far."""
+
+    session = uploads.load_session(state.HOME_DIR, upload_id)
+    remote_profile = _upload_profile(session.profile)
+    return await asyncio.to_thread(
+        uploads.abort_upload, state.HOME_DIR, upload_id, remote_profile
+    )
+
+
+async def _plan_sync(data: SyncRequest) -> tuple[SyncPlan, SlurmProfile]:
+    profile = _get_validated_remote_profile(data.profile)
+    source = os.path.expanduser(data.source)
+    try:
+        plan = await sync.plan_sync(
+            source,
+            data.destination,
+            profile.host,
+            profile.user,
+            checksum=data.checksum,
+        )
+    except FileNotFoundError as e:
+        raise NotFoundException(str(e))
+    except NotADirectoryError as e:
+        raise ValidationException(str(e))
+    except PermissionError:
+        raise NotAuthorizedException(f"Permission denied: {data.destination}")
+    return plan, profile
+
+
+@post("/api/sync/plan", guards=ENDPOINT_GUARDS, status_code=200)
+async def create_sync_plan(data: SyncRequest) -> SyncPlan:
+    """Compare a local directory with a remote one without transferring.
+
+    Lists the files that `POST /api/sync` would send and why: `missing` on
+    the remote, a different `size`, a newer local `mtime`, or, with
+    `checksum`, a different SHA-256.
+    """
+    plan, _ = await _plan_sync(data)
+    return plan
+
+
+@post("/api/sync", guards=ENDPOINT_GUARDS, status_code=200)
+async def sync_directory(data: SyncRequest) -> Stream:
+    """Send the missing and changed files in a local directory to a remote one.
+
+    The response is newline-delimited JSON: a `plan` event, `progress`
+    events as files are sent, and a final `done` event listing any files
+    that failed. Disconnecting stops the sync after in-flight files finish.
+    """
+    plan, profile = await _plan_sync(data)
+    logger.debug(
+        f"Syncing {len(plan.transfers)} files ({plan.total_bytes} bytes) to "
+        f"{profile.user}@{profile.host}:{plan.destination}"
+    )
+    return Stream(
+        sync.stream_sync(plan, profile.host, profile.user, workers=data.workers),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-store"},
+    )
+
+
 @get("/api/ports", guards=ENDPOINT_GUARDS)
 async def get_ports(request: Request) -> int:  # type: ignore
     """Find an available port on the server. This endpoint allows a UI to run local services."""
@@ -1402,6 +1659,20 @@ async def prune_services(session: AsyncSession, state: State) -> int:
     return count
 
 
+class BatchJobStage(BaseModel):
+    """A task chained after the first task of a batch job.
+
+    The stage reads the outputs of the stage before it, within the same
+    pipeline and allocation.
+    """
+
+    task: str  # e.g., "translate"
+    repo_id: str  # Model ID
+    revision: Optional[str] = None  # Model revision
+    params: Optional[dict[str, Any]] = None  # Task-specific parameters
+    output_ext: Optional[str] = None  # Output file extension
+
+
 class BatchJobRequest(BaseModel):
     """Request model for creating a batch job."""
 
@@ -1417,9 +1688,19 @@ class BatchJobRequest(BaseModel):
     output_ext: Optional[str] = None  # Output file extension (e.g., ".json")
     cache_dir: Optional[str] = None  # Model cache directory on cluster
     params: Optional[dict[str, Any]] = None  # Task-specific parameters
+    stages: Optional[list[BatchJobStage]] = None  # Tasks chained after `task`
     resources: Optional[dict[str, Any]] = None  # Resource requirements
     max_workers: int = 1  # Max concurrent Slurm workers
     idle_timeout: int = DEFAULT_IDLE_TIMEOUT  # Minutes before auto-stop
+    shards: int = 1  # Parallel allocations splitting the inputs
+    result_cache: bool = False  # Reuse and keep outputs in the profile's cache
+    priority: int = 0  # Dispatch order when queued for an allocation (higher first)
+
+
+class BatchJobEstimateRequest(BatchJobRequest):
+    """Request model for a sampling estimate of a batch job."""
+
+    sample: int = DEFAULT_SAMPLE_SIZE  # Input files to run on
 
 
 def build_batch_job(data: BatchJobRequest) -> BatchJob:
@@ -1439,9 +1720,17 @@ def build_batch_job(data: BatchJobRequest) -> BatchJob:
         "output_ext": data.output_ext,
         "cache_dir": data.cache_dir,
         "params": data.params,
+        "stages": [stage.model_dump(exclude_none=True) for stage in data.stages]
+        if data.stages
+        else None,
         "resources": data.resources,
         "max_workers": data.max_workers,
         "idle_timeout": data.idle_timeout,
+        "shards": data.shards,
+        "result_cache": f"{data.profile.cache_dir}/{RESULTS_DIR}"
+        if data.result_cache
+        else None,
+        "priority": data.priority,
     }
 
     if isinstance(data.profile, LocalProfile):
@@ -1510,6 +1799,28 @@ async def run_job(
 
     logger.debug("Building batch job...")
     batch_job = build_batch_job(data)
+    return await _start_batch_job(batch_job, session, state)
+
+
+async def _start_batch_job(
+    batch_job: BatchJob, session: AsyncSession, state: State
+) -> BatchJob:
+    """Persist and start a new batch job.
+
+    If the allocation caps are reached (see ``jobs.queue``), the job is
+    queued instead, and the job supervisor starts it once there's room.
+    """
+    # Queued jobs are dispatched by the supervisor, so only queue with one.
+    limits = QueueLimits.from_config(state)
+    supervisor: JobSupervisor | None = (
+        getattr(state, "job_supervisor", None) if limits.enabled() else None
+    )
+    if supervisor is not None:
+        # Admit the job against the allocations the dispatcher counts: hold
+        # its lock until this request's changes are committed (released by
+        # session_provider), before writing anything.
+        await supervisor.admission.acquire()
+        session.info.setdefault("held_locks", []).append(supervisor.admission)
 
     # Add to database first to get ID
     session.add(batch_job)
@@ -1518,7 +1829,10 @@ async def run_job(
     logger.debug("Attempting to start batch job...")
     try:
         client = create_tigerflow_client(batch_job, state)
-        await batch_job.start(state, client)
+        if supervisor is not None and await should_queue(session, batch_job, limits):
+            await batch_job.queue(state, client)
+        else:
+            await batch_job.start(state, client)
     except ValueError as e:
         # Bad request (e.g. input_dir does not exist): surface as 4xx and don't
         # leave a phantom job behind.
@@ -1540,10 +1854,51 @@ async def run_job(
     # Persist final state
     session.add(batch_job)
     await session.flush()
+    if batch_job.status == BatchJobStatus.QUEUED:
+        await renumber_queue(session)
+        await session.flush()
 
     return batch_job
 
 
+@post("/api/jobs/estimate", guards=ENDPOINT_GUARDS)
+async def run_job_estimate(
+    data: BatchJobEstimateRequest,
+    session: AsyncSession,
+    state: State,
+) -> BatchJob:
+    """Start a sampling job to estimate the cost of a batch job.
+
+    Runs the job on a random sample of `sample` files from `input_dir`, in a
+    single short allocation, through the same launch path as a regular job.
+    Its estimate is at `GET /api/jobs/{job_id}/estimate`.
+    """
+    logger.debug(f"Received job estimate request: {data}")
+
+    batch_job = build_batch_job(data)
+    batch_job.sample = data.sample
+    # A sample that runs out of time is estimated from the files it finished.
+    batch_job.max_restarts = 0
+    return await _start_batch_job(batch_job, session, state)
+
+
+async def _poll_jobs(jobs: list[BatchJob], session: AsyncSession, state: State) -> None:
+    """Poll active jobs in the request, when there's no job supervisor to."""
+    if getattr(state, "job_supervisor", None) is not None:
+        return
+    for job in jobs:
+        if job.status in _TERMINAL_STATUSES:
+            continue
+        # poll() advances the restart loop.
+        try:
+            client = create_tigerflow_client(job, state)
+            await job.poll(client, state)
+            session.add(job)
+        except Exception as e:
+            logger.warning(f"Failed to update job {job.id}: {e}")
+    await session.flush()
+
+
 @get("/api/jobs", guards=ENDPOINT_GUARDS)
 async def fetch_jobs(
     session: AsyncSession,
@@ -1555,7 +1910,13 @@ async def fetch_jobs(
     name: Optional[str] = None,
     profile: Optional[str] = None,
 ) -> list[BatchJob]:
-    """List batch jobs with optional filtering."""
+    """List batch jobs with optional filtering.
+
+    Returns the persisted job state. Active jobs are polled (and restarted
+    when their allocation ends with work remaining) by the background job
+    supervisor, or here if background polling is turned off. A job waiting for an allocation has status
+    ``queued`` and its place in the queue in ``queue_position``.
+    """
     query_params = {
         "id": id,
         "task": task,
@@ -1576,16 +1937,7 @@ async def fetch_jobs(
     jobs = list(res.scalars().all())
     logger.debug(f"Found {len(jobs)} matching batch jobs.")
 
-    # Update status for each job; poll() advances the restart loop.
-    for job in jobs:
-        try:
-            client = create_tigerflow_client(job, state)
-            await job.poll(client, state)
-            session.add(job)
-        except Exception as e:
-            logger.warning(f"Failed to update job {job.id}: {e}")
-
-    await session.flush()
+    await _poll_jobs(jobs, session, state)
 
     return jobs
 
@@ -1608,10 +1960,14 @@ async def get_job(
             detail="An error occurred while fetching the job."
         )
     try:
-        return res.scalar_one()
+        job = res.scalar_one()
     except NoResultFound:
         raise NotFoundException(detail=f"Job {id} not found")
 
+    await _poll_jobs([job], session, state)
+
+    return job
+
 
 @dataclass
 class JobFileResult:
@@ -1631,67 +1987,321 @@ class JobFileResult:
     status: str
     error: str | None
 
+    @classmethod
+    def from_result(cls, result: BatchJobResult) -> "JobFileResult":
+        return cls(
+            file=result.file,
+            input_file=result.input_file,
+            task=result.task,
+            output_file=result.output_file,
+            started_at=result.started_at.isoformat(),
+            finished_at=result.finished_at.isoformat(),
+            duration_ms=result.duration_ms,
+            status=result.status,
+            error=result.error,
+        )
+
+
+async def _sync_job_results(job: BatchJob, session: AsyncSession, state: State) -> None:
+    """Record a job's results from a fresh report unless they're current.
+
+    The supervisor records the results of active jobs as it polls them. A job
+    it hasn't recorded yet (or that the supervisor doesn't poll) is read here,
+    as is a job that stopped since its results were recorded. Once recorded
+    for a stopped job, its results don't change until it's resumed.
+    """
+    if job.results_status is not None and (
+        job.status not in _TERMINAL_STATUSES or job.results_status == job.status
+    ):
+        return
+
+    client = create_tigerflow_client(job, state)
+    try:
+        report = await job.report(client)
+    except TigerFlowError as e:
+        raise InternalServerException(detail=f"Failed to fetch job results: {e}")
+
+    results = await asyncio.to_thread(collect_results, job, report)
+    await replace_results(session, job.id, results)
+    # An active job stays with the supervisor, which records its changes.
+    if job.status in _TERMINAL_STATUSES:
+        job.results_status = job.status
+
 
 @get("/api/jobs/{job_id:str}/results", guards=ENDPOINT_GUARDS)
 async def get_job_results(
     job_id: str,
     session: AsyncSession,
     state: State,
-) -> list[JobFileResult]:
-    """Get file-level results for a batch job."""
+    job_status: Annotated[
+        Literal["success", "error"] | None, Parameter(query="status")
+    ] = None,
+    task: str | None = None,
+    sort: ResultSort = "finished_at",
+    order: ResultOrder = "asc",
+    limit: Annotated[int | None, Parameter(gt=0, le=100_000)] = None,
+    after: str | None = None,
+) -> Response[list[JobFileResult]]:
+    """Get file-level results for a batch job.
+
+    Results are filtered by `status` and `task`, and sorted by `finished_at`
+    or `duration` (ties broken by an arbitrary but stable order). With
+    `limit`, a page of at most `limit` results is returned; if there may be
+    more, the `X-Next-Cursor` header holds the `after` value of the next page.
+    """
     job = await get_batch_job(job_id, session)
     if job is None:
         raise NotFoundException(detail=f"Job {job_id} not found")
 
-    client = create_tigerflow_client(job, state)
-
+    await _sync_job_results(job, session, state)
     try:
-        report = await client.report(job.output_dir)
-    except TigerFlowError as e:
-        raise InternalServerException(detail=f"Failed to fetch job results: {e}")
+        results, cursor = await query_results(
+            session,
+            job.id,
+            status=job_status,
+            task=task,
+            sort=sort,
+            order=order,
+            limit=limit,
+            after=after,
+        )
+    except ValueError as e:
+        raise ValidationException(detail=str(e))
 
-    # Build error lookup: {task: {filename: error_message}}
-    error_lookup: dict[str, dict[str, str]] = {}
-    for task_name, error_list in report.errors.items():
-        error_lookup[task_name] = {err.file: err.message for err in error_list}
-
-    # Flatten metrics across tasks, deduplicating by (task, file) — keep latest
-    latest: dict[tuple[str, str], JobFileResult] = {}
-    for task_name, task_metrics in report.metrics.items():
-        task_errors = error_lookup.get(task_name, {})
-        output_ext = job.output_ext or get_default_output_ext(job.task) or ""
-        for file_metric in task_metrics.files:
-            stem = PurePosixPath(file_metric.file).stem
-            output_file = f"{job.output_dir}/{task_name}/{stem}{output_ext}"
-            # Full input path, symmetric with output_file. tigerflow reports the
-            # file relative to the input dir, so join unless it's already absolute.
-            input_path = PurePosixPath(file_metric.file)
-            input_file = (
-                str(input_path)
-                if input_path.is_absolute()
-                else f"{job.input_dir}/{file_metric.file}"
-            )
+    headers = {"X-Next-Cursor": cursor} if cursor is not None else None
+    return Response(
+        [JobFileResult.from_result(result) for result in results], headers=headers
+    )
+
+
+@get("/api/jobs/{job_id:str}/analytics", guards=ENDPOINT_GUARDS)
+async def get_job_analytics(
+    job_id: str, session: AsyncSession, state: State
+) -> JobAnalytics:
+    """Get throughput, latency and ETA analytics for a batch job.
+
+    Throughput is files/sec over sliding windows (5m, 15m, 1h), latency the
+    p50/p95/p99 duration of each task, and the ETA the remaining files over
+    the most recent throughput. For a Slurm job, `projected_restarts` is the
+    number of further allocations its walltime needs to finish, to compare
+    with `restart_budget`.
+    """
+    job = await get_batch_job(job_id, session)
+    if job is None:
+        raise NotFoundException(detail=f"Job {job_id} not found")
+
+    await _sync_job_results(job, session, state)
+    profile = deserialize_profile(state.HOME_DIR, job.profile)
+    return await job_analytics(
+        session,
+        job,
+        walltime=job.walltime(profile),
+        active=job.status not in _TERMINAL_STATUSES,
+    )
+
+
+@get("/api/jobs/{job_id:str}/estimate", guards=ENDPOINT_GUARDS)
+async def get_job_estimate(
+    job_id: str,
+    session: AsyncSession,
+    state: State,
+    shards: Optional[list[int]] = None,
+) -> JobEstimate:
+    """Get the extrapolated cost of a batch job from its sampling job.
+
+    The mean time per file of each task over the sample, projected to all of
+    `input_dir` for each number of `shards` (1, 2, 4, 8 and 16 by default):
+    wall-clock time and GPU-hours, with the allocations each shard needs at
+    the job's walltime.
+    """
+    job = await get_batch_job(job_id, session)
+    if job is None:
+        raise NotFoundException(detail=f"Job {job_id} not found")
+    if not job.is_sample():
+        raise ValidationException(detail=f"Job {job_id} is not a sampling job")
+
+    await _sync_job_results(job, session, state)
+    profile = deserialize_profile(state.HOME_DIR, job.profile)
+    return await estimate_job(
+        session,
+        job,
+        walltime=job.walltime(profile),
+        shard_counts=shards or DEFAULT_SHARD_COUNTS,
+    )
+
+
+def _content_disposition(filename: str) -> str:
+    """An attachment ``Content-Disposition`` for ``filename``, escaped like
+    litestar's ``File`` responses: as is if it is plain ASCII, percent-encoded
+    otherwise.
+    """
+    quoted = quote(filename)
+    if quoted == filename:
+        return f'attachment; filename="{filename}"'
+    return f"attachment; filename*=utf-8''{quoted}"
+
+
+def _archive_response(
+    root: str,
+    name: str,
+    *,
+    pattern: str | None = None,
+    files: list[tuple[str, str]] | None = None,
+    host: str | None = None,
+    user: str | None = None,
+) -> Stream:
+    return Stream(
+        archive.stream_tar(root, pattern=pattern, files=files, host=host, user=user),
+        media_type="application/x-tar",
+        headers={
+            "Content-Disposition": _content_disposition(f"{name}.tar"),
+            "Cache-Control": "no-store",
+        },
+    )
+
+
+@get("/api/jobs/{job_id:str}/archive", guards=ENDPOINT_GUARDS)
+async def get_job_archive(
+    job_id: str,
+    session: AsyncSession,
+    state: State,
+    pattern: str | None = None,
+    job_status: Annotated[
+        Literal["success", "error"] | None, Parameter(query="status")
+    ] = None,
+) -> Stream:
+    """Download a batch job's output directory as a tar archive.
+
+    The archive is streamed as it is read. `pattern` selects files by glob:
+    a bare name pattern such as `*.json` matches file names, and a pattern
+    with a `/` matches paths relative to the output directory. `status`
+    selects files by their result in `GET /api/jobs/{job_id}/results`:
+    outputs for successful files, or the input files (under `inputs/`)
+    for failed ones, e.g. to rerun them elsewhere.
+    """
+    job = await get_batch_job(job_id, session)
+    if job is None:
+        raise NotFoundException(detail=f"Job {job_id} not found")
 
-            key = (task_name, file_metric.file)
-            prev = latest.get(key)
-            if prev is None or datetime.fromisoformat(
-                file_metric.finished_at
-            ) > datetime.fromisoformat(prev.finished_at):
-                latest[key] = JobFileResult(
-                    file=file_metric.file,
-                    input_file=input_file,
-                    task=task_name,
-                    output_file=output_file
-                    if file_metric.status == "success"
-                    else None,
-                    started_at=file_metric.started_at,
-                    finished_at=file_metric.finished_at,
-                    duration_ms=file_metric.duration_ms,
-                    status=file_metric.status,
-                    error=task_errors.get(file_metric.file),
+    host, user = (None, None) if job.host == "localhost" else (job.host, job.user)
+    await asyncio.to_thread(archive.check_directory, job.output_dir, host, user)
+
+    files = None
+    if job_status is not None:
+        await _sync_job_results(job, session, state)
+        results, _ = await query_results(session, job.id, status=job_status)
+        files = []
+        for result in results:
+            if result.output_file is not None:
+                files.append(
+                    (
+                        result.output_file,
+                        posixpath.relpath(result.output_file, job.output_dir),
+                    )
+                )
+            else:
+                files.append(
+                    (
+                        result.input_file,
+                        "inputs/" + posixpath.relpath(result.input_file, job.input_dir),
+                    )
                 )
 
-    return list(latest.values())
+    return _archive_response(
+        job.output_dir,
+        job.name or str(job.id),
+        pattern=pattern,
+        files=files,
+        host=host,
+        user=user,
+    )
+
+
+@get("/api/jobs/{job_id:str}/export", guards=ENDPOINT_GUARDS)
+async def get_job_export(
+    job_id: str,
+    session: AsyncSession,
+    state: State,
+    export_format: Annotated[export.ExportFormat, Parameter(query="format")] = "jsonl",
+    job_status: Annotated[
+        Literal["success", "error"] | None, Parameter(query="status")
+    ] = None,
+    task: str | None = None,
+    limit: Annotated[int | None, Parameter(gt=0, le=100_000)] = None,
+    after: str | None = None,
+) -> Stream:
+    """Export a batch job's per-file results and outputs as one file.
+
+    One row per result in `GET /api/jobs/{job_id}/results` (filtered by
+    `status` and `task`, in order of `finished_at`), with the content of its
+    output file, as JSON Lines or, if `pyarrow` is installed on the server,
+    Parquet. The export is streamed as the outputs are read. The
+    `X-Next-Cursor` header holds the `after` value to continue from: export
+    a running job again with it to add the files that finished since.
+    """
+    job = await get_batch_job(job_id, session)
+    if job is None:
+        raise NotFoundException(detail=f"Job {job_id} not found")
+    if export_format == "parquet" and not export.parquet_available():
+        raise ValidationException(
+            detail="Parquet exports require pyarrow on the server (pip install pyarrow)"
+        )
+
+    await _sync_job_results(job, session, state)
+    try:
+        results, _ = await query_results(
+            session,
+            job.id,
+            status=job_status,
+            task=task,
+            limit=limit,
+            after=after,
+        )
+    except ValueError as e:
+        raise ValidationException(detail=str(e))
+
+    records = [export.ExportRecord.from_result(result) for result in results]
+    cursor = encode_cursor(results[-1]) if results else after
+    host, user = (None, None) if job.host == "localhost" else (job.host, job.user)
+    name = job.name or str(job.id)
+    headers = {
+        "Content-Disposition": _content_disposition(f"{name}.{export_format}"),
+        "Cache-Control": "no-store",
+    }
+    if cursor is not None:
+        headers["X-Next-Cursor"] = cursor
+    if export_format == "parquet":
+        return Stream(
+            export.stream_parquet(records, host=host, user=user),
+            media_type="application/vnd.apache.parquet",
+            headers=headers,
+        )
+    return Stream(
+        export.stream_jsonl(records, host=host, user=user),
+        media_type="application/jsonl",
+        headers=headers,
+    )
+
+
+@get("/api/archive", guards=ENDPOINT_GUARDS)
+async def get_archive(
+    path: str,
+    profile: str | None = None,
+    pattern: str | None = None,
+) -> Stream:
+    """Download a local or remote directory as a tar archive.
+
+    The archive is streamed as it is read; see `GET /api/jobs/{job_id}/archive`
+    for the `pattern` syntax.
+    """
+    remote_profile = _upload_profile(profile)
+    host = remote_profile.host if remote_profile else None
+    user = remote_profile.user if remote_profile else None
+    root = path if remote_profile else os.path.expanduser(path)
+    await asyncio.to_thread(archive.check_directory, root, host, user)
+
+    name = posixpath.basename(root.rstrip("/")) or "archive"
+    return _archive_response(root, name, pattern=pattern, host=host, user=user)
 
 
 @put("/api/jobs/{job_id:str}/stop", guards=ENDPOINT_GUARDS)
@@ -1726,6 +2336,9 @@ async def stop_job(
 
     session.add(job)
     await session.flush()
+    # A stopped queued job leaves the queue.
+    await renumber_queue(session)
+    await session.flush()
     return job
 
 
@@ -1785,6 +2398,7 @@ _DELETABLE_STATUSES = [
     BatchJobStatus.STALLED,
     BatchJobStatus.EXHAUSTED,
     BatchJobStatus.BROKEN,
+    BatchJobStatus.FAILED,
     None,
 ]
 
@@ -1851,6 +2465,7 @@ async def delete_job(
             deletion = sa.delete(BatchJob).where(BatchJob.id == batch_job.id)
             try:
                 await session.execute(deletion)
+                await delete_results(session, batch_job.id)
             except Exception as e:
                 logger.error(
                     f"An error occurred while attempting to delete batch job {batch_job.id.hex}: {e}"
@@ -3558,6 +4173,10 @@ async def session_provider(
             status_code=HTTP_409_CONFLICT,
             detail=str(e),
         ) from e
+    finally:
+        # Locks the handler holds until its changes are committed.
+        for lock in db_session.info.pop("held_locks", []):
+            lock.release()
 
 
 cors_config = CORSConfig(
@@ -3712,10 +4331,38 @@ async def close_http_client(app: Litestar) -> None:
     await app.state.http_client.aclose()
 
 
+async def start_job_supervisor(app: Litestar) -> None:
+    """Start polling active batch jobs in the background.
+
+    Disabled when ``JOB_POLL_INTERVAL`` is 0; jobs are then polled when
+    they're listed or fetched instead.
+    """
+    interval = app.state.JOB_POLL_INTERVAL
+    if interval <= 0:
+        # Queued jobs are only ever dispatched by the supervisor.
+        if QueueLimits.from_config(app.state).enabled():
+            raise ImproperlyConfiguredException(
+                "BLACKFISH_MAX_ALLOCATIONS_PER_PROFILE and "
+                "BLACKFISH_MAX_ALLOCATIONS_PER_USER need background job polling. "
+                "Set BLACKFISH_JOB_POLL_INTERVAL above 0."
+            )
+        app.state.job_supervisor = None
+        return
+    supervisor = JobSupervisor(db_config.create_session_maker(), app.state, interval)
+    supervisor.start()
+    app.state.job_supervisor = supervisor
+
+
+async def stop_job_supervisor(app: Litestar) -> None:
+    supervisor = getattr(app.state, "job_supervisor", None)
+    if supervisor is not None:
+        await supervisor.stop()
+
+
 app = Litestar(
     path=blackfish_config.BASE_PATH,
-    on_startup=[resume_incomplete_downloads, init_http_client],
-    on_shutdown=[close_http_client, remote.close_all],
+    on_startup=[resume_incomplete_downloads, init_http_client, start_job_supervisor],
+    on_shutdown=[stop_job_supervisor, close_http_client, remote.close_all],
     route_handlers=[
         dashboard,
         dashboard_login,
@@ -3732,6 +4379,7 @@ app = Litestar(
         get_files,
         upload_image,
         get_image,
+        get_image_thumbnail,
         update_image,
         delete_image,
         upload_text,
@@ -3742,6 +4390,13 @@ app = Litestar(
         get_audio,
         update_audio,
         delete_audio,
+        create_upload,
+        get_upload,
+        upload_chunk,
+        complete_upload,
+        abort_upload,
+        create_sync_plan,
+        sync_directory,
         run_service,
         stop_service,
         fetch_service,
@@ -3752,9 +4407,15 @@ app = Litestar(
         list_tasks,
         get_task,
         run_job,
+        run_job_estimate,
         fetch_jobs,
         get_job,
         get_job_results,
+        get_job_analytics,
+        get_job_estimate,
+        get_job_archive,
+        get_job_export,
+        get_archive,
         stop_job,
         resume_job,
         delete_job,
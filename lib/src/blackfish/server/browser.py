@@ -3,17 +3,45 @@
 This module provides a WebSocket endpoint for browsing remote file systems
 via SFTP. The underlying SSH+SFTP connection is held by
 :mod:`blackfish.server.remote`'s session pool — the WebSocket handler
-acquires it per message rather than holding a dedicated connection for
-the session's lifetime.
+borrows one of its SFTP channels per message rather than holding a
+dedicated connection for the session's lifetime.
+
+Messages are handled concurrently, up to ``MAX_CONCURRENT_REQUESTS`` per
+connection, so replies may arrive out of order; clients match them to
+requests by ``id``. The ``stat_many``, ``delete_many`` and ``rename_many``
+actions apply one operation to many paths and reply once with a result per
+path, so bulk operations in the UI take a single round trip.
+
+Directory listings are cached per ``(host, user, path)`` and revalidated
+against the directory's mtime, so paging, sorting and toggling hidden files
+cost one ``stat`` instead of a full ``listdir``. Changes made through this
+server (mkdir/rename/delete) invalidate the affected entries immediately.
+
+A ``list`` message with ``stream: true`` sends the directory in batches as
+it is read, over a dedicated SFTP channel, so the client can render the
+first entries of a huge directory before the rest has arrived. Streams run
+as background tasks on the connection and can be stopped with ``cancel``.
+
+``search`` and ``du`` walk a whole tree with a single remote ``find`` or
+``du`` and always stream their results the same way, so finding inputs or
+sizing a job's output directory takes one request instead of a ``list``
+per directory.
 """
 
 from __future__ import annotations
 
 import asyncio
+import itertools
 import json
 import os
+import posixpath
+import shlex
 import stat
-from typing import Annotated, Any, Literal, TYPE_CHECKING
+import threading
+import time
+from collections import OrderedDict
+from contextlib import ExitStack, aclosing
+from typing import Annotated, Any, Callable, Iterator, Literal, TYPE_CHECKING
 from enum import StrEnum
 from datetime import datetime
 
@@ -30,12 +58,28 @@ from blackfish.server.models.profile import (
 from blackfish.server.config import config as blackfish_config
 
 if TYPE_CHECKING:
-    from blackfish.server.remote import RemoteSession
+    from paramiko.sftp_attr import SFTPAttributes
+
+    from blackfish.server.remote import SFTPSession
 
 # WebSocket close codes (RFC 6455)
 WS_CLOSE_NORMAL = 1000  # Normal closure
 WS_CLOSE_POLICY_VIOLATION = 1008  # Policy violation (invalid profile, etc.)
 
+# Messages handled at once per connection. Further messages wait to be
+# read until a slot frees up.
+MAX_CONCURRENT_REQUESTS = 8
+
+# Paths operated on at once within a single batch message.
+_BATCH_CONCURRENCY = 4
+_MAX_BATCH_SIZE = 1000
+
+# ``search`` and ``du`` run one remote command for the whole tree. Results
+# are sent when a batch fills up or this long after the previous one, so
+# sparse matches still show up promptly.
+_COMMAND_TIMEOUT_SECONDS = 600.0
+_COMMAND_FLUSH_SECONDS = 0.25
+
 
 class FileEntry(BaseModel):
     name: str
@@ -56,6 +100,10 @@ class ErrorCode(StrEnum):
     UNKNOWN_ACTION = "unknown_action"
 
 
+SortKey = Literal["name", "size", "modified"]
+SortOrder = Literal["asc", "desc"]
+
+
 class ListMessage(BaseModel):
     action: Literal["list"]
     id: str | None = None
@@ -63,6 +111,15 @@ class ListMessage(BaseModel):
     show_hidden: bool = False
     limit: int = 1000
     offset: int = 0
+    # ``None`` keeps the order returned by the SFTP server.
+    sort: SortKey | None = None
+    order: SortOrder = "asc"
+    # Bypass the listing cache, e.g. for an explicit "reload" in the UI.
+    refresh: bool = False
+    # Send entries in batches as they are read instead of one response.
+    # Streams ignore sort/limit/offset and require an ``id``.
+    stream: bool = False
+    batch_size: int = Field(default=500, gt=0, le=10_000)
 
 
 class StatMessage(BaseModel):
@@ -96,16 +153,99 @@ class RenameMessage(BaseModel):
     new_path: str
 
 
+class StatManyMessage(BaseModel):
+    action: Literal["stat_many"]
+    id: str | None = None
+    paths: list[str] = Field(min_length=1, max_length=_MAX_BATCH_SIZE)
+
+
+class DeleteManyMessage(BaseModel):
+    action: Literal["delete_many"]
+    id: str | None = None
+    paths: list[str] = Field(min_length=1, max_length=_MAX_BATCH_SIZE)
+
+
+class RenamePair(BaseModel):
+    old_path: str
+    new_path: str
+
+
+class RenameManyMessage(BaseModel):
+    action: Literal["rename_many"]
+    id: str | None = None
+    renames: list[RenamePair] = Field(min_length=1, max_length=_MAX_BATCH_SIZE)
+
+
+class SearchMessage(BaseModel):
+    action: Literal["search"]
+    id: str | None = None
+    path: str
+    # Shell glob matched against entry names, e.g. ``*.wav``.
+    pattern: str | None = None
+    case_sensitive: bool = True
+    type: Literal["file", "dir"] | None = None
+    min_size: int | None = Field(default=None, ge=0)
+    max_size: int | None = Field(default=None, ge=0)
+    modified_after: datetime | None = None
+    modified_before: datetime | None = None
+    max_depth: int | None = Field(default=None, gt=0)
+    show_hidden: bool = False
+    # Stop after this many matches.
+    limit: int = Field(default=10_000, gt=0, le=1_000_000)
+    batch_size: int = Field(default=500, gt=0, le=10_000)
+
+
+class DuMessage(BaseModel):
+    action: Literal["du"]
+    id: str | None = None
+    path: str
+    # Report totals for directories down to this depth below ``path``.
+    max_depth: int = Field(default=1, ge=0, le=32)
+    # Sum file sizes rather than allocated blocks.
+    apparent_size: bool = False
+    batch_size: int = Field(default=500, gt=0, le=10_000)
+
+
+class CancelMessage(BaseModel):
+    action: Literal["cancel"]
+    id: str | None = None
+    # ``id`` of the streaming request to cancel.
+    target: str
+
+
 BrowserMessage = Annotated[
     ListMessage
     | StatMessage
     | ExistsMessage
     | MkdirMessage
     | DeleteMessage
-    | RenameMessage,
+    | RenameMessage
+    | StatManyMessage
+    | DeleteManyMessage
+    | RenameManyMessage
+    | SearchMessage
+    | DuMessage
+    | CancelMessage,
     Field(discriminator="action"),
 ]
 
+BatchMessage = StatManyMessage | DeleteManyMessage | RenameManyMessage
+
+_ACTIONS = (
+    "list",
+    "stat",
+    "exists",
+    "mkdir",
+    "delete",
+    "rename",
+    "stat_many",
+    "delete_many",
+    "rename_many",
+    "search",
+    "du",
+    "cancel",
+)
+
 BrowserMessageAdapter: TypeAdapter[BrowserMessage] = TypeAdapter(BrowserMessage)
 
 
@@ -134,12 +274,156 @@ def _map_exception_to_error_code(error: Exception) -> ErrorCode:
         return ErrorCode.CONNECTION_ERROR
 
 
+# Cached listings are revalidated against the directory mtime on every use,
+# but the mtime doesn't change when a file's contents (and so its size)
+# change, and has one-second resolution. Listings older than this are
+# re-read regardless.
+_LISTING_MAX_AGE_SECONDS = 60.0
+_LISTING_CACHE_MAX_DIRS = 256
+_LISTING_CACHE_MAX_ENTRIES = 500_000
+
+_SORT_KEYS: dict[str, Any] = {
+    "name": lambda a: a.filename,
+    "size": lambda a: a.st_size or 0,
+    "modified": lambda a: a.st_mtime or 0,
+}
+
+
+class _DirectoryListing:
+    """A directory's ``listdir_attr`` result plus derived sorted/filtered views."""
+
+    def __init__(self, mtime: int, attrs: list["SFTPAttributes"]) -> None:
+        self.mtime = mtime
+        self.attrs = attrs
+        self.listed_at = time.monotonic()
+        self._views: dict[tuple[str | None, str, bool], list["SFTPAttributes"]] = {}
+        self._lock = threading.Lock()
+
+    def expired(self) -> bool:
+        return time.monotonic() - self.listed_at > _LISTING_MAX_AGE_SECONDS
+
+    def view(
+        self, sort: str | None, order: str, show_hidden: bool
+    ) -> list["SFTPAttributes"]:
+        key = (sort, order, show_hidden)
+        with self._lock:
+            view = self._views.get(key)
+            if view is None:
+                view = self.attrs
+                if not show_hidden:
+                    view = [a for a in view if not a.filename.startswith(".")]
+                if sort is not None:
+                    view = sorted(view, key=_SORT_KEYS[sort], reverse=order == "desc")
+                elif order == "desc":
+                    view = view[::-1]
+                self._views[key] = view
+            return view
+
+
+class _ListingCache:
+    """Process-wide LRU of directory listings keyed by ``(host, user, path)``."""
+
+    def __init__(self, max_dirs: int, max_entries: int) -> None:
+        self.max_dirs = max_dirs
+        self.max_entries = max_entries
+        self._listings: OrderedDict[tuple[str, str, str], _DirectoryListing] = (
+            OrderedDict()
+        )
+        self._entries = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple[str, str, str], mtime: int) -> _DirectoryListing | None:
+        with self._lock:
+            listing = self._listings.get(key)
+            if listing is None:
+                return None
+            if listing.mtime != mtime or listing.expired():
+                self._pop(key)
+                return None
+            self._listings.move_to_end(key)
+            return listing
+
+    def put(self, key: tuple[str, str, str], listing: _DirectoryListing) -> None:
+        with self._lock:
+            self._pop(key)
+            if len(listing.attrs) > self.max_entries:
+                return
+            self._listings[key] = listing
+            self._entries += len(listing.attrs)
+            while (
+                len(self._listings) > self.max_dirs or self._entries > self.max_entries
+            ):
+                self._pop(next(iter(self._listings)))
+
+    def invalidate(self, host: str, user: str, path: str) -> None:
+        """Drop the listing of ``path`` and of every directory beneath it."""
+        path = _normalize(path)
+        prefix = path.rstrip("/") + "/"
+        with self._lock:
+            for key in list(self._listings):
+                if key[:2] == (host, user) and (
+                    key[2] == path or key[2].startswith(prefix)
+                ):
+                    self._pop(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._listings.clear()
+            self._entries = 0
+
+    def _pop(self, key: tuple[str, str, str]) -> None:
+        listing = self._listings.pop(key, None)
+        if listing is not None:
+            self._entries -= len(listing.attrs)
+
+
+_listing_cache = _ListingCache(_LISTING_CACHE_MAX_DIRS, _LISTING_CACHE_MAX_ENTRIES)
+
+
+def _normalize(path: str) -> str:
+    return posixpath.normpath(path) if path else "."
+
+
+def _invalidate_parent(sess: "SFTPSession", path: str) -> None:
+    """Invalidate the listing containing ``path`` and ``path``'s own subtree."""
+    path = _normalize(path)
+    _listing_cache.invalidate(sess.host, sess.user, path)
+    _listing_cache.invalidate(sess.host, sess.user, posixpath.dirname(path) or ".")
+
+
+def _read_listing(
+    sess: "SFTPSession", path: str, refresh: bool = False
+) -> _DirectoryListing:
+    """Return the listing of ``path``, from the cache if it is still current."""
+    key = (sess.host, sess.user, _normalize(path))
+    try:
+        mtime = sess.stat(path).st_mtime
+        if mtime is not None and not refresh:
+            listing = _listing_cache.get(key, mtime)
+            if listing is not None:
+                return listing
+        attrs = sess.sftp.listdir_attr(path)
+    except (FileNotFoundError, PermissionError):
+        raise
+    except Exception as e:
+        logger.error(f"SFTP listdir error: {e}")
+        raise OSError(str(e)) from e
+
+    listing = _DirectoryListing(mtime or 0, attrs)
+    if mtime is not None:
+        _listing_cache.put(key, listing)
+    return listing
+
+
 def _list_directory_entries(
-    sess: "RemoteSession",
+    sess: "SFTPSession",
     path: str,
     show_hidden: bool = False,
     limit: int = 1000,
     offset: int = 0,
+    sort: str | None = None,
+    order: str = "asc",
+    refresh: bool = False,
 ) -> tuple[list[FileEntry], int]:
     """List directory contents as :class:`FileEntry` models with pagination.
 
@@ -147,42 +431,97 @@ def _list_directory_entries(
     after the ``show_hidden`` filter but before pagination, so the caller
     can render an accurate "X of Y" indicator.
     """
-    try:
-        attrs = sess.sftp.listdir_attr(path)
-    except (FileNotFoundError, PermissionError):
-        raise
-    except Exception as e:
-        logger.error(f"SFTP listdir error: {e}")
-        raise OSError(str(e)) from e
-
-    if not show_hidden:
-        attrs = [a for a in attrs if not a.filename.startswith(".")]
+    attrs = _read_listing(sess, path, refresh=refresh).view(sort, order, show_hidden)
 
     total_count = len(attrs)
     page = attrs[offset : offset + limit]
 
-    return [
-        FileEntry(
-            name=attr.filename,
-            path=os.path.join(path, attr.filename),
-            is_dir=stat.S_ISDIR(attr.st_mode) if attr.st_mode else False,
-            size=attr.st_size or 0,
-            modified_at=(
-                datetime.fromtimestamp(attr.st_mtime)
-                if attr.st_mtime
-                else datetime.now()
-            ),
-            permissions=(
-                _format_permissions(attr.st_mode & 0o777)
-                if attr.st_mode
-                else "rwxrwxrwx"
-            ),
-        )
-        for attr in page
-    ], total_count
+    return [_file_entry(path, attr) for attr in page], total_count
 
 
-def _stat_entry(sess: "RemoteSession", path: str) -> FileEntry:
+def _file_entry(directory: str, attr: "SFTPAttributes") -> FileEntry:
+    return FileEntry(
+        name=attr.filename,
+        path=os.path.join(directory, attr.filename),
+        is_dir=stat.S_ISDIR(attr.st_mode) if attr.st_mode else False,
+        size=attr.st_size or 0,
+        modified_at=(
+            datetime.fromtimestamp(attr.st_mtime) if attr.st_mtime else datetime.now()
+        ),
+        permissions=(
+            _format_permissions(attr.st_mode & 0o777) if attr.st_mode else "rwxrwxrwx"
+        ),
+    )
+
+
+class _ListingStream:
+    """Reads a directory in batches for a streaming ``list``.
+
+    A current cached listing is replayed from memory. Otherwise the
+    directory is read with ``listdir_iter`` over a dedicated SFTP channel —
+    a partially consumed ``listdir_iter`` leaves unread replies on its
+    channel, so it must not share the pooled one — and the complete
+    listing is added to the cache. All methods block; call them from a
+    worker thread.
+    """
+
+    def __init__(self, profile: SlurmProfile, path: str, show_hidden: bool) -> None:
+        self.profile = profile
+        self.path = path
+        self.show_hidden = show_hidden
+        self._stack = ExitStack()
+        self._iter: Iterator["SFTPAttributes"] = iter(())
+        self._key = (profile.host, profile.user, _normalize(path))
+        self._mtime: int | None = None
+        # Everything read so far, for the cache. None when replaying.
+        self._read: list["SFTPAttributes"] | None = None
+
+    def open(self) -> None:
+        try:
+            with remote.borrow(self.profile.host, self.profile.user) as sess:
+                self._mtime = sess.stat(self.path).st_mtime
+            cached = (
+                _listing_cache.get(self._key, self._mtime)
+                if self._mtime is not None
+                else None
+            )
+            if cached is not None:
+                self._iter = iter(cached.attrs)
+                return
+            sftp = self._stack.enter_context(
+                remote.channel(self.profile.host, self.profile.user)
+            )
+            self._iter = sftp.listdir_iter(self.path)
+            self._read = []
+        except (FileNotFoundError, PermissionError):
+            raise
+        except Exception as e:
+            raise OSError(str(e)) from e
+
+    def next_batch(self, size: int) -> tuple[list["SFTPAttributes"], bool]:
+        """Return up to ``size`` entries (before hidden filtering) and a done flag."""
+        try:
+            batch = list(itertools.islice(self._iter, size))
+        except (FileNotFoundError, PermissionError):
+            raise
+        except Exception as e:
+            raise OSError(str(e)) from e
+        done = len(batch) < size
+        if self._read is not None:
+            self._read.extend(batch)
+            if done and self._mtime is not None:
+                _listing_cache.put(
+                    self._key, _DirectoryListing(self._mtime, self._read)
+                )
+        if not self.show_hidden:
+            batch = [a for a in batch if not a.filename.startswith(".")]
+        return batch, done
+
+    def close(self) -> None:
+        self._stack.close()
+
+
+def _stat_entry(sess: "SFTPSession", path: str) -> FileEntry:
     """Stat ``path`` and return a :class:`FileEntry`."""
     attr = sess.stat(path)
     return FileEntry(
@@ -199,25 +538,149 @@ def _stat_entry(sess: "RemoteSession", path: str) -> FileEntry:
     )
 
 
+# type, size, mtime, mode, path — path last, since it may contain tabs.
+_FIND_FORMAT = "%y\\t%s\\t%T@\\t%m\\t%p\\n"
+
+
+def _command_path(path: str) -> str:
+    path = _normalize(path)
+    if path.startswith("-"):
+        raise ValueError(f"Invalid path: {path}")
+    return path
+
+
+def _find_command(message: SearchMessage) -> list[str]:
+    """Build the remote ``find`` invocation for a ``search`` message."""
+    args = ["find", _command_path(message.path), "-mindepth", "1"]
+    if message.max_depth is not None:
+        args += ["-maxdepth", str(message.max_depth)]
+    if not message.show_hidden:
+        # Skip hidden entries and don't descend into hidden directories.
+        args += ["(", "-name", ".*", "-prune", ")", "-o"]
+    args.append("(")
+    if message.pattern is not None:
+        args += ["-name" if message.case_sensitive else "-iname", message.pattern]
+    if message.type is not None:
+        args += ["-type", "f" if message.type == "file" else "d"]
+    if message.min_size:
+        args += ["-size", f"+{message.min_size - 1}c"]
+    if message.max_size is not None:
+        args += ["-size", f"-{message.max_size + 1}c"]
+    if message.modified_after is not None:
+        args += ["-newermt", f"@{message.modified_after.timestamp():.0f}"]
+    if message.modified_before is not None:
+        args += ["!", "-newermt", f"@{message.modified_before.timestamp():.0f}"]
+    args += ["-printf", _FIND_FORMAT, ")"]
+    return [shlex.quote(arg) for arg in args]
+
+
+def _parse_find_line(line: bytes) -> FileEntry | None:
+    """Parse one line of ``_FIND_FORMAT`` output, or None if it is malformed."""
+    try:
+        kind, size, mtime, mode, path = (
+            line.decode("utf-8", "replace").rstrip("\n").split("\t", 4)
+        )
+        return FileEntry(
+            name=posixpath.basename(path),
+            path=path,
+            is_dir=kind == "d",
+            size=int(size),
+            modified_at=datetime.fromtimestamp(float(mtime)),
+            permissions=_format_permissions(int(mode, 8) & 0o777),
+        )
+    except ValueError:
+        logger.debug(f"Ignoring unexpected find output: {line!r}")
+        return None
+
+
+def _du_command(message: DuMessage) -> list[str]:
+    """Build the remote ``du`` invocation for a ``du`` message."""
+    args = ["du", "-B1", f"--max-depth={message.max_depth}"]
+    if message.apparent_size:
+        args.append("--apparent-size")
+    args += ["--", _normalize(message.path)]
+    return [shlex.quote(arg) for arg in args]
+
+
+def _parse_du_line(line: bytes) -> dict[str, Any] | None:
+    """Parse one ``size<TAB>path`` line of ``du`` output."""
+    try:
+        size, path = line.decode("utf-8", "replace").rstrip("\n").split("\t", 1)
+        return {"path": path, "size": int(size)}
+    except ValueError:
+        logger.debug(f"Ignoring unexpected du output: {line!r}")
+        return None
+
+
+def _command_error_code(error: remote.RemoteError) -> ErrorCode:
+    """Map a failed remote command to an ErrorCode."""
+    if isinstance(error, remote.RemoteCommandError):
+        detail = error.stderr.decode("utf-8", "replace")
+        if "No such file or directory" in detail:
+            return ErrorCode.NOT_FOUND
+        if "Permission denied" in detail:
+            return ErrorCode.PERMISSION_DENIED
+    return ErrorCode.CONNECTION_ERROR
+
+
+def _apply_batch_item(
+    sess: "SFTPSession", action: str, item: dict[str, str]
+) -> dict[str, Any]:
+    """Apply one path's share of a batch message and return its result fields."""
+    match action:
+        case "stat_many":
+            entry = _stat_entry(sess, item["path"])
+            return {"entry": entry.model_dump(mode="json")}
+        case "delete_many":
+            sess.delete(item["path"])
+            _invalidate_parent(sess, item["path"])
+            return {}
+        case "rename_many":
+            sess.rename(item["old_path"], item["new_path"])
+            _invalidate_parent(sess, item["old_path"])
+            _invalidate_parent(sess, item["new_path"])
+            return {}
+    raise ValueError(f"Unsupported batch action: {action}")
+
+
+def _run_batch_item(
+    profile: SlurmProfile, action: str, item: dict[str, str]
+) -> dict[str, Any]:
+    """Run one batch item on a borrowed channel; errors become a per-item result."""
+    try:
+        with remote.borrow(profile.host, profile.user) as sess:
+            return {**item, "status": "ok", **_apply_batch_item(sess, action, item)}
+    except Exception as e:
+        if not isinstance(e, (FileNotFoundError, PermissionError, OSError)):
+            logger.error(f"Unexpected error in {action} for {item}: {e}")
+        return {
+            **item,
+            "status": "error",
+            "error": {"code": _map_exception_to_error_code(e), "message": str(e)},
+        }
+
+
 class RemoteFileBrowserSession(WebsocketListener):
     """WebSocket handler for remote file browsing.
 
     The underlying SSH+SFTP connection is held by the shared pool in
-    :mod:`blackfish.server.remote`; each message acquires the pooled
-    session for the duration of one operation. Between user actions
+    :mod:`blackfish.server.remote`; each message borrows one of the pooled
+    SFTP channels for the duration of one operation. Between user actions
     the connection sits idle in the pool, available to other consumers.
+
+    One listener instance serves every connection, so per-connection state
+    (the profile, running streams and in-flight requests) lives on
+    ``socket.state``.
     """
 
     path = "/ws/files/{profile_name:str}"
 
-    profile: SlurmProfile | None = None
-    profile_name: str | None = None
-
     async def on_accept(
         self, socket: WebSocket[Any, Any, Any], profile_name: str
     ) -> None:
         """Validate the profile and probe the connection."""
-        self.profile_name = profile_name
+        socket.state.profile_name = profile_name
+        socket.state.profile = None
 
         try:
             profile = deserialize_profile(blackfish_config.HOME_DIR, profile_name)
@@ -283,7 +746,10 @@ class RemoteFileBrowserSession(WebsocketListener):
             await socket.close(code=WS_CLOSE_NORMAL)
             return
 
-        self.profile = profile
+        socket.state.profile = profile
+        socket.state.streams = {}
+        socket.state.requests = set()
+        socket.state.slots = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
         await socket.send_json(
             {
                 "status": "connected",
@@ -293,86 +759,466 @@ class RemoteFileBrowserSession(WebsocketListener):
         )
 
     async def on_disconnect(self, socket: WebSocket[Any, Any, Any]) -> None:
-        """Pool manages connection lifecycle; nothing to release here."""
-        logger.info(f"WebSocket disconnected for profile {self.profile_name}")
-        self.profile = None
+        """Cancel running work; the pool manages the connection itself."""
+        logger.info(
+            "WebSocket disconnected for profile "
+            f"{getattr(socket.state, 'profile_name', None)}"
+        )
+        for task, _ in getattr(socket.state, "streams", {}).values():
+            task.cancel()
+        for task in list(getattr(socket.state, "requests", ())):
+            task.cancel()
+        socket.state.profile = None
 
-    async def on_receive(self, data: str) -> str:
+    async def on_receive(self, data: str, socket: WebSocket[Any, Any, Any]) -> None:
         """Handle incoming WebSocket messages.
 
+        Each request is handled in a background task, up to
+        ``MAX_CONCURRENT_REQUESTS`` at a time; when all slots are busy this
+        waits for one to free up before returning, which stops further
+        messages from being read. Responses are sent on ``socket`` as each
+        request finishes: one per message, or a series of batches for a
+        streaming ``list``.
+
         Args:
             data: JSON string containing the request
-
-        Returns:
-            JSON string containing the response
+            socket: The client connection
         """
+        message = self._parse_message(data)
+        if isinstance(message, dict):
+            await socket.send_text(json.dumps(message, default=str))
+            return
+
+        profile: SlurmProfile | None = getattr(socket.state, "profile", None)
+        response: dict[str, Any] | None
+        match message:
+            case ListMessage(stream=True) | SearchMessage() | DuMessage():
+                response = self._start_stream(socket, profile, message)
+            case CancelMessage():
+                response = self._cancel_stream(socket, message)
+            case _ if profile is None:
+                response = self.handle_message(message, profile)
+            case _:
+                await socket.state.slots.acquire()
+                task = asyncio.create_task(self._respond(socket, profile, message))
+                socket.state.requests.add(task)
+                task.add_done_callback(socket.state.requests.discard)
+                response = None
+
+        if response is not None:
+            await socket.send_text(json.dumps(response, default=str))
+
+    async def _respond(
+        self,
+        socket: WebSocket[Any, Any, Any],
+        profile: SlurmProfile,
+        message: BrowserMessage,
+    ) -> None:
+        """Handle one request and send its reply, releasing its slot when done."""
+        try:
+            if isinstance(message, BatchMessage):
+                response = await self.handle_batch(message, profile)
+            else:
+                response = await asyncio.to_thread(
+                    self.handle_message, message, profile
+                )
+            await socket.send_text(json.dumps(response, default=str))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Most likely the client went away before the reply was sent.
+            logger.debug(f"Failed to reply to {message.action} request: {e}")
+        finally:
+            socket.state.slots.release()
+
+    def _parse_message(self, data: str) -> BrowserMessage | dict[str, Any]:
+        """Validate a raw message, returning an error response if it is invalid."""
         try:
             raw_message = json.loads(data)
         except json.JSONDecodeError as e:
-            return json.dumps(
-                {
-                    "status": "error",
-                    "error": {
-                        "code": ErrorCode.INVALID_REQUEST,
-                        "message": f"Invalid JSON: {e}",
-                    },
-                }
-            )
+            return {
+                "status": "error",
+                "error": {
+                    "code": ErrorCode.INVALID_REQUEST,
+                    "message": f"Invalid JSON: {e}",
+                },
+            }
 
         try:
-            message = BrowserMessageAdapter.validate_python(raw_message)
+            return BrowserMessageAdapter.validate_python(raw_message)
         except ValidationError as e:
             action = (
                 raw_message.get("action") if isinstance(raw_message, dict) else None
             )
-            if action is not None and action not in (
-                "list",
-                "stat",
-                "exists",
-                "mkdir",
-                "delete",
-                "rename",
-            ):
-                return json.dumps(
-                    {
-                        "id": raw_message.get("id")
-                        if isinstance(raw_message, dict)
-                        else None,
-                        "status": "error",
-                        "action": action,
-                        "error": {
-                            "code": ErrorCode.UNKNOWN_ACTION,
-                            "message": f"Unknown action: {action}",
-                        },
-                    }
-                )
-            return json.dumps(
-                {
+            if action is not None and action not in _ACTIONS:
+                return {
                     "id": raw_message.get("id")
                     if isinstance(raw_message, dict)
                     else None,
                     "status": "error",
                     "action": action,
                     "error": {
-                        "code": ErrorCode.INVALID_REQUEST,
-                        "message": str(e.errors()[0]["msg"]) if e.errors() else str(e),
+                        "code": ErrorCode.UNKNOWN_ACTION,
+                        "message": f"Unknown action: {action}",
                     },
                 }
+            return {
+                "id": raw_message.get("id") if isinstance(raw_message, dict) else None,
+                "status": "error",
+                "action": action,
+                "error": {
+                    "code": ErrorCode.INVALID_REQUEST,
+                    "message": str(e.errors()[0]["msg"]) if e.errors() else str(e),
+                },
+            }
+
+    def _start_stream(
+        self,
+        socket: WebSocket[Any, Any, Any],
+        profile: SlurmProfile | None,
+        message: ListMessage | SearchMessage | DuMessage,
+    ) -> dict[str, Any] | None:
+        """Start a streaming request in the background; return an error if it can't."""
+        if profile is None:
+            code, msg = ErrorCode.CONNECTION_ERROR, "SFTP connection not established"
+        elif message.id is None:
+            code, msg = ErrorCode.INVALID_REQUEST, "Streaming requests require an id"
+        elif message.id in socket.state.streams:
+            code, msg = (
+                ErrorCode.INVALID_REQUEST,
+                f"Stream {message.id} already running",
             )
+        else:
+            cancelled = asyncio.Event()
+            task = asyncio.create_task(
+                self._stream_listing(socket, profile, message, cancelled)
+                if isinstance(message, ListMessage)
+                else self._stream_command(socket, profile, message, cancelled)
+            )
+            socket.state.streams[message.id] = (task, cancelled)
+            return None
+
+        return {
+            "id": message.id,
+            "status": "error",
+            "action": message.action,
+            "error": {"code": code, "message": msg},
+        }
+
+    def _cancel_stream(
+        self, socket: WebSocket[Any, Any, Any], message: CancelMessage
+    ) -> dict[str, Any]:
+        stream = getattr(socket.state, "streams", {}).get(message.target)
+        if stream is not None:
+            stream[1].set()
+        return {
+            "id": message.id,
+            "status": "ok",
+            "action": message.action,
+            "data": {"cancelled": stream is not None},
+        }
+
+    async def _stream_listing(
+        self,
+        socket: WebSocket[Any, Any, Any],
+        profile: SlurmProfile,
+        message: ListMessage,
+        cancelled: asyncio.Event,
+    ) -> None:
+        """Send a directory listing in batches until done or cancelled.
 
-        response = await asyncio.to_thread(self.handle_message, message)
-        return json.dumps(response, default=str)
+        Every batch but the last is a ``progress`` message; the last has
+        status ``ok`` (or ``cancelled``) and carries the final ``total``.
+        """
+        stream = _ListingStream(profile, message.path, message.show_hidden)
+        count = 0
+        started = time.monotonic()
 
-    def handle_message(self, message: BrowserMessage) -> dict[str, Any]:
+        def reply(status: str, entries: list[FileEntry], **extra: Any) -> str:
+            return json.dumps(
+                {
+                    "id": message.id,
+                    "status": status,
+                    "action": message.action,
+                    "stream": True,
+                    "entries": [e.model_dump(mode="json") for e in entries],
+                    "count": count,
+                    "elapsed_ms": round((time.monotonic() - started) * 1000),
+                    **extra,
+                },
+                default=str,
+            )
+
+        final: str | None = None
+        try:
+            await asyncio.to_thread(stream.open)
+            while True:
+                attrs, done = await asyncio.to_thread(
+                    stream.next_batch, message.batch_size
+                )
+                entries = [_file_entry(message.path, a) for a in attrs]
+                count += len(entries)
+                if done:
+                    final = reply("ok", entries, total=count)
+                    break
+                if cancelled.is_set():
+                    final = reply("cancelled", entries, total=count)
+                    break
+                if entries:
+                    await socket.send_text(reply("progress", entries))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if not isinstance(e, (FileNotFoundError, PermissionError, OSError)):
+                logger.error(f"Unexpected error streaming {message.path}: {e}")
+            final = json.dumps(
+                {
+                    "id": message.id,
+                    "status": "error",
+                    "action": message.action,
+                    "stream": True,
+                    "error": {
+                        "code": _map_exception_to_error_code(e),
+                        "message": str(e),
+                    },
+                }
+            )
+        finally:
+            # Unregister before the final reply so that a cancel sent after
+            # the client has seen it is reported as a no-op.
+            if message.id is not None:
+                socket.state.streams.pop(message.id, None)
+            await asyncio.to_thread(stream.close)
+
+        if final is not None:
+            await socket.send_text(final)
+
+    async def _stream_command(
+        self,
+        socket: WebSocket[Any, Any, Any],
+        profile: SlurmProfile,
+        message: SearchMessage | DuMessage,
+        cancelled: asyncio.Event,
+    ) -> None:
+        """Run a remote ``find`` or ``du`` and send its results in batches.
+
+        Uses the same protocol as a streaming ``list``: ``progress`` batches,
+        then a final message with status ``ok``, ``cancelled`` or ``error``.
+        A final ``ok`` carries ``partial: true`` if some directories couldn't
+        be read, and a ``search`` stopped at its limit has ``truncated: true``.
+        A ``du`` reports the size of ``path`` itself in ``size``.
+        """
+        parse: Callable[[bytes], Any]
+        if isinstance(message, SearchMessage):
+            parse, limit = _parse_find_line, message.limit
+        else:
+            parse, limit = _parse_du_line, None
+        root = _normalize(message.path)
+        root_size: int | None = None
+        batch: list[Any] = []
+        count = 0
+        started = time.monotonic()
+
+        def reply(status: str, **extra: Any) -> str:
+            return json.dumps(
+                {
+                    "id": message.id,
+                    "status": status,
+                    "action": message.action,
+                    "stream": True,
+                    "entries": [
+                        e.model_dump(mode="json") if isinstance(e, FileEntry) else e
+                        for e in batch
+                    ],
+                    "count": count,
+                    "elapsed_ms": round((time.monotonic() - started) * 1000),
+                    **extra,
+                },
+                default=str,
+            )
+
+        def error(code: ErrorCode, msg: str) -> str:
+            return json.dumps(
+                {
+                    "id": message.id,
+                    "status": "error",
+                    "action": message.action,
+                    "stream": True,
+                    "error": {"code": code, "message": msg},
+                }
+            )
+
+        def check_directory() -> None:
+            with remote.borrow(profile.host, profile.user) as sess:
+                attr = sess.stat(message.path)
+            if not (attr.st_mode and stat.S_ISDIR(attr.st_mode)):
+                raise ValueError(f"Not a directory: {message.path}")
+
+        # Lines are read in a separate task so that batches can be flushed on
+        # a timer while the remote command is quiet.
+        lines: asyncio.Queue[bytes | Exception | None] = asyncio.Queue(
+            maxsize=4 * message.batch_size
+        )
+
+        async def produce() -> None:
+            try:
+                command = (
+                    _find_command(message)
+                    if isinstance(message, SearchMessage)
+                    else _du_command(message)
+                )
+                async with aclosing(
+                    remote.ssh_lines(
+                        f"{profile.user}@{profile.host}",
+                        command,
+                        timeout=_COMMAND_TIMEOUT_SECONDS,
+                    )
+                ) as output:
+                    async for line in output:
+                        await lines.put(line)
+                await lines.put(None)
+            except Exception as e:
+                await lines.put(e)
+
+        producer: asyncio.Task[None] | None = None
+        final: str | None = None
+        try:
+            await asyncio.to_thread(check_directory)
+            producer = asyncio.create_task(produce())
+            last_sent = time.monotonic()
+            while final is None:
+                try:
+                    item = await asyncio.wait_for(lines.get(), _COMMAND_FLUSH_SECONDS)
+                except asyncio.TimeoutError:
+                    item = b""
+
+                if cancelled.is_set():
+                    final = reply("cancelled", total=count)
+                elif item is None:
+                    final = reply("ok", total=count, size=root_size)
+                elif isinstance(item, remote.RemoteCommandError) and (
+                    item.returncode == 1
+                ):
+                    # find and du exit 1 when some directories are unreadable
+                    # but still report everything else.
+                    final = reply("ok", total=count, size=root_size, partial=True)
+                elif isinstance(item, remote.RemoteError):
+                    final = error(_command_error_code(item), str(item))
+                elif isinstance(item, Exception):
+                    raise item
+                elif item:
+                    entry: Any = parse(item)
+                    if entry is not None:
+                        if isinstance(message, DuMessage) and (
+                            _normalize(entry["path"]) == root
+                        ):
+                            root_size = entry["size"]
+                        batch.append(entry)
+                        count += 1
+                    if limit is not None and count >= limit:
+                        final = reply("ok", total=count, truncated=True)
+
+                if (
+                    final is None
+                    and batch
+                    and (
+                        len(batch) >= message.batch_size
+                        or time.monotonic() - last_sent >= _COMMAND_FLUSH_SECONDS
+                    )
+                ):
+                    await socket.send_text(reply("progress"))
+                    batch = []
+                    last_sent = time.monotonic()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if not isinstance(
+                e, (FileNotFoundError, PermissionError, ValueError, OSError)
+            ):
+                logger.error(
+                    f"Unexpected error in {message.action} {message.path}: {e}"
+                )
+            final = error(_map_exception_to_error_code(e), str(e))
+        finally:
+            if message.id is not None:
+                socket.state.streams.pop(message.id, None)
+            if producer is not None:
+                producer.cancel()
+                try:
+                    await producer
+                except asyncio.CancelledError:
+                    pass
+
+        await socket.send_text(final)
+
+    async def handle_batch(
+        self, message: BatchMessage, profile: SlurmProfile
+    ) -> dict[str, Any]:
+        """Apply a batch message to each of its paths and collect the results.
+
+        Stats run concurrently. Deletes run concurrently too, but deepest
+        paths first, level by level, so that a directory is only removed
+        after any of its contents named in the same batch. Renames run in
+        the order given, since later renames may depend on earlier ones.
+        A failure on one path is reported in its result and doesn't stop
+        the others.
+
+        Args:
+            message: Validated batch message
+            profile: Remote profile of the connection
+
+        Returns:
+            Response dict with one result per path, in request order
+        """
+        limit = asyncio.Semaphore(_BATCH_CONCURRENCY)
+
+        async def run(item: dict[str, str]) -> dict[str, Any]:
+            async with limit:
+                return await asyncio.to_thread(
+                    _run_batch_item, profile, message.action, item
+                )
+
+        results: list[dict[str, Any]]
+        match message:
+            case StatManyMessage():
+                results = list(
+                    await asyncio.gather(*(run({"path": p}) for p in message.paths))
+                )
+            case DeleteManyMessage():
+                by_depth: dict[int, list[int]] = {}
+                for i, path in enumerate(message.paths):
+                    by_depth.setdefault(_normalize(path).count("/"), []).append(i)
+                results = [{} for _ in message.paths]
+                for depth in sorted(by_depth, reverse=True):
+                    indexes = by_depth[depth]
+                    done = await asyncio.gather(
+                        *(run({"path": message.paths[i]}) for i in indexes)
+                    )
+                    for i, result in zip(indexes, done):
+                        results[i] = result
+            case RenameManyMessage():
+                results = [await run(pair.model_dump()) for pair in message.renames]
+
+        return {
+            "id": message.id,
+            "status": "ok",
+            "action": message.action,
+            "results": results,
+            "failed": sum(1 for r in results if r["status"] == "error"),
+        }
+
+    def handle_message(
+        self, message: BrowserMessage, profile: SlurmProfile | None
+    ) -> dict[str, Any]:
         """Route message to appropriate handler based on action.
 
         Args:
             message: Validated request message
+            profile: Remote profile of the connection, if it was accepted
 
         Returns:
             Response dict
         """
-        profile = self.profile
         if profile is None:
             return {
                 "status": "error",
@@ -383,7 +1229,7 @@ class RemoteFileBrowserSession(WebsocketListener):
             }
 
         try:
-            with remote.acquire(profile.host, profile.user) as sess:
+            with remote.borrow(profile.host, profile.user) as sess:
                 match message:
                     case ListMessage():
                         entries, total = _list_directory_entries(
@@ -392,6 +1238,9 @@ class RemoteFileBrowserSession(WebsocketListener):
                             show_hidden=message.show_hidden,
                             limit=message.limit,
                             offset=message.offset,
+                            sort=message.sort,
+                            order=message.order,
+                            refresh=message.refresh,
                         )
                         return {
                             "id": message.id,
@@ -423,6 +1272,7 @@ class RemoteFileBrowserSession(WebsocketListener):
 
                     case MkdirMessage():
                         sess.mkdir(message.path)
+                        _invalidate_parent(sess, message.path)
                         return {
                             "id": message.id,
                             "status": "ok",
@@ -431,6 +1281,7 @@ class RemoteFileBrowserSession(WebsocketListener):
 
                     case DeleteMessage():
                         sess.delete(message.path)
+                        _invalidate_parent(sess, message.path)
                         return {
                             "id": message.id,
                             "status": "ok",
@@ -439,12 +1290,26 @@ class RemoteFileBrowserSession(WebsocketListener):
 
                     case RenameMessage():
                         sess.rename(message.old_path, message.new_path)
+                        _invalidate_parent(sess, message.old_path)
+                        _invalidate_parent(sess, message.new_path)
                         return {
                             "id": message.id,
                             "status": "ok",
                             "action": message.action,
                         }
 
+                    case _:
+                        # Streams, cancels and batches are handled separately.
+                        return {
+                            "id": message.id,
+                            "status": "error",
+                            "action": message.action,
+                            "error": {
+                                "code": ErrorCode.INVALID_REQUEST,
+                                "message": f"Unsupported request: {message.action}",
+                            },
+                        }
+
         except (FileNotFoundError, PermissionError, ValueError, OSError) as e:
             return {
                 "id": message.id,
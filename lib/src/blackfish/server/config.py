@@ -16,6 +16,10 @@ DEFAULT_STATIC_DIR = Path(__file__).parent.parent
 DEFAULT_HOME_DIR = os.path.expanduser("~/.blackfish")
 DEFAULT_DEBUG = True
 DEFAULT_MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB
+DEFAULT_THUMBNAIL_CACHE_SIZE = 256 * 1024 * 1024  # 256MB
+DEFAULT_JOB_POLL_INTERVAL = 60.0  # seconds; 0 disables background polling
+DEFAULT_MAX_ALLOCATIONS_PER_PROFILE = 0  # 0 disables the cap
+DEFAULT_MAX_ALLOCATIONS_PER_USER = 0  # 0 disables the cap
 
 
 class ContainerProvider(StrEnum):
@@ -60,6 +64,10 @@ class BlackfishConfig:
         auth_token: Optional[str] = None,
         container_provider: Optional[ContainerProvider] = None,
         max_file_size: int = DEFAULT_MAX_FILE_SIZE,
+        thumbnail_cache_size: int = DEFAULT_THUMBNAIL_CACHE_SIZE,
+        job_poll_interval: float = DEFAULT_JOB_POLL_INTERVAL,
+        max_allocations_per_profile: int = DEFAULT_MAX_ALLOCATIONS_PER_PROFILE,
+        max_allocations_per_user: int = DEFAULT_MAX_ALLOCATIONS_PER_USER,
     ) -> None:
         self.BASE_PATH = os.getenv("BLACKFISH_BASE_PATH", base_path)
         self.HOST = os.getenv("BLACKFISH_HOST", host)
@@ -85,6 +93,20 @@ class BlackfishConfig:
         else:
             self.CONTAINER_PROVIDER = container_provider
         self.MAX_FILE_SIZE = int(os.getenv("BLACKFISH_MAX_FILE_SIZE", max_file_size))
+        self.THUMBNAIL_CACHE_SIZE = int(
+            os.getenv("BLACKFISH_THUMBNAIL_CACHE_SIZE", thumbnail_cache_size)
+        )
+        self.JOB_POLL_INTERVAL = float(
+            os.getenv("BLACKFISH_JOB_POLL_INTERVAL", job_poll_interval)
+        )
+        self.MAX_ALLOCATIONS_PER_PROFILE = int(
+            os.getenv(
+                "BLACKFISH_MAX_ALLOCATIONS_PER_PROFILE", max_allocations_per_profile
+            )
+        )
+        self.MAX_ALLOCATIONS_PER_USER = int(
+            os.getenv("BLACKFISH_MAX_ALLOCATIONS_PER_USER", max_allocations_per_user)
+        )
         self.IMAGES: dict[str, ImageSpec] = {}
         for service, default in DEFAULT_IMAGES.items():
             override = os.getenv(f"BLACKFISH_{service.upper()}_IMAGE")
@@ -0,0 +1,86 @@
+# type: ignore
+"""add allocation_time to jobs
+
+``jobs.allocation_time`` is the walltime of a batch job's current
+allocation when a restart sized it down from the requested time. NULL for
+existing rows, which use the requested time.
+
+Revision ID: 7a3e9c5b2d61
+Revises: 8d4f2b6e1a97
+Create Date: 2026-10-19 21:02:47.118604+00:00
+
+"""
+
+from __future__ import annotations
+
+import warnings
+
+import sqlalchemy as sa
+from alembic import op
+from advanced_alchemy.types import (
+    EncryptedString,
+    EncryptedText,
+    GUID,
+    ORA_JSONB,
+    DateTimeUTC,
+)
+from sqlalchemy import Text  # noqa: F401
+
+__all__ = [
+    "downgrade",
+    "upgrade",
+    "schema_upgrades",
+    "schema_downgrades",
+    "data_upgrades",
+    "data_downgrades",
+]
+
+sa.GUID = GUID
+sa.DateTimeUTC = DateTimeUTC
+sa.ORA_JSONB = ORA_JSONB
+sa.EncryptedString = EncryptedString
+sa.EncryptedText = EncryptedText
+
+# revision identifiers, used by Alembic.
+revision = "7a3e9c5b2d61"
+down_revision = "8d4f2b6e1a97"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", category=UserWarning)
+        with op.get_context().autocommit_block():
+            schema_upgrades()
+            data_upgrades()
+
+
+def downgrade() -> None:
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", category=UserWarning)
+        with op.get_context().autocommit_block():
+            data_downgrades()
+            schema_downgrades()
+
+
+def schema_upgrades() -> None:
+    """schema upgrade migrations go here."""
+
+    with op.batch_alter_table("jobs", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("allocation_time", sa.String(), nullable=True))
+
+
+def schema_downgrades() -> None:
+    """schema downgrade migrations go here."""
+
+    with op.batch_alter_table("jobs", schema=None) as batch_op:
+        batch_op.drop_column("allocation_time")
+
+
+def data_upgrades() -> None:
+    """Add any optional data upgrade migrations here!"""
+
+
+def data_downgrades() -> None:
+    """Add any optional data downgrade migrations here!"""
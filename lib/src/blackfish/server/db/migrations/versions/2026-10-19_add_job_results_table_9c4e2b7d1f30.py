@@ -0,0 +1,128 @@
+# type: ignore
+"""add job_results table
+
+Persists the latest per-file result of each task of a batch job, so the
+results endpoint can filter, sort and page them in SQL instead of rebuilding
+them from a tigerflow report on every request. ``jobs.results_status`` records
+the job status when the results were last recorded; NULL for jobs created
+before this migration, whose results are recorded on first request.
+
+Revision ID: 9c4e2b7d1f30
+Revises: 87981ca2ed42
+Create Date: 2026-10-19 09:12:44.318204+00:00
+
+"""
+
+from __future__ import annotations
+
+import warnings
+
+import sqlalchemy as sa
+from alembic import op
+from advanced_alchemy.types import (
+    EncryptedString,
+    EncryptedText,
+    GUID,
+    ORA_JSONB,
+    DateTimeUTC,
+)
+from sqlalchemy import Text  # noqa: F401
+
+__all__ = [
+    "downgrade",
+    "upgrade",
+    "schema_upgrades",
+    "schema_downgrades",
+    "data_upgrades",
+    "data_downgrades",
+]
+
+sa.GUID = GUID
+sa.DateTimeUTC = DateTimeUTC
+sa.ORA_JSONB = ORA_JSONB
+sa.EncryptedString = EncryptedString
+sa.EncryptedText = EncryptedText
+
+# revision identifiers, used by Alembic.
+revision = "9c4e2b7d1f30"
+down_revision = "87981ca2ed42"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", category=UserWarning)
+        with op.get_context().autocommit_block():
+            schema_upgrades()
+            data_upgrades()
+
+
+def downgrade() -> None:
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", category=UserWarning)
+        with op.get_context().autocommit_block():
+            data_downgrades()
+            schema_downgrades()
+
+
+def schema_upgrades() -> None:
+    """schema upgrade migrations go here."""
+    op.create_table(
+        "job_results",
+        sa.Column("id", sa.GUID(length=16), nullable=False),
+        sa.Column("job_id", sa.GUID(length=16), nullable=False),
+        sa.Column("task", sa.String(), nullable=False),
+        sa.Column("file", sa.String(), nullable=False),
+        sa.Column("input_file", sa.String(), nullable=False),
+        sa.Column("output_file", sa.String(), nullable=True),
+        sa.Column("started_at", sa.DateTimeUTC(timezone=True), nullable=False),
+        sa.Column("finished_at", sa.DateTimeUTC(timezone=True), nullable=False),
+        sa.Column("duration_ms", sa.Double(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("error", sa.String(), nullable=True),
+        sa.Column("sa_orm_sentinel", sa.Integer(), nullable=True),
+        sa.Column("created_at", sa.DateTimeUTC(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTimeUTC(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("id", name=op.f("pk_job_results")),
+    )
+    op.create_index(
+        "ix_job_results_job_task_file",
+        "job_results",
+        ["job_id", "task", "file"],
+        unique=True,
+    )
+    op.create_index("ix_job_results_job_status", "job_results", ["job_id", "status"])
+    op.create_index(
+        "ix_job_results_job_finished_at",
+        "job_results",
+        ["job_id", "finished_at", "id"],
+    )
+    op.create_index(
+        "ix_job_results_job_duration_ms",
+        "job_results",
+        ["job_id", "duration_ms", "id"],
+    )
+
+    with op.batch_alter_table("jobs", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("results_status", sa.String(), nullable=True))
+
+
+def schema_downgrades() -> None:
+    """schema downgrade migrations go here."""
+    with op.batch_alter_table("jobs", schema=None) as batch_op:
+        batch_op.drop_column("results_status")
+
+    op.drop_index("ix_job_results_job_duration_ms", "job_results")
+    op.drop_index("ix_job_results_job_finished_at", "job_results")
+    op.drop_index("ix_job_results_job_status", "job_results")
+    op.drop_index("ix_job_results_job_task_file", "job_results")
+    op.drop_table("job_results")
+
+
+def data_upgrades() -> None:
+    """Add any optional data upgrade migrations here!"""
+
+
+def data_downgrades() -> None:
+    """Add any optional data downgrade migrations here!"""
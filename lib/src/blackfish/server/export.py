@@ -0,0 +1,229 @@
+"""Consolidated exports of batch job outputs.
+
+A batch job writes one output file per input and stage, which is awkward to
+load for analysis once a job has processed hundreds of thousands of files.
+An export joins each recorded result (see ``jobs.results``) with the content
+of its output file into a single stream of rows, as JSON Lines or, where
+``pyarrow`` is installed, Parquet. Each row has the columns in
+``EXPORT_COLUMNS``; ``output`` is the output file's content (parsed if it is
+JSON, text otherwise) and is null for failed files and outputs that aren't
+text or are larger than ``MAX_OUTPUT_SIZE``.
+
+Rows are streamed in the order of the results query, so an export of a
+running job can be continued from its cursor to pick up the files that
+finished since. Like ``archive``, the generators here block and read remote
+outputs over a dedicated SFTP channel.
+"""
+
+from __future__ import annotations
+
+import importlib.util
+import json
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Iterable, Iterator, Literal
+
+from paramiko.ssh_exception import SSHException
+
+from blackfish.server.archive import open_source
+from blackfish.server.logger import logger
+
+if TYPE_CHECKING:
+    from blackfish.server.jobs.results import BatchJobResult
+
+ExportFormat = Literal["jsonl", "parquet"]
+
+EXPORT_COLUMNS = (
+    "input_file",
+    "task",
+    "status",
+    "duration_ms",
+    "started_at",
+    "finished_at",
+    "output_file",
+    "error",
+    "output",
+)
+
+# Outputs larger than this are exported without their content.
+MAX_OUTPUT_SIZE = 16 * 1024 * 1024
+
+# Rows per Parquet row group, and per chunk of a JSON Lines export.
+EXPORT_BATCH_SIZE = 1000
+
+
+@dataclass
+class ExportRecord:
+    """A result to export, detached from the database session."""
+
+    input_file: str
+    task: str
+    status: str
+    duration_ms: float
+    started_at: datetime
+    finished_at: datetime
+    output_file: str | None
+    error: str | None
+
+    @classmethod
+    def from_result(cls, result: BatchJobResult) -> "ExportRecord":
+        return cls(
+            input_file=result.input_file,
+            task=result.task,
+            status=result.status,
+            duration_ms=result.duration_ms,
+            started_at=result.started_at,
+            finished_at=result.finished_at,
+            output_file=result.output_file,
+            error=result.error,
+        )
+
+
+def parquet_available() -> bool:
+    """Whether ``pyarrow`` is installed for Parquet exports."""
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def _read_output(source: Any, path: str) -> str | None:
+    try:
+        size = source.stat(path).st_size
+        if size > MAX_OUTPUT_SIZE:
+            logger.warning(f"Exporting {path} without its content ({size} bytes)")
+            return None
+        with source.open(path) as f:
+            data = f.read()
+    except (OSError, SSHException) as e:
+        # Missing, unreadable or not a file: the row is still exported.
+        logger.warning(f"Exporting {path} without its content: {e}")
+        return None
+    try:
+        return str(data.decode("utf-8"))
+    except UnicodeDecodeError:
+        return None
+
+
+def _rows(
+    records: Iterable[ExportRecord], host: str | None, user: str | None
+) -> Iterator[tuple[ExportRecord, str | None]]:
+    """Pair each record with the content of its output file."""
+    source = open_source(host, user)
+    try:
+        for record in records:
+            output = None
+            if record.output_file is not None:
+                output = _read_output(source, record.output_file)
+            yield record, output
+    finally:
+        source.close()
+
+
+def _parse_output(output: str | None) -> Any:
+    if output is None:
+        return None
+    try:
+        return json.loads(output)
+    except ValueError:
+        return output
+
+
+def stream_jsonl(
+    records: Iterable[ExportRecord],
+    *,
+    host: str | None = None,
+    user: str | None = None,
+) -> Iterator[bytes]:
+    """Yield a JSON Lines export of ``records``, one row per line.
+
+    Args:
+        records: The results to export, in order
+        host: Remote host of the output files, or None if they're local
+        user: Remote user
+    """
+    lines = []
+    for record, output in _rows(records, host, user):
+        row = {
+            **asdict(record),
+            "started_at": record.started_at.isoformat(),
+            "finished_at": record.finished_at.isoformat(),
+            "output": _parse_output(output),
+        }
+        lines.append(json.dumps({column: row[column] for column in EXPORT_COLUMNS}))
+        if len(lines) == EXPORT_BATCH_SIZE:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+            lines = []
+    if lines:
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+class _Chunks:
+    """A write-only file that hands what was written to the caller."""
+
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_parquet(
+    records: Iterable[ExportRecord],
+    *,
+    host: str | None = None,
+    user: str | None = None,
+) -> Iterator[bytes]:
+    """Yield a Parquet export of ``records``, a row group at a time.
+
+    ``output`` is stored as text, so JSON outputs are kept as written.
+    Requires ``pyarrow`` (see :func:`parquet_available`).
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema(
+        [
+            ("input_file", pa.string()),
+            ("task", pa.string()),
+            ("status", pa.string()),
+            ("duration_ms", pa.float64()),
+            ("started_at", pa.timestamp("us", tz="UTC")),
+            ("finished_at", pa.timestamp("us", tz="UTC")),
+            ("output_file", pa.string()),
+            ("error", pa.string()),
+            ("output", pa.string()),
+        ]
+    )
+    sink = _Chunks()
+    writer = pq.ParquetWriter(sink, schema)
+    batch: list[dict[str, Any]] = []
+    try:
+        for record, output in _rows(records, host, user):
+            batch.append({**asdict(record), "output": output})
+            if len(batch) == EXPORT_BATCH_SIZE:
+                writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                batch = []
+                data = sink.drain()
+                if data:
+                    yield data
+        if batch:
+            writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+    finally:
+        writer.close()
+    yield sink.drain()
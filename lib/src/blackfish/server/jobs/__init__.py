@@ -3,8 +3,10 @@
 from blackfish.server.jobs.base import (
     BatchJob,
     BatchJobStatus,
+    SlurmAllocation,
     create_tigerflow_client,
     create_tigerflow_client_for_profile,
+    fetch_slurm_states,
     format_status,
 )
 from blackfish.server.jobs.client import (
@@ -14,16 +16,24 @@ from blackfish.server.jobs.client import (
     TigerFlowError,
     TigerFlowVersions,
 )
+from blackfish.server.jobs.report import ReportReader
+from blackfish.server.jobs.results import BatchJobResult
+from blackfish.server.jobs.supervisor import JobSupervisor
 
 __all__ = [
     "BatchJob",
+    "BatchJobResult",
     "BatchJobStatus",
+    "JobSupervisor",
     "LocalRunner",
+    "ReportReader",
     "SSHRunner",
+    "SlurmAllocation",
     "TigerFlowClient",
     "TigerFlowError",
     "TigerFlowVersions",
     "create_tigerflow_client",
     "create_tigerflow_client_for_profile",
+    "fetch_slurm_states",
     "format_status",
 ]
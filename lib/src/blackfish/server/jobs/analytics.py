@@ -0,0 +1,207 @@
+"""Throughput, latency and ETA analytics for batch jobs.
+
+Computed from the persisted per-file results (see ``jobs.results``) rather
+than a fresh report, so asking for them costs two indexed queries and no
+round trip to the cluster:
+
+- **Throughput** is the number of files the pipeline's last task finished
+  per second over sliding windows ending at the job's latest result (or
+  now, while it runs). A window longer than the job has been running is cut
+  to the job's age.
+- **Latency** is the p50/p95/p99 duration of the successful files of each
+  task (stage), with one sort of each task's durations.
+- **ETA** divides the remaining files by the most recent throughput that has
+  enough files to be meaningful, and the projected restarts divide the ETA by
+  the allocation's walltime.
+"""
+
+from __future__ import annotations
+
+import math
+import statistics
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING
+
+import sqlalchemy as sa
+
+from blackfish.server.jobs.results import BatchJobResult
+from blackfish.server.jobs.walltime import walltime_seconds
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+    from blackfish.server.jobs.base import BatchJob
+
+# Sliding throughput windows, shortest first.
+THROUGHPUT_WINDOWS = (timedelta(minutes=5), timedelta(minutes=15), timedelta(hours=1))
+
+# Fewest files in a window for its throughput to drive the ETA.
+_MIN_RATE_FILES = 10
+
+
+@dataclass
+class ThroughputWindow:
+    """Files finished in a sliding window ending at the latest result."""
+
+    window_seconds: int
+    files: int
+    files_per_second: float | None  # None if the window has no length
+
+
+@dataclass
+class TaskLatency:
+    """Duration percentiles of the successful files of one task."""
+
+    task: str
+    count: int
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+
+
+@dataclass
+class JobAnalytics:
+    """Throughput and completion estimates of a batch job.
+
+    ``eta_seconds`` and ``projected_restarts`` are ``None`` when the job has
+    no recent throughput or unknown remaining work. ``projected_restarts``
+    counts the allocations needed after the current (or next) one, to compare
+    against ``restart_budget``.
+    """
+
+    finished: int
+    errored: int
+    remaining: int | None
+    throughput: list[ThroughputWindow]
+    latency: list[TaskLatency]
+    files_per_second: float | None
+    eta_seconds: float | None
+    walltime_seconds: int | None
+    projected_restarts: int | None
+    restart_budget: int
+
+
+def latency_percentiles(task: str, durations: list[float]) -> TaskLatency:
+    """Summarize the durations (ms) of one task's files."""
+    if len(durations) == 1:
+        [only] = durations
+        return TaskLatency(task, 1, only, only, only, only)
+    # One sort for all 99 cut points; inclusive, so they stay within the data.
+    cuts = statistics.quantiles(durations, n=100, method="inclusive")
+    return TaskLatency(
+        task=task,
+        count=len(durations),
+        p50_ms=cuts[49],
+        p95_ms=cuts[94],
+        p99_ms=cuts[98],
+        max_ms=max(durations),
+    )
+
+
+def _aware(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+async def job_analytics(
+    session: AsyncSession,
+    job: BatchJob,
+    *,
+    walltime: str | None = None,
+    now: datetime | None = None,
+    active: bool = True,
+) -> JobAnalytics:
+    """Compute a job's analytics from its recorded results.
+
+    Args:
+        session: Database session
+        job: The batch job
+        walltime: The Slurm ``--time`` of the job's allocations, or ``None``
+            if it doesn't run under Slurm
+        now: Current time (for tests)
+        active: Whether the job is still running. The windows of a job that
+            isn't end at its latest result instead of now, so they describe
+            how fast it was going rather than how long it's been stopped.
+    """
+    now = now or datetime.now(timezone.utc)
+    where = BatchJobResult.job_id == job.id
+
+    first, last = (
+        await session.execute(
+            sa.select(
+                sa.func.min(BatchJobResult.started_at),
+                sa.func.max(BatchJobResult.finished_at),
+            ).where(where)
+        )
+    ).one()
+    end = now if active or last is None else _aware(last)
+    starts = [end - window for window in THROUGHPUT_WINDOWS]
+    counts = (
+        await session.execute(
+            sa.select(
+                *(
+                    sa.func.count().filter(BatchJobResult.finished_at > start)
+                    for start in starts
+                )
+            ).where(
+                where,
+                BatchJobResult.status == "success",
+                # An input file is done when the pipeline's last stage is.
+                BatchJobResult.task == job.pipeline_config()["tasks"][-1]["name"],
+            )
+        )
+    ).one()
+
+    throughput = []
+    for window, files in zip(THROUGHPUT_WINDOWS, counts):
+        length = window.total_seconds()
+        if first is not None:
+            length = min(length, (end - _aware(first)).total_seconds())
+        throughput.append(
+            ThroughputWindow(
+                window_seconds=int(window.total_seconds()),
+                files=files,
+                files_per_second=files / length if length > 0 else None,
+            )
+        )
+
+    # The most recent window with enough files, else the longest with any.
+    rate = next(
+        (
+            w.files_per_second
+            for w in throughput
+            if w.files >= _MIN_RATE_FILES and w.files_per_second
+        ),
+        throughput[-1].files_per_second if throughput[-1].files else None,
+    )
+
+    durations: dict[str, list[float]] = {}
+    rows = await session.execute(
+        sa.select(BatchJobResult.task, BatchJobResult.duration_ms).where(
+            where, BatchJobResult.status == "success"
+        )
+    )
+    for task, duration_ms in rows:
+        durations.setdefault(task, []).append(duration_ms)
+    latency = [latency_percentiles(task, values) for task, values in durations.items()]
+
+    remaining = job.staged
+    eta = remaining / rate if remaining is not None and rate else None
+    limit = walltime_seconds(walltime) if walltime else None
+    projected = None
+    if eta is not None and limit:
+        projected = max(0, math.ceil(eta / limit) - 1)
+
+    return JobAnalytics(
+        finished=job.finished or 0,
+        errored=job.errored or 0,
+        remaining=remaining,
+        throughput=throughput,
+        latency=latency,
+        files_per_second=rate,
+        eta_seconds=eta,
+        walltime_seconds=limit,
+        projected_restarts=projected,
+        restart_budget=max(0, (job.max_restarts or 0) - (job.restarts or 0)),
+    )
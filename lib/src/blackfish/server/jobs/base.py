@@ -4,6 +4,7 @@ import asyncio
 import datetime
 import os
 import shlex
+from dataclasses import dataclass
 from enum import StrEnum, auto
 from pathlib import Path
 from typing import TYPE_CHECKING, Any, Optional
@@ -26,12 +27,21 @@ from blackfish.server.jobs.client import (
     LocalRunner,
     SSHRunner,
     TigerFlowClient,
+    TigerFlowError,
+    TigerFlowReport,
 )
+from blackfish.server.jobs.cache import CACHE_DIR, cache_dir, stage_cache, store_cache
+from blackfish.server.jobs.estimate import sample_dir, sample_walltime, stage_sample
+from blackfish.server.jobs.manifest import MANIFEST_NAME, input_dir_mtime, scan_inputs
+from blackfish.server.jobs.report import ReportReader
+from blackfish.server.jobs.shards import merge_reports, shard_dir, stage_shards
 from blackfish.server.jobs.tasks import (
     build_pipeline_config,
     get_default_input_ext,
     get_default_output_ext,
 )
+from blackfish.server.jobs.versions import ImageVersionCache
+from blackfish.server.jobs.walltime import resubmit_walltime, walltime_seconds
 from blackfish.server.logger import logger
 from blackfish.server.models.profile import (
     BlackfishProfile,
@@ -40,6 +50,8 @@ from blackfish.server.models.profile import (
 )
 
 if TYPE_CHECKING:
+    from uuid import UUID
+
     from litestar.datastructures import State
 
     from blackfish.server.config import BlackfishConfig
@@ -59,6 +71,7 @@ DEFAULT_MAX_STALLED_RESTARTS = 1
 
 
 class BatchJobStatus(StrEnum):
+    QUEUED = auto()  # waiting for an allocation slot (see ``jobs.queue``)
     SUBMITTED = auto()  # first sbatch; Slurm hasn't confirmed the allocation yet
     RESUBMITTED = auto()  # a restart's sbatch; Slurm hasn't confirmed it yet
     PENDING = auto()  # allocation queued, awaiting resources
@@ -67,6 +80,7 @@ class BatchJobStatus(StrEnum):
     BROKEN = auto()  # Metadata missing - unable to determine job state
     STALLED = auto()  # Restarts made no forward progress
     EXHAUSTED = auto()  # Restart budget exhausted with work remaining
+    FAILED = auto()  # Queued, then couldn't be started (see ``jobs.queue``)
 
 
 # Statuses from which a job never transitions again — used to short-circuit
@@ -78,6 +92,7 @@ _TERMINAL_STATUSES = frozenset(
         BatchJobStatus.STALLED,
         BatchJobStatus.EXHAUSTED,
         BatchJobStatus.BROKEN,
+        BatchJobStatus.FAILED,
     }
 )
 
@@ -92,6 +107,17 @@ _RESUMABLE_STATUSES = frozenset(
     }
 )
 
+# Statuses in which a job holds (or awaits) an allocation, counted against
+# the allocation caps (see ``jobs.queue``).
+_ALLOCATED_STATUSES = frozenset(
+    {
+        BatchJobStatus.SUBMITTED,
+        BatchJobStatus.RESUBMITTED,
+        BatchJobStatus.PENDING,
+        BatchJobStatus.RUNNING,
+    }
+)
+
 # Slurm states in which the allocation is still holding (or awaiting) resources.
 _ALIVE_STATES = frozenset(
     {
@@ -123,6 +149,57 @@ _TERMINAL_SLURM_STATES = frozenset(
 )
 
 
+def _array_state(states: list[JobState]) -> JobState:
+    """The state of a Slurm job array, from the states of its tasks.
+
+    The array holds resources while any of its tasks does, and has ended only
+    once all of them have. A single state is returned as is.
+    """
+    for alive in (JobState.RUNNING, JobState.PENDING):
+        if alive in states:
+            return alive
+    for state in states:
+        if state not in _TERMINAL_SLURM_STATES:
+            return state
+    return states[0] if states else JobState.MISSING
+
+
+# sacct timestamps, read and written in UTC (see BatchJob._slurm_state).
+_SACCT_TIME_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+
+@dataclass(frozen=True)
+class SlurmAllocation:
+    """What sacct reports about a batch job's allocation.
+
+    ``elapsed`` is how long the allocation has run, in seconds (for a job
+    array, its longest-running task), or ``None`` if sacct didn't say.
+    """
+
+    state: JobState
+    elapsed: int | None = None
+
+
+def _array_allocation(allocations: list[SlurmAllocation]) -> SlurmAllocation:
+    """The allocation of a Slurm job array, from those of its tasks."""
+    elapsed = [a.elapsed for a in allocations if a.elapsed is not None]
+    return SlurmAllocation(
+        _array_state([a.state for a in allocations]),
+        max(elapsed) if elapsed else None,
+    )
+
+
+def _parse_allocation(state: str, elapsed: str) -> SlurmAllocation:
+    """Parse sacct's ``State`` and ``Elapsed`` fields of one record.
+
+    Raises:
+        ValueError: If the state isn't one Blackfish knows.
+    """
+    return SlurmAllocation(
+        parse_state(state.encode("utf-8")), walltime_seconds(elapsed) or None
+    )
+
+
 def format_status(status: BatchJobStatus | None) -> str:
     """Format job status for display."""
     return status.upper() if status else "NONE"
@@ -198,18 +275,23 @@ def create_tigerflow_client_for_profile(
         image=image,
         provider=provider,
         cache_dir=profile.cache_dir,
+        versions_cache=ImageVersionCache.in_home(app_config.HOME_DIR),
     )
 
 
 def create_tigerflow_client(
     job: "BatchJob",
     app_config: "State | BlackfishConfig",
+    *,
+    incremental: bool = False,
 ) -> TigerFlowClient:
     """Create a TigerFlowClient for a batch job.
 
     Args:
         job: The batch job to create a client for
         app_config: Application configuration with HOME_DIR, IMAGES, provider
+        incremental: Read reports that list only the METRICS records not yet
+            acknowledged (see ``ReportReader``)
 
     Returns:
         Configured TigerFlowClient
@@ -237,6 +319,8 @@ def create_tigerflow_client(
         image=image,
         provider=provider,
         cache_dir=cache_dir,
+        reader=ReportReader(job.host, job.user, incremental=incremental),
+        versions_cache=ImageVersionCache.in_home(app_config.HOME_DIR),
     )
 
 
@@ -271,8 +355,24 @@ class BatchJob(UUIDAuditBase):
     resources: Mapped[Optional[dict[str, Any]]] = mapped_column(
         JSON, nullable=True, default=None
     )
+    # Further tasks chained after ``task`` in the same pipeline, each reading
+    # the outputs of the one before: dicts with ``task`` and ``repo_id`` and
+    # optional ``revision``, ``params`` and ``output_ext``.
+    stages: Mapped[Optional[list[dict[str, Any]]]] = mapped_column(
+        JSON, nullable=True, default=None
+    )
     max_workers: Mapped[int] = mapped_column(default=1)
     idle_timeout: Mapped[Optional[int]] = mapped_column(default=None)  # minutes
+    # Number of disjoint input subsets run in parallel, one Slurm array task
+    # each (see ``jobs.shards``).
+    shards: Mapped[int] = mapped_column(default=1)
+    # Number of input files to sample for a cost estimate instead of
+    # processing them all (see ``jobs.estimate``); NULL for a regular job.
+    sample: Mapped[Optional[int]]
+    # The result cache the job reads and fills (``{cache_dir}/results``, see
+    # ``jobs.cache``); NULL for a job that doesn't use one.
+    result_cache: Mapped[Optional[str]]
+    cached: Mapped[Optional[int]]  # Inputs served from the result cache
 
     # Profile info (denormalized for convenience)
     profile: Mapped[str]
@@ -282,12 +382,34 @@ class BatchJob(UUIDAuditBase):
 
     # Job state
     status: Mapped[Optional[BatchJobStatus]]
-    pid: Mapped[Optional[str]]  # Slurm job ID of the current allocation
+    # Dispatch order of a queued job (see ``jobs.queue``): higher first.
+    priority: Mapped[int] = mapped_column(default=0)
+    # Place of a QUEUED job in the queue, from 1; NULL for other jobs.
+    queue_position: Mapped[Optional[int]]
+    pid: Mapped[Optional[str]]  # Slurm job ID of the current allocation (or array)
+    # Walltime of the current allocation when sized down from the requested
+    # ``time`` at a restart (see ``jobs.walltime``); NULL for the requested.
+    allocation_time: Mapped[Optional[str]]
 
     # Progress tracking
     staged: Mapped[Optional[int]]  # Items remaining (total - finished - errored)
     finished: Mapped[Optional[int]]  # Successfully processed
     errored: Mapped[Optional[int]]  # Failed items (transient; reset each run)
+    # Per-stage progress from the last report: one dict per pipeline stage with
+    # ``name``, ``processed``, ``staged`` and ``failed``.
+    stage_progress: Mapped[Optional[list[dict[str, Any]]]] = mapped_column(
+        JSON, nullable=True, default=None
+    )
+
+    # Input manifest (see ``jobs.manifest``): the number of input files and
+    # the mtime of input_dir when they were listed. The count is reused until
+    # the directory changes.
+    input_count: Mapped[Optional[int]]
+    input_mtime: Mapped[Optional[int]]
+
+    # Job status when the per-file results (see ``jobs.results``) were last
+    # recorded from a report. NULL if they never were, or since a resume.
+    results_status: Mapped[Optional[BatchJobStatus]]
 
     # Restart bookkeeping
     restarts: Mapped[int] = mapped_column(default=0)
@@ -321,24 +443,77 @@ class BatchJob(UUIDAuditBase):
     def _resolved_input_ext(self) -> str:
         return self.input_ext or get_default_input_ext(self.task)
 
-    def _pipeline_yaml(self) -> str:
-        """Build the tigerflow ``local`` pipeline YAML for this job."""
-        params: dict[str, Any] = {"model": self.repo_id}
-        if self.revision:
-            params["revision"] = self.revision
+    def _model_params(
+        self,
+        repo_id: str,
+        revision: str | None,
+        params: dict[str, Any] | None,
+    ) -> dict[str, Any]:
+        model_params: dict[str, Any] = {"model": repo_id}
+        if revision:
+            model_params["revision"] = revision
         if self.cache_dir:
-            params["cache_dir"] = self.cache_dir
-        if self.params:
-            params.update(self.params)
+            model_params["cache_dir"] = self.cache_dir
+        if params:
+            model_params.update(params)
+        return model_params
+
+    def pipeline_config(self) -> dict[str, Any]:
+        """Build the tigerflow ``local`` pipeline config for this job.
 
+        Raises:
+            ValueError: If the job's stages don't form a valid pipeline.
+        """
         output_ext = self.output_ext or get_default_output_ext(self.task)
-        config = build_pipeline_config(
+        return build_pipeline_config(
             task=self.task,
             input_ext=self._resolved_input_ext(),
-            params=params,
+            params=self._model_params(self.repo_id, self.revision, self.params),
             output_ext=output_ext,
+            stages=[
+                {
+                    "task": stage["task"],
+                    "params": self._model_params(
+                        stage["repo_id"], stage.get("revision"), stage.get("params")
+                    ),
+                    "output_ext": stage.get("output_ext"),
+                }
+                for stage in self.stages or []
+            ],
         )
-        return yaml.dump(config, default_flow_style=False)
+
+    def _pipeline_yaml(self) -> str:
+        """Build the tigerflow ``local`` pipeline YAML for this job."""
+        return yaml.dump(self.pipeline_config(), default_flow_style=False)
+
+    def _is_sharded(self) -> bool:
+        """Whether the job's inputs are split across a Slurm job array."""
+        return (self.shards or 1) > 1
+
+    def is_sample(self) -> bool:
+        """Whether the job runs on a sample of its inputs for an estimate."""
+        return self.sample is not None
+
+    def pipeline_paths(self) -> tuple[str, str]:
+        """The input and output directories of the job's pipeline.
+
+        A sampling job runs on the sample staged under ``output_dir`` (see
+        ``jobs.estimate``), and a job using the result cache on the inputs it
+        has no cached outputs for (see ``jobs.cache``); the shards of a
+        sharded job each have their own.
+        """
+        if self.is_sample():
+            directory = sample_dir(self.output_dir, self.id.hex)
+            return f"{directory}/input", f"{directory}/output"
+        if self.result_cache:
+            return f"{cache_dir(self.output_dir)}/input", self.output_dir
+        return self.input_dir, self.output_dir
+
+    def _pipeline_dirs(self) -> list[str]:
+        """The output directories of the job's tigerflow pipelines."""
+        if not self._is_sharded():
+            return [self.pipeline_paths()[1]]
+        return [f"{shard_dir(self.output_dir, k)}/output" for k in range(self.shards)]
 
     def _job_config(self) -> SlurmJobConfig:
         """Build the sbatch resource config from ``self.resources``.
@@ -373,8 +548,18 @@ class BatchJob(UUIDAuditBase):
         """
         return isinstance(profile, SlurmProfile)
 
-    def _render_script(self, app_config: "State | BlackfishConfig") -> str:
-        """Render the batch launch script for this job."""
+    def walltime(self, profile: "BlackfishProfile | None") -> str | None:
+        """The Slurm ``--time`` of each allocation, or ``None`` off Slurm."""
+        return self._job_config().time if self._is_slurm(profile) else None
+
+    def _render_script(
+        self, app_config: "State | BlackfishConfig", shards: list[int] | None = None
+    ) -> str:
+        """Render the batch launch script for this job.
+
+        A sharded job renders a Slurm job array over ``shards`` (all of the
+        job's shards by default).
+        """
         profile = deserialize_profile(app_config.HOME_DIR, self.profile)
         if profile is None:
             raise ValueError(f"Profile '{self.profile}' not found")
@@ -384,6 +569,26 @@ class BatchJob(UUIDAuditBase):
         pipeline_path = os.path.join(
             home_dir, "jobs", self.id.hex, f"pipeline-{self.id}.yaml"
         )
+        pipeline_input, pipeline_output = self.pipeline_paths()
+        array = None
+        if self._is_sharded():
+            # Each array task runs the pipeline of its own shard.
+            array = ",".join(str(k) for k in (shards or range(self.shards)))
+            pipeline_path = pipeline_path.replace(".yaml", "-$SLURM_ARRAY_TASK_ID.yaml")
+            pipeline_input = (
+                f"{shard_dir(self.output_dir, '$SLURM_ARRAY_TASK_ID')}/input"
+            )
+            pipeline_output = (
+                f"{shard_dir(self.output_dir, '$SLURM_ARRAY_TASK_ID')}/output"
+            )
+
+        job_config = self._job_config()
+        if self.allocation_time:
+            job_config.time = self.allocation_time
+        elif self.is_sample():
+            # A sample runs in a short allocation; the requested time is what
+            # its estimate projects the whole job with.
+            job_config.time = sample_walltime(job_config.time)
 
         image, provider = _resolve_image_and_provider(
             app_config, profile, self.image_ref
@@ -396,18 +601,23 @@ class BatchJob(UUIDAuditBase):
             image=image,
             provider=str(provider),
             profile=profile,
-            job_config=self._job_config(),
+            job_config=job_config,
             pipeline_yaml=self._pipeline_yaml(),
             pipeline_path=pipeline_path,
             input_dir=self.input_dir,
             output_dir=self.output_dir,
+            pipeline_input=pipeline_input,
+            pipeline_output=pipeline_output,
+            array=array,
             cache_dir=self.cache_dir or profile.cache_dir,
             idle_timeout=self.idle_timeout
             if self.idle_timeout is not None
             else DEFAULT_IDLE_TIMEOUT,
         )
 
-    async def _submit(self, app_config: "State | BlackfishConfig") -> str:
+    async def _submit(
+        self, app_config: "State | BlackfishConfig", shards: list[int] | None = None
+    ) -> str:
         """Render, stage, and launch the batch script.
 
         The launch mechanism is chosen by profile *type* (Slurm → ``sbatch``,
@@ -416,13 +626,15 @@ class BatchJob(UUIDAuditBase):
         - SlurmProfile, remote: scp the script, then ``sbatch`` over SSH.
         - LocalProfile: run the script directly with ``bash`` (no Slurm).
 
+        A sharded job is submitted as a job array over ``shards``.
+
         Returns:
             The Slurm job id for Slurm profiles, or a ``local-<uuid>`` sentinel
             for LocalProfile (which has no Slurm allocation).
         """
         profile = deserialize_profile(app_config.HOME_DIR, self.profile)
         is_slurm = self._is_slurm(profile)
-        script = self._render_script(app_config)
+        script = self._render_script(app_config, shards)
 
         local_script_path = Path(
             os.path.join(app_config.HOME_DIR, "jobs", self.id.hex, "start.sh")
@@ -465,15 +677,15 @@ class BatchJob(UUIDAuditBase):
         )
         return result.stdout.decode("utf-8").strip().split()[-1]
 
-    async def start(
+    async def preflight(
         self,
         app_config: "State | BlackfishConfig",
         client: TigerFlowClient,
     ) -> None:
-        """Start the batch job by submitting a containerized Slurm allocation.
+        """Check a new job can run before it is started or queued.
 
-        Verifies the image is staged (recording its versions), then renders and
-        submits the launch script. Caller is responsible for persistence.
+        Validates the job's configuration, verifies the image is staged
+        (recording its versions), and checks ``input_dir`` exists.
 
         Args:
             app_config: Application configuration (HOME_DIR, IMAGES, provider).
@@ -481,11 +693,25 @@ class BatchJob(UUIDAuditBase):
 
         Raises:
             TigerFlowError: If the image is not staged.
-            ValueError: If ``input_dir`` does not exist.
+            ValueError: If ``input_dir`` does not exist, the job's stages don't
+                form a valid pipeline, the job is sharded but its profile
+                doesn't use Slurm, or it samples its inputs and is sharded or
+                uses the result cache.
         """
-        logger.info(
-            f"Starting batch job {self.id}: task={self.task}, model={self.repo_id}"
-        )
+        if self.shards is not None and self.shards < 1:
+            raise ValueError(f"Invalid number of shards: {self.shards}")
+        if self._is_sharded() and not self._is_slurm(
+            deserialize_profile(app_config.HOME_DIR, self.profile)
+        ):
+            raise ValueError("Sharded batch jobs require a Slurm profile")
+        if self.sample is not None and (self.sample < 1 or self._is_sharded()):
+            raise ValueError(
+                f"Invalid sample of {self.sample} files (samples can't be sharded)"
+            )
+        if self.sample is not None and self.result_cache:
+            raise ValueError("Samples can't use the result cache")
+        # Reject a chain of stages that can't feed each other up front.
+        self.pipeline_config()
 
         versions = await client.check_health()
         self.tigerflow_version = versions.tigerflow
@@ -500,6 +726,62 @@ class BatchJob(UUIDAuditBase):
 
         await self._ensure_directories(client)
 
+    async def queue(
+        self,
+        app_config: "State | BlackfishConfig",
+        client: TigerFlowClient,
+    ) -> None:
+        """Run the pre-flight and put the job in the allocation queue.
+
+        The supervisor starts it once its profile and user have room (see
+        ``jobs.queue``). Caller is responsible for persistence.
+
+        Raises:
+            TigerFlowError, ValueError: As for ``preflight``.
+        """
+        await self.preflight(app_config, client)
+        self.status = BatchJobStatus.QUEUED
+        logger.info(f"Batch job {self.id} queued for an allocation")
+
+    async def start(
+        self,
+        app_config: "State | BlackfishConfig",
+        client: TigerFlowClient,
+    ) -> None:
+        """Start the batch job by submitting a containerized Slurm allocation.
+
+        Runs the pre-flight (see ``preflight``), then renders and submits the
+        launch script. Caller is responsible for persistence.
+
+        Args:
+            app_config: Application configuration (HOME_DIR, IMAGES, provider).
+            client: TigerFlowClient for the image-availability/version check.
+
+        Raises:
+            TigerFlowError: If the image is not staged, or the inputs of a
+                sharded job could not be split.
+            ValueError: As for ``preflight``.
+        """
+        logger.info(
+            f"Starting batch job {self.id}: task={self.task}, model={self.repo_id}"
+        )
+
+        await self.preflight(app_config, client)
+        # List the inputs once up front; polls reuse the count.
+        await self._scan_inputs(client)
+        if self._is_sharded():
+            await self._require_shards(client)
+        if self.is_sample():
+            await self._require_sample(client)
+        self.queue_position = None
+        if self.cached and self.cached == self.input_count:
+            logger.info(
+                f"Batch job {self.id}: all {self.cached} inputs are in the result "
+                "cache; nothing to run."
+            )
+            self.status = BatchJobStatus.STOPPED
+            return
+
         job_id = await self._submit(app_config)
         self.pid = job_id
         self.status = BatchJobStatus.SUBMITTED
@@ -536,7 +818,8 @@ class BatchJob(UUIDAuditBase):
 
         ``client.stop`` only halts the in-container tigerflow pipeline; the
         sbatch allocation (``self.pid``) must also be cancelled or it keeps
-        holding resources until walltime. Sets the job STOPPED.
+        holding resources until walltime. A sharded job stops the pipeline of
+        every shard. Sets the job STOPPED.
 
         Args:
             client: TigerFlowClient for remote operations
@@ -546,8 +829,15 @@ class BatchJob(UUIDAuditBase):
         if self.status == BatchJobStatus.STOPPED:
             logger.debug("Batch job is already stopped. Skipping stop command.")
             return
+        if self.status == BatchJobStatus.QUEUED:
+            # Never submitted: there's no pipeline or allocation to stop.
+            self.status = BatchJobStatus.STOPPED
+            self.queue_position = None
+            return
 
-        await client.stop(self.output_dir)
+        await asyncio.gather(
+            *(client.stop(output_dir) for output_dir in self._pipeline_dirs())
+        )
         await self._cancel_allocation()
         self.status = BatchJobStatus.STOPPED
 
@@ -606,7 +896,15 @@ class BatchJob(UUIDAuditBase):
         self.tigerflow_ml_version = versions.tigerflow_ml
 
         await self._ensure_directories(client)
-
+        if self._is_sharded():
+            # Inputs added while the job sat terminal join their shards.
+            await self._count_input_files(client)
+            await self._require_shards(client)
+        if self.is_sample():
+            await self._require_sample(client)
+
+        # The resumed run starts over from the requested walltime.
+        self.allocation_time = None
         job_id = await self._submit(app_config)
 
         # Reset the guards that produced the terminal status, but only once the
@@ -619,13 +917,16 @@ class BatchJob(UUIDAuditBase):
         # boundary.
         self.restarts = 0
         self.stalled_restarts = 0
+        # The recorded results describe the run that ended; the resumed run
+        # adds to them from its first poll.
+        self.results_status = None
 
         self.pid = job_id
         self.status = BatchJobStatus.RESUBMITTED
 
     async def _cancel_allocation(self) -> None:
         """Cancel the Slurm allocation, if any. Best-effort."""
-        if not self.pid or str(self.pid).startswith("local-"):
+        if not self._has_allocation():
             return
         scancel_cmd = ["scancel", str(self.pid)]
         try:
@@ -636,8 +937,33 @@ class BatchJob(UUIDAuditBase):
         except Exception as e:  # noqa: BLE001 - cancellation is best-effort
             logger.warning(f"Failed to scancel job {self.pid} for {self.id}: {e}")
 
-    async def _slurm_state(self) -> JobState:
-        """Return the current Slurm state of this job's allocation.
+    def _has_allocation(self) -> bool:
+        """Whether the job was submitted to Slurm (a LocalProfile job's ``pid``
+        is a ``local-`` sentinel)."""
+        return bool(self.pid) and not str(self.pid).startswith("local-")
+
+    def _pipeline_running(self, allocation: SlurmAllocation) -> bool | None:
+        """Whether the pipeline is running, judged by its Slurm allocation.
+
+        A Slurm job's pipeline runs on a compute node, so the pid it records
+        means nothing where the report is read. ``None`` for a job without an
+        allocation, whose pipeline process the report reader checks itself.
+        """
+        if not self._has_allocation():
+            return None
+        return allocation.state == JobState.RUNNING
+
+    def _sacct_start_bound(self) -> datetime.datetime:
+        """Earliest start time (UTC) of a Slurm record that can be this job's."""
+        # Buffer against clock skew between this host and the cluster, and
+        # against the gap between row creation and sbatch actually recording
+        # a start time. Generous because being slightly too early costs
+        # nothing — a wrapped-around id is years old, not hours.
+        return self.created_at - datetime.timedelta(hours=6)
+
+    async def _slurm_state(self) -> SlurmAllocation:
+        """Return the current Slurm state and elapsed time of this job's
+        allocation.
 
         Slurm recycles job IDs once its counter wraps (``MaxJobId``), and the
         accounting database keeps old records forever. Without a lower time
@@ -659,15 +985,9 @@ class BatchJob(UUIDAuditBase):
         path executes without a shell.
         """
         if not self.pid:
-            return JobState.MISSING
+            return SlurmAllocation(JobState.MISSING)
 
         try:
-            # Buffer against clock skew between this host and the cluster, and
-            # against the gap between row creation and sbatch actually recording
-            # a start time. Generous because being slightly too early costs
-            # nothing — a wrapped-around id is years old, not hours.
-            start_bound = self.created_at - datetime.timedelta(hours=6)
-
             sacct_cmd = [
                 "env",
                 "TZ=UTC",
@@ -678,69 +998,296 @@ class BatchJob(UUIDAuditBase):
                 "-j",
                 str(self.pid),
                 "-S",
-                start_bound.strftime("%Y-%m-%dT%H:%M:%S"),
+                self._sacct_start_bound().strftime(_SACCT_TIME_FORMAT),
                 "-o",
-                "State",
+                "State,Elapsed",
             ]
             if self.host == "localhost":
                 result = await remote.run(sacct_cmd)
             else:
                 result = await remote.ssh(f"{self.user}@{self.host}", sacct_cmd)
-            return parse_state(result.stdout)
+            allocations = [
+                _parse_allocation(*line.split("|", 1))
+                for line in result.stdout.decode("utf-8").splitlines()
+                if "|" in line
+            ]
+            if not allocations:
+                return SlurmAllocation(JobState.MISSING)
+            if self._is_sharded():
+                # One line per array task (or per range of pending tasks).
+                return _array_allocation(allocations)
+            return allocations[0]
         except Exception as e:  # noqa: BLE001 - liveness check is best-effort
             logger.warning(f"Failed to read Slurm state for job {self.id}: {e}")
-            return JobState.MISSING
+            return SlurmAllocation(JobState.MISSING)
+
+    async def _scan_inputs(self, client: TigerFlowClient) -> int | None:
+        """List the input files into the job's manifest and record their count.
+
+        A job using the result cache also looks its new inputs up in the
+        cache. Returns ``None`` (leaving the recorded manifest as it was) if
+        the input directory could not be listed or the cache read.
+        """
+        manifest = await scan_inputs(
+            client.runner,
+            self.input_dir,
+            self._resolved_input_ext(),
+            self.output_dir,
+        )
+        if manifest is None:
+            return None
+        if self.result_cache:
+            view = await stage_cache(
+                client.runner,
+                self.input_dir,
+                self.output_dir,
+                self.result_cache,
+                self.pipeline_config(),
+            )
+            if view is None:
+                return None
+            self.cached = view.cached
+        self.input_count = manifest.count
+        self.input_mtime = manifest.mtime
+        return manifest.count
 
     async def _count_input_files(self, client: TigerFlowClient) -> int | None:
         """Count input files matching the input extension in ``input_dir``.
 
         This is the restart denominator (the report has no total-input field).
-        Returns ``None`` if the count could not be determined (e.g. a transient
+        The count recorded in the input manifest is reused while ``input_dir``
+        is unchanged; otherwise the directory is listed again. Returns
+        ``None`` if the count could not be determined (e.g. a transient
         SSH/``find`` failure), so callers don't treat it as a genuine zero.
+        A sampling job counts the files in its sample, and a job using the
+        result cache the files it has no cached outputs for.
+        """
+        count = None
+        if self.input_count is not None and self.input_mtime is not None:
+            mtime = await input_dir_mtime(client.runner, self.input_dir)
+            if mtime == self.input_mtime:
+                count = self.input_count
+        if count is None:
+            count = await self._scan_inputs(client)
+        if count is not None and self.sample is not None:
+            return min(count, self.sample)
+        if count is not None and self.result_cache:
+            return count - (self.cached or 0)
+        return count
+
+    async def _stage_shards(self, client: TigerFlowClient) -> list[int] | None:
+        """Split the input manifest into the job's shards (see ``jobs.shards``).
+
+        Returns the number of inputs in each shard, or ``None`` if the shards
+        could not be staged.
+        """
+        tasks = [task["name"] for task in self.pipeline_config()["tasks"]]
+        return await stage_shards(
+            client.runner,
+            self.input_dir,
+            self.output_dir,
+            self.shards,
+            tasks,
+            f"{CACHE_DIR}/{MANIFEST_NAME}" if self.result_cache else MANIFEST_NAME,
+        )
+
+    async def _require_shards(self, client: TigerFlowClient) -> None:
+        """Stage the job's shards before a submission that needs them.
+
+        Raises:
+            TigerFlowError: If the shards could not be staged.
+        """
+        if await self._stage_shards(client) is None:
+            raise TigerFlowError(
+                "command", client.host, f"Failed to split {self.input_dir} into shards"
+            )
+
+    async def _require_sample(self, client: TigerFlowClient) -> None:
+        """Stage the job's sample before a submission that needs it.
+
+        Raises:
+            TigerFlowError: If the sample could not be staged.
         """
-        ext = self._resolved_input_ext()
-        # `find` avoids the "argument list too long" a shell glob would hit.
-        cmd = (
-            f"find {shlex.quote(self.input_dir)} -maxdepth 1 -type f "
-            f"-name {shlex.quote('*' + ext)} | wc -l"
+        staged = await stage_sample(
+            client.runner,
+            self.input_dir,
+            self.output_dir,
+            self.id.hex,
+            self.sample or 0,
+        )
+        if staged is None:
+            raise TigerFlowError(
+                "command", client.host, f"Failed to sample {self.input_dir}"
+            )
+
+    async def _store_cache(self, client: TigerFlowClient, results_dir: str) -> None:
+        """Add the outputs of a completed job to its result cache. Best-effort."""
+        stored = await store_cache(
+            client.runner, self.output_dir, results_dir, self.pipeline_config()
         )
-        returncode, stdout, _ = await client.runner.run(cmd)
+        if stored:
+            logger.info(
+                f"Added the outputs of {stored} inputs of {self.id} to the cache"
+            )
+
+    async def _remaining_shards(
+        self, client: TigerFlowClient, finished: list[int]
+    ) -> dict[int, int] | None:
+        """The number of inputs left in each shard that has any, given each
+        one's finished count.
+
+        The shards are staged again first, so inputs added since the last
+        submission are included. Returns ``None`` (every shard) if they could
+        not be.
+        """
+        counts = await self._stage_shards(client)
+        if counts is None:
+            return None
+        remaining = {
+            k: count - done
+            for k, (count, done) in enumerate(zip(counts, finished))
+            if done < count
+        }
+        return remaining or None
+
+    async def _size_allocation(
+        self,
+        client: TigerFlowClient,
+        app_config: "State | BlackfishConfig",
+        processed: float,
+        remaining: int,
+        elapsed: int | None,
+    ) -> None:
+        """Set the walltime of the next allocation from the last one's
+        throughput (see ``jobs.walltime``).
+
+        Args:
+            client: TigerFlowClient for reading the resource specs
+            app_config: Application configuration (HOME_DIR)
+            processed: Files the last allocation processed (per array task)
+            remaining: Files left for the next allocation (per array task)
+            elapsed: Seconds the last allocation ran, per sacct
+        """
+        try:
+            profile = deserialize_profile(app_config.HOME_DIR, self.profile)
+        except FileNotFoundError:
+            profile = None
+        if profile is None or not self._is_slurm(profile):
+            return
+
+        requested = self._job_config().time
+        self.allocation_time = resubmit_walltime(
+            requested,
+            elapsed,
+            processed,
+            remaining,
+            await self._time_limit(client, profile),
+        )
+        if self.allocation_time:
+            logger.info(
+                f"Sizing the next allocation of batch job {self.id} to "
+                f"{self.allocation_time} for {remaining} files (requested {requested})"
+            )
+
+    async def _time_limit(
+        self, client: TigerFlowClient, profile: BlackfishProfile
+    ) -> int | None:
+        """The longest walltime, in minutes, in the cluster's resource specs.
+
+        ``None`` if the profile's cache directory has no readable
+        ``resource_specs.yaml``, or it doesn't set ``time.max``. (Unlike
+        ``parse_resource_specs``, a missing limit doesn't default to 3 hours:
+        that would cut a job that requested longer.)
+        """
+        path = f"{profile.cache_dir}/resource_specs.yaml"
+        returncode, stdout, _ = await client.runner.run(f"cat {shlex.quote(path)}")
         if returncode != 0:
-            # Command failure (transient SSH/find error) is not a genuine zero;
-            # return None so callers don't mistake it for "no work remaining".
             return None
         try:
-            return int(stdout.decode("utf-8").strip())
-        except ValueError:
+            specs = yaml.safe_load(stdout)
+        except yaml.YAMLError:
             return None
+        time = specs.get("time") if isinstance(specs, dict) else None
+        limit = time.get("max") if isinstance(time, dict) else None
+        return limit if isinstance(limit, int) and limit > 0 else None
+
+    async def report(self, client: TigerFlowClient) -> TigerFlowReport:
+        """Read the job's tigerflow report.
+
+        The reports of a sharded job's pipelines are merged into one report
+        for the whole job.
+        """
+        running = None
+        if self._has_allocation():
+            running = self._pipeline_running(await self._slurm_state())
+        return self._merge_reports(
+            client, await self._pipeline_reports(client, running)
+        )
+
+    async def _pipeline_reports(
+        self, client: TigerFlowClient, running: bool | None = None
+    ) -> list[TigerFlowReport]:
+        return list(
+            await asyncio.gather(
+                *(
+                    client.report(output_dir, running=running)
+                    for output_dir in self._pipeline_dirs()
+                )
+            )
+        )
+
+    def _merge_reports(
+        self, client: TigerFlowClient, reports: list[TigerFlowReport]
+    ) -> TigerFlowReport:
+        if len(reports) == 1:
+            return reports[0]
+        # Kept like the report of an unsharded job, for readers of last_report.
+        client.last_report = merge_reports(reports)
+        return client.last_report
 
     async def _observe(
-        self, client: TigerFlowClient
-    ) -> tuple[int, int | None, JobState]:
+        self, client: TigerFlowClient, slurm_state: SlurmAllocation | None = None
+    ) -> tuple[int, int | None, SlurmAllocation, list[int]]:
         """Fetch the three independent status inputs concurrently.
 
         Updates progress fields from the report and returns
-        ``(processed, total, slurm_state)`` for the caller's status decision.
+        ``(processed, total, allocation, finished)`` for the caller's status
+        decision, where ``finished`` is the processed count of each shard.
         ``total`` is ``None`` when the input count could not be determined.
+        A ``slurm_state`` already fetched by the caller (see
+        ``fetch_slurm_states``) is used instead of querying sacct again.
+        The reports are read once the allocation's state is known, which
+        tells them whether the pipeline is running. Progress is summed
+        across the shards of a sharded job.
         """
-        report, total, state = await asyncio.gather(
-            client.report(self.output_dir),
-            self._count_input_files(client),
-            self._slurm_state(),
+
+        async def liveness() -> tuple[list[TigerFlowReport], SlurmAllocation]:
+            if slurm_state is not None:
+                allocation = slurm_state
+            else:
+                allocation = await self._slurm_state()
+            running = self._pipeline_running(allocation)
+            return await self._pipeline_reports(client, running), allocation
+
+        (reports, allocation), total = await asyncio.gather(
+            liveness(), self._count_input_files(client)
         )
+        report = self._merge_reports(client, reports)
         processed = report.progress.pipeline.finished
         self.finished = processed
         self.errored = report.progress.pipeline.errored
+        self.stage_progress = [task.model_dump() for task in report.progress.tasks]
         # "staged" is what remains, so finished + errored + staged == total (the
         # CLI progress denominator). Left unchanged when the count is unknown.
         if total is not None:
             self.staged = max(0, total - processed - (self.errored or 0))
         logger.debug(
             f"Batch job {self.id}: processed={processed}/{total}, "
-            f"errored={self.errored}, slurm_state={format_state(state)}, "
+            f"errored={self.errored}, slurm_state={format_state(allocation.state)}, "
             f"restarts={self.restarts}, stalled={self.stalled_restarts}"
         )
-        return processed, total, state
+        finished = [r.progress.pipeline.finished for r in reports]
+        return processed, total, allocation, finished
 
     def _status_from_observation(
         self, processed: int, total: int | None, state: JobState
@@ -805,9 +1352,12 @@ class BatchJob(UUIDAuditBase):
         current = self.status
         if current is not None and current in _TERMINAL_STATUSES:
             return current
+        # Queued jobs haven't been submitted: there's nothing to observe.
+        if current == BatchJobStatus.QUEUED:
+            return current
 
-        processed, total, state = await self._observe(client)
-        status = self._status_from_observation(processed, total, state)
+        processed, total, allocation, _ = await self._observe(client)
+        status = self._status_from_observation(processed, total, allocation.state)
         if status == BatchJobStatus.STOPPED and self.status != BatchJobStatus.STOPPED:
             await self._cancel_allocation()
         self.status = status
@@ -817,12 +1367,16 @@ class BatchJob(UUIDAuditBase):
         self,
         client: TigerFlowClient,
         app_config: "State | BlackfishConfig",
+        *,
+        slurm_state: SlurmAllocation | None = None,
     ) -> BatchJobStatus:
         """Refresh status and advance the restart loop when the allocation has
         ended with work remaining.
 
         This is the caller that may resubmit — used by the periodic status poll,
-        not by stop/delete (those use the read-only ``refresh()``).
+        not by stop/delete (those use the read-only ``refresh()``). Pass
+        ``slurm_state`` when the allocation's state was already looked up in a
+        batch with other jobs on the same cluster.
 
         Caller is responsible for persistence.
         """
@@ -833,13 +1387,19 @@ class BatchJob(UUIDAuditBase):
         current = self.status
         if current is not None and current in _TERMINAL_STATUSES:
             return current
+        # Queued jobs haven't been submitted: there's nothing to observe.
+        if current == BatchJobStatus.QUEUED:
+            return current
 
         # The high-water is the processed count as of the last restart boundary.
         # Comparing this allocation's processed count against it tells the stall
         # guard whether *this* allocation made forward progress.
         prev_highwater = self.processed_highwater
 
-        processed, total, state = await self._observe(client)
+        processed, total, allocation, finished = await self._observe(
+            client, slurm_state
+        )
+        state = allocation.state
         status = self._status_from_observation(processed, total, state)
 
         # Restart only when the allocation has DEFINITELY ended and work remains.
@@ -861,6 +1421,8 @@ class BatchJob(UUIDAuditBase):
                 and self.status != BatchJobStatus.STOPPED
             ):
                 await self._cancel_allocation()
+                if self.result_cache:
+                    await self._store_cache(client, self.result_cache)
             self.status = status
             return status
 
@@ -893,8 +1455,124 @@ class BatchJob(UUIDAuditBase):
             f"Resubmitting batch job {self.id} "
             f"(processed={processed}/{total}, restart {self.restarts + 1})"
         )
-        job_id = await self._submit(app_config)
+        # Only the shards with inputs left need another allocation, and it
+        # only needs the time to process them.
+        shards = None
+        remaining = total - processed
+        progress: float = processed - prev_highwater
+        if self._is_sharded():
+            left = await self._remaining_shards(client, finished)
+            if left is not None:
+                shards = list(left)
+                remaining = max(left.values())
+            progress /= self.shards
+        await self._size_allocation(
+            client, app_config, progress, remaining, allocation.elapsed
+        )
+        job_id = await self._submit(app_config, shards)
         self.pid = job_id
         self.restarts += 1
         self.status = BatchJobStatus.RESUBMITTED
         return BatchJobStatus.RESUBMITTED
+
+
+async def fetch_slurm_states(jobs: list[BatchJob]) -> dict[UUID, SlurmAllocation]:
+    """Look up the Slurm state and elapsed time of several jobs' allocations
+    at once.
+
+    Jobs on the same cluster (``host`` and ``user``) share one ``sacct -j
+    a,b,c`` query instead of one query each. The query's ``-S`` bound is the
+    earliest of the jobs' own bounds (see ``BatchJob._slurm_state``), so it
+    can also return old records whose recycled id matches a newer job. Each
+    job therefore keeps only records submitted after its own bound, and the
+    most recent of those.
+
+    Like ``_slurm_state``, this is best-effort: a job whose state couldn't be
+    read — no pid, no matching record, or a failed query — is ``MISSING``.
+
+    Returns:
+        The allocation of each job, keyed by job id.
+    """
+    states = {job.id: SlurmAllocation(JobState.MISSING) for job in jobs}
+    clusters: dict[tuple[str | None, str | None], list[BatchJob]] = {}
+    for job in jobs:
+        if job.pid:
+            clusters.setdefault((job.host, job.user), []).append(job)
+
+    async def fetch(host: str | None, user: str | None, group: list[BatchJob]) -> None:
+        start_bound = min(job._sacct_start_bound() for job in group)
+        sacct_cmd = [
+            "env",
+            "TZ=UTC",
+            "sacct",
+            "-n",
+            "-P",
+            "-X",
+            "-j",
+            ",".join(sorted({str(job.pid) for job in group})),
+            "-S",
+            start_bound.strftime(_SACCT_TIME_FORMAT),
+            "-o",
+            "JobID,Submit,State,Elapsed",
+        ]
+        try:
+            if host == "localhost":
+                result = await remote.run(sacct_cmd)
+            else:
+                result = await remote.ssh(f"{user}@{host}", sacct_cmd)
+        except Exception as e:  # noqa: BLE001 - liveness check is best-effort
+            logger.warning(
+                f"Failed to read Slurm state for {len(group)} job(s) on {host}: {e}"
+            )
+            return
+
+        records: dict[str, list[tuple[datetime.datetime | None, str, str]]] = {}
+        for line in result.stdout.decode("utf-8").splitlines():
+            fields = line.strip().split("|")
+            if len(fields) != 4:
+                continue
+            pid, submit, state, elapsed = fields
+            try:
+                submitted: datetime.datetime | None = datetime.datetime.strptime(
+                    submit, _SACCT_TIME_FORMAT
+                ).replace(tzinfo=datetime.timezone.utc)
+            except ValueError:  # "Unknown" before the record is complete
+                submitted = None
+            records.setdefault(pid, []).append((submitted, state, elapsed))
+
+        for job in group:
+            bound = job._sacct_start_bound()
+            pid = str(job.pid)
+            # A job array lists one record per task ("<pid>_<task>"), or per
+            # range of tasks still pending ("<pid>_[<range>]").
+            ids = (
+                [r for r in records if r.startswith(f"{pid}_")]
+                if job._is_sharded()
+                else [pid]
+            )
+            found = []
+            for record_id in ids:
+                candidates = [
+                    record
+                    for record in records.get(record_id, [])
+                    if record[0] is None or record[0] >= bound
+                ]
+                if not candidates:
+                    continue
+                # A record still missing its submit time is the newest.
+                _, state, elapsed = max(
+                    candidates, key=lambda r: (r[0] is None, r[0] or bound)
+                )
+                try:
+                    found.append(_parse_allocation(state, elapsed))
+                except ValueError:
+                    logger.warning(
+                        f"Unrecognized Slurm state for job {job.id}: {state}"
+                    )
+            if found:
+                states[job.id] = _array_allocation(found)
+
+    await asyncio.gather(
+        *(fetch(host, user, group) for (host, user), group in clusters.items())
+    )
+    return states
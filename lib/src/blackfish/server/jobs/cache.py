@@ -0,0 +1,250 @@
+"""Result cache shared by batch jobs.
+
+Jobs often run the same pipeline over inputs an earlier job has already
+processed. A job created with the result cache keeps its outputs in a cache
+on the cluster, in the profile's cache directory, addressed by the pipeline
+(each stage's task, model, revision and parameters) and by the content of
+the input file::
+
+    {cache_dir}/results/{pipeline}/{sha256 of input}/{stage}{output_ext}
+
+When the job's inputs are listed, each new input is looked up once: if every
+stage of the pipeline has an output cached for its content, the outputs are
+copied to ``{output_dir}/{stage}`` under the input's own name (as a reflink
+where the filesystem supports it) and the input is left out of the pipeline. Only the other inputs run, from
+an input view of their own::
+
+    {output_dir}/.blackfish/cache/hashes.txt   content hash and name of each input
+    {output_dir}/.blackfish/cache/cached.txt   names of the inputs served from the cache
+    {output_dir}/.blackfish/cache/inputs.txt   names of the inputs to run
+    {output_dir}/.blackfish/cache/input/       symlinks to those files
+
+An input keeps the side it was put on when first listed, so the pipeline's
+count of finished files stays comparable with ``inputs.txt`` across restarts.
+When the job completes, copies of the outputs of the inputs it ran are added
+to the cache. The cache never shares a file with an output directory, so
+editing an output can't change what later jobs get.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import shlex
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+
+from blackfish.server.jobs.manifest import MANIFEST_DIR, MANIFEST_NAME
+from blackfish.server.logger import logger
+
+if TYPE_CHECKING:
+    from blackfish.server.jobs.client import CommandRunner
+
+RESULTS_DIR = "results"
+CACHE_DIR = "cache"
+
+# `sha256sum` where there is one (Linux), `shasum` otherwise (macOS).
+_HASH_CMD = (
+    "if command -v sha256sum > /dev/null; then h=sha256sum; else h='shasum -a 256'; fi"
+)
+
+# Prints "{hash} {name}" for each line of the hash list (the second file)
+# whose name is listed in the first. A line holds 64 hex digits, two spaces
+# and the name; a name with a backslash or newline is escaped (as \\ and \n)
+# and its line starts with a backslash.
+_PICK_HASHES = (
+    "LC_ALL=C awk 'FILENAME == ARGV[1] { want[$0] = 1; next } "
+    "{ h = substr($0, 1, 64); n = substr($0, 67) } "
+    r'/^\\/ { h = substr($0, 2, 64); n = ""; '
+    "for (i = 68; i <= length($0); i++) { ch = substr($0, i, 1); "
+    r'if (ch == "\\") { ch = substr($0, ++i, 1); if (ch == "n") ch = "\n" } '
+    "n = n ch } } "
+    "n in want { print h, n }'"
+)
+
+# Reads a line printed by _PICK_HASHES into $hash and $name.
+_READ_HASH = 'IFS= read -r line; do hash="${line%% *}"; name="${line#* }"; '
+
+
+def _copy(source: str, dest: str) -> str:
+    """Copy a file, as a reflink where the filesystem supports it."""
+    return (
+        f'{{ cp --reflink=auto -f "{source}" "{dest}" 2> /dev/null || '
+        f'cp -f "{source}" "{dest}"; }}'
+    )
+
+
+def cache_dir(output_dir: str) -> str:
+    """Directory of the cache view of a job writing to ``output_dir``."""
+    return f"{output_dir}/{MANIFEST_DIR}/{CACHE_DIR}"
+
+
+def pipeline_key(pipeline: dict[str, Any]) -> str:
+    """The cache address of a tigerflow pipeline config.
+
+    Covers what determines the outputs of each stage: its name, task module,
+    parameters and output extension. The model cache directory and the input
+    extension filter don't change an output, so they're left out.
+    """
+    stages = [
+        {
+            "name": task["name"],
+            "module": task["module"],
+            "output_ext": task.get("output_ext"),
+            "params": {
+                k: v for k, v in (task.get("params") or {}).items() if k != "cache_dir"
+            },
+        }
+        for task in pipeline["tasks"]
+    ]
+    encoded = json.dumps(stages, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()[:32]
+
+
+def _stage_outputs(pipeline: dict[str, Any]) -> list[tuple[str, str]]:
+    """The name and output extension of each stage of ``pipeline``."""
+    return [(task["name"], task.get("output_ext") or "") for task in pipeline["tasks"]]
+
+
+@dataclass
+class CacheView:
+    """The split of a job's inputs between the cache and the pipeline.
+
+    Attributes:
+        cached: Inputs whose outputs came from the cache
+        pending: Inputs the pipeline runs
+    """
+
+    cached: int
+    pending: int
+
+
+async def stage_cache(
+    runner: CommandRunner,
+    input_dir: str,
+    output_dir: str,
+    results_dir: str,
+    pipeline: dict[str, Any],
+) -> CacheView | None:
+    """Look the job's new inputs up in the cache and stage the rest to run.
+
+    Expects the manifest (see ``jobs.manifest``) to be current. Inputs
+    already looked up keep their side; inputs no longer in the manifest are
+    dropped.
+
+    Args:
+        runner: Command runner for the cluster
+        input_dir: The job's input directory
+        output_dir: The job's output directory
+        results_dir: The result cache (``{cache_dir}/results``)
+        pipeline: The job's tigerflow pipeline config
+
+    Returns:
+        The split of the inputs, or ``None`` if they could not be staged.
+    """
+    stages = _stage_outputs(pipeline)
+    entries = f"{results_dir}/{pipeline_key(pipeline)}"
+    mkdirs = " ".join(shlex.quote(f"{output_dir}/{name}") for name, _ in stages)
+    restore = "; ".join(
+        f'[ -e "$o/{name}/$stem{ext}" ] || '
+        f"{_copy(f'$e/{name}{ext}', f'$o/{name}/$stem{ext}')} || exit 1"
+        for name, ext in stages
+    )
+    hit = " && ".join(f'[ -e "$e/{name}{ext}" ]' for name, ext in stages)
+    cmd = (
+        f"{_HASH_CMD} && "
+        f"mkdir -p {mkdirs} {shlex.quote(f'{cache_dir(output_dir)}/input')} && "
+        f"cd {shlex.quote(cache_dir(output_dir))} && "
+        f"touch hashes.txt cached.txt inputs.txt && "
+        f"o={shlex.quote(output_dir)} && c={shlex.quote(entries)} && "
+        f"d={shlex.quote(input_dir)} && "
+        # Inputs not looked up yet.
+        f"LC_ALL=C awk 'FILENAME != ARGV[3] {{ seen[$0] = 1; next }} "
+        f"!($0 in seen)' cached.txt inputs.txt ../{MANIFEST_NAME} > .new.txt && "
+        f"if [ -s .new.txt ]; then "
+        f"(cd \"$d\" && tr '\\n' '\\0' < \"$OLDPWD/.new.txt\" | xargs -0 $h) "
+        f">> hashes.txt || exit 1; fi && "
+        # Look each new input up by its content hash.
+        f": > .hits.txt && : > .misses.txt && "
+        f"{_PICK_HASHES} .new.txt hashes.txt | while {_READ_HASH}"
+        f'e="$c/$hash"; stem="${{name%.*}}"; '
+        f"if {hit}; then {restore}; "
+        # printf, since a POSIX echo expands backslashes in the name.
+        f"printf '%s\\n' \"$name\" >> .hits.txt; "
+        f"else printf '%s\\n' \"$name\" >> .misses.txt; fi; "
+        f"done && "
+        # Keep each side to the current manifest, and add the new inputs.
+        f"for f in cached inputs; do "
+        f"LC_ALL=C awk 'FILENAME == ARGV[1] {{ keep[$0] = 1; next }} $0 in keep' "
+        f"../{MANIFEST_NAME} $f.txt > .$f.txt.tmp || exit 1; done && "
+        f"cat .hits.txt >> .cached.txt.tmp && cat .misses.txt >> .inputs.txt.tmp && "
+        f"mv .cached.txt.tmp cached.txt && mv .inputs.txt.tmp inputs.txt && "
+        f"(cd input && find . -type l | sed 's|^\\./||' | "
+        f"LC_ALL=C awk 'FILENAME == ARGV[1] {{ keep[$0] = 1; next }} "
+        f"!($0 in keep)' ../inputs.txt - | while IFS= read -r f; do "
+        f'rm -f "$f"; done) && '
+        f"while IFS= read -r f; do "
+        f'ln -sf "$d/$f" input/ || exit 1; done < .misses.txt && '
+        f"wc -l < cached.txt && wc -l < inputs.txt"
+    )
+    returncode, stdout, stderr = await runner.run(cmd)
+    if returncode != 0:
+        logger.warning(
+            f"Failed to look up the inputs of {input_dir} in the result cache: "
+            f"{stderr.decode('utf-8', errors='replace').strip()}"
+        )
+        return None
+    try:
+        cached, pending = (int(line) for line in stdout.decode("utf-8").split())
+    except ValueError:
+        return None
+    return CacheView(cached=cached, pending=pending)
+
+
+async def store_cache(
+    runner: CommandRunner,
+    output_dir: str,
+    results_dir: str,
+    pipeline: dict[str, Any],
+) -> int | None:
+    """Add the outputs of the inputs a job ran to the cache.
+
+    Only inputs with an output from every stage are added, and only if the
+    cache doesn't have them yet. Each output is written aside and renamed
+    into place, so a reader never sees half of one.
+
+    Returns:
+        The number of inputs added, or ``None`` if the cache could not be
+        written.
+    """
+    stages = _stage_outputs(pipeline)
+    entries = f"{results_dir}/{pipeline_key(pipeline)}"
+    done = " && ".join(f'[ -e "$o/{name}/$stem{ext}" ]' for name, ext in stages)
+    cached = " && ".join(f'[ -e "$e/{name}{ext}" ]' for name, ext in stages)
+    store = "; ".join(
+        f"{_copy(f'$o/{name}/$stem{ext}', f'$e/.{name}{ext}.tmp')} && "
+        f'mv -f "$e/.{name}{ext}.tmp" "$e/{name}{ext}" || exit 1'
+        for name, ext in stages
+    )
+    cmd = (
+        f"cd {shlex.quote(cache_dir(output_dir))} && "
+        f"o={shlex.quote(output_dir)} && c={shlex.quote(entries)} && "
+        f'mkdir -p "$c" && n=0 && '
+        f"{_PICK_HASHES} inputs.txt hashes.txt > .ran.txt && "
+        f"while {_READ_HASH}"
+        f'e="$c/$hash"; stem="${{name%.*}}"; '
+        f"if {done} && ! {{ {cached}; }}; then "
+        f'mkdir -p "$e" && {store}; n=$((n + 1)); fi; '
+        f"done < .ran.txt && echo $n"
+    )
+    returncode, stdout, stderr = await runner.run(cmd)
+    if returncode != 0:
+        logger.warning(
+            f"Failed to add the outputs in {output_dir} to the result cache: "
+            f"{stderr.decode('utf-8', errors='replace').strip()}"
+        )
+        return None
+    try:
+        return int(stdout.decode("utf-8").strip())
+    except ValueError:
+        return None
@@ -21,11 +21,22 @@ from blackfish.server.logger import logger
 
 if TYPE_CHECKING:
     from blackfish.server.images import ImageSpec
+    from blackfish.server.jobs.report import ReportReader
+    from blackfish.server.jobs.versions import ImageVersionCache
 
 
 # Default idle timeout for TigerFlow jobs (minutes)
 DEFAULT_IDLE_TIMEOUT = 10
 
+# Prints the tigerflow and tigerflow-ml versions, one per line (empty if the
+# package isn't installed), so one container start reads both.
+_VERSIONS_SNIPPET = (
+    "import importlib.metadata as m; "
+    "d = {(x.name or '').lower().replace('_', '-'): x.version "
+    "for x in m.distributions()}; "
+    "print(d.get('tigerflow', '')); print(d.get('tigerflow-ml', ''))"
+)
+
 
 class TigerFlowReportStatus(BaseModel):
     """Status section from tigerflow report."""
@@ -274,6 +285,8 @@ class TigerFlowClient:
         provider: ContainerProvider,
         cache_dir: str,
         on_progress: Callable[[str], None] | None = None,
+        reader: "ReportReader | None" = None,
+        versions_cache: "ImageVersionCache | None" = None,
     ):
         """Initialize TigerFlowClient.
 
@@ -287,6 +300,11 @@ class TigerFlowClient:
                 ``{cache_dir}/images/{image.sif}``.
             on_progress: Optional callback for progress updates. Defaults to
                 ``logger.info``.
+            reader: Optional reader that builds reports from the output
+                directory directly, without starting the container. The
+                container is still used if the reader fails.
+            versions_cache: Optional cache of image versions, so the health
+                check starts the container only when the SIF has changed.
         """
         self.runner = runner
         self.home_dir = home_dir
@@ -295,6 +313,11 @@ class TigerFlowClient:
         self.cache_dir = cache_dir
         self._sif = f"{cache_dir}/images/{image.sif}"
         self._on_progress = on_progress or logger.info
+        self.reader = reader
+        self.versions_cache = versions_cache
+        # The most recent report read by ``report``, for callers that want
+        # more from it than the method they called used.
+        self.last_report: TigerFlowReport | None = None
 
     @property
     def host(self) -> str:
@@ -357,22 +380,40 @@ class TigerFlowClient:
     # Image / environment checks
     # -------------------------------------------------------------------------
 
-    async def _sif_exists(self) -> bool:
-        """Return whether the SIF is present at the canonical launch location.
+    async def _sif_stat(self) -> tuple[int, int] | None:
+        """Return the size and mtime of the SIF at the canonical launch location.
 
         The launch templates run the SIF from ``{cache_dir}/images/{sif}`` (the
         same convention as the service templates), so the health check probes
-        that single location.
+        that single location. GNU ``stat`` is tried first, then BSD's (macOS).
+
+        Returns:
+            ``(size, mtime)``, or None if ``stat`` printed neither.
+
+        Raises:
+            TigerFlowError: If the SIF is not present.
         """
-        returncode, _, _ = await self.runner.run(f"test -f {self._sif}")
-        return returncode == 0
+        sif = self._sif
+        returncode, stdout, _ = await self.runner.run(
+            f"test -f {sif} && {{ stat -L -c '%s %Y' {sif} 2> /dev/null || "
+            f"stat -L -f '%z %m' {sif} 2> /dev/null || true; }}"
+        )
+        if returncode != 0:
+            raise TigerFlowError("missing", self.host)
+        try:
+            size, mtime = (int(field) for field in stdout.decode("utf-8").split())
+        except ValueError:
+            return None
+        return size, mtime
 
     async def check_health(self) -> TigerFlowVersions:
         """Verify the tigerflow-ml image is staged and return its versions.
 
         Checks that the SIF exists, then reads the tigerflow and tigerflow-ml
         versions from inside the container (recorded on the job for
-        reproducibility).
+        reproducibility). With a ``versions_cache``, the versions of an
+        Apptainer image are read once per change to the SIF; Docker runs an
+        image the SIF doesn't identify, so it is always read.
 
         Returns:
             TigerFlowVersions with the image's installed package versions.
@@ -380,34 +421,43 @@ class TigerFlowClient:
         Raises:
             TigerFlowError: If the image is not staged.
         """
-        if not await self._sif_exists():
-            raise TigerFlowError("missing", self.host)
-
-        tf_version = await self._container_package_version("tigerflow")
-        tfml_version = await self._container_package_version("tigerflow-ml")
-
+        stat = await self._sif_stat()
+        cache = (
+            self.versions_cache
+            if self.provider is ContainerProvider.Apptainer and stat is not None
+            else None
+        )
+        if cache is not None and stat is not None:
+            cached = cache.get(self.host, self._sif, *stat)
+            if cached is not None:
+                return cached
+
+        versions = await self._container_versions()
+        if (
+            cache is not None
+            and stat is not None
+            and "unknown" not in (versions.tigerflow, versions.tigerflow_ml)
+        ):
+            cache.put(self.host, self._sif, *stat, versions)
+        return versions
+
+    async def _container_versions(self) -> TigerFlowVersions:
+        """Read the tigerflow and tigerflow-ml versions from inside the image.
+
+        Both are read in one container start. A version that could not be
+        determined is "unknown".
+        """
+        command = self._tigerflow_cmd_python(f'-c "{_VERSIONS_SNIPPET}"')
+        returncode, stdout, _ = await self.runner.run(command)
+        lines = stdout.decode("utf-8").splitlines() if returncode == 0 else []
+        tf_version, tfml_version = (
+            [line.strip() for line in lines[-2:]] if len(lines) >= 2 else ["", ""]
+        )
         return TigerFlowVersions(
             tigerflow=tf_version or "unknown",
             tigerflow_ml=tfml_version or "unknown",
         )
 
-    async def _container_package_version(self, package: str) -> str | None:
-        """Read an installed package version from inside the image.
-
-        Args:
-            package: Distribution name (e.g. "tigerflow" or "tigerflow-ml").
-
-        Returns:
-            Version string, or None if it could not be determined.
-        """
-        code_snippet = f"import importlib.metadata as m; print(m.version('{package}'))"
-        command = self._tigerflow_cmd_python(f'-c "{code_snippet}"')
-        returncode, stdout, _ = await self.runner.run(command)
-        if returncode != 0:
-            return None
-        version = stdout.decode("utf-8").strip()
-        return version or None
-
     def _tigerflow_cmd_python(self, args: str) -> str:
         """Build a command to run ``python <args>`` inside the image.
 
@@ -426,14 +476,21 @@ class TigerFlowClient:
     # Job Operations
     # -------------------------------------------------------------------------
 
-    async def report(self, output_dir: str) -> TigerFlowReport:
+    async def report(
+        self, output_dir: str, running: bool | None = None
+    ) -> TigerFlowReport:
         """Get a job report (status, progress, metrics, errors).
 
         The report is computed from on-disk state in ``output_dir`` and is valid
-        even after the pipeline process has exited.
+        even after the pipeline process has exited. With a ``reader``, that
+        state is read directly; ``tigerflow report`` runs in the container only
+        if reading fails for a reason other than a missing pipeline directory.
+        The report is also kept as ``last_report``.
 
         Args:
             output_dir: Path to the pipeline output directory on the cluster.
+            running: Whether the pipeline is running, when the caller knows
+                (e.g. from its Slurm allocation); passed to the ``reader``.
 
         Returns:
             TigerFlowReport with current job state and progress.
@@ -441,6 +498,24 @@ class TigerFlowClient:
         Raises:
             TigerFlowError: If the report command fails.
         """
+        report = await self._read_report(output_dir, running)
+        self.last_report = report
+        return report
+
+    async def _read_report(
+        self, output_dir: str, running: bool | None
+    ) -> TigerFlowReport:
+        if self.reader is not None:
+            try:
+                return await self.reader.read(output_dir, running)
+            except TigerFlowError:
+                raise
+            except Exception as e:
+                logger.warning(
+                    f"Could not read TigerFlow report for {output_dir} directly, "
+                    f"falling back to the container: {e}"
+                )
+
         logger.debug(f"Fetching TigerFlow report for {output_dir}")
 
         command = self._tigerflow_cmd(f"report {output_dir} --json", binds=[output_dir])
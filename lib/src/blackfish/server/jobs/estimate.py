@@ -0,0 +1,248 @@
+"""Sampling estimates of batch job cost.
+
+Before committing a large input directory, a job can be run on a random
+sample of it: a batch job with ``sample`` set takes that many input files at
+random, runs the same pipeline on them through the usual launch path, and
+extrapolates from their timings. The sample gets its own input view and
+pipeline directory, so it never touches the outputs of a real job on the
+same ``output_dir``::
+
+    {output_dir}/.blackfish/samples/{job}/inputs.txt   the sampled file names
+    {output_dir}/.blackfish/samples/{job}/input/       symlinks to those files
+    {output_dir}/.blackfish/samples/{job}/output/      the sample's pipeline directory
+
+The estimate assumes each stage processes one file at a time and the stages
+of a pipeline run concurrently, so the slowest stage sets the pace. For ``n``
+shards, each shard processes ``ceil(total / n)`` files at that pace, in as
+many allocations of the job's walltime as it takes; every allocation also
+spends ``STARTUP_ALLOWANCE`` starting up. Time spent waiting in the queue
+isn't included.
+"""
+
+from __future__ import annotations
+
+import math
+import shlex
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+import sqlalchemy as sa
+
+from blackfish.server.jobs.manifest import MANIFEST_DIR, manifest_path
+from blackfish.server.jobs.results import BatchJobResult
+from blackfish.server.jobs.walltime import (
+    STARTUP_ALLOWANCE,
+    format_walltime,
+    walltime_seconds,
+)
+from blackfish.server.logger import logger
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+    from blackfish.server.jobs.base import BatchJob
+    from blackfish.server.jobs.client import CommandRunner
+
+SAMPLES_DIR = "samples"
+
+DEFAULT_SAMPLE_SIZE = 20
+
+# Walltime of a sample's allocation, unless the job requests less.
+SAMPLE_WALLTIME = 30 * 60
+
+# Shard counts an estimate covers unless asked for others.
+DEFAULT_SHARD_COUNTS = (1, 2, 4, 8, 16)
+
+# Reservoir sampling: every line of the manifest is equally likely to be kept,
+# in one pass and without `shuf` (missing on macOS).
+_SAMPLE_AWK = (
+    "BEGIN { srand() } "
+    "NR <= n { s[NR] = $0; next } "
+    "{ r = int(rand() * NR) + 1; if (r <= n) s[r] = $0 } "
+    "END { for (i = 1; i <= n && i <= NR; i++) print s[i] }"
+)
+
+
+def sample_dir(output_dir: str, job_id: str) -> str:
+    """Directory of the sample of a sampling job writing to ``output_dir``."""
+    return f"{output_dir}/{MANIFEST_DIR}/{SAMPLES_DIR}/{job_id}"
+
+
+def sample_walltime(requested: str) -> str:
+    """The ``--time`` of a sample's allocation, for a job requesting ``requested``."""
+    seconds = walltime_seconds(requested)
+    if seconds is None or seconds <= SAMPLE_WALLTIME:
+        return requested
+    return format_walltime(SAMPLE_WALLTIME)
+
+
+async def stage_sample(
+    runner: CommandRunner,
+    input_dir: str,
+    output_dir: str,
+    job_id: str,
+    size: int,
+) -> int | None:
+    """Link a random sample of the job's input manifest into its sample view.
+
+    Expects the manifest (see ``jobs.manifest``) to be current. A sample
+    already staged is kept, so resuming the job resumes the same sample. A
+    sample is small, so its files are linked one by one, which unlike
+    ``xargs -d`` also works on macOS for a local profile.
+
+    Returns:
+        The number of sampled files, or ``None`` if the sample could not be
+        staged.
+    """
+    directory = sample_dir(output_dir, job_id)
+    manifest = manifest_path(output_dir)
+    cmd = (
+        f"mkdir -p {shlex.quote(f'{directory}/input')} "
+        f"{shlex.quote(f'{directory}/output/.tigerflow')} && "
+        f"cd {shlex.quote(directory)} && "
+        f"{{ test -f inputs.txt || "
+        f"{{ awk -v n={size} {shlex.quote(_SAMPLE_AWK)} {shlex.quote(manifest)} "
+        f"> .inputs.txt.tmp && mv .inputs.txt.tmp inputs.txt; }}; }} && "
+        f"d={shlex.quote(input_dir)} && "
+        f'while IFS= read -r f; do ln -sf "$d/$f" input/ || exit 1; '
+        f"done < inputs.txt && "
+        f"wc -l < inputs.txt"
+    )
+    returncode, stdout, stderr = await runner.run(cmd)
+    if returncode != 0:
+        logger.warning(
+            f"Failed to sample {size} files of {input_dir}: "
+            f"{stderr.decode('utf-8', errors='replace').strip()}"
+        )
+        return None
+    try:
+        return int(stdout.decode("utf-8").strip())
+    except ValueError:
+        return None
+
+
+@dataclass
+class ShardEstimate:
+    """The projected cost of running a job in ``shards`` shards."""
+
+    shards: int
+    files_per_shard: int
+    allocations: int  # per shard
+    wall_clock_seconds: float
+    gpu_hours: float
+
+
+@dataclass
+class JobEstimate:
+    """The extrapolated cost of a job, from the timings of its sample.
+
+    ``seconds_per_file`` (and the projections) are ``None`` until a sampled
+    file has been processed by every stage.
+    """
+
+    status: str | None
+    total_files: int | None
+    sampled: int
+    succeeded: int
+    failed: int
+    stage_seconds: dict[str, float]  # mean per file, by stage
+    seconds_per_file: float | None
+    gpus: int
+    walltime_seconds: int | None
+    projections: list[ShardEstimate]
+
+
+def project(
+    total: int,
+    seconds_per_file: float,
+    shards: int,
+    gpus: int,
+    walltime: int | None,
+) -> ShardEstimate:
+    """Project the cost of ``total`` files in ``shards`` shards."""
+    files = math.ceil(total / shards)
+    processing = files * seconds_per_file
+    allocations = 1
+    if walltime and walltime > STARTUP_ALLOWANCE:
+        allocations = max(1, math.ceil(processing / (walltime - STARTUP_ALLOWANCE)))
+    wall_clock = processing + allocations * STARTUP_ALLOWANCE
+    return ShardEstimate(
+        shards=shards,
+        files_per_shard=files,
+        allocations=allocations,
+        wall_clock_seconds=wall_clock,
+        gpu_hours=shards * wall_clock * gpus / 3600,
+    )
+
+
+async def estimate_job(
+    session: AsyncSession,
+    job: BatchJob,
+    *,
+    walltime: str | None = None,
+    shard_counts: tuple[int, ...] | list[int] = DEFAULT_SHARD_COUNTS,
+) -> JobEstimate:
+    """Extrapolate a sampling job's recorded results to its whole input.
+
+    Args:
+        session: Database session
+        job: The sampling job
+        walltime: The Slurm ``--time`` of its allocations, or ``None`` if it
+            doesn't run under Slurm
+        shard_counts: Numbers of shards to project
+    """
+    rows = await session.execute(
+        sa.select(
+            BatchJobResult.task,
+            sa.func.avg(BatchJobResult.duration_ms).filter(
+                BatchJobResult.status == "success"
+            ),
+            sa.func.count().filter(BatchJobResult.status == "success"),
+            sa.func.count().filter(BatchJobResult.status == "error"),
+        )
+        .where(BatchJobResult.job_id == job.id)
+        .group_by(BatchJobResult.task)
+    )
+    stage_seconds: dict[str, float] = {}
+    counts: dict[str, tuple[int, int]] = {}
+    for task, avg_ms, succeeded, failed in rows:
+        counts[task] = (succeeded, failed)
+        if avg_ms is not None:
+            stage_seconds[task] = avg_ms / 1000
+
+    stages = [task["name"] for task in job.pipeline_config()["tasks"]]
+    # A file succeeded once the last stage has it; it failed at any stage.
+    succeeded = counts.get(stages[-1], (0, 0))[0]
+    failed = sum(f for _, f in counts.values())
+    seconds_per_file = (
+        max(stage_seconds[stage] for stage in stages)
+        if all(stage in stage_seconds for stage in stages)
+        else None
+    )
+
+    gpus = job._job_config().gres
+    limit = walltime_seconds(walltime) if walltime else None
+    total = job.input_count
+    sampled = job.sample or 0
+    if total is not None:
+        sampled = min(sampled, total)
+    projections = []
+    if seconds_per_file is not None and total:
+        projections = [
+            project(total, seconds_per_file, n, gpus, limit)
+            for n in sorted(set(shard_counts))
+            if n >= 1
+        ]
+
+    return JobEstimate(
+        status=job.status,
+        total_files=total,
+        sampled=sampled,
+        succeeded=succeeded,
+        failed=failed,
+        stage_seconds=stage_seconds,
+        seconds_per_file=seconds_per_file,
+        gpus=gpus,
+        walltime_seconds=limit,
+        projections=projections,
+    )
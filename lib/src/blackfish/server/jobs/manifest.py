@@ -0,0 +1,106 @@
+"""Input manifests for batch jobs.
+
+The restart loop needs the number of input files to know whether a job is
+done (see ``BatchJob.poll``). Counting them means listing ``input_dir``, a
+heavy metadata scan on a parallel filesystem with hundreds of thousands of
+inputs, so it isn't repeated on every poll. The inputs are listed once, when
+the job starts, into a manifest in the output directory::
+
+    {output_dir}/.blackfish/inputs.txt    one input file name per line, sorted
+
+and the count is kept on the job along with the modification time of
+``input_dir``. Adding, removing or renaming a file in a directory changes its
+mtime, so later polls only ``stat`` the directory and list it again when the
+mtime has moved.
+
+Directory mtimes have one-second resolution here. A scan that starts in the
+same second the directory last changed may have missed a file added later in
+that second, so its mtime isn't kept and the next poll scans again.
+"""
+
+from __future__ import annotations
+
+import shlex
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from blackfish.server.logger import logger
+
+if TYPE_CHECKING:
+    from blackfish.server.jobs.client import CommandRunner
+
+MANIFEST_DIR = ".blackfish"
+MANIFEST_NAME = "inputs.txt"
+
+
+@dataclass
+class InputManifest:
+    """The result of listing a job's input directory.
+
+    Attributes:
+        count: Number of input files
+        mtime: Modification time of the input directory when it was listed,
+            or ``None`` if it changed while being listed
+    """
+
+    count: int
+    mtime: int | None
+
+
+def manifest_path(output_dir: str) -> str:
+    """Path of the input manifest of a job writing to ``output_dir``."""
+    return f"{output_dir}/{MANIFEST_DIR}/{MANIFEST_NAME}"
+
+
+def _stat_mtime_cmd(path: str) -> str:
+    # GNU stat, then BSD stat (LocalProfile on macOS).
+    quoted = shlex.quote(path)
+    return f"(stat -c %Y {quoted} 2>/dev/null || stat -f %m {quoted})"
+
+
+async def input_dir_mtime(runner: CommandRunner, input_dir: str) -> int | None:
+    """Modification time of ``input_dir``, or ``None`` if it can't be read."""
+    returncode, stdout, _ = await runner.run(_stat_mtime_cmd(input_dir))
+    if returncode != 0:
+        return None
+    try:
+        return int(stdout.decode("utf-8").strip())
+    except ValueError:
+        return None
+
+
+async def scan_inputs(
+    runner: CommandRunner, input_dir: str, ext: str, output_dir: str
+) -> InputManifest | None:
+    """List the input files matching ``ext`` into the job's manifest.
+
+    Returns:
+        The new manifest, or ``None`` if the directory could not be listed
+        (e.g. a transient SSH failure), so callers don't mistake it for a
+        genuine zero.
+    """
+    directory = f"{output_dir}/{MANIFEST_DIR}"
+    path = shlex.quote(manifest_path(output_dir))
+    partial = shlex.quote(f"{directory}/.{MANIFEST_NAME}.tmp")
+    # `find` avoids the "argument list too long" a shell glob would hit. The
+    # list is written aside and renamed, so a reader never sees half of it.
+    cmd = (
+        f"mkdir -p {shlex.quote(directory)} && "
+        f"{_stat_mtime_cmd(input_dir)} && date +%s && "
+        f"cd {shlex.quote(input_dir)} && "
+        f"find . -maxdepth 1 -type f -name {shlex.quote('*' + ext)} "
+        f"| sed 's|^\\./||' | LC_ALL=C sort > {partial} && "
+        f"mv {partial} {path} && wc -l < {path}"
+    )
+    returncode, stdout, stderr = await runner.run(cmd)
+    if returncode != 0:
+        logger.warning(
+            f"Failed to list input files in {input_dir}: "
+            f"{stderr.decode('utf-8', errors='replace').strip()}"
+        )
+        return None
+    try:
+        mtime, now, count = (int(line) for line in stdout.decode("utf-8").split())
+    except ValueError:
+        return None
+    return InputManifest(count=count, mtime=mtime if mtime < now else None)
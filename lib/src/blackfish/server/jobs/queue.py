@@ -0,0 +1,158 @@
+"""Fair-share queue of batch jobs waiting for an allocation.
+
+On a shared server, a few large submissions could otherwise ``sbatch`` as
+many allocations as they like at once, crowding the cluster's queue and
+spending their account's fairshare. The server can cap the allocations its
+batch jobs hold at once, per profile (``MAX_ALLOCATIONS_PER_PROFILE``) and
+per cluster user (``MAX_ALLOCATIONS_PER_USER``). A job holds an allocation
+from its submission until it reaches a terminal status; a sharded job holds
+one per shard. A cap of 0 means no cap.
+
+A new job that would exceed a cap, or that finds jobs already waiting on
+its profile or user, is put in the queue (status ``QUEUED``) after the same
+pre-flight as a job that starts right away. After each poll,
+the supervisor dispatches waiting jobs by ``priority`` (highest first) and
+submission time. A job whose profile and user have room is dispatched even
+if jobs ahead of it are still waiting on theirs, so a user at their cap
+never holds up the others. Each queued job's ``queue_position`` is its
+place in that order.
+
+A job with more shards than a cap allows could never be dispatched, so it
+is rejected when submitted. One already queued when the caps are lowered
+is failed when its turn comes.
+
+A new job is admitted and queued jobs are dispatched under the supervisor's
+``admission`` lock, so that a request and a dispatch pass never both see the
+same free allocation.
+"""
+
+from __future__ import annotations
+
+from collections import Counter
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+import sqlalchemy as sa
+
+from blackfish.server.jobs.base import _ALLOCATED_STATUSES, BatchJob, BatchJobStatus
+
+if TYPE_CHECKING:
+    from litestar.datastructures import State
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+    from blackfish.server.config import BlackfishConfig
+
+
+@dataclass
+class QueueLimits:
+    """Caps on the allocations held at once; 0 means no cap."""
+
+    per_profile: int = 0
+    per_user: int = 0
+
+    @classmethod
+    def from_config(cls, app_config: "State | BlackfishConfig") -> "QueueLimits":
+        return cls(
+            per_profile=getattr(app_config, "MAX_ALLOCATIONS_PER_PROFILE", 0) or 0,
+            per_user=getattr(app_config, "MAX_ALLOCATIONS_PER_USER", 0) or 0,
+        )
+
+    def enabled(self) -> bool:
+        return self.per_profile > 0 or self.per_user > 0
+
+    def validate(self, job: BatchJob) -> None:
+        """Check that the job fits under each cap on its own.
+
+        Raises:
+            ValueError: If the job needs more allocations than a cap allows.
+        """
+        need = allocations(job)
+        for scope, cap in (("profile", self.per_profile), ("user", self.per_user)):
+            if 0 < cap < need:
+                raise ValueError(
+                    f"The job needs {need} allocations at once, but the server "
+                    f"allows at most {cap} per {scope}. Use fewer shards."
+                )
+
+
+def allocations(job: BatchJob) -> int:
+    """The number of allocations the job holds while it runs."""
+    return max(job.shards or 1, 1)
+
+
+def _user(job: BatchJob) -> tuple[str | None, str | None]:
+    return job.host, job.user
+
+
+class SlotUsage:
+    """The allocations held by batch jobs, by profile and by cluster user."""
+
+    def __init__(self, jobs: list[BatchJob]) -> None:
+        self.profiles: Counter[str] = Counter()
+        self.users: Counter[tuple[str | None, str | None]] = Counter()
+        for job in jobs:
+            self.add(job)
+
+    def add(self, job: BatchJob) -> None:
+        """Count the allocations of a job that was just dispatched."""
+        self.profiles[job.profile] += allocations(job)
+        self.users[_user(job)] += allocations(job)
+
+    def fits(self, job: BatchJob, limits: QueueLimits) -> bool:
+        """Whether the job can be submitted without exceeding a cap."""
+        need = allocations(job)
+        for held, cap in (
+            (self.profiles[job.profile], limits.per_profile),
+            (self.users[_user(job)], limits.per_user),
+        ):
+            if cap > 0 and held + need > cap:
+                return False
+        return True
+
+
+async def slot_usage(session: AsyncSession) -> SlotUsage:
+    """The allocations held by the batch jobs that haven't finished."""
+    query = sa.select(BatchJob).where(BatchJob.status.in_(_ALLOCATED_STATUSES))
+    return SlotUsage(list((await session.execute(query)).scalars().all()))
+
+
+async def queued_jobs(session: AsyncSession) -> list[BatchJob]:
+    """The queued jobs, in the order they're dispatched in."""
+    query = (
+        sa.select(BatchJob)
+        .where(BatchJob.status == BatchJobStatus.QUEUED)
+        .order_by(
+            BatchJob.priority.desc(), BatchJob.created_at.asc(), BatchJob.id.asc()
+        )
+    )
+    return list((await session.execute(query)).scalars().all())
+
+
+async def should_queue(
+    session: AsyncSession, job: BatchJob, limits: QueueLimits
+) -> bool:
+    """Whether a new job has to wait for an allocation.
+
+    It waits if submitting it would exceed a cap, or if jobs are already
+    waiting on its profile or user, so that the dispatcher picks between
+    them by priority and age.
+
+    Raises:
+        ValueError: If the job needs more allocations than a cap allows.
+    """
+    if not limits.enabled():
+        return False
+    limits.validate(job)
+    for queued in await queued_jobs(session):
+        if queued.id != job.id and (
+            queued.profile == job.profile or _user(queued) == _user(job)
+        ):
+            return True
+    return not (await slot_usage(session)).fits(job, limits)
+
+
+async def renumber_queue(session: AsyncSession) -> None:
+    """Set ``queue_position`` of each queued job to its place in the queue."""
+    for position, job in enumerate(await queued_jobs(session), start=1):
+        if job.queue_position != position:
+            job.queue_position = position
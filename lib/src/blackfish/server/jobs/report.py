@@ -0,0 +1,649 @@
+"""Read TigerFlow pipeline reports straight from the output directory.
+
+``tigerflow report`` computes its report entirely from files under
+``{output_dir}/.tigerflow``; running it through the tigerflow-ml container
+(see ``TigerFlowClient.report``) costs a container start and an image load
+on every poll just to read them. :class:`ReportReader` reads the same files
+directly — from the local filesystem, or over the pooled SFTP connection for
+a remote cluster — and builds the same :class:`TigerFlowReport`.
+
+The layout mirrors tigerflow's ``PipelineOutput``::
+
+    .tigerflow/
+        run.pid               pid of the pipeline process
+        run.log               INIT lines list the tasks and their dependencies
+        .finished/{stem}.*    one marker per file through the whole pipeline
+        .symlinks/{stem}.*    one symlink per file the pipeline has picked up
+        {task}/{stem}.*       task outputs; {stem}.err holds a JSON error
+        {task}/logs/**/task*.log
+                              METRICS lines time each file the task handled
+
+Files whose name starts with ``.~tf_`` are tigerflow's temporary files and
+are ignored.
+
+The METRICS logs grow with every file processed, so they aren't re-read on
+each poll: a :class:`MetricsCursor` per output directory remembers how far
+each log has been read and running totals of its records, and only appended
+lines are fetched and parsed. An incremental :class:`ReportReader` (the
+supervisor's) reads through these cursors, so its reports summarize every
+record but list only the new ones; any other reader lists them all. Either
+way, the report must agree with tigerflow's own; the contract tests compare
+the two.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import fnmatch
+import json
+import math
+import os
+import posixpath
+import stat
+import threading
+from collections import Counter, OrderedDict
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Protocol
+
+from blackfish.server import remote
+from blackfish.server.jobs.client import (
+    TigerFlowError,
+    TigerFlowFileMetric,
+    TigerFlowReport,
+    TigerFlowTaskMetrics,
+)
+from blackfish.server.logger import logger
+
+if TYPE_CHECKING:
+    from paramiko import SFTPClient
+
+
+# Prefix of tigerflow's in-flight temporary files.
+TEMP_FILE_PREFIX = ".~tf_"
+
+
+@dataclass(frozen=True)
+class _Entry:
+    name: str
+    is_dir: bool
+    is_file: bool
+    is_symlink: bool
+    size: int = 0
+
+
+class _Filesystem(Protocol):
+    def exists(self, path: str) -> bool: ...
+
+    def scandir(self, path: str) -> list[_Entry]: ...
+
+    def read_text(self, path: str) -> str: ...
+
+    def read_from(self, path: str, offset: int) -> bytes: ...
+
+
+class _LocalFilesystem:
+    def exists(self, path: str) -> bool:
+        return os.path.exists(path)
+
+    def scandir(self, path: str) -> list[_Entry]:
+        entries = []
+        with os.scandir(path) as it:
+            for e in it:
+                is_file = e.is_file()
+                size = e.stat().st_size if is_file else 0
+                entries.append(
+                    _Entry(e.name, e.is_dir(), is_file, e.is_symlink(), size)
+                )
+        return entries
+
+    def read_text(self, path: str) -> str:
+        with open(path) as f:
+            return f.read()
+
+    def read_from(self, path: str, offset: int) -> bytes:
+        with open(path, "rb") as f:
+            f.seek(offset)
+            return f.read()
+
+
+class _SFTPFilesystem:
+    """Read through an SFTP channel. Entries carry ``lstat`` modes, so a
+    symlink is neither a file nor a directory."""
+
+    def __init__(self, sftp: "SFTPClient") -> None:
+        self._sftp = sftp
+
+    def exists(self, path: str) -> bool:
+        try:
+            self._sftp.stat(path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def scandir(self, path: str) -> list[_Entry]:
+        entries = []
+        for attr in self._sftp.listdir_attr(path):
+            mode = attr.st_mode or 0
+            entries.append(
+                _Entry(
+                    attr.filename,
+                    stat.S_ISDIR(mode),
+                    stat.S_ISREG(mode),
+                    stat.S_ISLNK(mode),
+                    attr.st_size or 0,
+                )
+            )
+        return entries
+
+    def read_text(self, path: str) -> str:
+        with self._sftp.open(path, "r") as f:
+            return f.read().decode("utf-8")
+
+    def read_from(self, path: str, offset: int) -> bytes:
+        with self._sftp.open(path, "rb") as f:
+            f.seek(offset)
+            return f.read()
+
+
+def _stem(name: str) -> str:
+    return posixpath.splitext(name)[0]
+
+
+def _json_tail(line: str) -> Any:
+    """Parse the JSON object logged at the end of a tigerflow log line."""
+    start = line.find("{")
+    if start == -1:
+        return None
+    return json.loads(line[start:])
+
+
+def _task_dirs(fs: _Filesystem, internal: str) -> list[_Entry]:
+    return [e for e in fs.scandir(internal) if e.is_dir and not e.name.startswith(".")]
+
+
+def _task_meta(fs: _Filesystem, internal: str) -> list[dict[str, Any]]:
+    """Tasks from the most recent INIT entry in run.log."""
+    log_file = posixpath.join(internal, "run.log")
+    tasks: list[dict[str, Any]] = []
+    try:
+        for line in fs.read_text(log_file).splitlines():
+            if "INIT" not in line:
+                continue
+            data = _json_tail(line)
+            if data is None:
+                continue
+            tasks = [
+                {"name": t["name"], "depends_on": t.get("depends_on")}
+                for t in data.get("tasks", [])
+            ]
+    except (OSError, json.JSONDecodeError, KeyError, TypeError):
+        pass
+    return tasks
+
+
+def _log_files(fs: _Filesystem, directory: str) -> list[tuple[str, int]]:
+    """Paths and sizes of ``task*.log`` files anywhere under ``directory``."""
+    try:
+        entries = fs.scandir(directory)
+    except OSError:
+        return []
+    files = []
+    for entry in entries:
+        path = posixpath.join(directory, entry.name)
+        if entry.is_dir:
+            files.extend(_log_files(fs, path))
+        elif entry.is_file and fnmatch.fnmatch(entry.name, "task*.log"):
+            files.append((path, entry.size))
+    return files
+
+
+def _parse_metric(line: str) -> TigerFlowFileMetric | None:
+    data = _json_tail(line)
+    if data is None:
+        return None
+    started = datetime.fromisoformat(data["started_at"])
+    finished = datetime.fromisoformat(data["finished_at"])
+    return TigerFlowFileMetric(
+        file=data["file"],
+        started_at=started.isoformat(),
+        finished_at=finished.isoformat(),
+        duration_ms=(finished - started).total_seconds() * 1000,
+        status=data["status"],
+    )
+
+
+@dataclass
+class _LogCursor:
+    """How far one task log has been read, and tallies of what it held."""
+
+    task: str
+    offset: int = 0
+    # Like tigerflow, stop reading a log at its first malformed METRICS line.
+    broken: bool = False
+    attempts: int = 0
+    total_ms: float = 0.0
+    min_ms: float = math.inf
+    max_ms: float = -math.inf
+    # Stem of the file of each successful attempt, in log order.
+    succeeded: list[str] = field(default_factory=list)
+
+    def advance(
+        self, fs: _Filesystem, path: str, size: int
+    ) -> list[TigerFlowFileMetric]:
+        """Parse the lines appended since the last call and return their records."""
+        if self.broken or size == self.offset:
+            return []
+        try:
+            data = fs.read_from(path, self.offset)
+        except OSError:
+            return []
+        # Leave a partly written last line for the next read.
+        end = data.rfind(b"\n") + 1
+        self.offset += end
+        records: list[TigerFlowFileMetric] = []
+        for line in data[:end].decode("utf-8", "replace").splitlines():
+            if "METRICS" not in line:
+                continue
+            try:
+                record = _parse_metric(line)
+            except (json.JSONDecodeError, KeyError, TypeError, ValueError):
+                self.broken = True
+                break
+            if record is not None:
+                records.append(record)
+        return records
+
+
+@dataclass
+class TaskSummary:
+    """Running totals of every METRICS record a task has logged."""
+
+    attempts: int = 0
+    # Successful attempts, and the time they took.
+    count: int = 0
+    total_ms: float = 0.0
+    min_ms: float = 0.0
+    max_ms: float = 0.0
+    # Distinct files the task has succeeded on.
+    succeeded: int = 0
+
+
+@dataclass
+class MetricsDelta:
+    """What a :meth:`MetricsCursor.read` found: each task's records not yet
+    acknowledged, in log order, and the summary of all its records."""
+
+    records: dict[str, list[TigerFlowFileMetric]]
+    summaries: dict[str, TaskSummary]
+
+
+@dataclass
+class _TaskTally:
+    # Summed in log order, as a full read sums the durations.
+    total_ms: float = 0.0
+    succeeded: Counter[str] = field(default_factory=Counter)
+
+
+class MetricsCursor:
+    """Incremental METRICS ingestion for one pipeline output directory.
+
+    Remembers, per task log, the byte offset read up to and running totals
+    of the records parsed from it. Each :meth:`read` parses only lines
+    appended since the last one and returns just the new records, with the
+    summary of all of them, so its cost follows new work rather than the
+    size of the job. Records stay pending until :meth:`acknowledge`\\ d, so
+    a consumer that fails to record them gets them again. A log that
+    shrinks is read again from the start; one that disappears is forgotten.
+    """
+
+    def __init__(self) -> None:
+        self._logs: dict[str, _LogCursor] = {}
+        self._tasks: dict[str, _TaskTally] = {}
+        self._pending: dict[str, list[TigerFlowFileMetric]] = {}
+        self.lock = threading.Lock()
+
+    def _add(self, log: _LogCursor, records: list[TigerFlowFileMetric]) -> None:
+        tally = self._tasks.setdefault(log.task, _TaskTally())
+        for record in records:
+            log.attempts += 1
+            if record.status != "success":
+                continue
+            duration = record.duration_ms
+            log.total_ms += duration
+            tally.total_ms += duration
+            log.min_ms = min(log.min_ms, duration)
+            log.max_ms = max(log.max_ms, duration)
+            stem = _stem(posixpath.basename(record.file))
+            log.succeeded.append(stem)
+            tally.succeeded[stem] += 1
+        if records:
+            self._pending.setdefault(log.task, []).extend(records)
+
+    def _drop(self, log: _LogCursor) -> None:
+        tally = self._tasks[log.task]
+        tally.total_ms -= log.total_ms
+        for stem in log.succeeded:
+            tally.succeeded[stem] -= 1
+            if not tally.succeeded[stem]:
+                del tally.succeeded[stem]
+
+    def read(self, fs: _Filesystem, internal: str, tasks: list[str]) -> MetricsDelta:
+        """The records logged by each task since the last acknowledged read,
+        and the summary of every record each task has logged."""
+        summaries: dict[str, TaskSummary] = {}
+        seen: set[str] = set()
+        for task in tasks:
+            logs = []
+            for path, size in _log_files(fs, posixpath.join(internal, task, "logs")):
+                seen.add(path)
+                log = self._logs.get(path)
+                if log is not None and size < log.offset:
+                    # Truncated or replaced: start over.
+                    self._drop(log)
+                    log = None
+                if log is None:
+                    log = self._logs[path] = _LogCursor(task)
+                self._add(log, log.advance(fs, path, size))
+                logs.append(log)
+            if not any(log.attempts for log in logs):
+                continue
+            count = sum(len(log.succeeded) for log in logs)
+            summaries[task] = TaskSummary(
+                attempts=sum(log.attempts for log in logs),
+                count=count,
+                total_ms=self._tasks[task].total_ms,
+                min_ms=min(log.min_ms for log in logs) if count else 0,
+                max_ms=max(log.max_ms for log in logs) if count else 0,
+                succeeded=len(self._tasks[task].succeeded),
+            )
+        for path in self._logs.keys() - seen:
+            self._drop(self._logs.pop(path))
+        for task in self._pending.keys() - summaries.keys():
+            del self._pending[task]
+        records = {
+            task: list(pending) for task, pending in self._pending.items() if pending
+        }
+        return MetricsDelta(records, summaries)
+
+    def acknowledge(self, delivered: Mapping[str, int]) -> None:
+        """Drop the first ``delivered[task]`` pending records of each task,
+        once the consumer has recorded the records a read returned."""
+        with self.lock:
+            for task, count in delivered.items():
+                del self._pending.get(task, [])[:count]
+
+
+# Cursors for the most recently read output directories, by (host, path).
+_MAX_CURSORS = 64
+_cursors: OrderedDict[tuple[str, str], MetricsCursor] = OrderedDict()
+_cursors_lock = threading.Lock()
+
+
+def _cursor_for(host: str, output_dir: str) -> MetricsCursor:
+    key = (host, output_dir)
+    with _cursors_lock:
+        cursor = _cursors.pop(key, None) or MetricsCursor()
+        _cursors[key] = cursor
+        while len(_cursors) > _MAX_CURSORS:
+            _cursors.popitem(last=False)
+        return cursor
+
+
+def _summarize_metrics(
+    summary: TaskSummary, files: list[TigerFlowFileMetric]
+) -> TigerFlowTaskMetrics:
+    """Per-task summary, matching ``tigerflow report --json``: the statistics
+    cover successes only, while ``files`` lists every attempt.
+
+    The statistics cover every record the task has logged; ``files`` and
+    ``durations`` only the records of this read. The records were validated
+    as they were read, so the summary is built without validating them again.
+    """
+    return TigerFlowTaskMetrics.model_construct(
+        count=summary.count,
+        avg_ms=summary.total_ms / summary.count if summary.count else 0,
+        min_ms=summary.min_ms,
+        max_ms=summary.max_ms,
+        durations=[f.duration_ms for f in files if f.status == "success"],
+        files=files,
+    )
+
+
+def _read_error(fs: _Filesystem, path: str, stem: str) -> dict[str, Any]:
+    try:
+        data = json.loads(fs.read_text(path))
+        return {
+            "file": data.get("file", stem),
+            "path": path,
+            "timestamp": datetime.fromisoformat(data["timestamp"]).isoformat(),
+            "exception_type": data.get("exception_type", ""),
+            "message": data.get("message", ""),
+            "traceback": data.get("traceback", ""),
+        }
+    except (OSError, json.JSONDecodeError, KeyError, TypeError, ValueError):
+        return {
+            "file": stem,
+            "path": path,
+            "timestamp": None,
+            "exception_type": "",
+            "message": "",
+            "traceback": "",
+        }
+
+
+def _read_pid(fs: _Filesystem, internal: str) -> int | None:
+    try:
+        return int(fs.read_text(posixpath.join(internal, "run.pid")).strip())
+    except (OSError, ValueError):
+        return None
+
+
+def build_report(
+    fs: _Filesystem,
+    output_dir: str,
+    pid: int | None,
+    running: bool,
+    cursor: MetricsCursor | None = None,
+) -> TigerFlowReport:
+    """Build the ``tigerflow report --json`` report from ``output_dir``.
+
+    ``pid`` and ``running`` describe the pipeline process, which is checked
+    by the caller (see :meth:`ReportReader.read`). Metrics are read through
+    ``cursor``, if given, so only records logged since its last read are
+    parsed, and each task's ``files`` lists only the records the cursor
+    hasn't had acknowledged. Without one, the report lists every record.
+    """
+    internal = posixpath.join(output_dir, ".tigerflow")
+    finished_dir = posixpath.join(internal, ".finished")
+    symlinks_dir = posixpath.join(internal, ".symlinks")
+
+    finished: set[str] = set()
+    if fs.exists(finished_dir):
+        finished = {_stem(e.name) for e in fs.scandir(finished_dir) if e.is_file}
+
+    task_dirs = _task_dirs(fs, internal)
+    listings = {
+        task.name: fs.scandir(posixpath.join(internal, task.name)) for task in task_dirs
+    }
+
+    failed: set[str] = set()
+    with_output: set[str] = set()
+    errors: dict[str, list[dict[str, Any]]] = {}
+    for task, entries in listings.items():
+        task_errors = []
+        for entry in entries:
+            if not entry.is_file or entry.name.startswith(TEMP_FILE_PREFIX):
+                continue
+            if entry.name.endswith(".err"):
+                stem = entry.name.removesuffix(".err")
+                failed.add(stem)
+                path = posixpath.join(internal, task, entry.name)
+                task_errors.append(_read_error(fs, path, stem))
+            else:
+                with_output.add(_stem(entry.name))
+        if task_errors:
+            errors[task] = task_errors
+
+    picked_up: set[str] = set()
+    if fs.exists(symlinks_dir):
+        picked_up = {
+            _stem(e.name)
+            for e in fs.scandir(symlinks_dir)
+            if e.is_symlink
+            and _stem(e.name) not in finished
+            and _stem(e.name) not in failed
+        }
+    in_progress = picked_up & with_output
+    staged = picked_up - with_output
+
+    cursor = cursor or MetricsCursor()
+    with cursor.lock:
+        delta = cursor.read(fs, internal, [task.name for task in task_dirs])
+    summaries = delta.summaries
+
+    tasks = []
+    for meta in _task_meta(fs, internal):
+        if meta["depends_on"] is None:
+            available = len(finished) + len(in_progress) + len(staged) + len(failed)
+        else:
+            depends_on = summaries.get(meta["depends_on"])
+            available = depends_on.succeeded if depends_on else 0
+        summary = summaries.get(meta["name"])
+        processed = summary.count if summary else 0
+        task_failed = len(errors.get(meta["name"], []))
+        tasks.append(
+            {
+                "name": meta["name"],
+                "processed": processed,
+                "staged": max(0, available - processed - task_failed),
+                "failed": task_failed,
+            }
+        )
+
+    report = TigerFlowReport.model_validate(
+        {
+            "status": {"running": running, "pid": pid if running else None},
+            "progress": {
+                "pipeline": {
+                    "finished": len(finished),
+                    "in_progress": len(in_progress),
+                    "staged": len(staged) if running else None,
+                    "errored": len(failed),
+                },
+                "tasks": tasks,
+            },
+            "metrics": {},
+            "errors": errors,
+        }
+    )
+    # Metrics can be large; their records were validated as they were read.
+    report.metrics = {
+        task: _summarize_metrics(summary, delta.records.get(task, []))
+        for task, summary in summaries.items()
+    }
+    return report
+
+
+class ReportReader:
+    """Read TigerFlow reports without running the tigerflow CLI.
+
+    Args:
+        host: Host the output directories live on ("localhost" for local)
+        user: SSH user for a remote host
+        incremental: List only the METRICS records logged since the last
+            acknowledged report of each directory (see :meth:`acknowledge`)
+    """
+
+    def __init__(
+        self, host: str, user: str | None = None, incremental: bool = False
+    ) -> None:
+        self.host = host
+        self.user = user
+        self.incremental = incremental
+        # The cursor behind each report read, and the records it listed.
+        self._delivered: list[tuple[MetricsCursor, dict[str, int]]] = []
+
+    def _is_local(self) -> bool:
+        return self.host == "localhost"
+
+    def _validate(self, fs: _Filesystem, output_dir: str) -> None:
+        if not fs.exists(output_dir):
+            raise TigerFlowError(
+                "report", self.host, f"Output directory does not exist: {output_dir}"
+            )
+        if not fs.exists(posixpath.join(output_dir, ".tigerflow")):
+            raise TigerFlowError(
+                "report",
+                self.host,
+                f"Not a valid pipeline directory (missing .tigerflow): {output_dir}",
+            )
+
+    def _is_running(self, pid: int) -> bool:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True  # Exists, but belongs to someone else
+        return True
+
+    def _build(
+        self, fs: _Filesystem, output_dir: str, pid: int | None, running: bool
+    ) -> TigerFlowReport:
+        if not self.incremental:
+            return build_report(fs, output_dir, pid, running)
+        cursor = _cursor_for(self.host, output_dir)
+        report = build_report(fs, output_dir, pid, running, cursor)
+        delivered = {task: len(m.files) for task, m in report.metrics.items()}
+        self._delivered.append((cursor, delivered))
+        return report
+
+    def _read(self, output_dir: str, running: bool | None) -> TigerFlowReport:
+        if self._is_local():
+            fs: _Filesystem = _LocalFilesystem()
+            output_dir = os.path.realpath(os.path.expanduser(output_dir))
+            self._validate(fs, output_dir)
+            pid = _read_pid(fs, posixpath.join(output_dir, ".tigerflow"))
+            if running is None:
+                running = pid is not None and self._is_running(pid)
+            return self._build(fs, output_dir, pid, running)
+        if self.user is None:
+            raise ValueError("Missing user for remote report")
+        with remote.borrow(self.host, self.user) as sess:
+            fs = _SFTPFilesystem(sess.sftp)
+            if output_dir.startswith("~"):
+                output_dir = sess.sftp.normalize(".") + output_dir[1:]
+            self._validate(fs, output_dir)
+            output_dir = sess.sftp.normalize(output_dir)
+            pid = _read_pid(fs, posixpath.join(output_dir, ".tigerflow"))
+            return self._build(fs, output_dir, pid, bool(running))
+
+    async def read(
+        self, output_dir: str, running: bool | None = None
+    ) -> TigerFlowReport:
+        """Read the report for the pipeline writing to ``output_dir``.
+
+        ``running`` says whether the pipeline is running, if the caller knows:
+        a pipeline in a Slurm allocation runs on a compute node, so its pid
+        can only be judged by the allocation's state. Otherwise a local
+        pipeline's process is looked up, and a remote one is taken as not
+        running.
+
+        Raises:
+            TigerFlowError: If ``output_dir`` isn't a pipeline output directory.
+            OSError: If the directory can't be read.
+        """
+        logger.debug(f"Reading TigerFlow report from {self.host}:{output_dir}")
+        return await asyncio.to_thread(self._read, output_dir, running)
+
+    def acknowledge(self) -> None:
+        """Mark the records listed by this reader's reports as recorded.
+
+        An incremental reader's next report of the same directory lists only
+        records logged after them. Until then, it lists them again.
+        """
+        for cursor, delivered in self._delivered:
+            cursor.acknowledge(delivered)
+        self._delivered.clear()
@@ -0,0 +1,379 @@
+"""Per-file batch results, persisted for querying.
+
+A tigerflow report lists every file each task has handled, with one METRICS
+record per attempt. Turning that into one result per ``(task, file)`` —
+latest attempt wins, joined with the task's error files — is cheap once but
+not on every request for a job with hundreds of thousands of inputs. The
+results are kept in the ``job_results`` table instead: the supervisor records
+the results that are new or changed after each poll (see ``JobSupervisor``),
+and ``GET /api/jobs/{job_id}/results`` filters, sorts and pages them in SQL.
+The supervisor's reports list only the METRICS records logged since its last
+poll, so recording them costs as much as the files processed in between.
+
+Pages are keyset-paginated: a page ends with a cursor holding the sort value
+and id of its last row, and the next page starts after it. Unlike an offset,
+the cursor stays correct while the poller inserts rows ahead of it and costs
+the same however deep into the results it points.
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+from collections.abc import Mapping
+from datetime import datetime, timezone
+from pathlib import PurePosixPath
+from typing import TYPE_CHECKING, Any, Literal, Optional, cast
+from uuid import UUID
+
+import sqlalchemy as sa
+from advanced_alchemy.base import UUIDAuditBase
+from sqlalchemy import Index
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import InstrumentedAttribute, Mapped
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+    from blackfish.server.jobs.base import BatchJob
+    from blackfish.server.jobs.client import TigerFlowFileMetric, TigerFlowReport
+
+# What a later report can change about a recorded result.
+Fingerprint = tuple[datetime, str, Optional[str]]
+
+ResultSort = Literal["finished_at", "duration"]
+ResultOrder = Literal["asc", "desc"]
+
+# Result columns refreshed when a newer attempt of a (task, file) is recorded.
+_RESULT_FIELDS = (
+    "input_file",
+    "output_file",
+    "started_at",
+    "finished_at",
+    "duration_ms",
+    "status",
+    "error",
+)
+
+# Rows deleted per statement, well under SQLite's limit on bound parameters.
+_DELETE_BATCH = 500
+
+
+class BatchJobResult(UUIDAuditBase):
+    """The latest result of one task on one input file of a batch job."""
+
+    __tablename__ = "job_results"
+    __table_args__ = (
+        Index("ix_job_results_job_task_file", "job_id", "task", "file", unique=True),
+        Index("ix_job_results_job_status", "job_id", "status"),
+        Index("ix_job_results_job_finished_at", "job_id", "finished_at", "id"),
+        Index("ix_job_results_job_duration_ms", "job_id", "duration_ms", "id"),
+    )
+
+    job_id: Mapped[UUID]
+    task: Mapped[str]
+    file: Mapped[str]  # raw name as tigerflow reports it — identity/dedup only
+    input_file: Mapped[str]  # full path to the input file (for display)
+    output_file: Mapped[Optional[str]]  # None unless the file succeeded
+    started_at: Mapped[datetime]
+    finished_at: Mapped[datetime]
+    duration_ms: Mapped[float]
+    status: Mapped[str]  # "success" or "error"
+    error: Mapped[Optional[str]]
+
+    def fingerprint(self) -> Fingerprint:
+        """What a later report can change about this result."""
+        return self.finished_at, self.status, self.error
+
+
+def _parse_time(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def collect_results(
+    job: BatchJob,
+    report: TigerFlowReport,
+    recorded: Mapping[tuple[str, str], Fingerprint] | None = None,
+) -> list[BatchJobResult]:
+    """Build the latest per-file result of each task from a job's report.
+
+    Only the files the report lists are built: from an incremental report
+    (see ``ReportReader``), those with METRICS records logged since the
+    last one. Results whose ``(task, file)`` maps to their current
+    ``fingerprint`` in ``recorded`` are left out, so a caller that remembers
+    what it recorded only builds what changed. The results are transient:
+    record them with ``record_results`` or ``replace_results``.
+    """
+    # Build error lookup: {task: {filename: error_message}}
+    error_lookup: dict[str, dict[str, str]] = {}
+    for task_name, error_list in report.errors.items():
+        error_lookup[task_name] = {err.file: err.message for err in error_list}
+
+    # Flatten metrics across tasks, deduplicating by (task, file) — keep latest
+    latest: dict[tuple[str, str], tuple[datetime, TigerFlowFileMetric]] = {}
+    for task_name, task_metrics in report.metrics.items():
+        for file_metric in task_metrics.files:
+            finished_at = _parse_time(file_metric.finished_at)
+            key = (task_name, file_metric.file)
+            prev = latest.get(key)
+            if prev is None or finished_at > prev[0]:
+                latest[key] = (finished_at, file_metric)
+
+    # The first stage reads input_dir; later stages read the kept outputs of
+    # the stage they depend on.
+    stages = {task["name"]: task for task in job.pipeline_config()["tasks"]}
+    # A sampling job's pipeline writes under its sample; its inputs are links
+    # to the files in input_dir.
+    output_root = job.pipeline_paths()[1]
+    results = []
+    for (task_name, file), (finished_at, file_metric) in latest.items():
+        error = error_lookup.get(task_name, {}).get(file)
+        if recorded is not None and recorded.get((task_name, file)) == (
+            finished_at,
+            file_metric.status,
+            error,
+        ):
+            continue
+
+        stage = stages.get(task_name, {})
+        output_ext = stage.get("output_ext", "")
+        source = (
+            f"{output_root}/{stage['depends_on']}"
+            if stage.get("depends_on")
+            else job.input_dir
+        )
+        stem = PurePosixPath(file).stem
+        # Full input path, symmetric with output_file. tigerflow reports the
+        # file relative to the stage's input dir, so join unless it's already
+        # absolute.
+        input_path = PurePosixPath(file)
+        input_file = str(input_path) if input_path.is_absolute() else f"{source}/{file}"
+        results.append(
+            BatchJobResult(
+                job_id=job.id,
+                task=task_name,
+                file=file,
+                input_file=input_file,
+                output_file=f"{output_root}/{task_name}/{stem}{output_ext}"
+                if file_metric.status == "success"
+                else None,
+                started_at=_parse_time(file_metric.started_at),
+                finished_at=finished_at,
+                duration_ms=file_metric.duration_ms,
+                status=file_metric.status,
+                error=error,
+            )
+        )
+
+    return results
+
+
+def changed_errors(
+    report: TigerFlowReport, recorded: Mapping[tuple[str, str], Fingerprint]
+) -> list[tuple[str, str, str]]:
+    """The ``(task, file, error)`` of each recorded failure whose error now
+    reads differently.
+
+    A task can log a file's METRICS record before its error file is listed,
+    and an incremental report doesn't list the record again once the error
+    file appears. Record these with ``record_errors``.
+    """
+    return [
+        (task, error.file, error.message)
+        for task, errors in report.errors.items()
+        for error in errors
+        if (fingerprint := recorded.get((task, error.file))) is not None
+        and fingerprint[1] == "error"
+        and fingerprint[2] != error.message
+    ]
+
+
+def _row(result: BatchJobResult) -> dict[str, Any]:
+    return {
+        "job_id": result.job_id,
+        "task": result.task,
+        "file": result.file,
+        **{name: getattr(result, name) for name in _RESULT_FIELDS},
+    }
+
+
+async def record_results(session: AsyncSession, results: list[BatchJobResult]) -> None:
+    """Insert new results and update those with a newer or changed attempt.
+
+    A stored result is never replaced by an older attempt, so results recorded
+    from reports read out of order still converge on the latest.
+    """
+    if not results:
+        return
+    stmt = sqlite_insert(BatchJobResult)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["job_id", "task", "file"],
+        set_={
+            **{name: stmt.excluded[name] for name in _RESULT_FIELDS},
+            "updated_at": datetime.now(timezone.utc),
+        },
+        where=stmt.excluded.finished_at >= BatchJobResult.finished_at,
+    )
+    await session.execute(stmt, [_row(result) for result in results])
+
+
+async def record_errors(
+    session: AsyncSession, job_id: UUID, errors: list[tuple[str, str, str]]
+) -> None:
+    """Set the error of recorded results, given as ``(task, file, error)``."""
+    if not errors:
+        return
+    table = cast(sa.Table, BatchJobResult.__table__)
+    stmt = (
+        sa.update(table)
+        .where(
+            table.c.job_id == job_id,
+            table.c.task == sa.bindparam("b_task"),
+            table.c.file == sa.bindparam("b_file"),
+        )
+        .values(error=sa.bindparam("b_error"), updated_at=datetime.now(timezone.utc))
+    )
+    await session.execute(
+        stmt,
+        [
+            {"b_task": task, "b_file": file, "b_error": error}
+            for task, file, error in errors
+        ],
+    )
+
+
+async def replace_results(
+    session: AsyncSession, job_id: UUID, results: list[BatchJobResult]
+) -> None:
+    """Replace all of a job's results with ``results``.
+
+    Results already stored keep their ids, so a cursor taken before the
+    replacement still pages through the same rows.
+    """
+    now = datetime.now(timezone.utc)
+    if results:
+        stmt = sqlite_insert(BatchJobResult)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["job_id", "task", "file"],
+            set_={
+                **{name: stmt.excluded[name] for name in _RESULT_FIELDS},
+                "updated_at": now,
+            },
+        )
+        await session.execute(
+            stmt, [{**_row(result), "updated_at": now} for result in results]
+        )
+    keep = {(result.task, result.file) for result in results}
+    stored = await session.execute(
+        sa.select(BatchJobResult.id, BatchJobResult.task, BatchJobResult.file).where(
+            BatchJobResult.job_id == job_id
+        )
+    )
+    stale = [row_id for row_id, task, file in stored if (task, file) not in keep]
+    for start in range(0, len(stale), _DELETE_BATCH):
+        await session.execute(
+            sa.delete(BatchJobResult).where(
+                BatchJobResult.id.in_(stale[start : start + _DELETE_BATCH])
+            )
+        )
+
+
+async def delete_results(session: AsyncSession, job_id: UUID) -> None:
+    """Delete all of a job's results."""
+    await session.execute(
+        sa.delete(BatchJobResult).where(BatchJobResult.job_id == job_id)
+    )
+
+
+def _sort_column(sort: ResultSort) -> InstrumentedAttribute[Any]:
+    if sort == "duration":
+        return BatchJobResult.duration_ms
+    return BatchJobResult.finished_at
+
+
+def encode_cursor(result: BatchJobResult, sort: ResultSort = "finished_at") -> str:
+    """The cursor of the results after ``result`` in ``sort`` order."""
+    value: Any = (
+        result.duration_ms if sort == "duration" else result.finished_at.isoformat()
+    )
+    raw = json.dumps([value, result.id.hex]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str, sort: ResultSort) -> tuple[Any, UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        value, id_ = json.loads(raw)
+        key = UUID(id_)
+        if sort == "duration":
+            return float(value), key
+        return _parse_time(value), key
+    except (binascii.Error, ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+async def query_results(
+    session: AsyncSession,
+    job_id: UUID,
+    *,
+    status: str | None = None,
+    task: str | None = None,
+    sort: ResultSort = "finished_at",
+    order: ResultOrder = "asc",
+    limit: int | None = None,
+    after: str | None = None,
+) -> tuple[list[BatchJobResult], str | None]:
+    """Return a page of a job's results and the cursor of the next page.
+
+    Args:
+        session: Database session
+        job_id: The batch job
+        status: Only results with this status ("success" or "error")
+        task: Only results of this task
+        sort: Sort by finish time or by duration; ties are broken by id
+        order: Sort direction
+        limit: Page size, or ``None`` for all matching results
+        after: Cursor returned with the previous page
+
+    Returns:
+        ``(results, cursor)``, where ``cursor`` is ``None`` on the last page.
+
+    Raises:
+        ValueError: If ``after`` is not a cursor returned by this function.
+    """
+    column = _sort_column(sort)
+    query = sa.select(BatchJobResult).where(BatchJobResult.job_id == job_id)
+    if status is not None:
+        query = query.where(BatchJobResult.status == status)
+    if task is not None:
+        query = query.where(BatchJobResult.task == task)
+    if after is not None:
+        value, key = _decode_cursor(after, sort)
+        if order == "asc":
+            query = query.where(
+                sa.or_(
+                    column > value, sa.and_(column == value, BatchJobResult.id > key)
+                )
+            )
+        else:
+            query = query.where(
+                sa.or_(
+                    column < value, sa.and_(column == value, BatchJobResult.id < key)
+                )
+            )
+    if order == "asc":
+        query = query.order_by(column.asc(), BatchJobResult.id.asc())
+    else:
+        query = query.order_by(column.desc(), BatchJobResult.id.desc())
+    if limit is not None:
+        query = query.limit(limit)
+
+    results = list((await session.execute(query)).scalars().all())
+    cursor = None
+    if limit is not None and len(results) == limit:
+        cursor = encode_cursor(results[-1], sort)
+    return results, cursor
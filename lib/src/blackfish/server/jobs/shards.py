@@ -0,0 +1,190 @@
+"""Sharded batch jobs.
+
+A batch job with ``shards > 1`` splits its inputs into that many disjoint
+subsets and runs one tigerflow pipeline per subset, each as a task of a
+single Slurm job array. tigerflow allows one running pipeline per output
+directory (it keeps its state, and a pid lock, in ``{output_dir}/.tigerflow``),
+so every shard gets its own input view and pipeline directory under the
+job's ``output_dir``::
+
+    {output_dir}/.blackfish/shards/{k}/inputs.txt   the shard's input file names
+    {output_dir}/.blackfish/shards/{k}/input/       symlinks to those files
+    {output_dir}/.blackfish/shards/{k}/output/      the shard's pipeline directory
+
+Each task directory of a shard's pipeline (``output/{task}``) links to
+``{output_dir}/{task}``, so the outputs of all shards land where an unsharded
+job would put them.
+
+Files are assigned to shards by a hash of their name rather than by their
+position in the manifest, so a file stays in its shard — and its finished
+marker stays with it — when inputs are added or removed between restarts.
+"""
+
+from __future__ import annotations
+
+import shlex
+from typing import TYPE_CHECKING
+
+from blackfish.server.jobs.client import (
+    TigerFlowPipelineProgress,
+    TigerFlowProgress,
+    TigerFlowReport,
+    TigerFlowReportStatus,
+    TigerFlowTaskMetrics,
+    TigerFlowTaskProgress,
+)
+from blackfish.server.jobs.manifest import MANIFEST_DIR, MANIFEST_NAME
+from blackfish.server.logger import logger
+
+if TYPE_CHECKING:
+    from blackfish.server.jobs.client import CommandRunner, TigerFlowErrorDetail
+
+SHARDS_DIR = "shards"
+
+# Java-style string hash over the bytes of a file name, modulo a prime so it
+# stays exact in awk's doubles. Mirrored by ``shard_of``.
+_HASH_AWK = (
+    'BEGIN { for (i = 1; i < 256; i++) ord[sprintf("%c", i)] = i } '
+    "{ h = 0; for (i = 1; i <= length($0); i++) "
+    "h = (h * 31 + ord[substr($0, i, 1)]) % 2147483647; "
+    'print > ("shards/" (h % n) "/.inputs.txt.tmp") }'
+)
+
+
+def shard_dir(output_dir: str, shard: int | str) -> str:
+    """Directory of one shard of a job writing to ``output_dir``."""
+    return f"{output_dir}/{MANIFEST_DIR}/{SHARDS_DIR}/{shard}"
+
+
+def shard_of(name: str, shards: int) -> int:
+    """The shard an input file named ``name`` is assigned to."""
+    h = 0
+    for byte in name.encode("utf-8"):
+        h = (h * 31 + byte) % 2147483647
+    return h % shards
+
+
+async def stage_shards(
+    runner: CommandRunner,
+    input_dir: str,
+    output_dir: str,
+    shards: int,
+    tasks: list[str],
+    manifest: str = MANIFEST_NAME,
+) -> list[int] | None:
+    """Split the job's input manifest into per-shard input views.
+
+    Expects the manifest (see ``jobs.manifest``) to be current. Safe to run
+    again before a restart: links are added for new inputs, and the shards'
+    pipeline directories are left as they are.
+
+    Args:
+        runner: Command runner for the cluster
+        input_dir: The job's input directory
+        output_dir: The job's output directory
+        shards: Number of shards
+        tasks: Names of the pipeline's tasks
+        manifest: The list of inputs to split, relative to
+            ``{output_dir}/.blackfish`` (the inputs left to run, for a job
+            using the result cache)
+
+    Returns:
+        The number of input files in each shard, or ``None`` if the views
+        could not be staged.
+    """
+    ids = " ".join(str(k) for k in range(shards))
+    links = " && ".join(
+        f"mkdir -p {shlex.quote(f'{output_dir}/{task}')} && "
+        f"ln -sfn {shlex.quote(f'{output_dir}/{task}')} "
+        f"shards/$k/output/{shlex.quote(task)}"
+        for task in tasks
+    )
+    # `xargs ln -t` links a whole shard in a few processes rather than one
+    # `ln` per file.
+    cmd = (
+        f"cd {shlex.quote(f'{output_dir}/{MANIFEST_DIR}')} && "
+        f"for k in {ids}; do "
+        f"mkdir -p shards/$k/input shards/$k/output/.tigerflow && "
+        f": > shards/$k/.inputs.txt.tmp || exit 1; done && "
+        f"LC_ALL=C awk -v n={shards} {shlex.quote(_HASH_AWK)} {shlex.quote(manifest)} && "
+        f"for k in {ids}; do "
+        f"mv shards/$k/.inputs.txt.tmp shards/$k/inputs.txt && "
+        f"{links + ' && ' if links else ''}"
+        f"awk -v d={shlex.quote(input_dir)} '{{ print d \"/\" $0 }}' "
+        f"shards/$k/inputs.txt | (cd shards/$k/input && xargs -r -d '\\n' ln -sf -t .) && "
+        f"wc -l < shards/$k/inputs.txt || exit 1; done"
+    )
+    returncode, stdout, stderr = await runner.run(cmd)
+    if returncode != 0:
+        logger.warning(
+            f"Failed to stage {shards} shards of {input_dir}: "
+            f"{stderr.decode('utf-8', errors='replace').strip()}"
+        )
+        return None
+    try:
+        counts = [int(line) for line in stdout.decode("utf-8").split()]
+    except ValueError:
+        return None
+    return counts if len(counts) == shards else None
+
+
+def merge_reports(reports: list[TigerFlowReport]) -> TigerFlowReport:
+    """Combine the reports of a job's shards into one report for the job."""
+    running = [r.status for r in reports if r.status.running]
+    staged = [
+        r.progress.pipeline.staged
+        for r in reports
+        if r.progress.pipeline.staged is not None
+    ]
+
+    tasks: dict[str, TigerFlowTaskProgress] = {}
+    metrics: dict[str, TigerFlowTaskMetrics] = {}
+    errors: dict[str, list[TigerFlowErrorDetail]] = {}
+    for report in reports:
+        for task in report.progress.tasks:
+            if task.name in tasks:
+                total = tasks[task.name]
+                total.processed += task.processed
+                total.staged += task.staged
+                total.failed += task.failed
+            else:
+                tasks[task.name] = task.model_copy()
+        for name, task_metrics in report.metrics.items():
+            merged = metrics.get(name)
+            if merged is None:
+                metrics[name] = task_metrics.model_copy(deep=True)
+                continue
+            count = merged.count + task_metrics.count
+            if task_metrics.count:
+                merged.avg_ms = (
+                    merged.avg_ms * merged.count
+                    + task_metrics.avg_ms * task_metrics.count
+                ) / count
+                merged.min_ms = (
+                    min(merged.min_ms, task_metrics.min_ms)
+                    if merged.count
+                    else task_metrics.min_ms
+                )
+                merged.max_ms = max(merged.max_ms, task_metrics.max_ms)
+            merged.count = count
+            merged.durations += task_metrics.durations
+            merged.files += task_metrics.files
+        for name, details in report.errors.items():
+            errors.setdefault(name, []).extend(details)
+
+    return TigerFlowReport(
+        status=TigerFlowReportStatus(
+            running=bool(running), pid=running[0].pid if running else None
+        ),
+        progress=TigerFlowProgress(
+            pipeline=TigerFlowPipelineProgress(
+                finished=sum(r.progress.pipeline.finished for r in reports),
+                in_progress=sum(r.progress.pipeline.in_progress for r in reports),
+                staged=sum(staged) if staged else None,
+                errored=sum(r.progress.pipeline.errored for r in reports),
+            ),
+            tasks=list(tasks.values()),
+        ),
+        metrics=metrics,
+        errors=errors,
+    )
@@ -0,0 +1,365 @@
+"""Background supervisor that polls active batch jobs.
+
+Polling a batch job is slow — it reads the tigerflow report in a container,
+counts the input files, and asks Slurm about the allocation — and it may
+resubmit an allocation that hit its walltime (see ``BatchJob.poll``). The
+supervisor owns that work: every ``JOB_POLL_INTERVAL`` seconds it polls each
+job that hasn't reached a terminal status and persists the result. Jobs on
+different clusters are polled concurrently, and a few at a time on each
+cluster. The Slurm state of every job on a cluster is read with a single
+``sacct`` query (see ``fetch_slurm_states``), so a pass takes about as long
+as the slowest cluster rather than the sum of its jobs. Request handlers
+only read the persisted state, so listing jobs is cheap however many
+clients are open, and restarts happen on schedule whether or not anyone is
+looking.
+
+A poll runs on a detached copy of the job. Its result is written back only
+if the row hasn't changed in the meantime (e.g. the job was stopped or
+resumed while the poll was running); otherwise the result is discarded and
+the job is polled again on the next pass. If the discarded poll had already
+resubmitted the allocation, that allocation is cancelled.
+
+Each saved poll also records the job's per-file results from the report it
+read (see ``jobs.results``). The supervisor reads incremental reports, which
+list only the METRICS records logged since the last report it recorded, and
+remembers what it recorded for each active job, so only results that are new
+or changed since the last pass are built and written. The records of a poll
+that is discarded are listed again by the next one.
+
+After each pass, the supervisor starts the queued jobs that now fit under
+the allocation caps (see ``jobs.queue``). Like a poll, a dispatch is saved
+only if the job is still queued and unchanged; otherwise the allocation it
+submitted is cancelled. A queued job that can't run as submitted (e.g. its
+``input_dir`` was deleted) is marked ``FAILED``; one that couldn't reach the
+cluster is retried on the next pass.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable
+
+import sqlalchemy as sa
+
+from blackfish.server.jobs.base import (
+    _TERMINAL_STATUSES,
+    BatchJob,
+    BatchJobStatus,
+    SlurmAllocation,
+    create_tigerflow_client,
+    fetch_slurm_states,
+)
+from blackfish.server.jobs.queue import (
+    QueueLimits,
+    queued_jobs,
+    renumber_queue,
+    slot_usage,
+)
+from blackfish.server.jobs.client import TigerFlowError
+from blackfish.server.jobs.results import (
+    BatchJobResult,
+    Fingerprint,
+    changed_errors,
+    collect_results,
+    record_errors,
+    record_results,
+)
+from blackfish.server.logger import logger
+
+if TYPE_CHECKING:
+    from datetime import datetime
+    from uuid import UUID
+
+    from litestar.datastructures import State
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+    from blackfish.server.config import BlackfishConfig
+    from blackfish.server.jobs.report import ReportReader
+
+# Jobs polled at once on each cluster. Each poll runs a few SSH commands.
+DEFAULT_MAX_POLLS_PER_HOST = 4
+
+# TigerFlowError types worth retrying a queued job's start on.
+_TRANSIENT_ERRORS = frozenset({"ssh", "timeout"})
+
+
+@dataclass
+class _PollResult:
+    """A polled job, its ``updated_at`` and ``pid`` before the poll, and what
+    it read to record."""
+
+    job: BatchJob
+    updated_at: datetime
+    pid: str | None
+    # Results new or changed since last recorded (None without a report).
+    results: list[BatchJobResult] | None = None
+    # Recorded results whose error changed, as (task, file, error).
+    errors: list[tuple[str, str, str]] | None = None
+    # Acknowledged once the results are recorded.
+    reader: ReportReader | None = None
+
+
+# Fields a poll may change. Everything else belongs to the request handlers.
+_POLLED_FIELDS = (
+    "status",
+    "pid",
+    "allocation_time",
+    "staged",
+    "finished",
+    "errored",
+    "stage_progress",
+    "restarts",
+    "stalled_restarts",
+    "processed_highwater",
+    "input_count",
+    "input_mtime",
+    "cached",
+)
+
+
+class JobSupervisor:
+    """Polls active batch jobs on a schedule and persists their state.
+
+    Args:
+        session_maker: Factory for database sessions
+        app_config: Application configuration, passed to ``BatchJob.poll``
+        interval: Seconds between the end of one pass and the start of the next
+        max_per_host: Number of jobs polled at once on each cluster
+    """
+
+    def __init__(
+        self,
+        session_maker: Callable[[], AsyncSession],
+        app_config: "State | BlackfishConfig",
+        interval: float,
+        max_per_host: int = DEFAULT_MAX_POLLS_PER_HOST,
+    ) -> None:
+        self.interval = interval
+        self._session_maker = session_maker
+        self._app_config = app_config
+        self._max_per_host = max_per_host
+        self._task: asyncio.Task[None] | None = None
+        # Held to admit a new job or to dispatch queued ones, so that both
+        # count the allocations held against the caps from the same state.
+        self.admission = asyncio.Lock()
+        # Per active job, the fingerprint of each result recorded so far.
+        self._recorded: dict[UUID, dict[tuple[str, str], Fingerprint]] = {}
+
+    def start(self) -> None:
+        """Start polling in the background. Call from a running event loop."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="job-supervisor")
+            logger.debug(f"Started batch job supervisor (interval={self.interval}s)")
+
+    async def stop(self) -> None:
+        """Stop polling, waiting for the current pass to be cancelled."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.poll_once()
+                await self.dispatch_once()
+            except Exception as e:
+                # A failed pass (e.g. the database is locked) mustn't end polling.
+                logger.error(f"Batch job supervisor pass failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def poll_once(self) -> int:
+        """Poll every active job once and persist the results.
+
+        Returns:
+            The number of jobs whose new state was saved.
+        """
+        async with self._session_maker() as session:
+            query = sa.select(BatchJob).where(
+                sa.or_(
+                    BatchJob.status.is_(None),
+                    BatchJob.status.not_in(
+                        {*_TERMINAL_STATUSES, BatchJobStatus.QUEUED}
+                    ),
+                )
+            )
+            jobs = list((await session.execute(query)).scalars().all())
+            session.expunge_all()
+        active = {job.id for job in jobs}
+        for job_id in list(self._recorded):
+            if job_id not in active:
+                del self._recorded[job_id]
+        if not jobs:
+            return 0
+
+        clusters: dict[tuple[str | None, str | None], list[BatchJob]] = {}
+        for job in jobs:
+            clusters.setdefault((job.host, job.user), []).append(job)
+        logger.debug(
+            f"Polling {len(jobs)} active batch job(s) on {len(clusters)} cluster(s)"
+        )
+
+        async def poll(
+            job: BatchJob, slurm_state: SlurmAllocation, slots: asyncio.Semaphore
+        ) -> _PollResult | None:
+            async with slots:
+                polled = _PollResult(job, job.updated_at, job.pid)
+                try:
+                    client = create_tigerflow_client(
+                        job, self._app_config, incremental=True
+                    )
+                    await job.poll(client, self._app_config, slurm_state=slurm_state)
+                except Exception as e:
+                    logger.warning(f"Failed to update job {job.id}: {e}")
+                    return None
+                if client.last_report is not None:
+                    recorded = self._recorded.get(job.id, {})
+                    polled.results = await asyncio.to_thread(
+                        collect_results, job, client.last_report, recorded
+                    )
+                    polled.errors = changed_errors(client.last_report, recorded)
+                    polled.reader = client.reader
+                return polled
+
+        host_slots = {
+            host: asyncio.Semaphore(self._max_per_host) for host, _ in clusters
+        }
+
+        async def poll_cluster(group: list[BatchJob]) -> list[_PollResult | None]:
+            states = await fetch_slurm_states(group)
+            slots = host_slots[group[0].host]
+            return await asyncio.gather(
+                *(poll(job, states[job.id], slots) for job in group)
+            )
+
+        results = [
+            result
+            for group in await asyncio.gather(
+                *(poll_cluster(group) for group in clusters.values())
+            )
+            for result in group
+        ]
+
+        saved = 0
+        orphaned: list[BatchJob] = []
+        recorded: list[_PollResult] = []
+        async with self._session_maker() as session, session.begin():
+            for result in results:
+                if result is None:
+                    continue
+                job = result.job
+                current = await session.get(BatchJob, job.id)
+                if current is None or current.updated_at != result.updated_at:
+                    logger.debug(
+                        f"Batch job {job.id} changed while being polled; "
+                        "discarding the result"
+                    )
+                    if job.pid != result.pid:
+                        orphaned.append(job)
+                    continue
+                for field in _POLLED_FIELDS:
+                    setattr(current, field, getattr(job, field))
+                if result.results is not None:
+                    await record_results(session, result.results)
+                    await record_errors(session, job.id, result.errors or [])
+                    current.results_status = job.status
+                    recorded.append(result)
+                saved += 1
+
+        for result in recorded:
+            fingerprints = self._recorded.setdefault(result.job.id, {})
+            fingerprints.update(
+                ((r.task, r.file), r.fingerprint()) for r in result.results or []
+            )
+            for task, file, error in result.errors or []:
+                finished_at, status, _ = fingerprints[task, file]
+                fingerprints[task, file] = (finished_at, status, error)
+            if result.reader is not None:
+                result.reader.acknowledge()
+
+        for job in orphaned:
+            await job._cancel_allocation()
+        return saved
+
+    async def dispatch_once(self) -> int:
+        """Start the queued jobs that fit under the allocation caps.
+
+        Jobs are taken in queue order; one that doesn't fit is skipped, so
+        jobs behind it on other profiles and users can still start. A job
+        rejected by its pre-flight or by TigerFlow, or that needs more
+        allocations than a cap allows, is marked ``FAILED``; one that fails
+        to start for any other reason (e.g. an SSH timeout) stays queued and
+        is retried on the next pass.
+
+        Returns:
+            The number of jobs taken off the queue.
+        """
+        async with self.admission:
+            return await self._dispatch()
+
+    async def _dispatch(self) -> int:
+        async with self._session_maker() as session:
+            queued = await queued_jobs(session)
+            usage = await slot_usage(session)
+            session.expunge_all()
+        if not queued:
+            return 0
+
+        limits = QueueLimits.from_config(self._app_config)
+
+        dispatched: list[tuple[BatchJob, datetime]] = []
+        for job in queued:
+            updated_at = job.updated_at
+            try:
+                limits.validate(job)
+                if not usage.fits(job, limits):
+                    continue
+                client = create_tigerflow_client(job, self._app_config)
+                await job.start(self._app_config, client)
+            except (ValueError, TigerFlowError) as e:
+                if isinstance(e, TigerFlowError) and e.error_type in _TRANSIENT_ERRORS:
+                    logger.warning(f"Failed to start queued job {job.id}: {e}")
+                    continue
+                # Retrying won't help: the job can't run as submitted (or
+                # under the caps, if they were lowered since it was queued).
+                logger.error(f"Queued batch job {job.id} failed to start: {e}")
+                job.status = BatchJobStatus.FAILED
+                job.queue_position = None
+            except Exception as e:
+                logger.warning(f"Failed to start queued job {job.id}: {e}")
+                continue
+            # A job with all its inputs in the result cache holds no allocation.
+            if job.status == BatchJobStatus.SUBMITTED:
+                usage.add(job)
+            dispatched.append((job, updated_at))
+
+        saved = 0
+        orphaned: list[BatchJob] = []
+        async with self._session_maker() as session, session.begin():
+            for job, updated_at in dispatched:
+                current = await session.get(BatchJob, job.id)
+                if (
+                    current is None
+                    or current.updated_at != updated_at
+                    or current.status != BatchJobStatus.QUEUED
+                ):
+                    logger.debug(
+                        f"Batch job {job.id} changed while being started; "
+                        "cancelling its allocation"
+                    )
+                    orphaned.append(job)
+                    continue
+                await session.merge(job)
+                saved += 1
+            await renumber_queue(session)
+
+        for job in orphaned:
+            await job._cancel_allocation()
+        if saved:
+            logger.info(f"Dispatched {saved} queued batch job(s)")
+        return saved
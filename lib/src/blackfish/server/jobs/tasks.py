@@ -79,11 +79,27 @@ def get_default_output_ext(task: str) -> str | None:
     return DEFAULT_OUTPUT_EXT.get(task)
 
 
+def stage_names(tasks: list[str]) -> list[str]:
+    """Names of the pipeline stages running ``tasks``, in order.
+
+    A stage is named after its task; a task that appears again is numbered
+    (``translate``, ``translate-2``) so every stage has its own name and
+    output directory.
+    """
+    names = []
+    seen: dict[str, int] = {}
+    for task in tasks:
+        seen[task] = seen.get(task, 0) + 1
+        names.append(task if seen[task] == 1 else f"{task}-{seen[task]}")
+    return names
+
+
 def build_pipeline_config(
     task: str,
     input_ext: str,
     params: dict[str, Any] | None = None,
     output_ext: str | None = None,
+    stages: list[dict[str, Any]] | None = None,
 ) -> dict[str, Any]:
     """Build a TigerFlow pipeline configuration for containerized local execution.
 
@@ -95,28 +111,62 @@ def build_pipeline_config(
     image sets ``HF_HOME=/cache``), so the model cache is bound there by the job
     script rather than exported in per-task setup commands.
 
+    Further ``stages`` are chained after the first task in the same pipeline:
+    each one ``depends_on`` the stage before it and reads that stage's outputs,
+    so its input extension is the previous stage's output extension.
+
     Args:
         task: Task name (e.g., "transcribe")
         input_ext: Input file extension (e.g., ".wav")
         params: Task-specific parameters (e.g., model, language)
         output_ext: Output file extension (e.g., ".json")
+        stages: Stages run after ``task``, each a dict with a ``task`` and
+            optional ``params`` and ``output_ext`` (defaulting to the task's
+            default output extension)
 
     Returns:
         Pipeline configuration dict ready to be written as YAML
-    """
-    module = get_task_library(task)
 
-    task_config: dict[str, Any] = {
-        "name": task,
-        "kind": "local",
-        "module": module,
-        "input_ext": input_ext,
-    }
-
-    if output_ext:
-        task_config["output_ext"] = output_ext
-
-    if params:
-        task_config["params"] = params
+    Raises:
+        ValueError: If a task is not supported, or a stage followed by another
+            has no output extension.
+    """
+    chain: list[dict[str, Any]] = [
+        {"task": task, "params": params, "output_ext": output_ext}
+    ]
+    for stage in stages or []:
+        chain.append(
+            {
+                "task": stage["task"],
+                "params": stage.get("params"),
+                "output_ext": stage.get("output_ext")
+                or get_default_output_ext(stage["task"]),
+            }
+        )
 
-    return {"tasks": [task_config]}
+    tasks = []
+    names = stage_names([stage["task"] for stage in chain])
+    for i, (name, stage) in enumerate(zip(names, chain)):
+        task_config: dict[str, Any] = {
+            "name": name,
+            "kind": "local",
+            "module": get_task_library(stage["task"]),
+            "input_ext": input_ext,
+        }
+        if i > 0:
+            task_config["depends_on"] = names[i - 1]
+
+        if stage["output_ext"]:
+            task_config["output_ext"] = stage["output_ext"]
+        elif i < len(chain) - 1:
+            raise ValueError(
+                f"Stage '{name}' needs an output extension to feed '{names[i + 1]}'"
+            )
+
+        if stage["params"]:
+            task_config["params"] = stage["params"]
+
+        tasks.append(task_config)
+        input_ext = stage["output_ext"]
+
+    return {"tasks": tasks}
@@ -0,0 +1,74 @@
+"""Cache of the package versions in staged tigerflow-ml images.
+
+Reading the tigerflow and tigerflow-ml versions of an image means starting
+its container, which takes seconds on a busy login node, and the versions
+are checked on every ``blackfish start`` and before every job launch. They
+only change when the image is restaged, so they're cached under
+``HOME_DIR``, keyed by ``(host, SIF path, size, mtime)``: restaging an image
+changes its size or mtime and misses the cache. Each SIF keeps only its
+latest entry, so the cache doesn't grow with restaging.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+
+from blackfish.server.jobs.client import TigerFlowVersions
+from blackfish.server.logger import logger
+
+VERSIONS_CACHE_NAME = "tigerflow_versions.json"
+
+
+class ImageVersionCache:
+    """Versions of staged SIFs, stored in one JSON file."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    @classmethod
+    def in_home(cls, home_dir: str) -> "ImageVersionCache":
+        """The cache of the Blackfish home directory ``home_dir``."""
+        return cls(os.path.join(home_dir, VERSIONS_CACHE_NAME))
+
+    def _load(self) -> dict[str, dict[str, object]]:
+        try:
+            with open(self.path) as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable image version cache {self.path}: {e}")
+            return {}
+        return entries if isinstance(entries, dict) else {}
+
+    def get(
+        self, host: str, sif: str, size: int, mtime: int
+    ) -> TigerFlowVersions | None:
+        """The versions recorded for the SIF, if it hasn't changed since."""
+        entry = self._load().get(f"{host}:{sif}")
+        if not entry or entry.get("size") != size or entry.get("mtime") != mtime:
+            return None
+        try:
+            return TigerFlowVersions.model_validate(entry)
+        except ValueError:
+            return None
+
+    def put(
+        self, host: str, sif: str, size: int, mtime: int, versions: TigerFlowVersions
+    ) -> None:
+        """Record the versions of the SIF as it is now."""
+        entries = self._load()
+        entries[f"{host}:{sif}"] = {
+            "size": size,
+            "mtime": mtime,
+            **versions.model_dump(),
+        }
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(entries, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Failed to write image version cache {self.path}: {e}")
@@ -0,0 +1,106 @@
+"""Walltime sizing for batch job resubmissions.
+
+A job is resubmitted with its requested ``time`` by default. The last
+allocations of a long job often need a fraction of that, and a shorter
+request backfills sooner on Slurm. So at each restart boundary, the time the
+allocation that just ended actually ran (its ``Elapsed`` in sacct, not the
+walltime it asked for, since it may have ended early on a node failure or
+preemption) is used to estimate the seconds per file, and the next one asks
+for enough time to process the files left with a margin::
+
+    time = remaining * seconds_per_file * WALLTIME_MARGIN + STARTUP_ALLOWANCE
+
+rounded up to whole ``ROUND_TO`` minutes. The request is never lengthened
+beyond the job's own ``time``, nor beyond the partition limit in the
+profile's ``resource_specs.yaml``.
+"""
+
+from __future__ import annotations
+
+import math
+
+# Headroom over the estimated processing time, for slower files.
+WALLTIME_MARGIN = 1.25
+
+# Time for the allocation to start, pull the image and load the model, which
+# the per-file rate of a long allocation barely reflects.
+STARTUP_ALLOWANCE = 10 * 60
+
+ROUND_TO = 5 * 60
+
+
+def walltime_seconds(value: str) -> int | None:
+    """Parse a Slurm ``--time`` value into seconds.
+
+    Accepts "minutes", "minutes:seconds", "hours:minutes:seconds",
+    "days-hours", "days-hours:minutes" and "days-hours:minutes:seconds".
+    Returns ``None`` for anything else (including "UNLIMITED").
+    """
+    days, rest = 0, value.strip()
+    try:
+        if "-" in rest:
+            day_part, rest = rest.split("-", 1)
+            days = int(day_part)
+            # After a day count, the fields are hours[:minutes[:seconds]].
+            fields = [int(f) for f in rest.split(":")]
+            if len(fields) > 3:
+                return None
+            hours, minutes, seconds = fields + [0] * (3 - len(fields))
+        else:
+            fields = [int(f) for f in rest.split(":")]
+            if len(fields) > 3:
+                return None
+            # minutes | minutes:seconds | hours:minutes:seconds
+            hours, minutes, seconds = (
+                [0, fields[0], 0]
+                if len(fields) == 1
+                else [0] * (3 - len(fields)) + fields
+            )
+    except ValueError:
+        return None
+    if min(days, hours, minutes, seconds) < 0:
+        return None
+    return ((days * 24 + hours) * 60 + minutes) * 60 + seconds
+
+
+def format_walltime(seconds: int) -> str:
+    """Format seconds as a Slurm ``--time`` value ("[D-]HH:MM:SS")."""
+    days, rest = divmod(seconds, 86400)
+    hours, rest = divmod(rest, 3600)
+    minutes, seconds = divmod(rest, 60)
+    hms = f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+    return f"{days}-{hms}" if days else hms
+
+
+def resubmit_walltime(
+    requested: str,
+    elapsed: int | None,
+    processed: float,
+    remaining: int,
+    limit_minutes: int | None = None,
+) -> str | None:
+    """Walltime of the next allocation of a job.
+
+    Args:
+        requested: The job's requested ``time``, the longest it will ask for
+        elapsed: Seconds the allocation that just ended ran, if known
+        processed: Files that allocation processed (per array task, for a
+            sharded job)
+        remaining: Files left for the next allocation (for a sharded job,
+            the most any one shard has left)
+        limit_minutes: The partition's longest walltime, if known
+
+    Returns:
+        The ``time`` to request, or ``None`` to request ``requested``: the
+        previous allocation made no progress to estimate from, its elapsed
+        time is unknown, or ``requested`` didn't parse.
+    """
+    longest = walltime_seconds(requested)
+    if not longest or not elapsed or processed <= 0:
+        return None
+    if limit_minutes:
+        longest = min(longest, limit_minutes * 60)
+
+    estimate = remaining * (elapsed / processed) * WALLTIME_MARGIN + STARTUP_ALLOWANCE
+    sized = min(math.ceil(estimate / ROUND_TO) * ROUND_TO, longest)
+    return None if sized == walltime_seconds(requested) else format_walltime(sized)
@@ -5,12 +5,16 @@ This package groups two related-but-distinct primitives:
 - :mod:`.exec` — async subprocess ``ssh``/``scp``/``run`` with mandatory
   timeouts and a :class:`RemoteError` hierarchy. Built on
   :func:`asyncio.create_subprocess_exec`; for one-shot command execution.
+  ``ssh_lines`` streams a remote command's output line by line.
 
 - :mod:`.session` — sync :mod:`fabric`/:mod:`paramiko` pool. :func:`acquire`
   returns a :class:`RemoteSession` for a ``(host, user)`` pair, opened
   lazily and reused across calls so consumers share one connection instead
   of paying the SFTP handshake on every operation. For SFTP and other
-  long-lived in-process SSH work.
+  long-lived in-process SSH work. :func:`borrow` checks out one of a few
+  reusable SFTP channels on the same connection, for concurrent callers.
+  :func:`execute` runs a short command over the pooled connection, for
+  thread-based callers.
 
 The two halves don't share code; they're co-located because they cover the
 same conceptual layer (outbound SSH). Reach for ``run``/``ssh``/``scp`` when
@@ -29,6 +33,7 @@ from blackfish.server.remote.exec import (
     run,
     scp,
     ssh,
+    ssh_lines,
 )
 
 # Re-exported for test compatibility only — not part of the public API.
@@ -43,12 +48,18 @@ from blackfish.server.remote.exec import (  # noqa: F401
 )
 
 from blackfish.server.remote.session import (
+    ChannelSession,
     RemoteSession,
+    SFTPSession,
     acquire,
+    borrow,
+    channel,
     close_all,
+    execute,
 )
 
 __all__ = [
+    "ChannelSession",
     "CompletedProcess",
     "DEFAULT_TIMEOUT",
     "RemoteAuthError",
@@ -57,9 +68,14 @@ __all__ = [
     "RemoteError",
     "RemoteSession",
     "RemoteTimeout",
+    "SFTPSession",
     "acquire",
+    "borrow",
+    "channel",
     "close_all",
+    "execute",
     "run",
     "scp",
     "ssh",
+    "ssh_lines",
 ]
@@ -7,8 +7,9 @@ directly. It provides:
 - :func:`run` — run a command locally
 - :func:`ssh` — run a command on a remote host
 - :func:`scp` — copy a file to/from a remote host
+- :func:`ssh_lines` — run a command on a remote host, streaming its output
 
-All three are built on :func:`asyncio.create_subprocess_exec` for true async,
+All of these are built on :func:`asyncio.create_subprocess_exec` for true async,
 cancellable I/O, and all take a mandatory ``timeout``. A hung SSH call no
 longer blocks the event loop — it is cancelled when the timeout elapses.
 
@@ -29,6 +30,7 @@ from __future__ import annotations
 import asyncio
 from dataclasses import dataclass
 from pathlib import Path
+from typing import AsyncGenerator
 
 from blackfish.server.config import config
 
@@ -201,6 +203,69 @@ async def ssh(
     return CompletedProcess(returncode, stdout, stderr)
 
 
+async def ssh_lines(
+    destination: str, command: list[str], *, timeout: float = DEFAULT_TIMEOUT
+) -> AsyncGenerator[bytes, None]:
+    """Run ``command`` on a remote host via SSH, yielding stdout line by line.
+
+    Lines are yielded as the remote command produces them, so a caller can
+    act on the first results of a long-running command (e.g. ``find`` over
+    a large tree). Closing the generator early kills the ``ssh`` process.
+    Errors are only known once the command exits, so they are raised after
+    the last line.
+
+    Args:
+        destination: the SSH destination, e.g. ``"user@host"`` or ``"host"``.
+        command: the command and its arguments to run on the remote host.
+        timeout: seconds to wait for the whole command before cancelling it.
+
+    Yields:
+        Each line of stdout, including its trailing newline.
+
+    Raises:
+        RemoteTimeout: the command did not finish within ``timeout``.
+        RemoteAuthError: SSH authentication was rejected.
+        RemoteConnectionError: the host was unreachable or the connection failed.
+        RemoteCommandError: the remote command ran and exited non-zero.
+    """
+    cmd = ["ssh", *_ssh_options(), destination, *command]
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    assert proc.stdout is not None and proc.stderr is not None
+    # Drain stderr alongside stdout so a chatty command can't fill the pipe
+    # and stall.
+    stderr_task = asyncio.ensure_future(proc.stderr.read())
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    try:
+        try:
+            while line := await asyncio.wait_for(
+                proc.stdout.readline(), max(deadline - loop.time(), 0)
+            ):
+                yield line
+            stderr = await asyncio.wait_for(stderr_task, max(deadline - loop.time(), 0))
+            returncode = await asyncio.wait_for(
+                proc.wait(), max(deadline - loop.time(), 0)
+            )
+        except asyncio.TimeoutError:
+            raise RemoteTimeout(
+                f"ssh to {destination!r} timed out after {timeout}s"
+            ) from None
+    finally:
+        if proc.returncode is None:
+            proc.kill()
+            await proc.wait()
+        stderr_task.cancel()
+
+    if returncode == _SSH_TRANSPORT_EXIT:
+        raise _ssh_transport_error(destination, stderr)
+    if returncode != 0:
+        raise RemoteCommandError(cmd, returncode, b"", stderr)
+
+
 async def scp(src: str, dst: str, *, timeout: float = DEFAULT_TIMEOUT) -> None:
     """Copy a file with SCP.
 
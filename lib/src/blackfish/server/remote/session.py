@@ -31,10 +31,27 @@ domain-specific listing logic — live in caller modules (``sftp.py``,
 ``utils.py``, ``browser.py``) and use these primitives plus the raw
 :attr:`~RemoteSession.sftp` client as needed.
 
+Long-running work that would otherwise hold the session lock for its whole
+duration (e.g. streaming a huge directory listing) can use :func:`channel`,
+which opens a dedicated SFTP channel over the pooled SSH transport: no new
+handshake, and the pooled session stays free for other callers.
+
+Callers that issue many short operations concurrently (the file browser
+handling several messages at once) can use :func:`borrow` instead of
+:func:`acquire`. Each borrow checks out one of a small, reusable set of
+SFTP channels over the same transport, so up to ``_MAX_CHANNELS``
+operations per ``(host, user)`` are in flight at once rather than queueing
+on the session lock.
+
+Thread-based callers that need a short shell command alongside their SFTP
+work (e.g. hashing a file they just wrote) can use :func:`execute`, which
+runs it on a new session channel over the same transport. Async callers
+should prefer :func:`blackfish.server.remote.ssh`.
+
 Out of scope here: ``stream_file``'s long-lived generator (it holds its
 own non-pooled ``Connection`` — pooling would block the host for the
-duration of the read). Fabric's ``run``/``put``/``get`` aren't exposed
-yet; no caller needs them today.
+duration of the read). Fabric's ``put``/``get`` aren't exposed; no caller
+needs them today.
 """
 
 from __future__ import annotations
@@ -43,6 +60,7 @@ import errno
 import stat as stat_mod
 import threading
 import time
+from abc import ABC, abstractmethod
 from contextlib import contextmanager
 from typing import TYPE_CHECKING, Iterator
 
@@ -52,14 +70,22 @@ from litestar.exceptions import NotFoundException, ValidationException
 from blackfish.server.logger import logger
 
 if TYPE_CHECKING:
+    from paramiko.channel import Channel
     from paramiko.sftp_attr import SFTPAttributes
     from paramiko.sftp_client import SFTPClient
 
 # Pooled sessions unused for this long are closed and reopened on the next
 # acquire — partly to free resources, partly to preempt connections the SSH
-# server has silently dropped on its end after a long idle period.
+# server has silently dropped on its end after a long idle period. A session
+# with channels still in use (see channel(), execute() and borrow()) is never
+# idle, however long ago it was last acquired.
 _IDLE_TIMEOUT_SECONDS = 300.0
 
+# Upper bound on SFTP channels handed out by borrow() per (host, user).
+# OpenSSH's default MaxSessions is 10; stay under it, leaving room for the
+# pooled session's own channel and a dedicated channel() or two.
+_MAX_CHANNELS = 6
+
 # Exception types we trust to be "the operation was wrong, but the session
 # is healthy." Anything outside this set is treated as a transport-class
 # failure: the session is closed in acquire()'s except-path so the next
@@ -75,70 +101,20 @@ _DOMAIN_EXCEPTIONS: tuple[type[BaseException], ...] = (
 )
 
 
-class RemoteSession:
-    """One pooled fabric ``Connection`` + SFTP client for a ``(host, user)``.
+class SFTPSession(ABC):
+    """SFTP primitives over a paramiko client, with filesystem-style errors.
 
-    Don't instantiate directly — use :func:`acquire`. The session's lock is
-    held by the :func:`acquire` context manager for the duration of the
-    ``with`` block; only one operation runs at a time per ``(host, user)``.
+    Shared by the pooled :class:`RemoteSession` and the channels handed out
+    by :func:`borrow`; subclasses provide :attr:`sftp`.
     """
 
-    def __init__(self, host: str, user: str) -> None:
-        self.host = host
-        self.user = user
-        self._connection: Connection | None = None
-        self._sftp: "SFTPClient | None" = None
-        self._lock = threading.Lock()
-        self._last_used = time.monotonic()
-
-    # --- lifecycle -----------------------------------------------------------
-
-    def _open(self) -> None:
-        conn = Connection(
-            host=self.host,
-            user=self.user,
-            connect_kwargs={"timeout": 15, "banner_timeout": 10},
-        )
-        try:
-            conn.open()
-            self._sftp = conn.sftp()
-        except Exception:
-            try:
-                conn.close()
-            except Exception as cleanup_error:
-                logger.warning(f"Error during connection cleanup: {cleanup_error}")
-            raise
-        self._connection = conn
-        # debug, not info: this fires on the CLI path via utils.get_models /
-        # get_revisions / get_model_dir, and CLI command output should stay
-        # quiet by convention.
-        logger.debug(f"Opened SFTP session to {self.user}@{self.host}")
-
-    def _close(self) -> None:
-        if self._sftp is not None:
-            try:
-                self._sftp.close()
-            except Exception as e:
-                logger.warning(f"Error closing SFTP session: {e}")
-            self._sftp = None
-        if self._connection is not None:
-            try:
-                self._connection.close()
-            except Exception as e:
-                logger.warning(f"Error closing SSH connection: {e}")
-            self._connection = None
-
-    def _stale(self) -> bool:
-        return time.monotonic() - self._last_used > _IDLE_TIMEOUT_SECONDS
-
-    # --- raw access ----------------------------------------------------------
+    host: str
+    user: str
 
     @property
+    @abstractmethod
     def sftp(self) -> "SFTPClient":
-        """Underlying paramiko SFTPClient. Only valid inside :func:`acquire`."""
-        if self._sftp is None:
-            raise RuntimeError("RemoteSession is not currently acquired")
-        return self._sftp
+        """The paramiko SFTPClient the primitives run on."""
 
     def home_dir(self) -> str:
         """Return the absolute path of the remote home directory.
@@ -229,6 +205,145 @@ class RemoteSession:
             raise OSError(str(e)) from e
 
 
+class ChannelSession(SFTPSession):
+    """An SFTP channel checked out of a :class:`RemoteSession` by :func:`borrow`."""
+
+    def __init__(self, host: str, user: str, sftp: "SFTPClient") -> None:
+        self.host = host
+        self.user = user
+        self._sftp = sftp
+
+    @property
+    def sftp(self) -> "SFTPClient":
+        return self._sftp
+
+
+class RemoteSession(SFTPSession):
+    """One pooled fabric ``Connection`` + SFTP client for a ``(host, user)``.
+
+    Don't instantiate directly — use :func:`acquire`. The session's lock is
+    held by the :func:`acquire` context manager for the duration of the
+    ``with`` block; only one operation runs at a time per ``(host, user)``.
+    """
+
+    def __init__(self, host: str, user: str) -> None:
+        self.host = host
+        self.user = user
+        self._connection: Connection | None = None
+        self._sftp: "SFTPClient | None" = None
+        self._lock = threading.Lock()
+        self._last_used = time.monotonic()
+        # Idle channels for borrow(), and a bound on how many are out at once.
+        # The generation changes whenever the connection is closed, so that
+        # channels borrowed from an old connection aren't returned to the pool.
+        self._channels: list["SFTPClient"] = []
+        self._channel_slots = threading.BoundedSemaphore(_MAX_CHANNELS)
+        self._generation = 0
+        # Channels in use outside the lock, which keep the session from idling.
+        self._open_channels = 0
+
+    # --- lifecycle -----------------------------------------------------------
+
+    def _open(self) -> None:
+        conn = Connection(
+            host=self.host,
+            user=self.user,
+            connect_kwargs={"timeout": 15, "banner_timeout": 10},
+        )
+        try:
+            conn.open()
+            self._sftp = conn.sftp()
+        except Exception:
+            try:
+                conn.close()
+            except Exception as cleanup_error:
+                logger.warning(f"Error during connection cleanup: {cleanup_error}")
+            raise
+        self._connection = conn
+        # debug, not info: this fires on the CLI path via utils.get_models /
+        # get_revisions / get_model_dir, and CLI command output should stay
+        # quiet by convention.
+        logger.debug(f"Opened SFTP session to {self.user}@{self.host}")
+
+    def _close(self) -> None:
+        for channel in self._channels:
+            try:
+                channel.close()
+            except Exception as e:
+                logger.warning(f"Error closing SFTP channel: {e}")
+        self._channels.clear()
+        self._generation += 1
+        if self._sftp is not None:
+            try:
+                self._sftp.close()
+            except Exception as e:
+                logger.warning(f"Error closing SFTP session: {e}")
+            self._sftp = None
+        if self._connection is not None:
+            try:
+                self._connection.close()
+            except Exception as e:
+                logger.warning(f"Error closing SSH connection: {e}")
+            self._connection = None
+
+    def _stale(self) -> bool:
+        if self._open_channels > 0:
+            return False
+        return time.monotonic() - self._last_used > _IDLE_TIMEOUT_SECONDS
+
+    def _release_channel(self) -> None:
+        """Record that a channel in use outside the lock is done with."""
+        with self._lock:
+            self._open_channels -= 1
+            self._last_used = time.monotonic()
+
+    def _ensure_open(self) -> None:
+        """Open the connection, or reopen it if idle too long. Hold the lock."""
+        if self._sftp is not None and self._stale():
+            logger.debug(f"Closing idle SFTP session to {self.user}@{self.host}")
+            self._close()
+        if self._sftp is None:
+            self._open()
+
+    # --- raw access ----------------------------------------------------------
+
+    @property
+    def sftp(self) -> "SFTPClient":
+        """Underlying paramiko SFTPClient. Only valid inside :func:`acquire`."""
+        if self._sftp is None:
+            raise RuntimeError("RemoteSession is not currently acquired")
+        return self._sftp
+
+    def open_sftp(self) -> "SFTPClient":
+        """Open an additional SFTP channel over this session's SSH transport.
+
+        The caller owns the returned client and must close it. Only valid
+        inside :func:`acquire`; prefer :func:`channel`.
+        """
+        if self._connection is None:
+            raise RuntimeError("RemoteSession is not currently acquired")
+        try:
+            sftp: "SFTPClient" = self._connection.client.open_sftp()
+            return sftp
+        except Exception as e:
+            raise OSError(str(e)) from e
+
+    def open_session(self) -> "Channel":
+        """Open a session channel, for running a command, over this transport.
+
+        The caller owns the returned channel and must close it. Only valid
+        inside :func:`acquire`; prefer :func:`execute`.
+        """
+        if self._connection is None:
+            raise RuntimeError("RemoteSession is not currently acquired")
+        try:
+            transport = self._connection.client.get_transport()
+            channel: "Channel" = transport.open_session()
+            return channel
+        except Exception as e:
+            raise OSError(str(e)) from e
+
+
 class _SessionPool:
     """Process-scoped table of :class:`RemoteSession` keyed by ``(host, user)``."""
 
@@ -277,11 +392,7 @@ def acquire(host: str, user: str) -> Iterator[RemoteSession]:
     """
     session = _pool.get(host, user)
     with session._lock:
-        if session._sftp is not None and session._stale():
-            logger.debug(f"Closing idle SFTP session to {session.user}@{session.host}")
-            session._close()
-        if session._sftp is None:
-            session._open()
+        session._ensure_open()
         try:
             yield session
         except _DOMAIN_EXCEPTIONS:
@@ -298,6 +409,109 @@ def acquire(host: str, user: str) -> Iterator[RemoteSession]:
             session._last_used = time.monotonic()
 
 
+@contextmanager
+def channel(host: str, user: str) -> Iterator["SFTPClient"]:
+    """Open a dedicated SFTP channel over the pooled connection for ``(host, user)``.
+
+    The session lock is held only while the channel is opened, so the
+    channel can be used for as long as needed without blocking other
+    consumers of the pooled session; the connection isn't closed as idle
+    while it's open. The channel is closed on exit.
+    """
+    with acquire(host, user) as sess:
+        sftp = sess.open_sftp()
+        sess._open_channels += 1
+    try:
+        yield sftp
+    finally:
+        try:
+            sftp.close()
+        except Exception as e:
+            logger.warning(f"Error closing SFTP channel: {e}")
+        sess._release_channel()
+
+
+@contextmanager
+def borrow(host: str, user: str) -> Iterator[ChannelSession]:
+    """Check out one of the pooled SFTP channels for ``(host, user)``.
+
+    Unlike :func:`acquire`, borrows don't exclude each other: up to
+    ``_MAX_CHANNELS`` run concurrently, each on its own channel over the
+    shared transport, and further borrows block until a channel is
+    returned. Channels are opened on demand and kept for reuse.
+
+    A channel that raises anything other than a domain exception is closed
+    rather than returned. The pooled connection itself is only reset if a
+    new channel can't be opened on it, since other borrowers may still be
+    using it.
+    """
+    session = _pool.get(host, user)
+    with session._channel_slots:
+        with session._lock:
+            session._ensure_open()
+            generation = session._generation
+            if session._channels:
+                sftp = session._channels.pop()
+            else:
+                try:
+                    sftp = session.open_sftp()
+                except Exception:
+                    session._close()
+                    raise
+            session._last_used = time.monotonic()
+            session._open_channels += 1
+
+        healthy = False
+        try:
+            yield ChannelSession(host, user, sftp)
+            healthy = True
+        except _DOMAIN_EXCEPTIONS:
+            healthy = True
+            raise
+        finally:
+            with session._lock:
+                session._open_channels -= 1
+                reuse = healthy and generation == session._generation
+                if reuse:
+                    session._channels.append(sftp)
+                    session._last_used = time.monotonic()
+            if not reuse:
+                try:
+                    sftp.close()
+                except Exception as e:
+                    logger.warning(f"Error closing SFTP channel: {e}")
+
+
+def execute(
+    host: str, user: str, command: str, *, timeout: float = 60.0
+) -> tuple[int, bytes, bytes]:
+    """Run a shell command over the pooled connection for ``(host, user)``.
+
+    Blocks until the command exits. Like :func:`channel`, the session lock
+    is held only while the channel is opened. Stdout is read before stderr,
+    so commands should keep stderr output small.
+
+    Returns:
+        The exit status, stdout and stderr.
+
+    Raises:
+        TimeoutError: If the command produces no output for ``timeout`` seconds
+        OSError: If the channel can't be opened
+    """
+    with acquire(host, user) as sess:
+        chan = sess.open_session()
+        sess._open_channels += 1
+    try:
+        chan.settimeout(timeout)
+        chan.exec_command(command)
+        stdout = chan.makefile("rb").read()
+        stderr = chan.makefile_stderr("rb").read()
+        return chan.recv_exit_status(), stdout, stderr
+    finally:
+        chan.close()
+        sess._release_channel()
+
+
 def close_all() -> None:
     """Close every pooled session. Call on server shutdown."""
     _pool.close_all()
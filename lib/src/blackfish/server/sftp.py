@@ -8,6 +8,10 @@ Litestar HTTP exceptions the route handlers expect.
 ``stream_file`` is the exception — its generator outlives the function
 call, so it keeps its own non-pooled :class:`fabric.connection.Connection`
 rather than holding the shared session for the duration of the read.
+
+Files of ``transfer.PARALLEL_THRESHOLD`` or more are read and written with
+:mod:`blackfish.server.transfer` instead, in parallel chunks over several
+channels.
 """
 
 from __future__ import annotations
@@ -27,6 +31,7 @@ from litestar.exceptions import (
 )
 
 from blackfish.server import remote
+from blackfish.server import transfer
 from blackfish.server.logger import logger
 from blackfish.server.models.profile import SlurmProfile
 
@@ -141,7 +146,13 @@ def read_file(profile: SlurmProfile, path: str) -> bytes:
     """
     try:
         with remote.acquire(profile.host, profile.user) as sess:
-            return sess.read_bytes(path)
+            size = sess.stat(path).st_size or 0
+            if size < transfer.PARALLEL_THRESHOLD:
+                return sess.read_bytes(path)
+        # Large files are read in parallel chunks, outside the session lock.
+        content = transfer.download(profile.host, profile.user, path)
+        assert content is not None
+        return content
     except FileNotFoundError:
         raise NotFoundException(f"Remote file not found: {path}")
     except PermissionError:
@@ -186,14 +197,20 @@ def write_file(
                 parent_dir = os.path.dirname(path)
                 _ensure_remote_dir(sess.sftp, parent_dir)
 
-            sess.write_bytes(path, content)
+            parallel = len(content) >= transfer.PARALLEL_THRESHOLD
+            if not parallel:
+                sess.write_bytes(path, content)
 
-            return WriteFileResponse(
-                filename=os.path.basename(path),
-                size=len(content),
-                created_at=datetime.now(),
-                path=path,
-            )
+        if parallel:
+            # Large files are written in parallel chunks, outside the session lock.
+            transfer.upload(profile.host, profile.user, content, path)
+
+        return WriteFileResponse(
+            filename=os.path.basename(path),
+            size=len(content),
+            created_at=datetime.now(),
+            path=path,
+        )
     except (ValidationException, NotFoundException):
         raise
     except PermissionError:
@@ -0,0 +1,513 @@
+"""Delta sync of a local directory tree to a remote directory.
+
+Staging batch inputs on a cluster usually means copying a directory that is
+already mostly there. A sync first plans the transfer by comparing the local
+tree against the remote one, then sends only the files that are missing or
+changed, several at a time over channels borrowed from the pooled SSH
+connection (see :func:`blackfish.server.remote.borrow`). Large files are
+themselves split into chunks sent in parallel (see
+:mod:`blackfish.server.transfer`).
+
+Files are compared by size and modification time. A file is re-sent if its
+size differs or if the local copy is newer than the remote one; a remote
+copy that is newer (e.g. made earlier with a plain ``scp``, which stamps the
+copy with the time it was made) is left alone. With ``checksum`` set, files
+of equal size are compared by SHA-256 instead of by mtime — the remote
+hashes are computed on the cluster with ``sha256sum``, so only digests
+cross the network.
+
+Each file is written to a hidden ``.part`` file next to its destination and
+renamed into place once complete, and the destination's mtime is set to the
+local file's so the next sync sees it as unchanged. Files that exist only on
+the remote are never deleted.
+
+Errors use Python's filesystem conventions, like the remote session layer;
+callers translate them for HTTP or the terminal.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import posixpath
+import queue
+import shlex
+import stat
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Callable, Iterator, Literal
+
+from pydantic import BaseModel, Field
+
+from blackfish.server import remote
+from blackfish.server import transfer
+from blackfish.server.logger import logger
+
+if TYPE_CHECKING:
+    from paramiko.sftp_attr import SFTPAttributes
+    from paramiko.sftp_client import SFTPClient
+
+DEFAULT_SYNC_WORKERS = 4
+# Matches the number of channels remote.borrow() hands out per (host, user).
+MAX_SYNC_WORKERS = 6
+
+_PART_SUFFIX = ".sync-part"
+_HASH_CHUNK_SIZE = 1024 * 1024
+# Files hashed per remote ``sha256sum`` call, to keep command lines short.
+_HASH_BATCH_SIZE = 200
+_HASH_TIMEOUT_SECONDS = 600.0
+_PROGRESS_INTERVAL_SECONDS = 0.25
+
+
+class SyncRequest(BaseModel):
+    source: str
+    destination: str
+    profile: str
+    checksum: bool = False
+    workers: int = Field(default=DEFAULT_SYNC_WORKERS, ge=1, le=MAX_SYNC_WORKERS)
+
+
+class SyncFile(BaseModel):
+    """A file the sync will send, with why it was selected."""
+
+    path: str
+    size: int
+    mtime: float
+    reason: Literal["missing", "size", "mtime", "checksum"]
+
+
+class SyncPlan(BaseModel):
+    source: str
+    destination: str
+    transfers: list[SyncFile]
+    unchanged: int
+    total_bytes: int
+
+
+class SyncProgress(BaseModel):
+    files_total: int
+    files_done: int = 0
+    bytes_total: int
+    bytes_done: int = 0
+    current: str | None = None
+    errors: dict[str, str] = Field(default_factory=dict)
+    cancelled: bool = False
+
+
+# --- planning ----------------------------------------------------------------
+
+
+def _scan_local(source: str) -> dict[str, os.stat_result]:
+    """Stat every regular file under ``source``, keyed by POSIX relative path."""
+    if not os.path.exists(source):
+        raise FileNotFoundError(f"Source directory not found: {source}")
+    if not os.path.isdir(source):
+        raise NotADirectoryError(f"Not a directory: {source}")
+
+    files: dict[str, os.stat_result] = {}
+    for dirpath, dirnames, filenames in os.walk(source):
+        dirnames.sort()
+        for name in sorted(filenames):
+            path = os.path.join(dirpath, name)
+            try:
+                st = os.stat(path)
+            except OSError as e:
+                logger.warning(f"Skipping {path} in sync: {e}")
+                continue
+            if stat.S_ISREG(st.st_mode):
+                relpath = os.path.relpath(path, source).replace(os.sep, "/")
+                files[relpath] = st
+    return files
+
+
+def _scan_remote(sftp: "SFTPClient", destination: str) -> dict[str, "SFTPAttributes"]:
+    """Stat every regular file under ``destination``, keyed by relative path.
+
+    A missing destination is an empty tree.
+    """
+    files: dict[str, "SFTPAttributes"] = {}
+    try:
+        attr = sftp.stat(destination)
+    except FileNotFoundError:
+        return files
+    if not stat.S_ISDIR(attr.st_mode or 0):
+        raise NotADirectoryError(f"Not a directory: {destination}")
+
+    stack = [""]
+    while stack:
+        relpath = stack.pop()
+        for entry in sftp.listdir_attr(posixpath.join(destination, relpath)):
+            child = posixpath.join(relpath, entry.filename)
+            mode = entry.st_mode or 0
+            if stat.S_ISDIR(mode):
+                stack.append(child)
+            elif stat.S_ISREG(mode) and not entry.filename.endswith(_PART_SUFFIX):
+                files[child] = entry
+    return files
+
+
+def _local_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(_HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+async def _remote_sha256(
+    host: str, user: str, destination: str, relpaths: list[str]
+) -> dict[str, str]:
+    """Hash files on the remote host, keyed by relative path.
+
+    Files that can't be read are missing from the result. ``sha256sum``
+    escapes names containing newlines or backslashes; those are left out too,
+    which only means they are re-sent.
+    """
+    digests: dict[str, str] = {}
+    for start in range(0, len(relpaths), _HASH_BATCH_SIZE):
+        batch = relpaths[start : start + _HASH_BATCH_SIZE]
+        command = ["cd", shlex.quote(destination), "&&", "sha256sum", "--"]
+        command += [shlex.quote(relpath) for relpath in batch]
+        try:
+            result = await remote.ssh(
+                f"{user}@{host}", command, timeout=_HASH_TIMEOUT_SECONDS
+            )
+            stdout = result.stdout
+        except remote.RemoteCommandError as e:
+            # Exit 1 means some files couldn't be read; the rest were hashed.
+            stdout = e.stdout
+        for line in stdout.decode("utf-8", "surrogateescape").splitlines():
+            digest, sep, relpath = line.partition("  ")
+            if sep and not digest.startswith("\\"):
+                digests[relpath] = digest
+    return digests
+
+
+def _compare(local: os.stat_result, other: "SFTPAttributes | None") -> str | None:
+    if other is None:
+        return "missing"
+    if other.st_size != local.st_size:
+        return "size"
+    if int(local.st_mtime) > (other.st_mtime or 0):
+        return "mtime"
+    return None
+
+
+async def plan_sync(
+    source: str,
+    destination: str,
+    host: str,
+    user: str,
+    *,
+    checksum: bool = False,
+) -> SyncPlan:
+    """Work out which files under ``source`` need sending to ``destination``.
+
+    Args:
+        source: Local directory to sync from
+        destination: Remote directory to sync to; created if missing
+        host: Remote host
+        user: Remote user
+        checksum: Compare files of equal size by SHA-256 rather than mtime
+
+    Returns:
+        The files to send, ordered by path.
+
+    Raises:
+        FileNotFoundError: If ``source`` doesn't exist
+        NotADirectoryError: If ``source`` or ``destination`` isn't a directory
+        PermissionError: If ``destination`` can't be read
+    """
+
+    def scan_remote() -> dict[str, "SFTPAttributes"]:
+        with remote.channel(host, user) as sftp:
+            return _scan_remote(sftp, destination)
+
+    local, existing = await asyncio.gather(
+        asyncio.to_thread(_scan_local, source), asyncio.to_thread(scan_remote)
+    )
+
+    reasons: dict[str, str] = {}
+    candidates: list[str] = []
+    for relpath, st in local.items():
+        other = existing.get(relpath)
+        reason = _compare(st, other)
+        if reason == "mtime" and checksum:
+            candidates.append(relpath)
+        elif reason is not None:
+            reasons[relpath] = reason
+        elif checksum:
+            candidates.append(relpath)
+
+    if candidates:
+        remote_digests = await _remote_sha256(host, user, destination, candidates)
+        for relpath in candidates:
+            local_digest = await asyncio.to_thread(
+                _local_sha256, os.path.join(source, relpath)
+            )
+            if remote_digests.get(relpath) != local_digest:
+                reasons[relpath] = "checksum"
+
+    transfers = [
+        SyncFile(
+            path=relpath,
+            size=local[relpath].st_size,
+            mtime=local[relpath].st_mtime,
+            reason=reasons[relpath],  # type: ignore[arg-type]
+        )
+        for relpath in sorted(reasons)
+    ]
+    plan = SyncPlan(
+        source=source,
+        destination=destination,
+        transfers=transfers,
+        unchanged=len(local) - len(transfers),
+        total_bytes=sum(f.size for f in transfers),
+    )
+    return plan
+
+
+# --- transfer ----------------------------------------------------------------
+
+
+class _Tracker:
+    """Thread-safe progress, reported at most every few hundred milliseconds."""
+
+    def __init__(
+        self, plan: SyncPlan, callback: Callable[[SyncProgress], None] | None
+    ) -> None:
+        self.progress = SyncProgress(
+            files_total=len(plan.transfers), bytes_total=plan.total_bytes
+        )
+        self._callback = callback
+        self._lock = threading.Lock()
+        self._last_report = 0.0
+
+    def cancel(self) -> None:
+        with self._lock:
+            self.progress.cancelled = True
+
+    def update(
+        self,
+        *,
+        current: str | None = None,
+        nbytes: int = 0,
+        done: bool = False,
+        error: str | None = None,
+    ) -> None:
+        with self._lock:
+            if current is not None:
+                self.progress.current = current
+            self.progress.bytes_done += nbytes
+            if done:
+                self.progress.files_done += 1
+                if error is not None and current is not None:
+                    self.progress.errors[current] = error
+            now = time.monotonic()
+            if not done and now - self._last_report < _PROGRESS_INTERVAL_SECONDS:
+                return
+            self._last_report = now
+            snapshot = self.progress.model_copy(deep=True)
+        if self._callback is not None:
+            self._callback(snapshot)
+
+
+def _ensure_destination(sftp: "SFTPClient", destination: str) -> None:
+    """Create ``destination`` and any missing parents."""
+    missing: list[str] = []
+    path = destination.rstrip("/") or "/"
+    while path not in ("", "/"):
+        try:
+            sftp.stat(path)
+            break
+        except FileNotFoundError:
+            missing.append(path)
+            path = posixpath.dirname(path)
+    for path in reversed(missing):
+        try:
+            sftp.mkdir(path)
+        except IOError:
+            pass
+
+
+def _make_dirs(sftp: "SFTPClient", destination: str, relpaths: list[str]) -> None:
+    for relpath in relpaths:
+        try:
+            sftp.mkdir(posixpath.join(destination, relpath))
+        except IOError:
+            # Created concurrently, or an error the uploads will report.
+            pass
+
+
+def _send(
+    sftp: "SFTPClient",
+    source: str,
+    destination: str,
+    file: SyncFile,
+    on_bytes: Callable[[int], None],
+) -> None:
+    target = posixpath.join(destination, file.path)
+    head, tail = posixpath.split(target)
+    part = posixpath.join(head, f".{tail}{_PART_SUFFIX}")
+    sent = 0
+
+    def callback(transferred: int, total: int) -> None:
+        nonlocal sent
+        on_bytes(transferred - sent)
+        sent = transferred
+
+    with open(os.path.join(source, file.path), "rb") as f:
+        try:
+            sftp.putfo(f, part, file_size=file.size, callback=callback)
+            sftp.posix_rename(part, target)
+        except BaseException:
+            try:
+                sftp.remove(part)
+            except Exception:
+                pass
+            raise
+    sftp.utime(target, (time.time(), file.mtime))
+    # Count anything the callback didn't see, e.g. for empty files.
+    on_bytes(file.size - sent)
+
+
+def run_sync(
+    plan: SyncPlan,
+    host: str,
+    user: str,
+    *,
+    workers: int = DEFAULT_SYNC_WORKERS,
+    progress: Callable[[SyncProgress], None] | None = None,
+    cancel: threading.Event | None = None,
+) -> SyncProgress:
+    """Send the files in ``plan``, ``workers`` at a time. Blocks.
+
+    A file that fails to send is recorded in the returned progress's
+    ``errors`` and the rest continue. Setting ``cancel`` stops new files
+    from starting; files already in flight finish.
+
+    Args:
+        plan: A plan from :func:`plan_sync`
+        host: Remote host
+        user: Remote user
+        workers: Number of files sent concurrently, each on its own channel
+        progress: Called with a snapshot of progress as the sync runs
+        cancel: Event that stops the sync when set
+
+    Returns:
+        The final progress.
+    """
+    tracker = _Tracker(plan, progress)
+    if not plan.transfers:
+        return tracker.progress
+
+    needed: set[str] = set()
+    for file in plan.transfers:
+        parent = posixpath.dirname(file.path)
+        while parent and parent not in needed:
+            needed.add(parent)
+            parent = posixpath.dirname(parent)
+    # Create directories up front, parents first, so uploads don't race.
+    with remote.borrow(host, user) as sess:
+        _ensure_destination(sess.sftp, plan.destination)
+        _make_dirs(sess.sftp, plan.destination, sorted(needed))
+
+    def send(file: SyncFile) -> None:
+        if cancel is not None and cancel.is_set():
+            tracker.cancel()
+            return
+        tracker.update(current=file.path)
+        try:
+            if file.size >= transfer.PARALLEL_THRESHOLD:
+                # Split large files into chunks sent over several channels.
+                transfer.upload(
+                    host,
+                    user,
+                    os.path.join(plan.source, file.path),
+                    posixpath.join(plan.destination, file.path),
+                    mtime=file.mtime,
+                    progress=lambda n: tracker.update(nbytes=n),
+                )
+            else:
+                with remote.borrow(host, user) as sess:
+                    _send(
+                        sess.sftp,
+                        plan.source,
+                        plan.destination,
+                        file,
+                        lambda n: tracker.update(nbytes=n),
+                    )
+        except Exception as e:
+            logger.warning(f"Failed to sync {file.path}: {e}")
+            tracker.update(
+                current=file.path, done=True, error=str(e) or type(e).__name__
+            )
+        else:
+            tracker.update(current=file.path, done=True)
+
+    with ThreadPoolExecutor(max_workers=min(workers, MAX_SYNC_WORKERS)) as pool:
+        # Largest first, so one big file doesn't start last and run alone.
+        files = sorted(plan.transfers, key=lambda f: f.size, reverse=True)
+        list(pool.map(send, files))
+
+    result = tracker.progress
+    result.current = None
+    logger.info(
+        f"Synced {result.files_done - len(result.errors)} of {result.files_total} "
+        f"files to {user}@{host}:{plan.destination}"
+    )
+    return result
+
+
+def stream_sync(
+    plan: SyncPlan,
+    host: str,
+    user: str,
+    *,
+    workers: int = DEFAULT_SYNC_WORKERS,
+) -> Iterator[bytes]:
+    """Run a sync, yielding newline-delimited JSON events as it goes.
+
+    Events are ``{"event": "plan", ...}`` first, then ``progress`` events,
+    then a final ``done`` event carrying the final progress. Closing the
+    iterator cancels the sync once in-flight files finish.
+    """
+    events: queue.Queue[tuple[str, BaseModel] | None] = queue.Queue()
+    cancel = threading.Event()
+
+    def worker() -> None:
+        try:
+            result = run_sync(
+                plan,
+                host,
+                user,
+                workers=workers,
+                progress=lambda p: events.put(("progress", p)),
+                cancel=cancel,
+            )
+            events.put(("done", result))
+        except Exception as e:
+            logger.error(f"Sync to {user}@{host}:{plan.destination} failed: {e}")
+            failed = SyncProgress(
+                files_total=len(plan.transfers),
+                bytes_total=plan.total_bytes,
+                errors={"": str(e)},
+            )
+            events.put(("done", failed))
+        finally:
+            events.put(None)
+
+    def line(event: str, model: BaseModel) -> bytes:
+        return json.dumps({"event": event, **model.model_dump()}).encode() + b"\n"
+
+    thread = threading.Thread(target=worker, name="blackfish-sync", daemon=True)
+    thread.start()
+    try:
+        yield line("plan", plan)
+        while (item := events.get()) is not None:
+            yield line(*item)
+    finally:
+        cancel.set()
@@ -6,6 +6,8 @@
   Expects context:
     name, image, provider, profile, job_config,
     pipeline_yaml, pipeline_path, input_dir, output_dir, cache_dir, idle_timeout
+    pipeline_input  - the pipeline's input directory (input_dir unless sampling)
+    pipeline_output - the pipeline's output directory (output_dir unless sampling)
 #}
 {% block command %}
 cat > {{ pipeline_path }} << 'BLACKFISH_PIPELINE_EOF'
@@ -20,7 +22,7 @@ docker run --rm {{ '--runtime nvidia --gpus all' if job_config.gres else '' }} \
   -v {{ output_dir }}:{{ output_dir }} \
   -v {{ pipeline_path }}:{{ pipeline_path }} \
   {{ image.docker_ref }} \
-  run {{ pipeline_path }} {{ input_dir }} {{ output_dir }} \
+  run {{ pipeline_path }} {{ pipeline_input }} {{ pipeline_output }} \
   --idle-timeout {{ idle_timeout }}
 {%- elif provider == 'apptainer' %}
 export SINGULARITY_NO_EVAL=1
@@ -32,7 +34,7 @@ apptainer run {{ '--nv' if job_config.gres else '' }} \
   --bind {{ output_dir }} \
   --bind {{ pipeline_path }} \
   {{ profile.cache_dir }}/images/{{ image.sif }} \
-  run {{ pipeline_path }} {{ input_dir }} {{ output_dir }} \
+  run {{ pipeline_path }} {{ pipeline_input }} {{ pipeline_output }} \
   --idle-timeout {{ idle_timeout }}
 {%- endif %}
 {%- endblock %}
@@ -4,13 +4,26 @@
   as a single Slurm allocation. Walltime is handled by Blackfish resubmitting
   this script (tigerflow resumes on the same output directory).
 
+  A sharded job runs as a job array instead: each array task runs the pipeline
+  of one shard, whose input and output directories live under output_dir. A
+  sampling job likewise runs on the sample staged under output_dir.
+
   Overrides the base `prelude` block because batch jobs need no port discovery.
   Expects context:
     uuid, name, image, profile, job_config,
     pipeline_yaml   - the rendered tigerflow pipeline config (YAML string)
     pipeline_path   - absolute path to write the config on the cluster
     input_dir, output_dir, cache_dir, idle_timeout
+    pipeline_input  - the pipeline's input directory (input_dir unless sharded or sampling)
+    pipeline_output - the pipeline's output directory (output_dir unless sharded or sampling)
+    array           - the array task ids to run, or None for a single allocation
 #}
+{% block sbatch -%}
+{{ super() }}
+{%- if array %}
+#SBATCH --array={{ array }}
+{%- endif %}
+{%- endblock %}
 {% block prelude %}
 export APPTAINER_TMPDIR=/tmp
 {%- if job_config.gres > 0 %}
@@ -32,6 +45,6 @@ apptainer run {{ '--nv' if job_config.gres else '' }} \
   --bind {{ output_dir }} \
   --bind {{ pipeline_path }} \
   {{ profile.cache_dir }}/images/{{ image.sif }} \
-  run {{ pipeline_path }} {{ input_dir }} {{ output_dir }} \
+  run {{ pipeline_path }} {{ pipeline_input }} {{ pipeline_output }} \
   --idle-timeout {{ idle_timeout }}
 {%- endblock %}
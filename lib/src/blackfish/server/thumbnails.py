@@ -0,0 +1,307 @@
+"""Downscaled image previews for the file manager.
+
+Thumbnails are produced in one of two ways:
+
+- For JPEGs, the first few kilobytes of the file are read and, if the EXIF
+  block carries an embedded thumbnail at least as large as the requested
+  size, that thumbnail is returned without reading the rest of the file.
+- Otherwise the image is decoded with PIL's draft mode, which lets the JPEG
+  decoder scale by 1/2, 1/4 or 1/8 while decoding, and then resized.
+
+Results are cached on disk under ``HOME_DIR/thumbnails``, keyed by
+``(profile, path, size, mtime)`` so that a modified source produces a new
+entry. The cache is bounded by total size and evicts least recently used
+entries; a cache hit refreshes the entry's mtime.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from io import BytesIO
+
+from PIL import ExifTags, Image, ImageOps, UnidentifiedImageError
+
+from litestar.exceptions import (
+    InternalServerException,
+    NotAuthorizedException,
+    NotFoundException,
+    ValidationException,
+)
+
+from blackfish.server import remote
+from blackfish.server.logger import logger
+from blackfish.server.models.profile import SlurmProfile
+
+DEFAULT_THUMBNAIL_SIZE = 256
+MAX_THUMBNAIL_SIZE = 1024
+
+# EXIF data lives in an APP1 segment near the start of the file; 64KB (the
+# maximum segment size) is enough to cover it without reading pixel data.
+_EXIF_HEAD_SIZE = 64 * 1024
+
+_JPEG_EXTENSIONS = (".jpg", ".jpeg")
+
+# Evict down to this fraction of the limit so that a full cache doesn't
+# rescan the directory on every insert.
+_EVICTION_TARGET = 0.9
+
+_ORIENTATION_TRANSPOSE = {
+    2: Image.Transpose.FLIP_LEFT_RIGHT,
+    3: Image.Transpose.ROTATE_180,
+    4: Image.Transpose.FLIP_TOP_BOTTOM,
+    5: Image.Transpose.TRANSPOSE,
+    6: Image.Transpose.ROTATE_270,
+    7: Image.Transpose.TRANSVERSE,
+    8: Image.Transpose.ROTATE_90,
+}
+
+
+class ThumbnailCache:
+    """Size-bounded LRU cache of encoded thumbnails stored as files."""
+
+    def __init__(self, cache_dir: str, max_bytes: int) -> None:
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total: int | None = None
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    def _scan(self) -> list[os.DirEntry[str]]:
+        try:
+            return [e for e in os.scandir(self.cache_dir) if e.is_file()]
+        except FileNotFoundError:
+            return []
+
+    def get(self, key: str) -> bytes | None:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                content = f.read()
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return content
+
+    def put(self, key: str, content: bytes) -> None:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+
+        with self._lock:
+            # A rewritten key replaces its entry rather than adding to it.
+            try:
+                replaced = os.stat(path).st_size
+            except FileNotFoundError:
+                replaced = 0
+            os.replace(tmp_path, path)
+            if self._total is None:
+                self._total = sum(e.stat().st_size for e in self._scan())
+            else:
+                self._total += len(content) - replaced
+            if self._total > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        entries = sorted(
+            ((e.stat().st_mtime, e.stat().st_size, e.path) for e in self._scan()),
+        )
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * _EVICTION_TARGET
+        evicted = 0
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            evicted += 1
+        self._total = total
+        logger.debug(f"Evicted {evicted} thumbnails from {self.cache_dir}")
+
+
+_caches: dict[str, ThumbnailCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(home_dir: str, max_bytes: int) -> ThumbnailCache:
+    """Return the process-wide thumbnail cache for a Blackfish home directory."""
+    cache_dir = os.path.join(home_dir, "thumbnails")
+    with _caches_lock:
+        cache = _caches.get(cache_dir)
+        if cache is None:
+            cache = ThumbnailCache(cache_dir, max_bytes)
+            _caches[cache_dir] = cache
+        cache.max_bytes = max_bytes
+        return cache
+
+
+def cache_key(profile: str | None, path: str, size: int, mtime: float) -> str:
+    raw = f"{profile or ''}\0{path}\0{size}\0{mtime}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def media_type(content: bytes) -> str:
+    return "image/png" if content.startswith(b"\x89PNG") else "image/jpeg"
+
+
+def _find_exif(head: bytes) -> bytes | None:
+    """Return the EXIF APP1 payload of a JPEG, if it appears within ``head``."""
+    if not head.startswith(b"\xff\xd8"):
+        return None
+    pos = 2
+    while pos + 4 <= len(head):
+        if head[pos] != 0xFF:
+            return None
+        marker = head[pos + 1]
+        # Start of scan / end of image: no metadata segments follow.
+        if marker in (0xDA, 0xD9):
+            return None
+        length = int.from_bytes(head[pos + 2 : pos + 4], "big")
+        segment = head[pos + 4 : pos + 2 + length]
+        if marker == 0xE1 and segment.startswith(b"Exif\x00\x00"):
+            return segment
+        pos += 2 + length
+    return None
+
+
+def _exif_thumbnail(head: bytes, size: int) -> bytes | None:
+    """Extract an embedded EXIF thumbnail whose longest side is at least ``size``."""
+    segment = _find_exif(head)
+    if segment is None:
+        return None
+    try:
+        exif = Image.Exif()
+        exif.load(segment)
+        ifd1 = exif.get_ifd(ExifTags.IFD.IFD1)
+        offset = ifd1.get(ExifTags.Base.JpegIFOffset)
+        length = ifd1.get(ExifTags.Base.JpegIFByteCount)
+        tiff = segment[6:]
+        if not offset or not length or offset + length > len(tiff):
+            return None
+        thumb: Image.Image = Image.open(BytesIO(tiff[offset : offset + length]))
+        if max(thumb.size) < size:
+            return None
+        thumb.thumbnail((size, size))
+        transpose = _ORIENTATION_TRANSPOSE.get(exif.get(ExifTags.Base.Orientation, 1))
+        if transpose is not None:
+            thumb = thumb.transpose(transpose)
+        return _encode(thumb)
+    except Exception as e:
+        logger.debug(f"Ignoring unreadable EXIF thumbnail: {e}")
+        return None
+
+
+def _encode(img: Image.Image) -> bytes:
+    buffer = BytesIO()
+    if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+        img.save(buffer, format="PNG", optimize=True)
+    else:
+        if img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        img.save(buffer, format="JPEG", quality=85)
+    return buffer.getvalue()
+
+
+def render_thumbnail(content: bytes, size: int) -> bytes:
+    """Downscale an encoded image to fit in a ``size`` x ``size`` box.
+
+    Raises:
+        ValidationException: If the content isn't a readable image
+    """
+    try:
+        img: Image.Image = Image.open(BytesIO(content))
+        # For JPEGs, draft() lets the decoder skip detail we'll throw away.
+        img.draft("RGB", (size, size))
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail((size, size))
+        return _encode(img)
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as e:
+        raise ValidationException(f"Invalid image file: {e}")
+
+
+def _local_thumbnail(path: str, size: int, cache: ThumbnailCache) -> bytes:
+    try:
+        mtime = os.stat(path).st_mtime
+    except FileNotFoundError:
+        raise NotFoundException(f"The requested path ({path}) does not exist")
+    key = cache_key(None, path, size, mtime)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    with open(path, "rb") as f:
+        thumbnail = None
+        if path.lower().endswith(_JPEG_EXTENSIONS):
+            thumbnail = _exif_thumbnail(f.read(_EXIF_HEAD_SIZE), size)
+            f.seek(0)
+        if thumbnail is None:
+            thumbnail = render_thumbnail(f.read(), size)
+
+    cache.put(key, thumbnail)
+    return thumbnail
+
+
+def _remote_thumbnail(
+    profile: SlurmProfile, path: str, size: int, cache: ThumbnailCache
+) -> bytes:
+    with remote.acquire(profile.host, profile.user) as sess:
+        mtime = sess.stat(path).st_mtime or 0
+        key = cache_key(profile.name, path, size, mtime)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+        thumbnail = None
+        content = None
+        if path.lower().endswith(_JPEG_EXTENSIONS):
+            with sess.sftp.open(path, "rb") as f:
+                thumbnail = _exif_thumbnail(f.read(_EXIF_HEAD_SIZE), size)
+        if thumbnail is None:
+            content = sess.read_bytes(path)
+
+    # Decode outside the session lock so other requests can use the connection.
+    if content is not None:
+        thumbnail = render_thumbnail(content, size)
+    assert thumbnail is not None
+    cache.put(key, thumbnail)
+    return thumbnail
+
+
+def get_thumbnail(
+    cache: ThumbnailCache,
+    path: str,
+    size: int = DEFAULT_THUMBNAIL_SIZE,
+    profile: SlurmProfile | None = None,
+) -> bytes:
+    """Return an encoded thumbnail of a local or remote image, using the cache.
+
+    Raises:
+        NotFoundException: If the image doesn't exist
+        NotAuthorizedException: If permission denied
+        ValidationException: If the file isn't a readable image
+        InternalServerException: If the read fails
+    """
+    try:
+        if profile is None:
+            return _local_thumbnail(path, size, cache)
+        return _remote_thumbnail(profile, path, size, cache)
+    except (NotFoundException, ValidationException):
+        raise
+    except FileNotFoundError:
+        raise NotFoundException(f"The requested path ({path}) does not exist")
+    except PermissionError:
+        raise NotAuthorizedException(f"Permission denied: {path}")
+    except Exception as e:
+        logger.error(f"Failed to create thumbnail for {path}: {e}")
+        raise InternalServerException(f"Failed to create thumbnail: {e}")
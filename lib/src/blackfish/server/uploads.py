@@ -0,0 +1,490 @@
+"""Resumable chunked uploads for large files.
+
+An upload is staged in three steps: the client creates an upload session
+for a destination path and total size, PUTs numbered chunks (each with its
+byte offset and an optional SHA-256 checksum) in any order, and finally
+asks the server to complete the upload. Chunks are written in place into a
+hidden ``.part`` file next to the destination, which is atomically renamed
+over the destination once every chunk has arrived. A dropped connection
+only loses the chunk in flight: the client queries the session for its
+missing chunks and resends those.
+
+Session manifests are persisted as JSON under ``HOME_DIR/uploads`` so that
+uploads survive a server restart. Destinations on remote profiles are
+written through the pooled SFTP session from :mod:`blackfish.server.remote`.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Callable
+from uuid import uuid4
+
+from pydantic import BaseModel, Field, ValidationError
+
+from litestar.exceptions import (
+    ClientException,
+    InternalServerException,
+    NotAuthorizedException,
+    NotFoundException,
+    ValidationException,
+)
+
+from blackfish.server import remote
+from blackfish.server.files import FileUploadResponse
+from blackfish.server.logger import logger
+from blackfish.server.models.profile import SlurmProfile
+from blackfish.server.sftp import _ensure_remote_dir
+
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024  # 8MB
+MAX_CHUNK_SIZE = 64 * 1024 * 1024  # 64MB
+
+# Sessions that have not received a chunk for this long are discarded the
+# next time an upload is created.
+UPLOAD_EXPIRY = timedelta(days=7)
+
+# Serializes read-modify-write cycles on session manifests. Chunks for the
+# same upload may arrive concurrently; the data writes themselves don't need
+# the lock (they touch disjoint byte ranges), only the bookkeeping does.
+_manifest_lock = threading.Lock()
+
+
+class UploadRequest(BaseModel):
+    path: str
+    size: int = Field(ge=0)
+    profile: str | None = None
+    chunk_size: int = Field(default=DEFAULT_CHUNK_SIZE, gt=0, le=MAX_CHUNK_SIZE)
+    overwrite: bool = False
+
+
+class UploadSession(BaseModel):
+    """Persisted state of an in-progress upload."""
+
+    id: str
+    path: str
+    profile: str | None = None
+    size: int
+    chunk_size: int
+    overwrite: bool = False
+    created_at: datetime
+    updated_at: datetime
+    # Chunk index -> SHA-256 of the chunk as written.
+    chunks: dict[int, str] = Field(default_factory=dict)
+
+    @property
+    def num_chunks(self) -> int:
+        return -(-self.size // self.chunk_size)
+
+    @property
+    def part_path(self) -> str:
+        head, tail = os.path.split(self.path)
+        return os.path.join(head, f".{tail}.{self.id}.part")
+
+    def chunk_length(self, index: int) -> int:
+        return min(self.chunk_size, self.size - index * self.chunk_size)
+
+    def missing(self) -> list[int]:
+        return [i for i in range(self.num_chunks) if i not in self.chunks]
+
+    def received_ranges(self) -> list[tuple[int, int]]:
+        """Received bytes as sorted, merged ``(start, end)`` half-open ranges."""
+        ranges: list[tuple[int, int]] = []
+        for index in sorted(self.chunks):
+            start = index * self.chunk_size
+            end = start + self.chunk_length(index)
+            if ranges and ranges[-1][1] == start:
+                ranges[-1] = (ranges[-1][0], end)
+            else:
+                ranges.append((start, end))
+        return ranges
+
+
+class UploadStatus(BaseModel):
+    id: str
+    path: str
+    profile: str | None
+    size: int
+    chunk_size: int
+    num_chunks: int
+    received_bytes: int
+    received: list[tuple[int, int]]
+    missing: list[int]
+    created_at: datetime
+    updated_at: datetime
+
+
+class ChunkReceipt(BaseModel):
+    id: str
+    index: int
+    offset: int
+    size: int
+    sha256: str
+    received_bytes: int
+    remaining: int
+
+
+def upload_status(session: UploadSession) -> UploadStatus:
+    received = session.received_ranges()
+    return UploadStatus(
+        id=session.id,
+        path=session.path,
+        profile=session.profile,
+        size=session.size,
+        chunk_size=session.chunk_size,
+        num_chunks=session.num_chunks,
+        received_bytes=sum(end - start for start, end in received),
+        received=received,
+        missing=session.missing(),
+        created_at=session.created_at,
+        updated_at=session.updated_at,
+    )
+
+
+# --- manifests ---------------------------------------------------------------
+
+
+def _uploads_dir(home_dir: str) -> str:
+    return os.path.join(home_dir, "uploads")
+
+
+def _manifest_path(home_dir: str, upload_id: str) -> str:
+    # Upload IDs are generated server-side as hex UUIDs; anything else can't
+    # name a manifest and must not be joined into a path.
+    if not upload_id.isalnum():
+        raise NotFoundException(f"Upload {upload_id} not found")
+    return os.path.join(_uploads_dir(home_dir), f"{upload_id}.json")
+
+
+def _save_session(home_dir: str, session: UploadSession) -> None:
+    path = _manifest_path(home_dir, session.id)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(session.model_dump_json())
+    os.replace(tmp_path, path)
+
+
+def load_session(home_dir: str, upload_id: str) -> UploadSession:
+    """Load an upload session manifest.
+
+    Raises:
+        NotFoundException: If no session exists with the given ID
+    """
+    path = _manifest_path(home_dir, upload_id)
+    try:
+        with open(path) as f:
+            return UploadSession.model_validate_json(f.read())
+    except FileNotFoundError:
+        raise NotFoundException(f"Upload {upload_id} not found")
+    except (ValidationError, json.JSONDecodeError) as e:
+        logger.error(f"Corrupt upload manifest {path}: {e}")
+        raise InternalServerException(f"Upload {upload_id} manifest is corrupt")
+
+
+def _remove_manifest(home_dir: str, upload_id: str) -> None:
+    try:
+        os.remove(_manifest_path(home_dir, upload_id))
+    except FileNotFoundError:
+        pass
+
+
+def _prune_expired(
+    home_dir: str, resolve_profile: Callable[[str], SlurmProfile] | None
+) -> None:
+    """Discard sessions (and their part files) idle for longer than UPLOAD_EXPIRY."""
+    cutoff = datetime.now(timezone.utc) - UPLOAD_EXPIRY
+    try:
+        names = os.listdir(_uploads_dir(home_dir))
+    except FileNotFoundError:
+        return
+    for name in names:
+        if not name.endswith(".json"):
+            continue
+        try:
+            session = load_session(home_dir, name.removesuffix(".json"))
+        except Exception:
+            continue
+        if session.updated_at >= cutoff:
+            continue
+        logger.info(f"Discarding expired upload {session.id} ({session.path})")
+        try:
+            if session.profile is None:
+                _discard_part(session, None)
+            elif resolve_profile is not None:
+                _discard_part(session, resolve_profile(session.profile))
+        except Exception as e:
+            logger.warning(f"Failed to remove part file for upload {session.id}: {e}")
+        _remove_manifest(home_dir, session.id)
+
+
+# --- storage -----------------------------------------------------------------
+
+
+def _prepare_part(session: UploadSession, profile: SlurmProfile | None) -> None:
+    """Create the destination's parent directory and a sparse part file."""
+    if profile is None:
+        if os.path.exists(session.path) and not session.overwrite:
+            raise ValidationException(
+                f"The requested path ({session.path}) already exists"
+            )
+        parent = os.path.dirname(session.path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        with open(session.part_path, "wb") as f:
+            f.truncate(session.size)
+        return
+
+    with remote.acquire(profile.host, profile.user) as sess:
+        if sess.exists(session.path) and not session.overwrite:
+            raise ValidationException(f"Remote file already exists: {session.path}")
+        parent = os.path.dirname(session.path)
+        if parent:
+            _ensure_remote_dir(sess.sftp, parent)
+        with sess.sftp.open(session.part_path, "wb") as f:
+            f.truncate(session.size)
+
+
+def _write_chunk(
+    session: UploadSession, profile: SlurmProfile | None, offset: int, data: bytes
+) -> None:
+    if profile is None:
+        fd = os.open(session.part_path, os.O_WRONLY)
+        try:
+            written = 0
+            while written < len(data):
+                written += os.pwrite(fd, data[written:], offset + written)
+        finally:
+            os.close(fd)
+        return
+
+    with remote.acquire(profile.host, profile.user) as sess:
+        with sess.sftp.open(session.part_path, "r+b") as f:
+            f.set_pipelined(True)
+            f.seek(offset)
+            f.write(data)
+
+
+def _finalize_part(session: UploadSession, profile: SlurmProfile | None) -> None:
+    """Check the part file's size and rename it over the destination."""
+    if profile is None:
+        size = os.stat(session.part_path).st_size
+        if size != session.size:
+            raise InternalServerException(
+                f"Upload size mismatch: expected {session.size} bytes, found {size}"
+            )
+        if os.path.exists(session.path) and not session.overwrite:
+            raise ValidationException(
+                f"The requested path ({session.path}) already exists"
+            )
+        os.replace(session.part_path, session.path)
+        return
+
+    with remote.acquire(profile.host, profile.user) as sess:
+        remote_size = sess.stat(session.part_path).st_size
+        if remote_size != session.size:
+            raise InternalServerException(
+                f"Upload size mismatch: expected {session.size} bytes, "
+                f"found {remote_size}"
+            )
+        if sess.exists(session.path) and not session.overwrite:
+            raise ValidationException(f"Remote file already exists: {session.path}")
+        # posix_rename replaces an existing destination atomically, which
+        # plain SFTP rename refuses to do.
+        sess.sftp.posix_rename(session.part_path, session.path)
+
+
+def _discard_part(session: UploadSession, profile: SlurmProfile | None) -> None:
+    if profile is None:
+        try:
+            os.remove(session.part_path)
+        except FileNotFoundError:
+            pass
+        return
+
+    with remote.acquire(profile.host, profile.user) as sess:
+        try:
+            sess.sftp.remove(session.part_path)
+        except FileNotFoundError:
+            pass
+
+
+def _translate_errors(action: str, path: str, e: Exception) -> Exception:
+    """Map a storage exception onto the HTTP exception the routes raise."""
+    if isinstance(e, (ClientException, InternalServerException, NotFoundException)):
+        return e
+    if isinstance(e, FileNotFoundError):
+        return NotFoundException(f"Upload part file not found: {path}")
+    if isinstance(e, PermissionError):
+        return NotAuthorizedException(f"Permission denied: {path}")
+    logger.error(f"Failed to {action} upload at {path}: {e}")
+    return InternalServerException(f"Failed to {action} upload: {e}")
+
+
+# --- operations --------------------------------------------------------------
+
+
+def create_upload(
+    home_dir: str,
+    data: UploadRequest,
+    profile: SlurmProfile | None,
+    resolve_profile: Callable[[str], SlurmProfile] | None = None,
+) -> UploadSession:
+    """Start a new upload session and allocate its part file.
+
+    Args:
+        home_dir: Blackfish home directory (manifests live in ``uploads/``)
+        data: Upload parameters
+        profile: Remote profile to upload to, or ``None`` for local storage
+        resolve_profile: Looks up remote profiles by name, used to clean up
+            the part files of expired sessions
+
+    Raises:
+        ValidationException: If the destination exists and ``overwrite`` is False
+        NotAuthorizedException: If permission denied
+        InternalServerException: If the part file can't be created
+    """
+    os.makedirs(_uploads_dir(home_dir), exist_ok=True)
+    _prune_expired(home_dir, resolve_profile)
+
+    now = datetime.now(timezone.utc)
+    session = UploadSession(
+        id=uuid4().hex,
+        path=data.path,
+        profile=data.profile,
+        size=data.size,
+        chunk_size=data.chunk_size,
+        overwrite=data.overwrite,
+        created_at=now,
+        updated_at=now,
+    )
+    try:
+        _prepare_part(session, profile)
+    except Exception as e:
+        raise _translate_errors("create", session.path, e)
+
+    with _manifest_lock:
+        _save_session(home_dir, session)
+    logger.debug(
+        f"Created upload {session.id} for {session.path} "
+        f"({session.size} bytes, {session.num_chunks} chunks)"
+    )
+    return session
+
+
+def write_chunk(
+    home_dir: str,
+    upload_id: str,
+    index: int,
+    offset: int,
+    data: bytes,
+    profile: SlurmProfile | None,
+    sha256: str | None = None,
+) -> ChunkReceipt:
+    """Write one chunk of an upload at its byte offset.
+
+    Re-sending a chunk that was already received overwrites it, so clients
+    can retry any chunk whose response they didn't see.
+
+    Raises:
+        NotFoundException: If the upload doesn't exist
+        ValidationException: If the index, offset, length or checksum is wrong
+    """
+    session = load_session(home_dir, upload_id)
+
+    if not 0 <= index < session.num_chunks:
+        raise ValidationException(
+            f"Chunk index {index} out of range (upload has {session.num_chunks} chunks)"
+        )
+    expected_offset = index * session.chunk_size
+    if offset != expected_offset:
+        raise ValidationException(
+            f"Chunk {index} must start at offset {expected_offset}, not {offset}"
+        )
+    expected_length = session.chunk_length(index)
+    if len(data) != expected_length:
+        raise ValidationException(
+            f"Chunk {index} must be {expected_length} bytes, received {len(data)}"
+        )
+    digest = hashlib.sha256(data).hexdigest()
+    if sha256 is not None and sha256.lower() != digest:
+        raise ValidationException(
+            f"Checksum mismatch for chunk {index}: expected {sha256}, computed {digest}"
+        )
+
+    try:
+        _write_chunk(session, profile, offset, data)
+    except Exception as e:
+        raise _translate_errors("write", session.path, e)
+
+    with _manifest_lock:
+        # Reload: other chunks may have been recorded while this one was written.
+        session = load_session(home_dir, upload_id)
+        session.chunks[index] = digest
+        session.updated_at = datetime.now(timezone.utc)
+        _save_session(home_dir, session)
+
+    received_bytes = sum(end - start for start, end in session.received_ranges())
+    return ChunkReceipt(
+        id=session.id,
+        index=index,
+        offset=offset,
+        size=len(data),
+        sha256=digest,
+        received_bytes=received_bytes,
+        remaining=session.num_chunks - len(session.chunks),
+    )
+
+
+def complete_upload(
+    home_dir: str, upload_id: str, profile: SlurmProfile | None
+) -> FileUploadResponse:
+    """Move a fully received upload into place.
+
+    Raises:
+        NotFoundException: If the upload doesn't exist
+        ClientException: If chunks are still missing (409)
+        ValidationException: If the destination appeared and ``overwrite`` is False
+    """
+    session = load_session(home_dir, upload_id)
+
+    missing = session.missing()
+    if missing:
+        raise ClientException(
+            f"Upload {upload_id} is incomplete: {len(missing)} chunk(s) missing",
+            status_code=409,
+            extra={"missing": missing},
+        )
+
+    try:
+        _finalize_part(session, profile)
+    except Exception as e:
+        raise _translate_errors("complete", session.path, e)
+
+    with _manifest_lock:
+        _remove_manifest(home_dir, upload_id)
+    logger.debug(f"Completed upload {upload_id} to {session.path}")
+    return FileUploadResponse(
+        filename=os.path.basename(session.path),
+        size=session.size,
+        created_at=datetime.now(),
+    )
+
+
+def abort_upload(home_dir: str, upload_id: str, profile: SlurmProfile | None) -> str:
+    """Discard an upload and its part file.
+
+    Raises:
+        NotFoundException: If the upload doesn't exist
+    """
+    session = load_session(home_dir, upload_id)
+    try:
+        _discard_part(session, profile)
+    except Exception as e:
+        raise _translate_errors("abort", session.path, e)
+    with _manifest_lock:
+        _remove_manifest(home_dir, upload_id)
+    logger.debug(f"Aborted upload {upload_id} to {session.path}")
+    return upload_id
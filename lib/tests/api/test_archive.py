@@ -0,0 +1,251 @@
+"""API tests for streaming directory and job archives."""
+
+import io
+import os
+import tarfile
+from unittest import mock
+from uuid import UUID
+
+import pytest
+from litestar.testing import AsyncTestClient
+from paramiko import SFTPAttributes
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from blackfish.server import archive, remote
+from blackfish.server.jobs.base import BatchJob
+from blackfish.server.models.profile import SlurmProfile
+
+
+pytestmark = pytest.mark.anyio
+
+JOB_ID = "2a7a8e62-40cc-4240-a825-463e5b11a81f"
+
+
+@pytest.fixture
+def output_dir(tmp_path):
+    root = tmp_path / "output"
+    (root / "transcribe").mkdir(parents=True)
+    (root / "transcribe" / "audio_001.json").write_text('{"text": "one"}')
+    (root / "transcribe" / "audio_002.json").write_text('{"text": "two"}')
+    (root / "transcribe" / "notes.txt").write_text("notes")
+    (root / "large.bin").write_bytes(os.urandom(3 * archive.ARCHIVE_CHUNK_SIZE + 7))
+    return root
+
+
+def members(content: bytes) -> dict[str, bytes]:
+    with tarfile.open(fileobj=io.BytesIO(content)) as tar:
+        return {m.name: tar.extractfile(m).read() for m in tar.getmembers()}
+
+
+class FakeSFTP:
+    """Minimal SFTP client backed by the local filesystem."""
+
+    def __init__(self):
+        self.close = mock.MagicMock()
+        self.normalize = mock.MagicMock(return_value="/home/testuser")
+
+    def stat(self, path):
+        return SFTPAttributes.from_stat(os.stat(path))
+
+    def listdir_attr(self, path):
+        return [
+            SFTPAttributes.from_stat(os.stat(e.path), e.name) for e in os.scandir(path)
+        ]
+
+    def open(self, path, mode="r"):
+        f = open(path, mode)
+        f.prefetch = lambda: None
+        return f
+
+
+class TestDirectoryArchive:
+    async def test_local_directory(self, client: AsyncTestClient, output_dir):
+        response = await client.get("/api/archive", params={"path": str(output_dir)})
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-tar"
+        assert 'filename="output.tar"' in response.headers["content-disposition"]
+        files = members(response.content)
+        assert sorted(files) == [
+            "large.bin",
+            "transcribe/audio_001.json",
+            "transcribe/audio_002.json",
+            "transcribe/notes.txt",
+        ]
+        assert files["large.bin"] == (output_dir / "large.bin").read_bytes()
+        assert files["transcribe/audio_002.json"] == b'{"text": "two"}'
+
+    @pytest.mark.parametrize(
+        "pattern, expected",
+        [
+            ("*.json", ["transcribe/audio_001.json", "transcribe/audio_002.json"]),
+            ("transcribe/*_001*", ["transcribe/audio_001.json"]),
+            ("*.wav", []),
+        ],
+    )
+    async def test_pattern(
+        self, client: AsyncTestClient, output_dir, pattern, expected
+    ):
+        response = await client.get(
+            "/api/archive", params={"path": str(output_dir), "pattern": pattern}
+        )
+
+        assert response.status_code == 200
+        assert sorted(members(response.content)) == expected
+
+    async def test_missing_directory(self, client: AsyncTestClient, tmp_path):
+        response = await client.get(
+            "/api/archive", params={"path": str(tmp_path / "missing")}
+        )
+        assert response.status_code == 404
+
+    async def test_not_a_directory(self, client: AsyncTestClient, output_dir):
+        response = await client.get(
+            "/api/archive", params={"path": str(output_dir / "large.bin")}
+        )
+        assert response.status_code == 400
+
+    async def test_remote_directory(self, client: AsyncTestClient, output_dir):
+        profile = SlurmProfile(
+            name="remote-cluster",
+            host="remote.example.com",
+            user="testuser",
+            home_dir="/home/testuser",
+            cache_dir="/home/testuser/.cache",
+        )
+        fake_sftp = FakeSFTP()
+        mock_connection = mock.MagicMock()
+        mock_connection.return_value.sftp.return_value = fake_sftp
+        mock_connection.return_value.client.open_sftp.return_value = fake_sftp
+
+        with (
+            mock.patch(
+                "blackfish.server.asgi._get_validated_remote_profile",
+                return_value=profile,
+            ),
+            mock.patch("blackfish.server.remote.session.Connection", mock_connection),
+        ):
+            response = await client.get(
+                "/api/archive",
+                params={
+                    "path": str(output_dir),
+                    "profile": "remote-cluster",
+                    "pattern": "*.json",
+                },
+            )
+
+        assert response.status_code == 200
+        files = members(response.content)
+        assert sorted(files) == [
+            "transcribe/audio_001.json",
+            "transcribe/audio_002.json",
+        ]
+        # The archive was read over a dedicated channel, which is closed after.
+        mock_connection.return_value.client.open_sftp.assert_called_once()
+        fake_sftp.close.assert_called()
+
+    async def test_long_remote_stream_outlasts_idle_timeout(self, output_dir):
+        fake_sftp = FakeSFTP()
+        mock_connection = mock.MagicMock()
+        mock_connection.return_value.sftp.return_value = fake_sftp
+        mock_connection.return_value.client.open_sftp.return_value = fake_sftp
+
+        with (
+            mock.patch.object(remote.session, "_pool", remote.session._SessionPool()),
+            mock.patch("blackfish.server.remote.session.Connection", mock_connection),
+        ):
+            chunks = archive.stream_tar(
+                str(output_dir), host="remote.example.com", user="testuser"
+            )
+            content = next(chunks)
+            # The download runs past the idle timeout while another request
+            # uses the pooled connection.
+            pooled = remote.session._pool.get("remote.example.com", "testuser")
+            pooled._last_used -= remote.session._IDLE_TIMEOUT_SECONDS + 1
+            with remote.acquire("remote.example.com", "testuser"):
+                pass
+            content += b"".join(chunks)
+
+        mock_connection.return_value.close.assert_not_called()
+        assert len(members(content)["large.bin"]) == 3 * archive.ARCHIVE_CHUNK_SIZE + 7
+
+
+class TestJobArchive:
+    @pytest.fixture
+    async def job(self, session: AsyncSession, output_dir, tmp_path):
+        job = await session.get(BatchJob, UUID(JOB_ID))
+        job.host = "localhost"
+        job.output_dir = str(output_dir)
+        job.input_dir = str(tmp_path / "input")
+        (tmp_path / "input").mkdir()
+        (tmp_path / "input" / "audio_003.wav").write_bytes(b"RIFF")
+        await session.commit()
+        return job
+
+    async def test_job_output_dir(self, client: AsyncTestClient, job):
+        response = await client.get(
+            f"/api/jobs/{JOB_ID}/archive", params={"pattern": "*.json"}
+        )
+
+        assert response.status_code == 200
+        assert f'filename="{job.name}.tar"' in response.headers["content-disposition"]
+        assert sorted(members(response.content)) == [
+            "transcribe/audio_001.json",
+            "transcribe/audio_002.json",
+        ]
+
+    async def test_job_name_is_escaped(
+        self, client: AsyncTestClient, session: AsyncSession, job
+    ):
+        job.name = 'run "1"; ok'
+        await session.commit()
+
+        response = await client.get(f"/api/jobs/{JOB_ID}/archive")
+
+        assert response.status_code == 200
+        assert response.headers["content-disposition"] == (
+            "attachment; filename*=utf-8''run%20%221%22%3B%20ok.tar"
+        )
+
+    @pytest.mark.parametrize(
+        "status, expected",
+        [
+            ("success", ["transcribe/audio_001.json"]),
+            ("error", ["inputs/audio_003.wav"]),
+        ],
+    )
+    async def test_select_by_result_status(
+        self, client: AsyncTestClient, job, status, expected
+    ):
+        results = [
+            mock.Mock(
+                status="success",
+                output_file=f"{job.output_dir}/transcribe/audio_001.json",
+                input_file=f"{job.input_dir}/audio_001.wav",
+            ),
+            mock.Mock(
+                status="error",
+                output_file=None,
+                input_file=f"{job.input_dir}/audio_003.wav",
+            ),
+        ]
+
+        async def query_results(session, job_id, *, status=None):
+            return [r for r in results if r.status == status], None
+
+        with (
+            mock.patch("blackfish.server.asgi._sync_job_results", mock.AsyncMock()),
+            mock.patch("blackfish.server.asgi.query_results", query_results),
+        ):
+            response = await client.get(
+                f"/api/jobs/{JOB_ID}/archive", params={"status": status}
+            )
+
+        assert response.status_code == 200
+        assert sorted(members(response.content)) == expected
+
+    async def test_job_not_found(self, client: AsyncTestClient):
+        response = await client.get(
+            "/api/jobs/550e8400-e29b-41d4-a716-446655440000/archive"
+        )
+        assert response.status_code == 404
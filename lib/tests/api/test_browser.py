@@ -1,16 +1,31 @@
 """API tests for WebSocket remote file browsing."""
 
+import asyncio
+import os
+import shlex
+import threading
+import time
+from datetime import datetime
+
 import pytest
 from unittest import mock
 
 from litestar.testing import AsyncTestClient
 
+from blackfish.server import browser, remote as remote_module
 from blackfish.server.models.profile import SlurmProfile, LocalProfile
 
 
 pytestmark = pytest.mark.anyio
 
 
+@pytest.fixture(autouse=True)
+def _clear_listing_cache():
+    browser._listing_cache.clear()
+    yield
+    browser._listing_cache.clear()
+
+
 class MockSFTPAttr:
     """Mock SFTPAttributes for testing."""
 
@@ -46,6 +61,9 @@ def create_mock_connection_class(mock_sftp):
     # .sftp() returns the mock_sftp directly (no context manager)
     mock_connection_instance.sftp.return_value = mock_sftp
 
+    # Dedicated channels (remote.channel) are opened via the paramiko client
+    mock_connection_instance.client.open_sftp.return_value = mock_sftp
+
     # normalize() is used by get_home_dir to resolve "."
     mock_sftp.normalize.return_value = "/home/testuser"
 
@@ -656,3 +674,645 @@ class TestRemoteFileBrowserWebSocket:
                 assert response["id"] == "req-1"
                 assert response["status"] == "error"
                 assert response["error"]["code"] == "permission_denied"
+
+
+class TestListingCache:
+    """Test that directory listings are served from the cache while current."""
+
+    @pytest.fixture
+    def remote(self):
+        remote_profile = SlurmProfile(
+            name="remote",
+            host="remote.example.com",
+            user="testuser",
+            home_dir="/home/testuser",
+            cache_dir="/home/testuser/.cache",
+        )
+        mock_sftp = mock.MagicMock()
+        mock_sftp.stat.return_value = MockSFTPAttr("data", 0o040755, 4096, 1000)
+        mock_sftp.listdir_attr.return_value = [
+            MockSFTPAttr("b.txt", 0o100644, 300, 1704067300),
+            MockSFTPAttr(".hidden", 0o100644, 100, 1704067100),
+            MockSFTPAttr("c.txt", 0o100644, 200, 1704067200),
+            MockSFTPAttr("a.txt", 0o100644, 100, 1704067400),
+        ]
+        with (
+            mock.patch(
+                "blackfish.server.browser.deserialize_profile",
+                return_value=remote_profile,
+            ),
+            mock.patch(
+                "blackfish.server.remote.session.Connection",
+                create_mock_connection_class(mock_sftp),
+            ),
+        ):
+            yield mock_sftp
+
+    @staticmethod
+    def list_names(ws, **params):
+        ws.send_json({"id": "req", "action": "list", "path": "/data", **params})
+        response = ws.receive_json()
+        assert response["status"] == "ok"
+        return [e["name"] for e in response["entries"]], response["total"]
+
+    async def test_paging_sorting_and_hidden_use_cache(
+        self, client: AsyncTestClient, remote
+    ):
+        with await client.websocket_connect("/ws/files/remote") as ws:
+            ws.receive_json()
+
+            assert self.list_names(ws) == (["b.txt", "c.txt", "a.txt"], 3)
+            assert self.list_names(ws, limit=2, offset=2) == (["a.txt"], 3)
+            assert self.list_names(ws, sort="name") == (["a.txt", "b.txt", "c.txt"], 3)
+            assert self.list_names(ws, sort="size", order="desc") == (
+                ["b.txt", "c.txt", "a.txt"],
+                3,
+            )
+            assert self.list_names(ws, sort="modified", show_hidden=True) == (
+                [".hidden", "c.txt", "b.txt", "a.txt"],
+                4,
+            )
+
+        assert remote.listdir_attr.call_count == 1
+
+    async def test_directory_change_invalidates(self, client: AsyncTestClient, remote):
+        with await client.websocket_connect("/ws/files/remote") as ws:
+            ws.receive_json()
+
+            self.list_names(ws)
+            remote.stat.return_value = MockSFTPAttr("data", 0o040755, 4096, 2000)
+            remote.listdir_attr.return_value = [
+                MockSFTPAttr("d.txt", 0o100644, 100, 1704067500),
+            ]
+            assert self.list_names(ws) == (["d.txt"], 1)
+
+        assert remote.listdir_attr.call_count == 2
+
+    @pytest.mark.parametrize(
+        "message",
+        [
+            {"action": "mkdir", "path": "/data/new"},
+            {"action": "delete", "path": "/data/a.txt"},
+            {"action": "rename", "old_path": "/data/a.txt", "new_path": "/x/a.txt"},
+            {"action": "rename", "old_path": "/x/a.txt", "new_path": "/data/a.txt"},
+        ],
+    )
+    async def test_local_changes_invalidate(
+        self, client: AsyncTestClient, remote, message
+    ):
+        with await client.websocket_connect("/ws/files/remote") as ws:
+            ws.receive_json()
+
+            self.list_names(ws)
+            # Same mtime: only the explicit invalidation forces a re-read.
+            ws.send_json({"id": "req", **message})
+            assert ws.receive_json()["status"] == "ok"
+            self.list_names(ws)
+
+        assert remote.listdir_attr.call_count == 2
+
+    async def test_refresh_bypasses_cache(self, client: AsyncTestClient, remote):
+        with await client.websocket_connect("/ws/files/remote") as ws:
+            ws.receive_json()
+
+            self.list_names(ws)
+            self.list_names(ws, refresh=True)
+
+        assert remote.listdir_attr.call_count == 2
+
+    async def test_expired_listing_reread(
+        self, client: AsyncTestClient, remote, monkeypatch
+    ):
+        with await client.websocket_connect("/ws/files/remote") as ws:
+            ws.receive_json()
+
+            self.list_names(ws)
+            monkeypatch.setattr(browser, "_LISTING_MAX_AGE_SECONDS", -1)
+            self.list_names(ws)
+
+        assert remote.listdir_attr.call_count == 2
+
+    async def test_cache_bounded(self):
+        cache = browser._ListingCache(max_dirs=2, max_entries=5)
+        attrs = [MockSFTPAttr("f", 0o100644, 1, 1)] * 2
+        for path in ("/a", "/b", "/c"):
+            cache.put(("h", "u", path), browser._DirectoryListing(1, attrs))
+
+        assert cache.get(("h", "u", "/a"), 1) is None
+        assert cache.get(("h", "u", "/b"), 1) is not None
+
+        cache.put(("h", "u", "/d"), browser._DirectoryListing(1, attrs * 2))
+        assert cache.get(("h", "u", "/c"), 1) is None
+        assert cache.get(("h", "u", "/b"), 1) is None
+        assert cache.get(("h", "u", "/d"), 1) is not None
+
+
+class TestStreamingList:
+    """Test streaming directory listings."""
+
+    @pytest.fixture
+    def remote(self):
+        remote_profile = SlurmProfile(
+            name="remote",
+            host="remote.example.com",
+            user="testuser",
+            home_dir="/home/testuser",
+            cache_dir="/home/testuser/.cache",
+        )
+        mock_sftp = mock.MagicMock()
+        mock_sftp.stat.return_value = MockSFTPAttr("data", 0o040755, 4096, 1000)
+        mock_sftp.listdir_iter.side_effect = lambda path: iter(
+            [MockSFTPAttr(f"file{i}.txt", 0o100644, i, 1704067200) for i in range(5)]
+            + [MockSFTPAttr(".hidden", 0o100644, 1, 1704067200)]
+        )
+        with (
+            mock.patch(
+                "blackfish.server.browser.deserialize_profile",
+                return_value=remote_profile,
+            ),
+            mock.patch(
+                "blackfish.server.remote.session.Connection",
+                create_mock_connection_class(mock_sftp),
+            ),
+        ):
+            yield mock_sftp
+
+    @staticmethod
+    def receive_stream(ws):
+        messages = []
+        while True:
+            message = ws.receive_json()
+            messages.append(message)
+            if message["status"] != "progress":
+                return messages
+
+    async def test_stream_sends_batches(self, client: AsyncTestClient, remote):
+        with await client.websocket_connect("/ws/files/remote") as ws:
+            ws.receive_json()
+            ws.send_json(
+                {
+                    "id": "s1",
+                    "action": "list",
+                    "path": "/data",
+                    "stream": True,
+                    "batch_size": 2,
+                }
+            )
+            messages = self.receive_stream(ws)
+
+        assert [m["status"] for m in messages] == [
+            "progress",
+            "progress",
+            "progress",
+            "ok",
+        ]
+        assert all(m["id"] == "s1" and m["stream"] for m in messages)
+        # The hidden file is filtered out of the third batch.
+        assert [len(m["entries"]) for m in messages] == [2, 2, 1, 0]
+        assert [m["count"] for m in messages] == [2, 4, 5, 5]
+        assert messages[-1]["total"] == 5
+        assert messages[0]["entries"][0]["path"] == "/data/file0.txt"
+        # The listing was read over a dedicated channel, which is closed after.
+        remote.listdir_iter.assert_called_once_with("/data")
+        remote.listdir_attr.assert_not_called()
+
+    async def test_completed_stream_populates_cache(
+        self, client: AsyncTestClient, remote
+    ):
+        with await client.websocket_connect("/ws/files/remote") as ws:
+            ws.receive_json()
+            ws.send_json(
+                {"id": "s1", "action": "list", "path": "/data", "stream": True}
+            )
+            assert self.receive_stream(ws)[-1]["total"] == 5
+
+            ws.send_json({"id": "l1", "action": "list", "path": "/data"})
+            assert ws.receive_json()["total"] == 5
+
+            ws.send_json(
+                {
+                    "id": "s2",
+                    "action": "list",
+                    "path": "/data",
+                    "stream": True,
+                    "show_hidden": True,
+                }
+            )
+            assert self.receive_stream(ws)[-1]["total"] == 6
+
+        remote.listdir_iter.assert_called_once()
+        remote.listdir_attr.assert_not_called()
+
+    async def test_cancel_stream(self, client: AsyncTestClient, remote):
+        remote.listdir_iter.side_effect = lambda path: (
+            MockSFTPAttr(f"file{i}.txt", 0o100644, i, 1704067200)
+            for i in range(1_000_000)
+        )
+        with await client.websocket_connect("/ws/files/remote") as ws:
+            ws.receive_json()
+            ws.send_json(
+                {
+                    "id": "s1",
+                    "action": "list",
+                    "path": "/data",
+                    "stream": True,
+                    "batch_size": 1,
+                }
+            )
+            assert ws.receive_json()["status"] == "progress"
+            ws.send_json({"id": "c1", "action": "cancel", "target": "s1"})
+
+            ack = final = None
+            while ack is None or final is None:
+                message = ws.receive_json()
+                if message["id"] == "c1":
+                    ack = message
+                elif message["status"] != "progress":
+                    final = message
+
+            # The stream is gone, so cancelling again is a no-op.
+            ws.send_json({"id": "c2", "action": "cancel", "target": "s1"})
+            again = ws.receive_json()
+
+        assert ack["status"] == "ok"
+        assert ack["data"] == {"cancelled": True}
+        assert final["status"] == "cancelled"
+        assert final["total"] < 1_000_000
+        assert again["data"] == {"cancelled": False}
+
+    async def test_stream_requires_id(self, client: AsyncTestClient, remote):
+        with await client.websocket_connect("/ws/files/remote") as ws:
+            ws.receive_json()
+            ws.send_json({"action": "list", "path": "/data", "stream": True})
+            response = ws.receive_json()
+
+        assert response["status"] == "error"
+        assert response["error"]["code"] == "invalid_request"
+
+    async def test_stream_error(self, client: AsyncTestClient, remote):
+        remote.listdir_iter.side_effect = PermissionError("denied")
+        with await client.websocket_connect("/ws/files/remote") as ws:
+            ws.receive_json()
+            ws.send_json(
+                {"id": "s1", "action": "list", "path": "/data", "stream": True}
+            )
+            response = ws.receive_json()
+
+        assert response["id"] == "s1"
+        assert response["status"] == "error"
+        assert response["error"]["code"] == "permission_denied"
+
+
+class TestConcurrentRequests:
+    """Test concurrent message handling and batch actions."""
+
+    @pytest.fixture
+    def remote(self):
+        remote_profile = SlurmProfile(
+            name="remote",
+            host="remote.example.com",
+            user="testuser",
+            home_dir="/home/testuser",
+            cache_dir="/home/testuser/.cache",
+        )
+        mock_sftp = mock.MagicMock()
+        mock_connection = create_mock_connection_class(mock_sftp)
+        with (
+            mock.patch(
+                "blackfish.server.browser.deserialize_profile",
+                return_value=remote_profile,
+            ),
+            mock.patch("blackfish.server.remote.session.Connection", mock_connection),
+        ):
+            yield mock_sftp, mock_connection.return_value.client.open_sftp
+
+    async def test_slow_request_does_not_block_others(
+        self, client: AsyncTestClient, remote
+    ):
+        mock_sftp, open_sftp = remote
+        fast_done = threading.Event()
+
+        def stat(path):
+            # The slow stat reports whether the fast one ran while it waited.
+            overlapped = path == "/slow" and fast_done.wait(timeout=30)
+            fast_done.set()
+            return MockSFTPAttr("x", 0o100644, int(overlapped), 1704067200)
+
+        mock_sftp.stat.side_effect = stat
+        with await client.websocket_connect("/ws/files/remote") as ws:
+            ws.receive_json()
+            ws.send_json({"id": "a", "action": "stat", "path": "/slow"})
+            ws.send_json({"id": "b", "action": "stat", "path": "/fast"})
+            replies = {r["id"]: r for r in (ws.receive_json(), ws.receive_json())}
+
+        assert replies["a"]["status"] == replies["b"]["status"] == "ok"
+        assert replies["a"]["entry"]["size"] == 1
+        # Each in-flight request had its own channel.
+        assert open_sftp.call_count == 2
+
+    async def test_channels_reused(self, client: AsyncTestClient, remote):
+        mock_sftp, open_sftp = remote
+        mock_sftp.stat.return_value = MockSFTPAttr("x", 0o100644, 1, 1704067200)
+        with await client.websocket_connect("/ws/files/remote") as ws:
+            ws.receive_json()
+            for i in range(3):
+                ws.send_json({"id": str(i), "action": "stat", "path": "/x"})
+                assert ws.receive_json()["status"] == "ok"
+
+        open_sftp.assert_called_once()
+
+    async def test_stat_many(self, client: AsyncTestClient, remote):
+        mock_sftp, _ = remote
+
+        def stat(path):
+            if path == "/missing":
+                raise FileNotFoundError(path)
+            return MockSFTPAttr("x", 0o100644, 42, 1704067200)
+
+        mock_sftp.stat.side_effect = stat
+        with await client.websocket_connect("/ws/files/remote") as ws:
+            ws.receive_json()
+            ws.send_json(
+                {
+                    "id": "m1",
+                    "action": "stat_many",
+                    "paths": ["/a.txt", "/missing", "/b.txt"],
+                }
+            )
+            response = ws.receive_json()
+
+        assert response["id"] == "m1"
+        assert response["status"] == "ok"
+        assert response["failed"] == 1
+        results = response["results"]
+        assert [r["path"] for r in results] == ["/a.txt", "/missing", "/b.txt"]
+        assert [r["status"] for r in results] == ["ok", "error", "ok"]
+        assert results[0]["entry"]["size"] == 42
+        assert results[1]["error"]["code"] == "not_found"
+
+    async def test_delete_many_removes_contents_first(
+        self, client: AsyncTestClient, remote
+    ):
+        mock_sftp, _ = remote
+        removed = []
+        dirs = {"/d", "/d/sub"}
+        mock_sftp.stat.side_effect = lambda path: MockSFTPAttr(
+            path, 0o040755 if path in dirs else 0o100644, 0, 1704067200
+        )
+        mock_sftp.remove.side_effect = removed.append
+        mock_sftp.rmdir.side_effect = removed.append
+
+        paths = ["/d", "/d/a.txt", "/d/sub", "/d/sub/b.txt"]
+        with await client.websocket_connect("/ws/files/remote") as ws:
+            ws.receive_json()
+            ws.send_json({"id": "m1", "action": "delete_many", "paths": paths})
+            response = ws.receive_json()
+
+        assert response["failed"] == 0
+        assert [r["path"] for r in response["results"]] == paths
+        assert removed[0] == "/d/sub/b.txt"
+        assert removed[-1] == "/d"
+        assert removed.index("/d/a.txt") < removed.index("/d")
+
+    async def test_rename_many_in_order(self, client: AsyncTestClient, remote):
+        mock_sftp, _ = remote
+        renamed = []
+        mock_sftp.rename.side_effect = lambda old, new: renamed.append((old, new))
+        renames = [
+            {"old_path": "/b", "new_path": "/c"},
+            {"old_path": "/a", "new_path": "/b"},
+        ]
+        with await client.websocket_connect("/ws/files/remote") as ws:
+            ws.receive_json()
+            ws.send_json({"id": "m1", "action": "rename_many", "renames": renames})
+            response = ws.receive_json()
+
+        assert response["failed"] == 0
+        assert renamed == [("/b", "/c"), ("/a", "/b")]
+        assert response["results"][0] == {
+            "old_path": "/b",
+            "new_path": "/c",
+            "status": "ok",
+        }
+
+    async def test_empty_batch_rejected(self, client: AsyncTestClient, remote):
+        with await client.websocket_connect("/ws/files/remote") as ws:
+            ws.receive_json()
+            ws.send_json({"id": "m1", "action": "delete_many", "paths": []})
+            response = ws.receive_json()
+
+        assert response["status"] == "error"
+        assert response["error"]["code"] == "invalid_request"
+
+
+class TestSearchAndDiskUsage:
+    """Test tree-wide search and disk usage.
+
+    The remote find/du commands are run in a local shell against a temporary
+    tree, so their construction and quoting are exercised for real.
+    """
+
+    @pytest.fixture
+    def tree(self, tmp_path):
+        root = tmp_path / "data my"
+        (root / "sub").mkdir(parents=True)
+        (root / ".hidden").mkdir()
+        (root / "a.wav").write_bytes(b"x" * 100)
+        (root / "b.WAV").write_bytes(b"x" * 2000)
+        (root / "notes.txt").write_bytes(b"x" * 10)
+        (root / "sub" / "c.wav").write_bytes(b"x" * 5000)
+        (root / ".hidden" / "d.wav").write_bytes(b"x")
+        os.utime(root / "a.wav", (0, datetime(2020, 1, 1).timestamp()))
+        return root
+
+    @pytest.fixture
+    def commands(self):
+        remote_profile = SlurmProfile(
+            name="remote",
+            host="remote.example.com",
+            user="testuser",
+            home_dir="/home/testuser",
+            cache_dir="/home/testuser/.cache",
+        )
+        mock_sftp = mock.MagicMock()
+        mock_sftp.stat.side_effect = os.stat
+        commands = []
+
+        async def local_ssh_lines(destination, command, *, timeout):
+            commands.append(command)
+            proc = await asyncio.create_subprocess_shell(
+                " ".join(command),
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
+            async for line in proc.stdout:
+                yield line
+            stderr = await proc.stderr.read()
+            if await proc.wait() != 0:
+                raise remote_module.RemoteCommandError(
+                    command, proc.returncode, b"", stderr
+                )
+
+        with (
+            mock.patch(
+                "blackfish.server.browser.deserialize_profile",
+                return_value=remote_profile,
+            ),
+            mock.patch(
+                "blackfish.server.remote.session.Connection",
+                create_mock_connection_class(mock_sftp),
+            ),
+            mock.patch("blackfish.server.remote.ssh_lines", local_ssh_lines),
+        ):
+            yield commands
+
+    @staticmethod
+    def run(client_ws, message):
+        client_ws.send_json({"id": "q1", **message})
+        messages = TestStreamingList.receive_stream(client_ws)
+        entries = [e for m in messages for e in m.get("entries", [])]
+        return messages, entries
+
+    async def test_search_by_pattern(self, client: AsyncTestClient, tree, commands):
+        with await client.websocket_connect("/ws/files/remote") as ws:
+            ws.receive_json()
+            messages, entries = self.run(
+                ws, {"action": "search", "path": str(tree), "pattern": "*.wav"}
+            )
+
+        assert messages[-1]["status"] == "ok"
+        assert messages[-1]["total"] == 2
+        # Hidden directories are skipped; the match is case-sensitive.
+        assert sorted(e["path"] for e in entries) == [
+            str(tree / "a.wav"),
+            str(tree / "sub" / "c.wav"),
+        ]
+        entry = next(e for e in entries if e["name"] == "c.wav")
+        assert entry["size"] == 5000
+        assert entry["is_dir"] is False
+        assert entry["permissions"] == "rw-r--r--"
+        # One remote command for the whole tree.
+        assert len(commands) == 1
+
+    @pytest.mark.parametrize(
+        "filters, expected",
+        [
+            ({"case_sensitive": False}, ["a.wav", "b.WAV", "c.wav"]),
+            ({"case_sensitive": False, "min_size": 2000}, ["b.WAV", "c.wav"]),
+            ({"case_sensitive": False, "max_size": 2000}, ["a.wav", "b.WAV"]),
+            ({"case_sensitive": False, "max_depth": 1}, ["a.wav", "b.WAV"]),
+            (
+                {"case_sensitive": False, "modified_before": "2021-01-01T00:00:00"},
+                ["a.wav"],
+            ),
+            (
+                {"case_sensitive": False, "modified_after": "2021-01-01T00:00:00"},
+                ["b.WAV", "c.wav"],
+            ),
+            ({"show_hidden": True}, ["a.wav", "c.wav", "d.wav"]),
+        ],
+    )
+    async def test_search_filters(
+        self, client: AsyncTestClient, tree, commands, filters, expected
+    ):
+        with await client.websocket_connect("/ws/files/remote") as ws:
+            ws.receive_json()
+            _, entries = self.run(
+                ws,
+                {"action": "search", "path": str(tree), "pattern": "*.wav", **filters},
+            )
+
+        assert sorted(e["name"] for e in entries) == expected
+
+    async def test_search_directories(self, client: AsyncTestClient, tree, commands):
+        with await client.websocket_connect("/ws/files/remote") as ws:
+            ws.receive_json()
+            _, entries = self.run(
+                ws, {"action": "search", "path": str(tree), "type": "dir"}
+            )
+
+        assert [(e["name"], e["is_dir"]) for e in entries] == [("sub", True)]
+
+    async def test_search_limit(self, client: AsyncTestClient, tree, commands):
+        with await client.websocket_connect("/ws/files/remote") as ws:
+            ws.receive_json()
+            messages, entries = self.run(
+                ws, {"action": "search", "path": str(tree), "limit": 2, "batch_size": 1}
+            )
+
+        assert len(entries) == 2
+        assert messages[-1]["status"] == "ok"
+        assert messages[-1]["truncated"] is True
+
+    async def test_search_pattern_is_not_shell_expanded(
+        self, client: AsyncTestClient, tree, commands
+    ):
+        with await client.websocket_connect("/ws/files/remote") as ws:
+            ws.receive_json()
+            messages, entries = self.run(
+                ws, {"action": "search", "path": str(tree), "pattern": "$(touch x)*"}
+            )
+
+        assert messages[-1]["status"] == "ok"
+        assert entries == []
+        assert shlex.split(" ".join(commands[0]))[1] == str(tree)
+
+    async def test_search_missing_directory(
+        self, client: AsyncTestClient, tree, commands
+    ):
+        with await client.websocket_connect("/ws/files/remote") as ws:
+            ws.receive_json()
+            messages, _ = self.run(
+                ws, {"action": "search", "path": str(tree / "missing")}
+            )
+
+        assert messages[-1]["status"] == "error"
+        assert messages[-1]["error"]["code"] == "not_found"
+        assert commands == []
+
+    async def test_disk_usage(self, client: AsyncTestClient, tree, commands):
+        with await client.websocket_connect("/ws/files/remote") as ws:
+            ws.receive_json()
+            messages, entries = self.run(
+                ws, {"action": "du", "path": str(tree), "apparent_size": True}
+            )
+
+        final = messages[-1]
+        assert final["status"] == "ok"
+        sizes = {e["path"]: e["size"] for e in entries}
+        assert set(sizes) == {str(tree), str(tree / "sub"), str(tree / ".hidden")}
+        assert sizes[str(tree / "sub")] >= 5000
+        assert final["size"] == sizes[str(tree)]
+        assert final["size"] >= 100 + 2000 + 10 + 5000 + 1
+
+    async def test_cancel_search(self, client: AsyncTestClient, tree, commands):
+        async def endless(destination, command, *, timeout):
+            i = 0
+            while True:
+                i += 1
+                await asyncio.sleep(0)
+                yield f"f\t1\t{time.time()}\t644\t/d/{i}\n".encode()
+
+        with mock.patch("blackfish.server.remote.ssh_lines", endless):
+            with await client.websocket_connect("/ws/files/remote") as ws:
+                ws.receive_json()
+                ws.send_json(
+                    {
+                        "id": "s1",
+                        "action": "search",
+                        "path": str(tree),
+                        "limit": 1_000_000,
+                        "batch_size": 10,
+                    }
+                )
+                assert ws.receive_json()["status"] == "progress"
+                ws.send_json({"id": "c1", "action": "cancel", "target": "s1"})
+
+                final = None
+                while final is None:
+                    message = ws.receive_json()
+                    if message["id"] == "s1" and message["status"] != "progress":
+                        final = message
+
+        assert final["status"] == "cancelled"
+        assert final["total"] < 1_000_000
@@ -0,0 +1,197 @@
+"""API tests for consolidated exports of batch job outputs."""
+
+import io
+import json
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from unittest import mock
+from uuid import UUID
+
+import pytest
+from litestar.testing import AsyncTestClient
+from paramiko.ssh_exception import SSHException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from blackfish.server.jobs.base import BatchJob
+from blackfish.server.jobs.results import BatchJobResult, record_results
+
+
+pytestmark = pytest.mark.anyio
+
+JOB_ID = "2a7a8e62-40cc-4240-a825-463e5b11a81f"
+
+T0 = datetime(2026, 10, 19, 12, 0, tzinfo=timezone.utc)
+
+
+def lines(content: bytes) -> list[dict]:
+    return [json.loads(line) for line in content.decode().splitlines()]
+
+
+class TestJobExport:
+    @pytest.fixture
+    async def job(self, session: AsyncSession, tmp_path):
+        output_dir = tmp_path / "output"
+        (output_dir / "transcribe").mkdir(parents=True)
+        (output_dir / "transcribe" / "audio_001.json").write_text('{"text": "one"}')
+        (output_dir / "transcribe" / "audio_002.txt").write_text("two")
+        job = await session.get(BatchJob, UUID(JOB_ID))
+        job.host = "localhost"
+        job.input_dir = str(tmp_path / "input")
+        job.output_dir = str(output_dir)
+        await session.commit()
+        return job
+
+    def result(self, job, name, *, seconds, output=None, error=None):
+        return BatchJobResult(
+            job_id=job.id,
+            task="transcribe",
+            file=f"{name}.wav",
+            input_file=f"{job.input_dir}/{name}.wav",
+            output_file=f"{job.output_dir}/transcribe/{output}" if output else None,
+            started_at=T0,
+            finished_at=T0 + timedelta(seconds=seconds),
+            duration_ms=seconds * 1000.0,
+            status="error" if error else "success",
+            error=error,
+        )
+
+    @pytest.fixture
+    async def results(self, session: AsyncSession, job):
+        await record_results(
+            session,
+            [
+                self.result(job, "audio_001", seconds=1, output="audio_001.json"),
+                self.result(job, "audio_002", seconds=2, output="audio_002.txt"),
+                self.result(job, "audio_003", seconds=3, error="Corrupt file"),
+            ],
+        )
+        await session.commit()
+
+    @pytest.fixture(autouse=True)
+    def synced(self):
+        with mock.patch("blackfish.server.asgi._sync_job_results", mock.AsyncMock()):
+            yield
+
+    async def test_jsonl(self, client: AsyncTestClient, job, results):
+        response = await client.get(f"/api/jobs/{JOB_ID}/export")
+
+        assert response.status_code == 200
+        assert f'filename="{job.name}.jsonl"' in response.headers["content-disposition"]
+        rows = lines(response.content)
+        assert [row["input_file"] for row in rows] == [
+            f"{job.input_dir}/audio_001.wav",
+            f"{job.input_dir}/audio_002.wav",
+            f"{job.input_dir}/audio_003.wav",
+        ]
+        assert rows[0]["task"] == "transcribe"
+        assert rows[0]["duration_ms"] == 1000.0
+        # JSON outputs are parsed, other text is kept as is.
+        assert rows[0]["output"] == {"text": "one"}
+        assert rows[1]["output"] == "two"
+        assert rows[2]["status"] == "error"
+        assert rows[2]["error"] == "Corrupt file"
+        assert rows[2]["output"] is None
+
+    async def test_filters(self, client: AsyncTestClient, job, results):
+        response = await client.get(
+            f"/api/jobs/{JOB_ID}/export", params={"status": "error"}
+        )
+
+        assert response.status_code == 200
+        assert [row["status"] for row in lines(response.content)] == ["error"]
+
+    async def test_continue_from_cursor(
+        self, client: AsyncTestClient, session: AsyncSession, job, results
+    ):
+        first = await client.get(f"/api/jobs/{JOB_ID}/export")
+        cursor = first.headers["x-next-cursor"]
+
+        # Nothing new yet: the cursor stays where it was.
+        again = await client.get(f"/api/jobs/{JOB_ID}/export", params={"after": cursor})
+        assert again.content == b""
+        assert again.headers["x-next-cursor"] == cursor
+
+        (Path(job.output_dir) / "transcribe" / "audio_004.json").write_text("[]")
+        await record_results(
+            session, [self.result(job, "audio_004", seconds=4, output="audio_004.json")]
+        )
+        await session.commit()
+
+        response = await client.get(
+            f"/api/jobs/{JOB_ID}/export", params={"after": cursor}
+        )
+        rows = lines(response.content)
+        assert [row["input_file"] for row in rows] == [f"{job.input_dir}/audio_004.wav"]
+        assert rows[0]["output"] == []
+        assert response.headers["x-next-cursor"] != cursor
+
+    async def test_missing_output(self, client: AsyncTestClient, job, results):
+        (Path(job.output_dir) / "transcribe" / "audio_001.json").unlink()
+
+        response = await client.get(f"/api/jobs/{JOB_ID}/export")
+
+        assert response.status_code == 200
+        assert lines(response.content)[0]["output"] is None
+
+    async def test_unreadable_output(self, client: AsyncTestClient, job, results):
+        output = Path(job.output_dir) / "transcribe" / "audio_002.txt"
+        output.unlink()
+        output.mkdir()
+
+        response = await client.get(f"/api/jobs/{JOB_ID}/export")
+
+        assert response.status_code == 200
+        rows = lines(response.content)
+        assert [row["output"] for row in rows] == [{"text": "one"}, None, None]
+
+    async def test_ssh_failure_reading_output(
+        self, client: AsyncTestClient, job, results
+    ):
+        source = mock.MagicMock()
+        source.stat.return_value.st_size = 10
+        source.open.side_effect = SSHException("Failure")
+
+        with mock.patch("blackfish.server.export.open_source", return_value=source):
+            response = await client.get(f"/api/jobs/{JOB_ID}/export")
+
+        assert response.status_code == 200
+        assert [row["output"] for row in lines(response.content)] == [None] * 3
+        source.close.assert_called_once()
+
+    async def test_parquet(self, client: AsyncTestClient, job, results):
+        pq = pytest.importorskip("pyarrow.parquet")
+
+        with mock.patch("blackfish.server.export.EXPORT_BATCH_SIZE", 2):
+            response = await client.get(
+                f"/api/jobs/{JOB_ID}/export", params={"format": "parquet"}
+            )
+
+        assert response.status_code == 200
+        table = pq.read_table(io.BytesIO(response.content))
+        assert table.num_rows == 3
+        assert table.column("output").to_pylist() == ['{"text": "one"}', "two", None]
+        assert table.column("status").to_pylist() == ["success", "success", "error"]
+        assert pq.ParquetFile(io.BytesIO(response.content)).num_row_groups == 2
+
+    async def test_parquet_unavailable(self, client: AsyncTestClient, job):
+        with mock.patch(
+            "blackfish.server.export.parquet_available", return_value=False
+        ):
+            response = await client.get(
+                f"/api/jobs/{JOB_ID}/export", params={"format": "parquet"}
+            )
+
+        assert response.status_code == 400
+        assert "pyarrow" in response.json()["detail"]
+
+    async def test_invalid_cursor(self, client: AsyncTestClient, job):
+        response = await client.get(
+            f"/api/jobs/{JOB_ID}/export", params={"after": "not-a-cursor"}
+        )
+        assert response.status_code == 400
+
+    async def test_job_not_found(self, client: AsyncTestClient):
+        response = await client.get(
+            "/api/jobs/550e8400-e29b-41d4-a716-446655440000/export"
+        )
+        assert response.status_code == 404
@@ -1,11 +1,14 @@
+import asyncio
 import pytest
 from uuid import UUID
 from sqlalchemy.ext.asyncio import AsyncSession
+from litestar.exceptions import ImproperlyConfiguredException
 from litestar.testing import AsyncTestClient
-from unittest.mock import patch, AsyncMock
+from unittest.mock import patch, AsyncMock, Mock
 
 from blackfish.server.jobs.base import BatchJob, BatchJobStatus
 from blackfish.server.jobs.client import TigerFlowVersions
+from blackfish.server.jobs.queue import QueueLimits
 
 pytestmark = pytest.mark.anyio
 
@@ -197,6 +200,39 @@ class TestGetBatchJobsAPI:
         result = response.json()
         assert len(result) == 3  # Test fixtures have 3 jobs
 
+    async def test_fetch_jobs_polls_without_supervisor(
+        self, app, client: AsyncTestClient
+    ):
+        """With background polling off, listing polls the active jobs."""
+
+        async def poll(self, client, app_config, **kwargs):
+            self.status = BatchJobStatus.RUNNING
+            return self.status
+
+        with (
+            patch.object(app.state, "job_supervisor", None, create=True),
+            patch("blackfish.server.asgi.create_tigerflow_client"),
+            patch.object(BatchJob, "poll", autospec=True, side_effect=poll) as mock,
+        ):
+            response = await client.get("/api/jobs")
+
+        assert response.status_code == 200
+        assert mock.call_count == 3
+        assert {job["status"] for job in response.json()} == {"running"}
+
+    async def test_fetch_jobs_leaves_polling_to_supervisor(
+        self, app, client: AsyncTestClient
+    ):
+        """The supervisor polls jobs in the background, so listing doesn't."""
+        with (
+            patch.object(app.state, "job_supervisor", Mock(), create=True),
+            patch.object(BatchJob, "poll", new_callable=AsyncMock) as mock_poll,
+        ):
+            response = await client.get("/api/jobs")
+
+        assert response.status_code == 200
+        mock_poll.assert_not_called()
+
     async def test_fetch_jobs_by_id(self, client: AsyncTestClient):
         """Test fetching jobs by specific ID."""
         job_id = "2a7a8e62-40cc-4240-a825-463e5b11a81f"
@@ -996,6 +1032,121 @@ class TestGetJobResultsAPI:
         body = response.json()
         assert "Failed to fetch job results" in body["detail"]
 
+    @staticmethod
+    def _report(*files):
+        from blackfish.server.jobs.client import TigerFlowReport
+
+        return TigerFlowReport.model_validate(
+            {
+                "status": {"running": False, "pid": None},
+                "progress": {
+                    "pipeline": {
+                        "finished": len(files),
+                        "in_progress": 0,
+                        "staged": 0,
+                        "errored": 0,
+                    },
+                    "tasks": [],
+                },
+                "metrics": {
+                    "transcribe": {
+                        "count": len(files),
+                        "avg_ms": 0.0,
+                        "min_ms": 0.0,
+                        "max_ms": 0.0,
+                        "durations": [],
+                        "files": [
+                            {
+                                "file": file,
+                                "started_at": "2026-04-03T10:00:00+00:00",
+                                "finished_at": f"2026-04-03T10:00:0{i}+00:00",
+                                "duration_ms": float(i),
+                                "status": status,
+                            }
+                            for i, (file, status) in enumerate(files)
+                        ],
+                    },
+                },
+                "errors": {},
+            }
+        )
+
+    @patch("blackfish.server.asgi.create_tigerflow_client")
+    async def test_get_results_filtered_and_paged(
+        self,
+        mock_create_client,
+        client: AsyncTestClient,
+    ):
+        """Results are filtered by status and paged with the X-Next-Cursor header."""
+        job_id = "2a7a8e62-40cc-4240-a825-463e5b11a81f"
+
+        mock_tigerflow = AsyncMock()
+        mock_tigerflow.report = AsyncMock(
+            return_value=self._report(
+                ("a.wav", "success"),
+                ("b.wav", "error"),
+                ("c.wav", "success"),
+                ("d.wav", "success"),
+            )
+        )
+        mock_create_client.return_value = mock_tigerflow
+
+        url = f"/api/jobs/{job_id}/results?status=success&sort=duration&order=desc"
+        response = await client.get(f"{url}&limit=2")
+        assert response.status_code == 200
+        assert [r["file"] for r in response.json()] == ["d.wav", "c.wav"]
+        cursor = response.headers["x-next-cursor"]
+
+        response = await client.get(f"{url}&limit=2&after={cursor}")
+        assert response.status_code == 200
+        assert [r["file"] for r in response.json()] == ["a.wav"]
+        assert "x-next-cursor" not in response.headers
+
+    @patch("blackfish.server.asgi.create_tigerflow_client")
+    async def test_get_results_of_stopped_job_read_once(
+        self,
+        mock_create_client,
+        client: AsyncTestClient,
+        session: AsyncSession,
+    ):
+        """A stopped job's results are recorded on first request, then served
+        from the database."""
+        job_id = "2a7a8e62-40cc-4240-a825-463e5b11a81f"
+        job = await session.get(BatchJob, UUID(job_id))
+        job.status = BatchJobStatus.STOPPED
+        await session.commit()
+
+        mock_tigerflow = AsyncMock()
+        mock_tigerflow.report = AsyncMock(
+            return_value=self._report(("a.wav", "success"), ("b.wav", "error"))
+        )
+        mock_create_client.return_value = mock_tigerflow
+
+        first = await client.get(f"/api/jobs/{job_id}/results")
+        second = await client.get(f"/api/jobs/{job_id}/results?status=error")
+
+        assert [r["file"] for r in first.json()] == ["a.wav", "b.wav"]
+        assert [r["file"] for r in second.json()] == ["b.wav"]
+        mock_tigerflow.report.assert_awaited_once()
+
+    @patch("blackfish.server.asgi.create_tigerflow_client")
+    async def test_get_results_invalid_cursor(
+        self,
+        mock_create_client,
+        client: AsyncTestClient,
+    ):
+        """A malformed pagination cursor is a bad request."""
+        job_id = "2a7a8e62-40cc-4240-a825-463e5b11a81f"
+
+        mock_tigerflow = AsyncMock()
+        mock_tigerflow.report = AsyncMock(return_value=self._report())
+        mock_create_client.return_value = mock_tigerflow
+
+        response = await client.get(f"/api/jobs/{job_id}/results?after=bogus")
+
+        assert response.status_code == 400
+        assert "Invalid cursor" in response.json()["detail"]
+
     async def test_get_results_not_found(self, client: AsyncTestClient):
         """Test fetching results for a nonexistent job."""
         nonexistent_id = "550e8400-e29b-41d4-a716-446655440000"
@@ -1011,6 +1162,122 @@ class TestGetJobResultsAPI:
         assert response.status_code == 401
 
 
+class TestGetJobAnalyticsAPI:
+    """Test cases for the GET /api/jobs/{id}/analytics endpoint."""
+
+    @patch("blackfish.server.asgi.create_tigerflow_client")
+    async def test_get_analytics_of_stopped_slurm_job(
+        self,
+        mock_create_client,
+        client: AsyncTestClient,
+        session: AsyncSession,
+    ):
+        """A stopped job is measured up to its last result, and a Slurm job's
+        walltime projects its restarts."""
+        job_id = "2a7a8e62-40cc-4240-a825-463e5b11a81f"
+        job = await session.get(BatchJob, UUID(job_id))
+        job.status = BatchJobStatus.STOPPED
+        job.profile = "hpc"
+        job.resources = {"time": "00:00:02"}
+        job.staged = 6
+        await session.commit()
+
+        mock_tigerflow = AsyncMock()
+        mock_tigerflow.report = AsyncMock(
+            return_value=TestGetJobResultsAPI._report(
+                ("a.wav", "success"), ("b.wav", "error"), ("c.wav", "success")
+            )
+        )
+        mock_create_client.return_value = mock_tigerflow
+
+        response = await client.get(f"/api/jobs/{job_id}/analytics")
+
+        assert response.status_code == 200
+        data = response.json()
+        # Two successes in the two seconds between the first start and the
+        # last finish.
+        assert [w["files"] for w in data["throughput"]] == [2, 2, 2]
+        assert data["files_per_second"] == pytest.approx(1.0)
+        assert data["eta_seconds"] == pytest.approx(6.0)
+        assert data["walltime_seconds"] == 2
+        assert data["projected_restarts"] == 2
+        [latency] = data["latency"]
+        assert latency["task"] == "transcribe"
+        assert latency["count"] == 2
+        assert latency["max_ms"] == 2.0
+
+    async def test_get_analytics_not_found(self, client: AsyncTestClient):
+        """Test that an unknown job returns 404."""
+        response = await client.get(
+            "/api/jobs/00000000-0000-0000-0000-000000000000/analytics"
+        )
+
+        assert response.status_code == 404
+
+
+class TestGetJobEstimateAPI:
+    """Test cases for the GET /api/jobs/{id}/estimate endpoint."""
+
+    @patch("blackfish.server.asgi.create_tigerflow_client")
+    async def test_get_estimate_of_sampling_job(
+        self,
+        mock_create_client,
+        client: AsyncTestClient,
+        session: AsyncSession,
+    ):
+        """A sample's mean time per file is projected to the whole input."""
+        job_id = "2a7a8e62-40cc-4240-a825-463e5b11a81f"
+        job = await session.get(BatchJob, UUID(job_id))
+        job.status = BatchJobStatus.STOPPED
+        job.profile = "hpc"
+        job.resources = {"time": "01:00:00", "gpus": 1}
+        job.sample = 3
+        job.input_count = 1000
+        await session.commit()
+
+        mock_tigerflow = AsyncMock()
+        mock_tigerflow.report = AsyncMock(
+            return_value=TestGetJobResultsAPI._report(
+                ("a.wav", "success"), ("b.wav", "success"), ("c.wav", "success")
+            )
+        )
+        mock_create_client.return_value = mock_tigerflow
+
+        response = await client.get(
+            f"/api/jobs/{job_id}/estimate", params={"shards": [1, 4]}
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["sampled"] == 3
+        assert data["succeeded"] == 3
+        # Durations of 0, 1 and 2 ms.
+        assert data["seconds_per_file"] == pytest.approx(0.001)
+        assert data["walltime_seconds"] == 3600
+        one, four = data["projections"]
+        assert (one["shards"], one["files_per_shard"]) == (1, 1000)
+        assert one["allocations"] == 1
+        assert one["wall_clock_seconds"] == pytest.approx(1 + 600)
+        assert (four["shards"], four["files_per_shard"]) == (4, 250)
+
+    async def test_get_estimate_of_regular_job(self, client: AsyncTestClient):
+        """Only a sampling job has an estimate."""
+        response = await client.get(
+            "/api/jobs/2a7a8e62-40cc-4240-a825-463e5b11a81f/estimate"
+        )
+
+        assert response.status_code == 400
+        assert "not a sampling job" in response.json()["detail"]
+
+    async def test_get_estimate_not_found(self, client: AsyncTestClient):
+        """Test that an unknown job returns 404."""
+        response = await client.get(
+            "/api/jobs/00000000-0000-0000-0000-000000000000/estimate"
+        )
+
+        assert response.status_code == 404
+
+
 class TestCreateBatchJobAPI:
     """Test cases for the POST /api/jobs endpoint."""
 
@@ -1042,6 +1309,141 @@ class TestCreateBatchJobAPI:
             assert job["repo_id"] == "openai/whisper-large-v3"
             assert job["profile"] == "test"  # only returns the name
 
+    async def test_create_job_queued_at_cap(
+        self, app, client: AsyncTestClient, session: AsyncSession
+    ):
+        """A job over the allocation caps is queued instead of started."""
+        running = await session.get(
+            BatchJob, UUID("2a7a8e62-40cc-4240-a825-463e5b11a81f")
+        )
+        running.status = BatchJobStatus.RUNNING
+        await session.commit()
+        data = {
+            "name": "transcribe-batch-test",
+            "task": "transcribe",
+            "repo_id": "openai/whisper-large-v3",
+            "profile": {
+                "name": "test",
+                "home_dir": "/home/test",
+                "cache_dir": "/cache",
+            },
+            "input_dir": "/data/input",
+            "output_dir": "/data/output",
+            "priority": 5,
+        }
+        supervisor = Mock(admission=asyncio.Lock())
+
+        with (
+            patch.object(app.state, "job_supervisor", supervisor, create=True),
+            patch(
+                "blackfish.server.asgi.QueueLimits.from_config",
+                return_value=QueueLimits(per_profile=1),
+            ),
+            patch.object(BatchJob, "start", new_callable=AsyncMock) as mock_start,
+            patch.object(BatchJob, "preflight", new_callable=AsyncMock),
+        ):
+            response = await client.post("/api/jobs", json=data)
+
+        assert response.status_code == 201
+        mock_start.assert_not_called()
+        job = response.json()
+        assert job["status"] == "queued"
+        assert job["priority"] == 5
+        assert job["queue_position"] == 1
+        # Admission is released once the request's changes are committed.
+        assert not supervisor.admission.locked()
+
+    async def test_caps_need_background_polling(self, app):
+        """The server won't start with caps it has no supervisor to enforce."""
+        from blackfish.server.asgi import start_job_supervisor
+
+        with (
+            patch.object(app.state, "JOB_POLL_INTERVAL", 0),
+            patch.object(app.state, "MAX_ALLOCATIONS_PER_USER", 2),
+            pytest.raises(ImproperlyConfiguredException),
+        ):
+            await start_job_supervisor(app)
+
+    async def test_create_job_over_cap_rejected(self, app, client: AsyncTestClient):
+        """A job with more shards than a cap allows could never start."""
+        data = {
+            "name": "transcribe-batch-test",
+            "task": "transcribe",
+            "repo_id": "openai/whisper-large-v3",
+            "profile": {
+                "name": "test",
+                "home_dir": "/home/test",
+                "cache_dir": "/cache",
+            },
+            "input_dir": "/data/input",
+            "output_dir": "/data/output",
+            "shards": 4,
+        }
+        supervisor = Mock(admission=asyncio.Lock())
+
+        with (
+            patch.object(app.state, "job_supervisor", supervisor, create=True),
+            patch(
+                "blackfish.server.asgi.QueueLimits.from_config",
+                return_value=QueueLimits(per_profile=2),
+            ),
+            patch.object(BatchJob, "start", new_callable=AsyncMock) as mock_start,
+            patch.object(BatchJob, "preflight", new_callable=AsyncMock),
+        ):
+            response = await client.post("/api/jobs", json=data)
+
+        assert response.status_code == 400
+        assert "at most 2 per profile" in response.json()["detail"]
+        mock_start.assert_not_called()
+        assert not supervisor.admission.locked()
+
+    async def test_create_job_estimate(self, client: AsyncTestClient):
+        """A sampling job runs on `sample` files, in a single allocation."""
+        data = {
+            "name": "transcribe-batch-test",
+            "task": "transcribe",
+            "repo_id": "openai/whisper-large-v3",
+            "profile": {
+                "name": "test",
+                "home_dir": "/home/test",
+                "cache_dir": "/cache",
+            },
+            "input_dir": "/data/input",
+            "output_dir": "/data/output",
+            "sample": 10,
+        }
+
+        with patch.object(BatchJob, "start", new_callable=AsyncMock) as mock_start:
+            response = await client.post("/api/jobs/estimate", json=data)
+
+        assert response.status_code == 201
+        mock_start.assert_called_once()
+        job = response.json()
+        assert job["sample"] == 10
+        assert job["max_restarts"] == 0
+
+    async def test_create_job_with_result_cache(self, client: AsyncTestClient):
+        """The result cache lives in the profile's cache directory."""
+        data = {
+            "name": "transcribe-batch-test",
+            "task": "transcribe",
+            "repo_id": "openai/whisper-large-v3",
+            "profile": {
+                "name": "test",
+                "home_dir": "/home/test",
+                "cache_dir": "/cache",
+            },
+            "input_dir": "/data/input",
+            "output_dir": "/data/output",
+            "result_cache": True,
+        }
+
+        with patch.object(BatchJob, "start", new_callable=AsyncMock):
+            response = await client.post("/api/jobs", json=data)
+
+        assert response.status_code == 201
+        assert response.json()["result_cache"] == "/cache/results"
+
     async def test_create_job_with_pinned_image(self, client: AsyncTestClient):
         """A pinned image_ref is persisted on the job."""
 
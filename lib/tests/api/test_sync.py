@@ -0,0 +1,294 @@
+"""API tests for delta directory sync."""
+
+import json
+import os
+import subprocess
+from unittest import mock
+
+import pytest
+from litestar.testing import AsyncTestClient
+from paramiko import SFTPAttributes
+
+from blackfish.server import remote
+from blackfish.server.models.profile import SlurmProfile
+
+
+pytestmark = pytest.mark.anyio
+
+PROFILE = SlurmProfile(
+    name="remote-cluster",
+    host="remote.example.com",
+    user="testuser",
+    home_dir="/home/testuser",
+    cache_dir="/home/testuser/.cache",
+)
+
+
+class FakeSFTP:
+    """Minimal SFTP client backed by the local filesystem."""
+
+    def __init__(self):
+        self.close = mock.MagicMock()
+        self.normalize = mock.MagicMock(return_value="/home/testuser")
+        self.uploaded: list[str] = []
+
+    def stat(self, path):
+        return SFTPAttributes.from_stat(os.stat(path))
+
+    def listdir_attr(self, path):
+        return [
+            SFTPAttributes.from_stat(os.stat(e.path), e.name) for e in os.scandir(path)
+        ]
+
+    def mkdir(self, path):
+        os.mkdir(path)
+
+    def remove(self, path):
+        os.remove(path)
+
+    def posix_rename(self, old_path, new_path):
+        os.replace(old_path, new_path)
+
+    def utime(self, path, times):
+        os.utime(path, times)
+
+    def putfo(self, fl, remotepath, file_size=0, callback=None, confirm=True):
+        self.uploaded.append(remotepath)
+        with open(remotepath, "wb") as f:
+            while chunk := fl.read(4096):
+                f.write(chunk)
+                if callback is not None:
+                    callback(f.tell(), file_size)
+
+
+@pytest.fixture
+def trees(tmp_path):
+    source = tmp_path / "source"
+    (source / "audio" / "day1").mkdir(parents=True)
+    (source / "audio" / "day1" / "a.wav").write_bytes(b"a" * 5000)
+    (source / "audio" / "day1" / "b.wav").write_bytes(b"b" * 10)
+    (source / "audio" / "c.wav").write_bytes(b"c" * 20)
+    (source / "notes.txt").write_text("notes")
+
+    destination = tmp_path / "scratch" / "input"
+    (destination / "audio").mkdir(parents=True)
+    # Already staged with a plain copy: same size, later mtime.
+    (destination / "audio" / "c.wav").write_bytes(b"c" * 20)
+    # Stale copy: same size, older than the local file.
+    (destination / "notes.txt").write_text("NOTES")
+    os.utime(destination / "notes.txt", (0, 0))
+    # Truncated copy.
+    (destination / "audio" / "day1").mkdir()
+    (destination / "audio" / "day1" / "a.wav").write_bytes(b"a" * 100)
+    # Only on the remote; never deleted.
+    (destination / "extra.wav").write_bytes(b"x")
+    return source, destination
+
+
+@pytest.fixture
+def fake_sftp():
+    sftp = FakeSFTP()
+    connection = mock.MagicMock()
+    connection.return_value.sftp.return_value = sftp
+    connection.return_value.client.open_sftp.return_value = sftp
+    with (
+        mock.patch(
+            "blackfish.server.asgi._get_validated_remote_profile",
+            return_value=PROFILE,
+        ),
+        mock.patch("blackfish.server.remote.session.Connection", connection),
+    ):
+        yield sftp
+
+
+def events(content: bytes) -> list[dict]:
+    return [json.loads(line) for line in content.splitlines()]
+
+
+class TestSyncPlan:
+    async def test_plan_by_size_and_mtime(
+        self, client: AsyncTestClient, trees, fake_sftp
+    ):
+        source, destination = trees
+        response = await client.post(
+            "/api/sync/plan",
+            json={
+                "source": str(source),
+                "destination": str(destination),
+                "profile": "remote-cluster",
+            },
+        )
+
+        assert response.status_code == 200
+        plan = response.json()
+        assert {f["path"]: f["reason"] for f in plan["transfers"]} == {
+            "audio/day1/a.wav": "size",
+            "audio/day1/b.wav": "missing",
+            "notes.txt": "mtime",
+        }
+        assert plan["unchanged"] == 1
+        assert plan["total_bytes"] == 5000 + 10 + 5
+        assert fake_sftp.uploaded == []
+
+    async def test_plan_by_checksum(self, client: AsyncTestClient, trees, fake_sftp):
+        source, destination = trees
+        # Make the stale copy look current; only its content differs.
+        os.utime(destination / "notes.txt")
+
+        async def ssh(destination, command, *, timeout):
+            # The command is quoted for a remote shell; run it in a local one.
+            result = subprocess.run(" ".join(command), shell=True, capture_output=True)
+            return remote.CompletedProcess(result.returncode, result.stdout, b"")
+
+        with mock.patch("blackfish.server.remote.ssh", side_effect=ssh) as mock_ssh:
+            response = await client.post(
+                "/api/sync/plan",
+                json={
+                    "source": str(source),
+                    "destination": str(destination),
+                    "profile": "remote-cluster",
+                    "checksum": True,
+                },
+            )
+
+        assert response.status_code == 200
+        plan = response.json()
+        assert {f["path"]: f["reason"] for f in plan["transfers"]} == {
+            "audio/day1/a.wav": "size",
+            "audio/day1/b.wav": "missing",
+            "notes.txt": "checksum",
+        }
+        # Only files of equal size are hashed.
+        command = mock_ssh.call_args.args[1]
+        assert sorted(command[-2:]) == ["audio/c.wav", "notes.txt"]
+
+    async def test_missing_destination_is_empty(
+        self, client: AsyncTestClient, trees, fake_sftp, tmp_path
+    ):
+        source, _ = trees
+        response = await client.post(
+            "/api/sync/plan",
+            json={
+                "source": str(source),
+                "destination": str(tmp_path / "new" / "input"),
+                "profile": "remote-cluster",
+            },
+        )
+
+        assert response.status_code == 200
+        plan = response.json()
+        assert len(plan["transfers"]) == 4
+        assert {f["reason"] for f in plan["transfers"]} == {"missing"}
+
+    async def test_missing_source(self, client: AsyncTestClient, fake_sftp, tmp_path):
+        response = await client.post(
+            "/api/sync/plan",
+            json={
+                "source": str(tmp_path / "missing"),
+                "destination": str(tmp_path),
+                "profile": "remote-cluster",
+            },
+        )
+        assert response.status_code == 404
+
+    async def test_destination_not_a_directory(
+        self, client: AsyncTestClient, trees, fake_sftp
+    ):
+        source, destination = trees
+        response = await client.post(
+            "/api/sync/plan",
+            json={
+                "source": str(source),
+                "destination": str(destination / "extra.wav"),
+                "profile": "remote-cluster",
+            },
+        )
+        assert response.status_code == 400
+
+
+class TestSync:
+    async def test_sync_sends_only_changes(
+        self, client: AsyncTestClient, trees, fake_sftp
+    ):
+        source, destination = trees
+        request = {
+            "source": str(source),
+            "destination": str(destination),
+            "profile": "remote-cluster",
+            "workers": 3,
+        }
+        response = await client.post("/api/sync", json=request)
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        stream = events(response.content)
+        assert stream[0]["event"] == "plan"
+        assert stream[-1]["event"] == "done"
+        done = stream[-1]
+        assert done["files_done"] == done["files_total"] == 3
+        assert done["bytes_done"] == done["bytes_total"] == 5015
+        assert done["errors"] == {}
+
+        for relpath in ("audio/day1/a.wav", "audio/day1/b.wav", "notes.txt"):
+            assert (destination / relpath).read_bytes() == (
+                source / relpath
+            ).read_bytes()
+        assert (destination / "extra.wav").exists()
+        # Files were written under a temporary name and renamed into place.
+        assert all(os.path.basename(p).startswith(".") for p in fake_sftp.uploaded)
+        assert sorted(p.name for p in (destination / "audio" / "day1").iterdir()) == [
+            "a.wav",
+            "b.wav",
+        ]
+
+        # Sent files take the local mtime, so a second pass has nothing to do.
+        response = await client.post("/api/sync/plan", json=request)
+        assert response.json()["transfers"] == []
+        assert response.json()["unchanged"] == 4
+
+    async def test_sync_creates_destination(
+        self, client: AsyncTestClient, trees, fake_sftp, tmp_path
+    ):
+        source, _ = trees
+        destination = tmp_path / "new" / "input"
+        response = await client.post(
+            "/api/sync",
+            json={
+                "source": str(source),
+                "destination": str(destination),
+                "profile": "remote-cluster",
+            },
+        )
+
+        assert response.status_code == 200
+        assert events(response.content)[-1]["errors"] == {}
+        assert (destination / "audio" / "day1" / "a.wav").stat().st_size == 5000
+        assert (destination / "notes.txt").read_text() == "notes"
+
+    async def test_failed_file_is_reported(
+        self, client: AsyncTestClient, trees, fake_sftp
+    ):
+        source, destination = trees
+        putfo = fake_sftp.putfo
+
+        def flaky_putfo(fl, remotepath, **kwargs):
+            if remotepath.endswith(".b.wav.sync-part"):
+                raise OSError("Failure")
+            return putfo(fl, remotepath, **kwargs)
+
+        fake_sftp.putfo = flaky_putfo
+        response = await client.post(
+            "/api/sync",
+            json={
+                "source": str(source),
+                "destination": str(destination),
+                "profile": "remote-cluster",
+            },
+        )
+
+        assert response.status_code == 200
+        done = events(response.content)[-1]
+        assert done["files_done"] == 3
+        assert done["errors"] == {"audio/day1/b.wav": "Failure"}
+        assert (destination / "notes.txt").read_text() == "notes"
+        assert not (destination / "audio" / "day1" / "b.wav").exists()
@@ -0,0 +1,232 @@
+"""API tests for image thumbnails."""
+
+import os
+import struct
+from io import BytesIO
+from unittest import mock
+
+import pytest
+from PIL import Image
+from litestar.testing import AsyncTestClient
+
+from blackfish.server import thumbnails
+from blackfish.server.models.profile import SlurmProfile
+
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture(autouse=True)
+def _home_dir(app, tmp_path):
+    """Keep the thumbnail cache out of the real home directory."""
+    home = tmp_path / "home"
+    home.mkdir()
+    with mock.patch.dict(app.state._state, {"HOME_DIR": str(home)}):
+        yield home
+    thumbnails._caches.clear()
+
+
+def encode(img: Image.Image, format: str = "JPEG") -> bytes:
+    buffer = BytesIO()
+    img.save(buffer, format=format)
+    return buffer.getvalue()
+
+
+def jpeg_with_exif_thumbnail(
+    size: tuple[int, int], thumb_size: tuple[int, int], orientation: int = 1
+) -> bytes:
+    """Build a red JPEG whose EXIF block embeds a blue thumbnail."""
+    main = encode(Image.new("RGB", size, "red"))
+    thumb = encode(Image.new("RGB", thumb_size, "blue"))
+
+    # Little-endian TIFF: IFD0 holds the orientation, IFD1 points at the thumbnail.
+    ifd0 = struct.pack("<H", 1) + struct.pack("<HHIHH", 0x0112, 3, 1, orientation, 0)
+    ifd1_offset = 8 + len(ifd0) + 4
+    ifd1_size = 2 + 2 * 12 + 4
+    thumb_offset = ifd1_offset + ifd1_size
+    ifd1 = (
+        struct.pack("<H", 2)
+        + struct.pack("<HHII", 0x0201, 4, 1, thumb_offset)
+        + struct.pack("<HHII", 0x0202, 4, 1, len(thumb))
+        + struct.pack("<I", 0)
+    )
+    tiff = (
+        b"II*\x00"
+        + struct.pack("<I", 8)
+        + ifd0
+        + struct.pack("<I", ifd1_offset)
+        + ifd1
+        + thumb
+    )
+    app1 = b"Exif\x00\x00" + tiff
+    return b"\xff\xd8\xff\xe1" + struct.pack(">H", len(app1) + 2) + app1 + main[2:]
+
+
+def decode(content: bytes) -> Image.Image:
+    return Image.open(BytesIO(content))
+
+
+class TestThumbnails:
+    async def test_downscales_image(self, client: AsyncTestClient, tmp_path):
+        path = tmp_path / "photo.jpg"
+        path.write_bytes(encode(Image.new("RGB", (2000, 1000), "red")))
+
+        response = await client.get(
+            "/api/image/thumbnail", params={"path": str(path), "size": 128}
+        )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "image/jpeg"
+        assert decode(response.content).size == (128, 64)
+
+    async def test_transparent_image_is_png(self, client: AsyncTestClient, tmp_path):
+        path = tmp_path / "icon.png"
+        path.write_bytes(encode(Image.new("RGBA", (600, 600)), "PNG"))
+
+        response = await client.get("/api/image/thumbnail", params={"path": str(path)})
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "image/png"
+        assert decode(response.content).size == (256, 256)
+
+    async def test_uses_exif_thumbnail(self, client: AsyncTestClient, tmp_path):
+        path = tmp_path / "photo.jpg"
+        path.write_bytes(jpeg_with_exif_thumbnail((3000, 2000), (320, 240)))
+
+        response = await client.get("/api/image/thumbnail", params={"path": str(path)})
+
+        img = decode(response.content)
+        assert img.size == (256, 192)
+        assert img.getpixel((10, 10))[2] > 200  # blue, i.e. the EXIF thumbnail
+
+    async def test_exif_thumbnail_orientation(self, client: AsyncTestClient, tmp_path):
+        path = tmp_path / "photo.jpg"
+        path.write_bytes(
+            jpeg_with_exif_thumbnail((3000, 2000), (320, 240), orientation=6)
+        )
+
+        response = await client.get("/api/image/thumbnail", params={"path": str(path)})
+
+        assert decode(response.content).size == (192, 256)
+
+    async def test_small_exif_thumbnail_ignored(
+        self, client: AsyncTestClient, tmp_path
+    ):
+        path = tmp_path / "photo.jpg"
+        path.write_bytes(jpeg_with_exif_thumbnail((3000, 2000), (160, 120)))
+
+        response = await client.get("/api/image/thumbnail", params={"path": str(path)})
+
+        img = decode(response.content)
+        assert img.size == (256, 171)
+        assert img.getpixel((10, 10))[0] > 200  # red, i.e. the full image
+
+    async def test_cached_until_modified(self, client: AsyncTestClient, tmp_path):
+        path = tmp_path / "photo.png"
+        path.write_bytes(encode(Image.new("RGB", (500, 500), "red"), "PNG"))
+        params = {"path": str(path), "size": 64}
+
+        with mock.patch(
+            "blackfish.server.thumbnails.render_thumbnail",
+            wraps=thumbnails.render_thumbnail,
+        ) as render:
+            await client.get("/api/image/thumbnail", params=params)
+            await client.get("/api/image/thumbnail", params=params)
+            assert render.call_count == 1
+
+            # A different size is a different cache entry.
+            await client.get("/api/image/thumbnail", params={**params, "size": 32})
+            assert render.call_count == 2
+
+            path.write_bytes(encode(Image.new("RGB", (500, 500), "green"), "PNG"))
+            os.utime(path, (0, 12345))
+            response = await client.get("/api/image/thumbnail", params=params)
+            assert render.call_count == 3
+            assert decode(response.content).getpixel((0, 0))[1] > 100
+
+    async def test_missing_image(self, client: AsyncTestClient, tmp_path):
+        response = await client.get(
+            "/api/image/thumbnail", params={"path": str(tmp_path / "missing.png")}
+        )
+        assert response.status_code == 404
+
+    async def test_invalid_image(self, client: AsyncTestClient, tmp_path):
+        path = tmp_path / "fake.png"
+        path.write_bytes(b"not an image")
+
+        response = await client.get("/api/image/thumbnail", params={"path": str(path)})
+        assert response.status_code == 400
+
+    @pytest.mark.parametrize("params", [{"path": "doc.txt"}, {"size": 4096}])
+    async def test_invalid_request(self, client: AsyncTestClient, tmp_path, params):
+        response = await client.get(
+            "/api/image/thumbnail",
+            params={"path": str(tmp_path / "photo.png"), **params},
+        )
+        assert response.status_code == 400
+
+    async def test_remote_thumbnail_reads_only_exif(self, client: AsyncTestClient):
+        content = jpeg_with_exif_thumbnail((3000, 2000), (320, 240))
+        profile = SlurmProfile(
+            name="remote-cluster",
+            host="remote.example.com",
+            user="testuser",
+            home_dir="/home/testuser",
+            cache_dir="/home/testuser/.cache",
+        )
+        mock_sftp = mock.MagicMock()
+        mock_sftp.stat.return_value = mock.MagicMock(st_mtime=1000)
+        remote_file = mock.MagicMock()
+        remote_file.__enter__.return_value = remote_file
+        remote_file.read.side_effect = lambda n=-1: content[:n] if n >= 0 else content
+        mock_sftp.open.return_value = remote_file
+        mock_connection = mock.MagicMock()
+        mock_connection.return_value.sftp.return_value = mock_sftp
+
+        with (
+            mock.patch(
+                "blackfish.server.asgi._get_validated_remote_profile",
+                return_value=profile,
+            ),
+            mock.patch("blackfish.server.remote.session.Connection", mock_connection),
+        ):
+            for _ in range(2):
+                response = await client.get(
+                    "/api/image/thumbnail",
+                    params={"path": "/data/photo.jpg", "profile": "remote-cluster"},
+                )
+                assert response.status_code == 200
+                assert decode(response.content).size == (256, 192)
+
+        # One partial read for the first request; the second is a cache hit.
+        remote_file.read.assert_called_once_with(64 * 1024)
+
+
+class TestThumbnailCache:
+    async def test_evicts_least_recently_used(self, tmp_path):
+        tmp_path = tmp_path / "cache"
+        cache = thumbnails.ThumbnailCache(str(tmp_path), max_bytes=250)
+        for i, key in enumerate("ab"):
+            cache.put(key, b"x" * 100)
+            os.utime(tmp_path / key, (i, i))
+        # "a" is older than "b" but was just read.
+        assert cache.get("a") is not None
+
+        cache.put("c", b"x" * 100)
+        assert sorted(os.listdir(tmp_path)) == ["a", "c"]
+
+        os.utime(tmp_path / "c", (3, 3))
+        cache.put("d", b"x" * 100)
+        assert sorted(os.listdir(tmp_path)) == ["a", "d"]
+
+    async def test_rewritten_key_is_counted_once(self, tmp_path):
+        tmp_path = tmp_path / "cache"
+        cache = thumbnails.ThumbnailCache(str(tmp_path), max_bytes=250)
+        for i, key in enumerate("ab"):
+            cache.put(key, b"x" * 100)
+            os.utime(tmp_path / key, (i, i))
+        cache.put("c", b"x" * 40)
+
+        # Rewriting "c" keeps the cache at 240 bytes: nothing is evicted.
+        cache.put("c", b"x" * 40)
+        assert sorted(os.listdir(tmp_path)) == ["a", "b", "c"]
@@ -0,0 +1,287 @@
+"""API tests for resumable chunked uploads."""
+
+import hashlib
+import os
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+import pytest
+from litestar.testing import AsyncTestClient
+
+from blackfish.server import uploads
+from blackfish.server.models.profile import SlurmProfile
+
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture(autouse=True)
+def _home_dir(app, tmp_path):
+    """Keep upload manifests out of the real home directory."""
+    home = tmp_path / "home"
+    home.mkdir()
+    with mock.patch.dict(app.state._state, {"HOME_DIR": str(home)}):
+        yield home
+
+
+def chunks_of(content: bytes, chunk_size: int) -> list[bytes]:
+    return [content[i : i + chunk_size] for i in range(0, len(content), chunk_size)]
+
+
+async def put_chunk(
+    client: AsyncTestClient, upload_id: str, index: int, chunk: bytes, chunk_size: int
+):
+    return await client.put(
+        f"/api/uploads/{upload_id}/chunks/{index}",
+        params={
+            "offset": index * chunk_size,
+            "sha256": hashlib.sha256(chunk).hexdigest(),
+        },
+        content=chunk,
+    )
+
+
+class FakeSFTP:
+    """Minimal SFTP client backed by the local filesystem."""
+
+    def __init__(self):
+        self.open = mock.MagicMock(side_effect=self._open)
+        self.close = mock.MagicMock()
+        self.normalize = mock.MagicMock(return_value="/home/testuser")
+
+    def _open(self, path, mode="r"):
+        f = open(path, mode)
+        f.set_pipelined = lambda pipelined=True: None
+        return f
+
+    def stat(self, path):
+        return os.stat(path)
+
+    def mkdir(self, path):
+        os.mkdir(path)
+
+    def remove(self, path):
+        os.remove(path)
+
+    def posix_rename(self, old_path, new_path):
+        os.replace(old_path, new_path)
+
+
+class TestLocalUploads:
+    async def test_upload_out_of_order_with_resume(
+        self, client: AsyncTestClient, tmp_path
+    ):
+        content = os.urandom(10_000)
+        chunk_size = 4096
+        dest = tmp_path / "data" / "corpus.wav"
+
+        response = await client.post(
+            "/api/uploads",
+            json={"path": str(dest), "size": len(content), "chunk_size": chunk_size},
+        )
+        assert response.status_code == 201
+        upload = response.json()
+        assert upload["num_chunks"] == 3
+        assert upload["missing"] == [0, 1, 2]
+        upload_id = upload["id"]
+
+        parts = chunks_of(content, chunk_size)
+        for index in (2, 0):
+            response = await put_chunk(
+                client, upload_id, index, parts[index], chunk_size
+            )
+            assert response.status_code == 200
+
+        # A "reconnecting" client asks what is left to send.
+        response = await client.get(f"/api/uploads/{upload_id}")
+        assert response.status_code == 200
+        status = response.json()
+        assert status["missing"] == [1]
+        assert status["received"] == [[0, 4096], [8192, 10_000]]
+        assert status["received_bytes"] == 4096 + 1808
+
+        response = await client.post(f"/api/uploads/{upload_id}/complete")
+        assert response.status_code == 409
+        assert not dest.exists()
+
+        response = await put_chunk(client, upload_id, 1, parts[1], chunk_size)
+        assert response.status_code == 200
+        assert response.json()["remaining"] == 0
+
+        response = await client.post(f"/api/uploads/{upload_id}/complete")
+        assert response.status_code == 201
+        assert response.json()["size"] == len(content)
+        assert dest.read_bytes() == content
+        # Neither the part file nor the manifest is left behind.
+        assert os.listdir(dest.parent) == ["corpus.wav"]
+        response = await client.get(f"/api/uploads/{upload_id}")
+        assert response.status_code == 404
+
+    async def test_checksum_mismatch_rejected(self, client: AsyncTestClient, tmp_path):
+        response = await client.post(
+            "/api/uploads",
+            json={"path": str(tmp_path / "a.bin"), "size": 4, "chunk_size": 4},
+        )
+        upload_id = response.json()["id"]
+
+        response = await client.put(
+            f"/api/uploads/{upload_id}/chunks/0",
+            params={"offset": 0, "sha256": hashlib.sha256(b"nope").hexdigest()},
+            content=b"data",
+        )
+        assert response.status_code == 400
+        assert "Checksum mismatch" in response.json()["detail"]
+
+        response = await client.get(f"/api/uploads/{upload_id}")
+        assert response.json()["missing"] == [0]
+
+    @pytest.mark.parametrize(
+        "index, offset, content",
+        [
+            (1, 4, b"data"),  # index out of range
+            (0, 2, b"data"),  # wrong offset
+            (0, 0, b"dat"),  # short chunk
+        ],
+    )
+    async def test_invalid_chunk_rejected(
+        self, client: AsyncTestClient, tmp_path, index, offset, content
+    ):
+        response = await client.post(
+            "/api/uploads",
+            json={"path": str(tmp_path / "a.bin"), "size": 4, "chunk_size": 4},
+        )
+        upload_id = response.json()["id"]
+
+        response = await client.put(
+            f"/api/uploads/{upload_id}/chunks/{index}",
+            params={"offset": offset},
+            content=content,
+        )
+        assert response.status_code == 400
+
+    async def test_existing_destination_requires_overwrite(
+        self, client: AsyncTestClient, tmp_path
+    ):
+        dest = tmp_path / "a.bin"
+        dest.write_bytes(b"old")
+
+        response = await client.post(
+            "/api/uploads", json={"path": str(dest), "size": 3}
+        )
+        assert response.status_code == 400
+
+        response = await client.post(
+            "/api/uploads", json={"path": str(dest), "size": 3, "overwrite": True}
+        )
+        assert response.status_code == 201
+        upload_id = response.json()["id"]
+        await put_chunk(client, upload_id, 0, b"new", 3)
+
+        response = await client.post(f"/api/uploads/{upload_id}/complete")
+        assert response.status_code == 201
+        assert dest.read_bytes() == b"new"
+
+    async def test_abort_removes_part_file(self, client: AsyncTestClient, tmp_path):
+        response = await client.post(
+            "/api/uploads", json={"path": str(tmp_path / "a.bin"), "size": 10}
+        )
+        upload_id = response.json()["id"]
+        assert len(os.listdir(tmp_path)) == 2  # home dir + part file
+
+        response = await client.delete(f"/api/uploads/{upload_id}")
+        assert response.status_code == 200
+        assert os.listdir(tmp_path) == ["home"]
+
+        response = await client.get(f"/api/uploads/{upload_id}")
+        assert response.status_code == 404
+
+    async def test_manifest_survives_restart(
+        self, client: AsyncTestClient, tmp_path, _home_dir
+    ):
+        response = await client.post(
+            "/api/uploads",
+            json={"path": str(tmp_path / "a.bin"), "size": 8, "chunk_size": 4},
+        )
+        upload_id = response.json()["id"]
+        await put_chunk(client, upload_id, 0, b"abcd", 4)
+
+        session = uploads.load_session(str(_home_dir), upload_id)
+        assert list(session.chunks) == [0]
+        assert session.chunks[0] == hashlib.sha256(b"abcd").hexdigest()
+
+    async def test_expired_sessions_pruned(
+        self, client: AsyncTestClient, tmp_path, _home_dir
+    ):
+        response = await client.post(
+            "/api/uploads", json={"path": str(tmp_path / "old.bin"), "size": 4}
+        )
+        stale = uploads.load_session(str(_home_dir), response.json()["id"])
+        stale.updated_at = datetime.now(timezone.utc) - timedelta(days=30)
+        uploads._save_session(str(_home_dir), stale)
+
+        response = await client.post(
+            "/api/uploads", json={"path": str(tmp_path / "new.bin"), "size": 4}
+        )
+        assert response.status_code == 201
+
+        response = await client.get(f"/api/uploads/{stale.id}")
+        assert response.status_code == 404
+        assert not os.path.exists(stale.part_path)
+
+    async def test_unknown_upload(self, client: AsyncTestClient):
+        response = await client.get("/api/uploads/deadbeef")
+        assert response.status_code == 404
+
+        response = await client.get("/api/uploads/..%2Fprofiles")
+        assert response.status_code == 404
+
+
+class TestRemoteUploads:
+    async def test_remote_upload(self, client: AsyncTestClient, tmp_path):
+        profile = SlurmProfile(
+            name="remote-cluster",
+            host="remote.example.com",
+            user="testuser",
+            home_dir="/home/testuser",
+            cache_dir="/home/testuser/.cache",
+        )
+        fake_sftp = FakeSFTP()
+        mock_connection = mock.MagicMock()
+        mock_connection.return_value.sftp.return_value = fake_sftp
+
+        content = os.urandom(5000)
+        dest = tmp_path / "remote" / "corpus.wav"
+
+        with (
+            mock.patch(
+                "blackfish.server.asgi._get_validated_remote_profile",
+                return_value=profile,
+            ),
+            mock.patch("blackfish.server.remote.session.Connection", mock_connection),
+        ):
+            response = await client.post(
+                "/api/uploads",
+                json={
+                    "path": str(dest),
+                    "size": len(content),
+                    "chunk_size": 2048,
+                    "profile": "remote-cluster",
+                },
+            )
+            assert response.status_code == 201
+            upload_id = response.json()["id"]
+
+            for index, chunk in reversed(list(enumerate(chunks_of(content, 2048)))):
+                response = await put_chunk(client, upload_id, index, chunk, 2048)
+                assert response.status_code == 200
+
+            response = await client.post(f"/api/uploads/{upload_id}/complete")
+            assert response.status_code == 201
+
+        assert dest.read_bytes() == content
+        assert os.listdir(dest.parent) == ["corpus.wav"]
+        # Chunks are written in place rather than rewriting the whole file.
+        modes = [c.args[1] for c in fake_sftp.open.call_args_list]
+        assert modes == ["wb", "r+b", "r+b", "r+b"]
+        # All operations share the pooled connection.
+        assert mock_connection.call_count == 1
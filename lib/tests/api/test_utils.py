@@ -111,6 +111,103 @@ class TestFilesAPI:
                 # Restore permissions so cleanup can work
                 os.chmod(restricted_dir, 0o755)
 
+    async def test_files_pagination_and_sorting(self, client: AsyncTestClient):
+        """Test /api/files limit/offset/sort/order parameters."""
+        import os
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for i, name in enumerate(["b.txt", "c.txt", "a.txt", ".hidden"]):
+                path = os.path.join(temp_dir, name)
+                with open(path, "wb") as f:
+                    f.write(b"x" * (10 - i))
+                os.utime(path, (1000 + i, 1000 + i))
+            os.mkdir(os.path.join(temp_dir, "dir"))
+
+            response = await client.get(
+                "/api/files",
+                params={"path": temp_dir, "sort": "name", "limit": 2, "offset": 1},
+            )
+            assert response.status_code == 200
+            result = response.json()
+            assert result["total"] == 4
+            assert result["limit"] == 2
+            assert result["offset"] == 1
+            assert [f["name"] for f in result["files"]] == ["b.txt", "c.txt"]
+
+            response = await client.get(
+                "/api/files",
+                params={"path": temp_dir, "sort": "size", "order": "desc"},
+            )
+            files = response.json()["files"]
+            # A directory's own size depends on the filesystem.
+            assert [f["name"] for f in files if not f["is_dir"]] == [
+                "b.txt",
+                "c.txt",
+                "a.txt",
+            ]
+            assert [f["name"] for f in files if f["is_dir"]] == ["dir"]
+
+            response = await client.get(
+                "/api/files",
+                params={
+                    "path": temp_dir,
+                    "sort": "modified",
+                    "order": "desc",
+                    "hidden": True,
+                },
+            )
+            result = response.json()
+            assert result["total"] == 5
+            assert [f["name"] for f in result["files"]][1] == ".hidden"
+
+    async def test_files_unbounded_without_limit(self, client: AsyncTestClient):
+        """Test /api/files lists every entry when no limit is given."""
+        import os
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for i in range(1200):
+                open(os.path.join(temp_dir, f"{i:04d}.txt"), "w").close()
+
+            response = await client.get("/api/files", params={"path": temp_dir})
+
+        assert response.status_code == 200
+        result = response.json()
+        assert result["total"] == 1200
+        assert result["limit"] is None
+        assert len(result["files"]) == 1200
+
+    async def test_files_stats_only_requested_page(self, client: AsyncTestClient):
+        """Test /api/files stats each listed entry once, and only the page."""
+        import os
+        from unittest import mock
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for i in range(50):
+                open(os.path.join(temp_dir, f"{i:02d}.txt"), "w").close()
+
+            with mock.patch("os.stat", wraps=os.stat) as stat:
+                response = await client.get(
+                    "/api/files", params={"path": temp_dir, "sort": "name", "limit": 5}
+                )
+            stat_calls = [
+                c.args[0] for c in stat.call_args_list if c.args[0] != temp_dir
+            ]
+
+        assert response.status_code == 200
+        assert response.json()["total"] == 50
+        assert [f["name"] for f in response.json()["files"]] == [
+            f"{i:02d}.txt" for i in range(5)
+        ]
+        assert len(stat_calls) == 5
+
+    async def test_files_invalid_sort(self, client: AsyncTestClient):
+        """Test /api/files rejects unknown sort keys and limits."""
+        response = await client.get("/api/files", params={"sort": "owner"})
+        assert response.status_code == 400
+
+        response = await client.get("/api/files", params={"limit": 0})
+        assert response.status_code == 400
+
 
 class TestAudioAPI:
     """Test cases for the /api/audio endpoint."""
@@ -0,0 +1,81 @@
+"""Tests for `blackfish batch export`."""
+
+from unittest.mock import Mock, patch
+
+from blackfish.cli.__main__ import main
+
+JOB_ID = "2a7a8e62-40cc-4240-a825-463e5b11a81f"
+
+
+def _page(content: bytes, cursor: str | None) -> Mock:
+    res = Mock()
+    res.ok = True
+    res.content = content
+    res.headers = {"X-Next-Cursor": cursor} if cursor else {}
+    return res
+
+
+def _invoke(cli_runner, extra_args, pages):
+    with patch("blackfish.cli.batch.api.get") as mock_get:
+        mock_get.side_effect = pages
+        result = cli_runner.invoke(main, ["batch", "export", JOB_ID, *extra_args])
+    return result, mock_get
+
+
+class TestBatchExport:
+    def test_appends_pages_and_keeps_the_cursor(
+        self, cli_runner, mock_config, tmp_path
+    ):
+        output = tmp_path / "results.jsonl"
+        result, mock_get = _invoke(
+            cli_runner,
+            ["-o", str(output), "--status", "success"],
+            [
+                _page(b'{"n": 1}\n{"n": 2}\n', "c1"),
+                _page(b'{"n": 3}\n', "c2"),
+                _page(b"", "c2"),
+            ],
+        )
+
+        assert result.exit_code == 0, result.output
+        assert output.read_bytes() == b'{"n": 1}\n{"n": 2}\n{"n": 3}\n'
+        assert (tmp_path / "results.jsonl.cursor").read_text() == "c2"
+        params = [call.kwargs["params"] for call in mock_get.call_args_list]
+        assert params[0]["status"] == "success"
+        assert "after" not in params[0]
+        assert [p["after"] for p in params[1:]] == ["c1", "c2"]
+
+    def test_continues_from_the_cursor(self, cli_runner, mock_config, tmp_path):
+        output = tmp_path / "results.jsonl"
+        output.write_bytes(b'{"n": 1}\n')
+        (tmp_path / "results.jsonl.cursor").write_text("c1")
+
+        result, mock_get = _invoke(
+            cli_runner,
+            ["-o", str(output)],
+            [_page(b'{"n": 2}\n', "c2"), _page(b"", "c2")],
+        )
+
+        assert result.exit_code == 0, result.output
+        assert output.read_bytes() == b'{"n": 1}\n{"n": 2}\n'
+        assert mock_get.call_args_list[0].kwargs["params"]["after"] == "c1"
+
+    def test_parquet_is_written_whole(self, cli_runner, mock_config, tmp_path):
+        output = tmp_path / "results.parquet"
+        output.write_bytes(b"stale")
+
+        result, mock_get = _invoke(
+            cli_runner,
+            ["-o", str(output), "--format", "parquet"],
+            [_page(b"PAR1...PAR1", "c1")],
+        )
+
+        assert result.exit_code == 0, result.output
+        assert output.read_bytes() == b"PAR1...PAR1"
+        assert "limit" not in mock_get.call_args.kwargs["params"]
+
+    def test_follow_requires_jsonl(self, cli_runner, mock_config, tmp_path):
+        result, mock_get = _invoke(cli_runner, ["--format", "parquet", "--follow"], [])
+
+        assert "--follow requires --format jsonl" in result.output
+        mock_get.assert_not_called()
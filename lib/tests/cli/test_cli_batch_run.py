@@ -16,11 +16,15 @@ def _profile() -> SlurmProfile:
     )
 
 
-def _invoke(cli_runner, extra_args):
-    """Run `batch run` with the model-resolution collaborators stubbed."""
+def _invoke(cli_runner, extra_args, command="run", estimate=None):
+    """Run `batch run` (or `command`) with the model-resolution collaborators
+    stubbed.
+
+    `estimate` is what the API returns for a sampling job's estimate.
+    """
     cmd = [
         "batch",
-        "run",
+        command,
         "--name",
         "test-job",
         "--task",
@@ -42,6 +46,7 @@ def _invoke(cli_runner, extra_args):
         patch("blackfish.cli.batch.get_latest_commit") as mock_get_latest,
         patch("blackfish.cli.batch.get_revisions") as mock_get_revisions,
         patch("blackfish.cli.batch.api.post") as mock_post,
+        patch("blackfish.cli.batch.api.get") as mock_get,
     ):
         mock_resolve.return_value = "default"
         mock_deserialize.return_value = _profile()
@@ -54,6 +59,7 @@ def _invoke(cli_runner, extra_args):
         response.ok = True
         response.json.return_value = {"id": "job-uuid-123"}
         mock_post.return_value = response
+        mock_get.return_value.json.return_value = estimate
 
         result = cli_runner.invoke(main, cmd)
 
@@ -83,3 +89,98 @@ class TestBatchRunImageRef:
         result, _ = _invoke(cli_runner, ["--image-ref", pin, "--dry-run"])
 
         assert pin in result.output
+
+
+class TestBatchRunStages:
+    STAGE = '{"task": "chat", "model": "google/gemma-3-4b-it", "params": {"n": 1}}'
+
+    def test_stage_is_forwarded_with_its_revision(self, cli_runner, mock_config):
+        _, mock_post = _invoke(cli_runner, ["--stage", self.STAGE])
+
+        assert mock_post.call_args[1]["json"]["stages"] == [
+            {
+                "task": "chat",
+                "repo_id": "google/gemma-3-4b-it",
+                "revision": "abc123",
+                "params": {"n": 1},
+                "output_ext": None,
+            }
+        ]
+
+    def test_dry_run_chains_the_stages(self, cli_runner, mock_config):
+        result, mock_post = _invoke(cli_runner, ["--stage", self.STAGE, "--dry-run"])
+
+        assert "name: chat-2" in result.output
+        assert "depends_on: chat" in result.output
+        mock_post.assert_not_called()
+
+    def test_stage_needs_a_task_and_model(self, cli_runner, mock_config):
+        result, mock_post = _invoke(cli_runner, ["--stage", '{"task": "chat"}'])
+
+        assert 'needs a "task" and a "model"' in result.output
+        mock_post.assert_not_called()
+
+
+class TestBatchRunResultCache:
+    def test_result_cache_is_forwarded(self, cli_runner, mock_config):
+        _, mock_post = _invoke(cli_runner, ["--result-cache"])
+
+        assert mock_post.call_args[1]["json"]["result_cache"] is True
+
+    def test_result_cache_is_off_by_default(self, cli_runner, mock_config):
+        _, mock_post = _invoke(cli_runner, [])
+
+        assert mock_post.call_args[1]["json"]["result_cache"] is False
+
+
+class TestBatchRunPriority:
+    def test_priority_is_forwarded(self, cli_runner, mock_config):
+        _, mock_post = _invoke(cli_runner, ["--priority", "5"])
+
+        assert mock_post.call_args[1]["json"]["priority"] == 5
+
+    def test_priority_defaults_to_zero(self, cli_runner, mock_config):
+        _, mock_post = _invoke(cli_runner, [])
+
+        assert mock_post.call_args[1]["json"]["priority"] == 0
+
+
+class TestBatchEstimate:
+    ESTIMATE = {
+        "status": "stopped",
+        "total_files": 1000,
+        "sampled": 10,
+        "succeeded": 10,
+        "failed": 0,
+        "stage_seconds": {"chat": 36.0},
+        "seconds_per_file": 36.0,
+        "gpus": 1,
+        "walltime_seconds": 3600,
+        "projections": [
+            {
+                "shards": 4,
+                "files_per_shard": 250,
+                "allocations": 3,
+                "wall_clock_seconds": 10800.0,
+                "gpu_hours": 12.0,
+            }
+        ],
+    }
+
+    def test_sample_is_submitted_and_projected(self, cli_runner, mock_config):
+        result, mock_post = _invoke(
+            cli_runner, ["--sample", "10"], command="estimate", estimate=self.ESTIMATE
+        )
+
+        assert mock_post.call_args[0][0] == "/api/jobs/estimate"
+        assert mock_post.call_args[1]["json"]["sample"] == 10
+        assert "shards" not in mock_post.call_args[1]["json"]
+        assert "Time per file: 36.00s" in result.output
+        assert "3h 00m" in result.output
+        assert "12.0" in result.output
+
+    def test_nothing_to_project(self, cli_runner, mock_config):
+        estimate = {**self.ESTIMATE, "seconds_per_file": None, "projections": []}
+        result, _ = _invoke(cli_runner, [], command="estimate", estimate=estimate)
+
+        assert "nothing to estimate from" in result.output
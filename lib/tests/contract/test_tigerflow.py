@@ -16,9 +16,13 @@ is set in the environment.
 import json
 import os
 import subprocess
+from pathlib import Path
 
 import pytest
 
+from blackfish.server.jobs.client import TigerFlowReport
+from blackfish.server.jobs.report import ReportReader
+
 # Skip all tests in this module unless explicitly enabled
 pytestmark = pytest.mark.skipif(
     os.environ.get("TIGERFLOW_CONTRACT_TESTS") != "1",
@@ -148,3 +152,26 @@ class TestTigerflowTasksInfo:
         )
 
         assert returncode != 0, "Expected non-zero exit for unknown task"
+
+
+class TestTigerflowReport:
+    """Contract tests for tigerflow report, which ReportReader reimplements."""
+
+    @pytest.mark.anyio
+    @pytest.mark.parametrize("running", [False, True])
+    async def test_native_report_matches_cli(
+        self, tigerflow_output: Path, running: bool
+    ) -> None:
+        """ReportReader should build the same report as tigerflow report --json."""
+        if running:
+            (tigerflow_output / ".tigerflow" / "run.pid").write_text(str(os.getpid()))
+
+        returncode, stdout, stderr = run_tigerflow(
+            "report", str(tigerflow_output), "--json"
+        )
+        assert returncode == 0, f"Command failed: {stderr}"
+
+        expected = TigerFlowReport.model_validate(json.loads(stdout))
+        actual = await ReportReader("localhost").read(str(tigerflow_output))
+
+        assert actual == expected
@@ -1,3 +1,5 @@
+import json
+from pathlib import Path
 from typing import Any
 
 import pytest
@@ -183,3 +185,76 @@ def models_fixture() -> list[Model | dict[str, Any]]:
             "model_dir": "/home/test/.blackfish/models/models--openai/whisper-large-v3",
         },
     ]
+
+
+@pytest.fixture(name="tigerflow_output")
+def tigerflow_output_fixture(tmp_path) -> Path:
+    """A stopped two-task pipeline's output directory, as tigerflow writes it.
+
+    Of six inputs, ``a`` and ``b`` finished, ``c`` is in progress, ``d`` is
+    staged, and ``e`` and ``f`` failed (``f`` with an unreadable error file).
+    """
+    output = tmp_path / "output"
+    internal = output / ".tigerflow"
+    inputs = tmp_path / "input"
+    inputs.mkdir()
+    for subdir in (
+        ".finished",
+        ".symlinks",
+        "transcribe/logs/123",
+        "translate/logs/123",
+    ):
+        (internal / subdir).mkdir(parents=True)
+
+    tasks = [
+        {"name": "transcribe", "depends_on": None},
+        {"name": "translate", "depends_on": "transcribe"},
+    ]
+    (internal / "run.log").write_text(
+        "2026-04-03 09:59:59 | INFO | Starting pipeline\n"
+        f"2026-04-03 10:00:00 | INIT | {json.dumps({'tasks': tasks})}\n"
+    )
+    # No process has this pid, so the pipeline reads as stopped.
+    (internal / "run.pid").write_text("4194303\n")
+
+    for stem in "abcdef":
+        (inputs / f"{stem}.wav").write_bytes(b"")
+        (internal / ".symlinks" / f"{stem}.wav").symlink_to(inputs / f"{stem}.wav")
+    for stem in "ab":
+        (internal / ".finished" / f"{stem}.json").write_text("")
+        (internal / "transcribe" / f"{stem}.json").write_text("{}")
+    (internal / "transcribe" / "c.json").write_text("{}")
+    (internal / "transcribe" / ".~tf_d.json").write_text("")
+    (internal / "translate" / "a.json").write_text("{}")
+    (internal / "transcribe" / "e.err").write_text(
+        json.dumps(
+            {
+                "file": "e.wav",
+                "timestamp": "2026-04-03T10:00:05+00:00",
+                "exception_type": "ValueError",
+                "message": "Unsupported sample rate",
+                "traceback": "Traceback (most recent call last): ...",
+            }
+        )
+    )
+    (internal / "translate" / "f.err").write_text("not json")
+
+    def metric(file: str, second: int, status: str) -> str:
+        data = {
+            "file": file,
+            "started_at": f"2026-04-03T10:00:{second:02d}+00:00",
+            "finished_at": f"2026-04-03T10:00:{second + 2:02d}.500000+00:00",
+            "status": status,
+        }
+        return f"2026-04-03 10:00:{second:02d} | METRICS | {json.dumps(data)}\n"
+
+    (internal / "transcribe" / "logs" / "123" / "task-123.log").write_text(
+        "2026-04-03 10:00:00 | INFO | Task started\n"
+        + metric("a.wav", 1, "success")
+        + metric("b.wav", 3, "success")
+        + metric("e.wav", 5, "error")
+    )
+    (internal / "translate" / "logs" / "123" / "task-worker-9.log").write_text(
+        metric("a.json", 10, "success")
+    )
+    return output
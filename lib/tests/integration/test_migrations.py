@@ -15,6 +15,7 @@ from sqlalchemy import create_engine, text
 from sqlalchemy.types import TypeDecorator, TypeEngine
 
 # Importing these registers each model's Table in orm_registry.metadata.
+import blackfish.server.jobs.results  # noqa: F401
 import blackfish.server.models.download  # noqa: F401
 import blackfish.server.models.metadata  # noqa: F401
 import blackfish.server.models.model  # noqa: F401
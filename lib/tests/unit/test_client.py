@@ -15,6 +15,7 @@ from blackfish.server.jobs.client import (
     TigerFlowError,
     TigerFlowVersions,
 )
+from blackfish.server.jobs.versions import VERSIONS_CACHE_NAME, ImageVersionCache
 
 
 pytestmark = pytest.mark.anyio
@@ -301,9 +302,8 @@ class TestTigerFlowClientCheckHealth:
         runner = MockRunner()
         runner.set_responses(
             [
-                (0, b"", b""),  # test -f sif (present)
-                (0, b"0.1.1\n", b""),  # tigerflow version
-                (0, b"0.1.1\n", b""),  # tigerflow-ml version
+                (0, b"1048576 1700000000\n", b""),  # stat sif (present)
+                (0, b"0.1.1\n0.1.2\n", b""),  # tigerflow, tigerflow-ml versions
             ]
         )
         client = make_client(runner)
@@ -312,17 +312,27 @@ class TestTigerFlowClientCheckHealth:
 
         assert isinstance(versions, TigerFlowVersions)
         assert versions.tigerflow == "0.1.1"
-        assert versions.tigerflow_ml == "0.1.1"
+        assert versions.tigerflow_ml == "0.1.2"
+
+    async def test_check_health_reads_both_versions_in_one_container(self) -> None:
+        """Both versions are read by a single container start."""
+        runner = MockRunner()
+        runner.set_responses(
+            [(0, b"1048576 1700000000\n", b""), (0, b"0.1.1\n0.1.2\n", b"")]
+        )
+        client = make_client(runner)
+
+        await client.check_health()
+
+        assert len(runner.commands) == 2
+        assert "apptainer exec" in runner.commands[1]
+        assert "tigerflow-ml" in runner.commands[1]
 
     async def test_check_health_probes_sif_existence(self) -> None:
         """The health check should probe the SIF path via a `test -f`."""
         runner = MockRunner()
         runner.set_responses(
-            [
-                (0, b"", b""),
-                (0, b"0.1.1\n", b""),
-                (0, b"0.1.1\n", b""),
-            ]
+            [(0, b"1048576 1700000000\n", b""), (0, b"0.1.1\n0.1.1\n", b"")]
         )
         client = make_client(runner)
 
@@ -344,6 +354,136 @@ class TestTigerFlowClientCheckHealth:
         assert exc_info.value.error_type == "missing"
         assert "image not found" in exc_info.value.user_message()
 
+    async def test_check_health_unknown_versions(self) -> None:
+        """A failed version probe reports the versions as unknown."""
+        runner = MockRunner()
+        runner.set_responses([(0, b"1048576 1700000000\n", b""), (1, b"", b"")])
+        client = make_client(runner)
+
+        versions = await client.check_health()
+
+        assert versions.tigerflow == "unknown"
+        assert versions.tigerflow_ml == "unknown"
+
+
+class TestTigerFlowClientVersionCache:
+    """Tests for check_health with an image version cache."""
+
+    def make_cached_client(self, runner, tmp_path, **kwargs):
+        client = make_client(runner, **kwargs)
+        client.versions_cache = ImageVersionCache.in_home(str(tmp_path))
+        return client
+
+    async def test_versions_are_read_once_per_sif(self, tmp_path) -> None:
+        """A second check of an unchanged SIF doesn't start the container."""
+        runner = MockRunner()
+        runner.set_responses(
+            [
+                (0, b"1048576 1700000000\n", b""),
+                (0, b"0.1.1\n0.1.2\n", b""),
+                (0, b"1048576 1700000000\n", b""),
+            ]
+        )
+        client = self.make_cached_client(runner, tmp_path)
+
+        first = await client.check_health()
+        second = await client.check_health()
+
+        assert (
+            first
+            == second
+            == TigerFlowVersions(tigerflow="0.1.1", tigerflow_ml="0.1.2")
+        )
+        assert len(runner.commands) == 3
+        assert (tmp_path / VERSIONS_CACHE_NAME).exists()
+
+    async def test_restaged_sif_is_read_again(self, tmp_path) -> None:
+        """A SIF with a new size or mtime misses the cache."""
+        runner = MockRunner()
+        runner.set_responses(
+            [
+                (0, b"1048576 1700000000\n", b""),
+                (0, b"0.1.1\n0.1.2\n", b""),
+                (0, b"2097152 1800000000\n", b""),
+                (0, b"0.2.0\n0.2.0\n", b""),
+            ]
+        )
+        client = self.make_cached_client(runner, tmp_path)
+
+        await client.check_health()
+        versions = await client.check_health()
+
+        assert versions.tigerflow == "0.2.0"
+        assert len(runner.commands) == 4
+        # The entry of the old SIF was replaced.
+        entries = json.loads((tmp_path / VERSIONS_CACHE_NAME).read_text())
+        assert list(entries) == [f"testhost:{SIF_PATH}"]
+
+    async def test_unknown_versions_are_not_cached(self, tmp_path) -> None:
+        runner = MockRunner()
+        runner.set_responses(
+            [
+                (0, b"1048576 1700000000\n", b""),
+                (1, b"", b""),
+                (0, b"1048576 1700000000\n", b""),
+                (0, b"0.1.1\n0.1.2\n", b""),
+            ]
+        )
+        client = self.make_cached_client(runner, tmp_path)
+
+        await client.check_health()
+        versions = await client.check_health()
+
+        assert versions.tigerflow == "0.1.1"
+
+    async def test_missing_sif_is_not_served_from_cache(self, tmp_path) -> None:
+        runner = MockRunner()
+        runner.set_responses(
+            [
+                (0, b"1048576 1700000000\n", b""),
+                (0, b"0.1.1\n0.1.2\n", b""),
+                (1, b"", b""),
+            ]
+        )
+        client = self.make_cached_client(runner, tmp_path)
+
+        await client.check_health()
+        with pytest.raises(TigerFlowError) as exc_info:
+            await client.check_health()
+
+        assert exc_info.value.error_type == "missing"
+
+    async def test_docker_is_not_cached(self, tmp_path) -> None:
+        """Docker runs an image the SIF doesn't identify."""
+        runner = MockRunner()
+        runner.set_responses(
+            [
+                (0, b"1048576 1700000000\n", b""),
+                (0, b"0.1.1\n0.1.2\n", b""),
+            ]
+        )
+        client = self.make_cached_client(
+            runner, tmp_path, provider=ContainerProvider.Docker
+        )
+
+        await client.check_health()
+
+        assert "docker run" in runner.commands[1]
+        assert not (tmp_path / VERSIONS_CACHE_NAME).exists()
+
+    async def test_unreadable_cache_is_ignored(self, tmp_path) -> None:
+        (tmp_path / VERSIONS_CACHE_NAME).write_text("not json")
+        runner = MockRunner()
+        runner.set_responses(
+            [(0, b"1048576 1700000000\n", b""), (0, b"0.1.1\n0.1.2\n", b"")]
+        )
+        client = self.make_cached_client(runner, tmp_path)
+
+        versions = await client.check_health()
+
+        assert versions.tigerflow == "0.1.1"
+        assert json.loads((tmp_path / VERSIONS_CACHE_NAME).read_text())
+
 
 class TestTigerFlowClientReport:
     """Tests for TigerFlowClient.report()."""
@@ -0,0 +1,149 @@
+"""Unit tests for batch job analytics."""
+
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+import pytest
+from advanced_alchemy.base import UUIDAuditBase
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from blackfish.server.jobs.analytics import job_analytics, latency_percentiles
+from blackfish.server.jobs.base import BatchJob
+from blackfish.server.jobs.results import BatchJobResult, record_results
+
+pytestmark = pytest.mark.anyio
+
+T0 = datetime(2026, 4, 3, 10, 0, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+async def sessionmaker(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'app.sqlite'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(UUIDAuditBase.metadata.create_all)
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    await engine.dispose()
+
+
+@pytest.fixture
+def job() -> BatchJob:
+    return BatchJob(
+        id=uuid4(),
+        name="test-job",
+        task="transcribe",
+        repo_id="openai/whisper-large-v3",
+        input_dir="/data/input",
+        output_dir="/data/output",
+        profile="default",
+        host="localhost",
+        finished=0,
+        errored=0,
+        restarts=1,
+        max_restarts=3,
+    )
+
+
+def result(job, file, finished_at, duration_ms=1000.0, status="success", task=None):
+    return BatchJobResult(
+        job_id=job.id,
+        task=task or job.task,
+        file=file,
+        input_file=f"{job.input_dir}/{file}",
+        output_file=None,
+        started_at=finished_at - timedelta(milliseconds=duration_ms),
+        finished_at=finished_at,
+        duration_ms=duration_ms,
+        status=status,
+        error=None,
+    )
+
+
+class TestLatencyPercentiles:
+    def test_percentiles_of_durations(self):
+        latency = latency_percentiles(
+            "transcribe", [float(i) for i in range(100, 0, -1)]
+        )
+
+        assert latency.count == 100
+        assert latency.p50_ms == pytest.approx(50.5)
+        assert latency.p95_ms == pytest.approx(95.05)
+        assert latency.p99_ms == pytest.approx(99.01)
+        assert latency.max_ms == 100.0
+
+    def test_single_duration(self):
+        latency = latency_percentiles("transcribe", [42.0])
+
+        assert (latency.p50_ms, latency.p99_ms, latency.max_ms) == (42.0, 42.0, 42.0)
+
+
+class TestJobAnalytics:
+    async def test_throughput_eta_and_restarts(self, sessionmaker, job):
+        # One file every 10 seconds for 20 minutes, then 30 files in the last
+        # 5 minutes.
+        results = [
+            result(job, f"a{i:03d}.wav", T0 + timedelta(seconds=10 * i))
+            for i in range(1, 121)
+        ] + [
+            result(job, f"b{i:03d}.wav", T0 + timedelta(minutes=20, seconds=10 * i))
+            for i in range(1, 31)
+        ]
+        job.staged = 1800
+        now = T0 + timedelta(minutes=25)
+        async with sessionmaker() as session, session.begin():
+            await record_results(session, results)
+            analytics = await job_analytics(session, job, walltime="00:30:00", now=now)
+
+        windows = {w.window_seconds: w for w in analytics.throughput}
+        assert windows[300].files == 30
+        assert windows[300].files_per_second == pytest.approx(0.1)
+        assert windows[900].files == 30 + 60
+        # The job is younger than an hour (its first file started 9s after
+        # T0), so that window covers its age.
+        assert windows[3600].files == 150
+        assert windows[3600].files_per_second == pytest.approx(150 / (25 * 60 - 9))
+
+        # The 5-minute rate has enough files to drive the ETA.
+        assert analytics.files_per_second == pytest.approx(0.1)
+        assert analytics.eta_seconds == pytest.approx(18000)
+        assert analytics.walltime_seconds == 1800
+        assert analytics.projected_restarts == 9
+        assert analytics.restart_budget == 2
+
+    async def test_stopped_job_is_measured_up_to_its_last_result(
+        self, sessionmaker, job
+    ):
+        job.output_ext = ".txt"
+        job.stages = [{"task": "translate", "repo_id": "facebook/nllb-200"}]
+        results = [
+            result(job, f"{i}.wav", T0 + timedelta(seconds=i), duration_ms=1000.0 * i)
+            for i in range(1, 5)
+        ] + [result(job, "1.txt", T0 + timedelta(seconds=4), task="translate")]
+        job.staged = 8
+        async with sessionmaker() as session, session.begin():
+            await record_results(session, results)
+            analytics = await job_analytics(
+                session, job, now=T0 + timedelta(days=1), active=False
+            )
+
+        # Only files through the last stage count, and with fewer than 10 in
+        # any window the longest window's rate is used.
+        assert analytics.throughput[0].files == 1
+        assert analytics.files_per_second == pytest.approx(1 / 4)
+        assert analytics.eta_seconds == pytest.approx(32)
+        assert analytics.projected_restarts is None
+        latency = {task.task: task for task in analytics.latency}
+        assert latency["transcribe"].count == 4
+        assert latency["transcribe"].max_ms == 4000.0
+        assert latency["translate"].count == 1
+
+    async def test_errors_count_toward_neither_rate_nor_latency(
+        self, sessionmaker, job
+    ):
+        async with sessionmaker() as session, session.begin():
+            await record_results(session, [result(job, "a.wav", T0, status="error")])
+            analytics = await job_analytics(session, job, now=T0)
+
+        assert [w.files for w in analytics.throughput] == [0, 0, 0]
+        assert analytics.latency == []
+        assert analytics.files_per_second is None
+        assert analytics.eta_seconds is None
@@ -0,0 +1,138 @@
+"""Unit tests for sampling estimates of batch job cost."""
+
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+import pytest
+from advanced_alchemy.base import UUIDAuditBase
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from blackfish.server.jobs.base import BatchJob
+from blackfish.server.jobs.estimate import estimate_job, project, sample_walltime
+from blackfish.server.jobs.results import BatchJobResult, record_results
+
+pytestmark = pytest.mark.anyio
+
+T0 = datetime(2026, 4, 3, 10, 0, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+async def sessionmaker(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'app.sqlite'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(UUIDAuditBase.metadata.create_all)
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    await engine.dispose()
+
+
+@pytest.fixture
+def job() -> BatchJob:
+    return BatchJob(
+        id=uuid4(),
+        name="test-job",
+        task="transcribe",
+        repo_id="openai/whisper-large-v3",
+        input_dir="/data/input",
+        output_dir="/data/output",
+        output_ext=".txt",
+        profile="default",
+        host="localhost",
+        sample=10,
+        input_count=1000,
+        resources={"gpus": 2},
+    )
+
+
+def result(job, file, duration_ms, status="success", task=None):
+    finished_at = T0 + timedelta(minutes=1)
+    return BatchJobResult(
+        job_id=job.id,
+        task=task or job.task,
+        file=file,
+        input_file=f"{job.input_dir}/{file}",
+        output_file=None,
+        started_at=finished_at - timedelta(milliseconds=duration_ms),
+        finished_at=finished_at,
+        duration_ms=duration_ms,
+        status=status,
+        error=None,
+    )
+
+
+def test_sample_walltime_is_short_unless_the_job_is_shorter():
+    assert sample_walltime("1-00:00:00") == "00:30:00"
+    assert sample_walltime("00:10:00") == "00:10:00"
+    assert sample_walltime("UNLIMITED") == "UNLIMITED"
+
+
+class TestProject:
+    def test_one_allocation(self):
+        estimate = project(100, 3.0, shards=4, gpus=1, walltime=3600)
+
+        assert estimate.files_per_shard == 25
+        assert estimate.allocations == 1
+        assert estimate.wall_clock_seconds == 75 + 600
+        assert estimate.gpu_hours == pytest.approx(4 * 675 / 3600)
+
+    def test_allocations_fit_the_walltime_less_startup(self):
+        # 36000s of processing at 3000s per one-hour allocation.
+        estimate = project(1000, 36.0, shards=1, gpus=1, walltime=3600)
+
+        assert estimate.allocations == 12
+        assert estimate.wall_clock_seconds == 36000 + 12 * 600
+        assert estimate.gpu_hours == pytest.approx(12.0)
+
+    def test_without_walltime(self):
+        estimate = project(1000, 36.0, shards=1, gpus=1, walltime=None)
+
+        assert estimate.allocations == 1
+        assert estimate.wall_clock_seconds == 36600
+
+
+class TestEstimateJob:
+    async def test_extrapolates_mean_time_per_file(self, sessionmaker, job):
+        results = [result(job, f"{i}.wav", 30_000 + 2_000 * i) for i in range(7)]
+        results.append(result(job, "err.wav", 1_000, status="error"))
+        async with sessionmaker() as session, session.begin():
+            await record_results(session, results)
+            estimate = await estimate_job(
+                session, job, walltime="01:00:00", shard_counts=[4, 1, 4]
+            )
+
+        assert estimate.sampled == 10
+        assert (estimate.succeeded, estimate.failed) == (7, 1)
+        # Errors don't count toward the time per file.
+        assert estimate.seconds_per_file == pytest.approx(36.0)
+        assert estimate.walltime_seconds == 3600
+        assert [p.shards for p in estimate.projections] == [1, 4]
+        one, four = estimate.projections
+        assert one.allocations == 12
+        assert one.gpu_hours == pytest.approx(2 * 43200 / 3600)
+        assert four.files_per_shard == 250
+        assert four.allocations == 3
+        assert four.wall_clock_seconds == 9000 + 3 * 600
+
+    async def test_slowest_stage_sets_the_pace(self, sessionmaker, job):
+        job.stages = [{"task": "translate", "repo_id": "facebook/nllb-200"}]
+        results = [
+            result(job, "a.wav", 10_000),
+            result(job, "a.txt", 40_000, task="translate"),
+        ]
+        async with sessionmaker() as session, session.begin():
+            await record_results(session, results)
+            estimate = await estimate_job(session, job)
+
+        assert estimate.stage_seconds == {"transcribe": 10.0, "translate": 40.0}
+        assert estimate.seconds_per_file == pytest.approx(40.0)
+        assert estimate.succeeded == 1
+        # Off Slurm, each shard is a single run.
+        assert {p.allocations for p in estimate.projections} == {1}
+
+    async def test_no_projection_until_every_stage_has_a_file(self, sessionmaker, job):
+        job.stages = [{"task": "translate", "repo_id": "facebook/nllb-200"}]
+        async with sessionmaker() as session, session.begin():
+            await record_results(session, [result(job, "a.wav", 10_000)])
+            estimate = await estimate_job(session, job)
+
+        assert estimate.seconds_per_file is None
+        assert estimate.projections == []
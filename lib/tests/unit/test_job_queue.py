@@ -0,0 +1,161 @@
+"""Unit tests for the batch job allocation queue."""
+
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+import pytest
+from advanced_alchemy.base import UUIDAuditBase
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from blackfish.server.jobs.base import BatchJob, BatchJobStatus
+from blackfish.server.jobs.queue import (
+    QueueLimits,
+    SlotUsage,
+    queued_jobs,
+    renumber_queue,
+    should_queue,
+)
+
+pytestmark = pytest.mark.anyio
+
+T0 = datetime(2026, 10, 19, 12, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+async def session(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'app.sqlite'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(UUIDAuditBase.metadata.create_all)
+    async with async_sessionmaker(engine, expire_on_commit=False)() as session:
+        yield session
+    await engine.dispose()
+
+
+def make_job(**kwargs) -> BatchJob:
+    defaults = {
+        "id": uuid4(),
+        "name": "test-job",
+        "task": "transcribe",
+        "repo_id": "openai/whisper-large-v3",
+        "input_dir": "/data/input",
+        "output_dir": "/data/output",
+        "profile": "della",
+        "host": "della.princeton.edu",
+        "user": "shamu",
+        "status": BatchJobStatus.RUNNING,
+    }
+    defaults.update(kwargs)
+    return BatchJob(**defaults)
+
+
+async def add_jobs(session, *jobs: BatchJob) -> None:
+    session.add_all(jobs)
+    await session.flush()
+
+
+class TestQueueLimits:
+    def test_from_config(self):
+        config = type(
+            "Config",
+            (),
+            {"MAX_ALLOCATIONS_PER_PROFILE": 4, "MAX_ALLOCATIONS_PER_USER": 2},
+        )()
+
+        limits = QueueLimits.from_config(config)
+
+        assert limits == QueueLimits(per_profile=4, per_user=2)
+        assert limits.enabled()
+
+    def test_disabled_by_default(self):
+        assert not QueueLimits.from_config(object()).enabled()
+
+    def test_validate_rejects_job_over_a_cap(self):
+        limits = QueueLimits(per_profile=4, per_user=2)
+
+        limits.validate(make_job(shards=2))
+        with pytest.raises(ValueError, match="at most 2 per user"):
+            limits.validate(make_job(shards=3))
+
+
+class TestSlotUsage:
+    def test_counts_shards_per_profile_and_user(self):
+        usage = SlotUsage(
+            [
+                make_job(shards=3),
+                make_job(profile="della-gpu"),
+                make_job(user="orca"),
+            ]
+        )
+
+        assert usage.profiles == {"della": 4, "della-gpu": 1}
+        assert usage.users == {
+            ("della.princeton.edu", "shamu"): 4,
+            ("della.princeton.edu", "orca"): 1,
+        }
+
+    def test_fits_under_each_cap(self):
+        usage = SlotUsage([make_job(shards=2)])
+
+        assert usage.fits(make_job(), QueueLimits(per_profile=3))
+        assert not usage.fits(make_job(shards=2), QueueLimits(per_profile=3))
+        assert not usage.fits(make_job(profile="other"), QueueLimits(per_user=2))
+        assert usage.fits(make_job(user="orca"), QueueLimits(per_user=2))
+
+    def test_oversized_job_never_fits(self):
+        assert not SlotUsage([]).fits(make_job(shards=8), QueueLimits(per_profile=2))
+
+
+class TestShouldQueue:
+    async def test_not_without_caps(self, session):
+        await add_jobs(session, make_job(shards=16))
+
+        assert not await should_queue(session, make_job(), QueueLimits())
+
+    async def test_when_a_cap_is_reached(self, session):
+        await add_jobs(session, make_job(), make_job(status=BatchJobStatus.STOPPED))
+        limits = QueueLimits(per_user=1)
+
+        assert await should_queue(session, make_job(), limits)
+        assert not await should_queue(session, make_job(user="orca"), limits)
+
+    async def test_behind_jobs_already_waiting(self, session):
+        await add_jobs(session, make_job(status=BatchJobStatus.QUEUED))
+        limits = QueueLimits(per_profile=4)
+
+        assert await should_queue(session, make_job(), limits)
+        assert not await should_queue(
+            session, make_job(profile="other", user="orca"), limits
+        )
+
+    async def test_rejects_job_over_a_cap(self, session):
+        with pytest.raises(ValueError):
+            await should_queue(session, make_job(shards=8), QueueLimits(per_user=4))
+
+
+class TestRenumberQueue:
+    async def test_orders_by_priority_then_submission(self, session):
+        old = make_job(status=BatchJobStatus.QUEUED, created_at=T0)
+        new = make_job(
+            status=BatchJobStatus.QUEUED, created_at=T0 + timedelta(minutes=1)
+        )
+        urgent = make_job(
+            status=BatchJobStatus.QUEUED,
+            created_at=T0 + timedelta(minutes=2),
+            priority=10,
+        )
+        running = make_job(created_at=T0)
+        await add_jobs(session, old, new, urgent, running)
+
+        await renumber_queue(session)
+
+        assert [job.id for job in await queued_jobs(session)] == [
+            urgent.id,
+            old.id,
+            new.id,
+        ]
+        assert (urgent.queue_position, old.queue_position, new.queue_position) == (
+            1,
+            2,
+            3,
+        )
+        assert running.queue_position is None
@@ -0,0 +1,289 @@
+"""Unit tests for persisted per-file batch results."""
+
+from datetime import datetime, timezone
+from unittest import mock
+from uuid import uuid4
+
+import pytest
+from advanced_alchemy.base import UUIDAuditBase
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from blackfish.server.jobs.base import BatchJob
+from blackfish.server.jobs.client import (
+    TigerFlowErrorDetail,
+    TigerFlowFileMetric,
+    TigerFlowPipelineProgress,
+    TigerFlowProgress,
+    TigerFlowReport,
+    TigerFlowReportStatus,
+    TigerFlowTaskMetrics,
+)
+from blackfish.server.jobs import results as results_module
+from blackfish.server.jobs.results import (
+    collect_results,
+    query_results,
+    record_results,
+    replace_results,
+)
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def sessionmaker(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'app.sqlite'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(UUIDAuditBase.metadata.create_all)
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    await engine.dispose()
+
+
+@pytest.fixture
+def job() -> BatchJob:
+    return BatchJob(
+        id=uuid4(),
+        name="test-job",
+        task="transcribe",
+        repo_id="openai/whisper-large-v3",
+        input_dir="/data/input",
+        output_dir="/data/output",
+        output_ext=".json",
+        profile="default",
+        host="localhost",
+    )
+
+
+def metric(file, second, status="success", duration_ms=1000.0):
+    return TigerFlowFileMetric(
+        file=file,
+        started_at=f"2026-04-03T10:00:{second - 1:02d}+00:00",
+        finished_at=f"2026-04-03T10:00:{second:02d}+00:00",
+        duration_ms=duration_ms,
+        status=status,
+    )
+
+
+def make_report(files, errors=None) -> TigerFlowReport:
+    return TigerFlowReport(
+        status=TigerFlowReportStatus(running=True, pid=1),
+        progress=TigerFlowProgress(
+            pipeline=TigerFlowPipelineProgress(
+                finished=0, in_progress=0, staged=0, errored=0
+            ),
+            tasks=[],
+        ),
+        metrics={
+            "transcribe": TigerFlowTaskMetrics(
+                count=len(files),
+                avg_ms=0.0,
+                min_ms=0.0,
+                max_ms=0.0,
+                durations=[],
+                files=files,
+            )
+        },
+        errors={
+            "transcribe": [
+                TigerFlowErrorDetail(
+                    file=file,
+                    path=f"/data/output/.tigerflow/transcribe/{file}.err",
+                    timestamp=None,
+                    exception_type="RuntimeError",
+                    message=message,
+                    traceback="",
+                )
+                for file, message in (errors or {}).items()
+            ]
+        },
+    )
+
+
+class TestCollectResults:
+    def test_keeps_latest_attempt_with_its_error(self, job):
+        report = make_report(
+            [
+                metric("b.wav", 5, "error"),
+                metric("a.wav", 2, "error"),
+                metric("a.wav", 1, "success"),
+            ],
+            errors={"a.wav": "Decoding failed", "b.wav": "Out of memory"},
+        )
+
+        results = {r.file: r for r in collect_results(job, report)}
+
+        assert results["a.wav"].status == "error"
+        assert results["a.wav"].error == "Decoding failed"
+        assert results["a.wav"].output_file is None
+        assert results["a.wav"].input_file == "/data/input/a.wav"
+        assert results["a.wav"].finished_at == datetime(
+            2026, 4, 3, 10, 0, 2, tzinfo=timezone.utc
+        )
+
+    def test_skips_results_already_recorded(self, job):
+        first = collect_results(job, make_report([metric("a.wav", 1)]))
+        recorded = {(r.task, r.file): r.fingerprint() for r in first}
+
+        report = make_report(
+            [metric("a.wav", 1), metric("b.wav", 2, "error")],
+            errors={"b.wav": "Decoding failed"},
+        )
+        assert [r.file for r in collect_results(job, report, recorded)] == ["b.wav"]
+
+        # An error file that appears later changes the result.
+        recorded[("transcribe", "b.wav")] = (
+            datetime(2026, 4, 3, 10, 0, 2, tzinfo=timezone.utc),
+            "error",
+            None,
+        )
+        assert [r.file for r in collect_results(job, report, recorded)] == ["b.wav"]
+
+    def test_later_stages_read_the_previous_stages_outputs(self, job):
+        job.output_ext = ".txt"
+        job.stages = [{"task": "translate", "repo_id": "facebook/nllb-200"}]
+        report = make_report([metric("a.wav", 1)])
+        report.metrics["translate"] = report.metrics["transcribe"].model_copy(
+            update={"files": [metric("a.txt", 2)]}
+        )
+
+        results = {r.task: r for r in collect_results(job, report)}
+
+        assert results["transcribe"].output_file == "/data/output/transcribe/a.txt"
+        assert results["translate"].input_file == "/data/output/transcribe/a.txt"
+        assert results["translate"].output_file == "/data/output/translate/a.txt"
+
+
+class TestRecordResults:
+    async def test_newer_attempts_replace_older(self, sessionmaker, job):
+        async with sessionmaker() as session, session.begin():
+            await record_results(
+                session, collect_results(job, make_report([metric("a.wav", 2)]))
+            )
+        async with sessionmaker() as session, session.begin():
+            # Out of order: an older attempt doesn't replace the stored one.
+            await record_results(
+                session,
+                collect_results(job, make_report([metric("a.wav", 1, "error")])),
+            )
+            await record_results(
+                session,
+                collect_results(
+                    job, make_report([metric("b.wav", 3), metric("b.wav", 4)])
+                ),
+            )
+
+        async with sessionmaker() as session:
+            results, cursor = await query_results(session, job.id)
+
+        assert [(r.file, r.status, r.finished_at.second) for r in results] == [
+            ("a.wav", "success", 2),
+            ("b.wav", "success", 4),
+        ]
+        assert cursor is None
+
+    async def test_replace_drops_results_missing_from_report(self, sessionmaker, job):
+        async with sessionmaker() as session, session.begin():
+            await record_results(
+                session,
+                collect_results(
+                    job, make_report([metric("a.wav", 1), metric("b.wav", 2)])
+                ),
+            )
+            await replace_results(
+                session, job.id, collect_results(job, make_report([metric("c.wav", 3)]))
+            )
+            results, _ = await query_results(session, job.id)
+
+        assert [r.file for r in results] == ["c.wav"]
+
+    async def test_replace_keeps_ids_of_stored_results(self, sessionmaker, job):
+        async with sessionmaker() as session, session.begin():
+            await replace_results(
+                session, job.id, collect_results(job, make_report([metric("a.wav", 1)]))
+            )
+            [before], _ = await query_results(session, job.id)
+        async with sessionmaker() as session, session.begin():
+            await replace_results(
+                session,
+                job.id,
+                collect_results(job, make_report([metric("a.wav", 2, "error")])),
+            )
+            [after], _ = await query_results(session, job.id)
+
+        assert after.id == before.id
+        assert after.status == "error"
+
+    async def test_replace_drops_results_written_at_the_same_time(
+        self, sessionmaker, job
+    ):
+        stamp = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        with (
+            mock.patch.object(results_module, "datetime", wraps=datetime) as clock,
+            mock.patch.object(results_module, "_DELETE_BATCH", 2),
+        ):
+            clock.now.return_value = stamp
+            async with sessionmaker() as session, session.begin():
+                await record_results(
+                    session,
+                    collect_results(
+                        job,
+                        make_report([metric(f"{name}.wav", 1) for name in "abcde"]),
+                    ),
+                )
+                await replace_results(
+                    session,
+                    job.id,
+                    collect_results(job, make_report([metric("f.wav", 2)])),
+                )
+                results, _ = await query_results(session, job.id)
+
+        assert [r.file for r in results] == ["f.wav"]
+
+
+class TestQueryResults:
+    @pytest.fixture
+    async def recorded(self, sessionmaker, job):
+        files = [
+            metric(f"{i:02d}.wav", i + 1, "error" if i % 3 == 0 else "success", i % 4)
+            for i in range(12)
+        ]
+        other = BatchJob(**{**job.to_dict(), "id": uuid4()})
+        async with sessionmaker() as session, session.begin():
+            await record_results(session, collect_results(job, make_report(files)))
+            await record_results(session, collect_results(other, make_report(files)))
+
+    async def test_filters_by_status_and_task(self, sessionmaker, job, recorded):
+        async with sessionmaker() as session:
+            errors, _ = await query_results(session, job.id, status="error")
+            other_task, _ = await query_results(session, job.id, task="translate")
+
+        assert [r.file for r in errors] == ["00.wav", "03.wav", "06.wav", "09.wav"]
+        assert other_task == []
+
+    @pytest.mark.parametrize(
+        "sort,order", [("finished_at", "asc"), ("duration", "desc")]
+    )
+    async def test_pages_cover_results_once(
+        self, sessionmaker, job, recorded, sort, order
+    ):
+        async with sessionmaker() as session:
+            everything, _ = await query_results(session, job.id, sort=sort, order=order)
+            pages = []
+            cursor = None
+            while True:
+                page, cursor = await query_results(
+                    session, job.id, sort=sort, order=order, limit=5, after=cursor
+                )
+                pages.append([r.file for r in page])
+                if cursor is None:
+                    break
+
+        assert [len(page) for page in pages] == [5, 5, 2]
+        assert sum(pages, []) == [r.file for r in everything]
+        if sort == "duration":
+            durations = [r.duration_ms for r in everything]
+            assert durations == sorted(durations, reverse=True)
+
+    async def test_rejects_invalid_cursor(self, sessionmaker, job):
+        async with sessionmaker() as session:
+            with pytest.raises(ValueError, match="Invalid cursor"):
+                await query_results(session, job.id, after="not-a-cursor")
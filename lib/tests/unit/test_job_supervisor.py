@@ -0,0 +1,566 @@
+"""Unit tests for the background batch job supervisor."""
+
+import asyncio
+from unittest.mock import AsyncMock, Mock, patch
+from uuid import uuid4
+
+import pytest
+from advanced_alchemy.base import UUIDAuditBase
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from blackfish.server.job import JobState
+from blackfish.server.jobs.base import BatchJob, BatchJobStatus, SlurmAllocation
+from blackfish.server.jobs.client import TigerFlowError, TigerFlowReport
+from blackfish.server.jobs.results import query_results, record_results
+from blackfish.server.jobs.supervisor import JobSupervisor
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def sessionmaker(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'app.sqlite'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(UUIDAuditBase.metadata.create_all)
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    await engine.dispose()
+
+
+async def add_job(sessionmaker, **kwargs) -> BatchJob:
+    defaults = {
+        "id": uuid4(),
+        "name": "test-job",
+        "task": "transcribe",
+        "repo_id": "openai/whisper-large-v3",
+        "input_dir": "/data/input",
+        "output_dir": "/data/output",
+        "profile": "default",
+        "host": "localhost",
+        "pid": "100",
+        "status": BatchJobStatus.RUNNING,
+    }
+    defaults.update(kwargs)
+    async with sessionmaker() as session, session.begin():
+        job = BatchJob(**defaults)
+        session.add(job)
+    return job
+
+
+async def get_job(sessionmaker, job_id) -> BatchJob | None:
+    async with sessionmaker() as session:
+        return await session.get(BatchJob, job_id)
+
+
+def supervisor(sessionmaker) -> JobSupervisor:
+    return JobSupervisor(sessionmaker, Mock(), interval=60)
+
+
+@pytest.fixture
+def mock_client():
+    async def fetch_slurm_states(jobs):
+        return {job.id: SlurmAllocation(JobState.RUNNING) for job in jobs}
+
+    with (
+        patch("blackfish.server.jobs.supervisor.create_tigerflow_client") as client,
+        patch(
+            "blackfish.server.jobs.supervisor.fetch_slurm_states",
+            side_effect=fetch_slurm_states,
+        ),
+    ):
+        client.return_value.last_report = None
+        yield client
+
+
+async def test_poll_once_persists_active_jobs(sessionmaker, mock_client):
+    running = await add_job(sessionmaker)
+    submitted = await add_job(sessionmaker, status=None)
+    stopped = await add_job(sessionmaker, status=BatchJobStatus.STOPPED)
+    polled = []
+
+    async def poll(self, client, app_config, *, slurm_state=None):
+        polled.append(self.id)
+        self.status = BatchJobStatus.RUNNING
+        self.finished = 7
+        return self.status
+
+    with patch.object(BatchJob, "poll", poll):
+        saved = await supervisor(sessionmaker).poll_once()
+
+    assert saved == 2
+    assert sorted(polled) == sorted([running.id, submitted.id])
+    for job_id in (running.id, submitted.id):
+        job = await get_job(sessionmaker, job_id)
+        assert job.status == BatchJobStatus.RUNNING
+        assert job.finished == 7
+    assert (await get_job(sessionmaker, stopped.id)).finished != 7
+
+
+async def test_failed_poll_leaves_job_unchanged(sessionmaker, mock_client):
+    job = await add_job(sessionmaker)
+    failing = AsyncMock(side_effect=RuntimeError("connection refused"))
+
+    with patch.object(BatchJob, "poll", failing):
+        saved = await supervisor(sessionmaker).poll_once()
+
+    assert saved == 0
+    assert (await get_job(sessionmaker, job.id)).status == BatchJobStatus.RUNNING
+
+
+async def test_result_discarded_if_job_changed_during_poll(sessionmaker, mock_client):
+    job = await add_job(sessionmaker)
+
+    async def poll(self, client, app_config, *, slurm_state=None):
+        # The job is stopped while its poll is in flight...
+        async with sessionmaker() as session, session.begin():
+            current = await session.get(BatchJob, self.id)
+            await asyncio.sleep(0.01)  # ensure a later updated_at
+            current.status = BatchJobStatus.STOPPED
+        # ...and the poll resubmits the allocation.
+        self.pid = "200"
+        self.restarts += 1
+        return self.status
+
+    with (
+        patch.object(BatchJob, "poll", poll),
+        patch.object(BatchJob, "_cancel_allocation", autospec=True) as cancel,
+    ):
+        saved = await supervisor(sessionmaker).poll_once()
+
+    assert saved == 0
+    current = await get_job(sessionmaker, job.id)
+    assert current.status == BatchJobStatus.STOPPED
+    assert current.pid == "100"
+    assert current.restarts == 0
+    # The orphaned allocation is cancelled.
+    cancel.assert_awaited_once()
+    assert cancel.await_args.args[0].pid == "200"
+
+
+async def test_resubmitting_poll_saves_allocation_time(sessionmaker, mock_client):
+    job = await add_job(sessionmaker)
+
+    async def poll(self, client, app_config, *, slurm_state=None):
+        # The allocation hit its walltime and was resubmitted, sized down.
+        self.pid = "200"
+        self.restarts += 1
+        self.status = BatchJobStatus.RESUBMITTED
+        self.allocation_time = "00:35:00"
+        return self.status
+
+    with patch.object(BatchJob, "poll", poll):
+        saved = await supervisor(sessionmaker).poll_once()
+
+    assert saved == 1
+    current = await get_job(sessionmaker, job.id)
+    assert current.pid == "200"
+    assert current.allocation_time == "00:35:00"
+
+
+async def test_poll_saves_cached_count_with_input_listing(sessionmaker, mock_client):
+    job = await add_job(sessionmaker, input_count=10, input_mtime=1, cached=4)
+
+    async def poll(self, client, app_config, *, slurm_state=None):
+        # Files were added to input_dir; some of them are in the result cache.
+        self.input_count = 15
+        self.input_mtime = 2
+        self.cached = 6
+        return self.status
+
+    with patch.object(BatchJob, "poll", poll):
+        await supervisor(sessionmaker).poll_once()
+
+    current = await get_job(sessionmaker, job.id)
+    assert (current.input_count, current.input_mtime, current.cached) == (15, 2, 6)
+
+
+async def test_result_discarded_if_job_deleted_during_poll(sessionmaker, mock_client):
+    job = await add_job(sessionmaker)
+
+    async def poll(self, client, app_config, *, slurm_state=None):
+        async with sessionmaker() as session, session.begin():
+            await session.delete(await session.get(BatchJob, self.id))
+        return self.status
+
+    with patch.object(BatchJob, "poll", poll):
+        saved = await supervisor(sessionmaker).poll_once()
+
+    assert saved == 0
+    assert await get_job(sessionmaker, job.id) is None
+
+
+async def test_polls_run_concurrently_up_to_limit_per_host(sessionmaker, mock_client):
+    for host in ("della", "della", "della", "tiger", "tiger", "tiger"):
+        await add_job(sessionmaker, host=host, user="test")
+    active: dict[str, int] = {"della": 0, "tiger": 0}
+    peak: dict[str, int] = {"della": 0, "tiger": 0}
+    overall = 0
+
+    async def poll(self, client, app_config, *, slurm_state=None):
+        nonlocal overall
+        active[self.host] += 1
+        peak[self.host] = max(peak[self.host], active[self.host])
+        overall = max(overall, sum(active.values()))
+        await asyncio.sleep(0.01)
+        active[self.host] -= 1
+        return self.status
+
+    with patch.object(BatchJob, "poll", poll):
+        await JobSupervisor(sessionmaker, Mock(), 60, max_per_host=2).poll_once()
+
+    assert peak == {"della": 2, "tiger": 2}
+    assert overall == 4
+
+
+async def test_slurm_states_fetched_once_per_cluster(sessionmaker, mock_client):
+    a = await add_job(sessionmaker, host="della", user="test", pid="1")
+    b = await add_job(sessionmaker, host="della", user="test", pid="2")
+    c = await add_job(sessionmaker, host="tiger", user="test", pid="3")
+    states = {
+        a.id: SlurmAllocation(JobState.RUNNING, 60),
+        b.id: SlurmAllocation(JobState.TIMEOUT, 3600),
+        c.id: SlurmAllocation(JobState.PENDING),
+    }
+    seen = {}
+
+    async def poll(self, client, app_config, *, slurm_state=None):
+        seen[self.id] = slurm_state
+        return self.status
+
+    with (
+        patch.object(BatchJob, "poll", poll),
+        patch(
+            "blackfish.server.jobs.supervisor.fetch_slurm_states",
+            AsyncMock(
+                side_effect=lambda jobs: {job.id: states[job.id] for job in jobs}
+            ),
+        ) as fetch,
+    ):
+        await supervisor(sessionmaker).poll_once()
+
+    assert sorted(
+        sorted(job.pid for job in call.args[0]) for call in fetch.await_args_list
+    ) == [
+        ["1", "2"],
+        ["3"],
+    ]
+    assert seen == states
+
+
+def report(*files: str, status: str = "success", errors=None) -> TigerFlowReport:
+    return TigerFlowReport.model_validate(
+        {
+            "status": {"running": True, "pid": 1},
+            "progress": {
+                "pipeline": {
+                    "finished": len(files),
+                    "in_progress": 0,
+                    "staged": 0,
+                    "errored": 0,
+                },
+                "tasks": [],
+            },
+            "metrics": {
+                "transcribe": {
+                    "count": len(files),
+                    "avg_ms": 1.0,
+                    "min_ms": 1.0,
+                    "max_ms": 1.0,
+                    "durations": [1.0] * len(files),
+                    "files": [
+                        {
+                            "file": file,
+                            "started_at": "2026-04-03T10:00:00+00:00",
+                            "finished_at": "2026-04-03T10:00:01+00:00",
+                            "duration_ms": 1.0,
+                            "status": status,
+                        }
+                        for file in files
+                    ],
+                }
+            },
+            "errors": errors or {},
+        }
+    )
+
+
+async def test_results_recorded_incrementally(sessionmaker, mock_client):
+    job = await add_job(sessionmaker)
+    reports = [report("a.wav"), report("a.wav", "b.wav")]
+
+    async def poll(self, client, app_config, *, slurm_state=None):
+        client.last_report = reports.pop(0)
+        return self.status
+
+    job_supervisor = supervisor(sessionmaker)
+    with (
+        patch.object(BatchJob, "poll", poll),
+        patch(
+            "blackfish.server.jobs.supervisor.record_results",
+            wraps=record_results,
+        ) as record,
+    ):
+        await job_supervisor.poll_once()
+        await job_supervisor.poll_once()
+
+    # The second pass writes only the new result.
+    assert [
+        [result.file for result in call.args[1]] for call in record.await_args_list
+    ] == [["a.wav"], ["b.wav"]]
+    async with sessionmaker() as session:
+        results, _ = await query_results(session, job.id)
+    assert sorted(result.file for result in results) == ["a.wav", "b.wav"]
+    current = await get_job(sessionmaker, job.id)
+    assert current.results_status == BatchJobStatus.RUNNING
+
+
+async def test_report_acknowledged_once_recorded(sessionmaker, mock_client):
+    await add_job(sessionmaker)
+    reader = mock_client.return_value.reader
+
+    async def poll(self, client, app_config, *, slurm_state=None):
+        client.last_report = report("a.wav")
+        return self.status
+
+    with patch.object(BatchJob, "poll", poll):
+        await supervisor(sessionmaker).poll_once()
+
+    assert mock_client.call_args.kwargs["incremental"] is True
+    reader.acknowledge.assert_called_once()
+
+
+async def test_discarded_report_not_acknowledged(sessionmaker, mock_client):
+    await add_job(sessionmaker)
+    reader = mock_client.return_value.reader
+
+    async def poll(self, client, app_config, *, slurm_state=None):
+        client.last_report = report("a.wav")
+        async with sessionmaker() as session, session.begin():
+            current = await session.get(BatchJob, self.id)
+            await asyncio.sleep(0.01)  # ensure a later updated_at
+            current.finished = 3
+        return self.status
+
+    with patch.object(BatchJob, "poll", poll):
+        await supervisor(sessionmaker).poll_once()
+
+    # The next poll's report lists the records again.
+    reader.acknowledge.assert_not_called()
+
+
+async def test_error_listed_after_its_record_is_recorded(sessionmaker, mock_client):
+    job = await add_job(sessionmaker)
+    error = {
+        "file": "a.wav",
+        "path": "/data/output/.tigerflow/transcribe/a.err",
+        "timestamp": None,
+        "exception_type": "ValueError",
+        "message": "Unreadable audio",
+        "traceback": "",
+    }
+    # The error file shows up after the record, which isn't listed again.
+    reports = [
+        report("a.wav", status="error"),
+        report(status="error", errors={"transcribe": [error]}),
+    ]
+
+    async def poll(self, client, app_config, *, slurm_state=None):
+        client.last_report = reports.pop(0)
+        return self.status
+
+    job_supervisor = supervisor(sessionmaker)
+    with patch.object(BatchJob, "poll", poll):
+        await job_supervisor.poll_once()
+        await job_supervisor.poll_once()
+
+    async with sessionmaker() as session:
+        [result], _ = await query_results(session, job.id)
+    assert (result.status, result.error) == ("error", "Unreadable audio")
+    assert job_supervisor._recorded[job.id]["transcribe", "a.wav"][2] == (
+        "Unreadable audio"
+    )
+
+
+async def test_start_polls_until_stopped(sessionmaker, mock_client):
+    await add_job(sessionmaker)
+    poll = AsyncMock(return_value=BatchJobStatus.RUNNING)
+    job_supervisor = JobSupervisor(sessionmaker, Mock(), interval=0.01)
+
+    with patch.object(BatchJob, "poll", poll):
+        job_supervisor.start()
+        await asyncio.sleep(0.2)
+        await job_supervisor.stop()
+        calls = poll.await_count
+        await asyncio.sleep(0.05)
+
+    assert calls >= 2
+    assert poll.await_count == calls
+
+
+def queue_supervisor(sessionmaker, **limits) -> JobSupervisor:
+    app_config = Mock(MAX_ALLOCATIONS_PER_PROFILE=0, MAX_ALLOCATIONS_PER_USER=0)
+    app_config.configure_mock(**limits)
+    return JobSupervisor(sessionmaker, app_config, interval=60)
+
+
+async def start(self, app_config, client):
+    self.pid = f"{self.name}-pid"
+    self.status = BatchJobStatus.SUBMITTED
+    self.queue_position = None
+
+
+async def test_queued_jobs_not_polled(sessionmaker, mock_client):
+    await add_job(sessionmaker, status=BatchJobStatus.QUEUED, pid=None)
+    poll = AsyncMock(return_value=BatchJobStatus.RUNNING)
+
+    with patch.object(BatchJob, "poll", poll):
+        saved = await supervisor(sessionmaker).poll_once()
+
+    assert saved == 0
+    poll.assert_not_awaited()
+
+
+async def test_dispatch_starts_queued_jobs_that_fit(sessionmaker, mock_client):
+    await add_job(sessionmaker, user="shamu")
+    blocked = await add_job(
+        sessionmaker, name="blocked", user="shamu", status=BatchJobStatus.QUEUED
+    )
+    later = await add_job(
+        sessionmaker, name="later", user="orca", status=BatchJobStatus.QUEUED
+    )
+    last = await add_job(
+        sessionmaker, name="last", user="orca", status=BatchJobStatus.QUEUED
+    )
+
+    with patch.object(BatchJob, "start", start):
+        started = await queue_supervisor(
+            sessionmaker, MAX_ALLOCATIONS_PER_USER=1
+        ).dispatch_once()
+
+    # The job behind a user at their cap still starts, and takes the slot.
+    assert started == 1
+    current = await get_job(sessionmaker, later.id)
+    assert current.status == BatchJobStatus.SUBMITTED
+    assert current.pid == "later-pid"
+    assert current.queue_position is None
+    for job_id, position in ((blocked.id, 1), (last.id, 2)):
+        current = await get_job(sessionmaker, job_id)
+        assert current.status == BatchJobStatus.QUEUED
+        assert current.queue_position == position
+
+
+async def test_dispatch_cancels_job_stopped_while_starting(sessionmaker, mock_client):
+    job = await add_job(sessionmaker, status=BatchJobStatus.QUEUED, pid=None)
+
+    async def stopped_start(self, app_config, client):
+        async with sessionmaker() as session, session.begin():
+            current = await session.get(BatchJob, self.id)
+            await asyncio.sleep(0.01)  # ensure a later updated_at
+            current.status = BatchJobStatus.STOPPED
+        await start(self, app_config, client)
+
+    with (
+        patch.object(BatchJob, "start", stopped_start),
+        patch.object(BatchJob, "_cancel_allocation", autospec=True) as cancel,
+    ):
+        started = await queue_supervisor(sessionmaker).dispatch_once()
+
+    assert started == 0
+    current = await get_job(sessionmaker, job.id)
+    assert current.status == BatchJobStatus.STOPPED
+    assert current.pid is None
+    cancel.assert_awaited_once()
+    assert cancel.await_args.args[0].pid == "test-job-pid"
+
+
+@pytest.mark.parametrize(
+    "error",
+    [RuntimeError("connection refused"), TigerFlowError("timeout", "della")],
+)
+async def test_failed_dispatch_stays_queued(sessionmaker, mock_client, error):
+    job = await add_job(sessionmaker, status=BatchJobStatus.QUEUED, pid=None)
+    failing = AsyncMock(side_effect=error)
+
+    with patch.object(BatchJob, "start", failing):
+        started = await queue_supervisor(sessionmaker).dispatch_once()
+
+    assert started == 0
+    current = await get_job(sessionmaker, job.id)
+    assert current.status == BatchJobStatus.QUEUED
+    assert current.queue_position == 1
+
+
+@pytest.mark.parametrize(
+    "error",
+    [
+        ValueError("Input directory /data/input does not exist"),
+        TigerFlowError("missing", "della"),
+    ],
+)
+async def test_dispatch_fails_job_that_cannot_run(sessionmaker, mock_client, error):
+    job = await add_job(sessionmaker, status=BatchJobStatus.QUEUED, pid=None)
+    waiting = await add_job(sessionmaker, status=BatchJobStatus.QUEUED, pid=None)
+
+    with patch.object(BatchJob, "start", AsyncMock(side_effect=[error, None])):
+        await queue_supervisor(sessionmaker).dispatch_once()
+
+    current = await get_job(sessionmaker, job.id)
+    assert current.status == BatchJobStatus.FAILED
+    assert current.queue_position is None
+    # It no longer holds up the queue.
+    assert (await get_job(sessionmaker, waiting.id)).queue_position == 1
+
+
+async def test_dispatched_job_with_all_inputs_cached_holds_no_slot(
+    sessionmaker, mock_client
+):
+    cached = await add_job(
+        sessionmaker, name="cached", status=BatchJobStatus.QUEUED, pid=None
+    )
+    later = await add_job(
+        sessionmaker, name="later", status=BatchJobStatus.QUEUED, pid=None
+    )
+
+    async def start_cached(self, app_config, client):
+        if self.name == "cached":
+            self.status = BatchJobStatus.STOPPED
+            self.queue_position = None
+        else:
+            await start(self, app_config, client)
+
+    with patch.object(BatchJob, "start", start_cached):
+        started = await queue_supervisor(
+            sessionmaker, MAX_ALLOCATIONS_PER_PROFILE=1
+        ).dispatch_once()
+
+    assert started == 2
+    assert (await get_job(sessionmaker, cached.id)).status == BatchJobStatus.STOPPED
+    assert (await get_job(sessionmaker, later.id)).status == BatchJobStatus.SUBMITTED
+
+
+async def test_dispatch_fails_job_over_a_cap(sessionmaker, mock_client):
+    job = await add_job(sessionmaker, status=BatchJobStatus.QUEUED, pid=None, shards=4)
+    mock_start = AsyncMock()
+
+    with patch.object(BatchJob, "start", mock_start):
+        await queue_supervisor(
+            sessionmaker, MAX_ALLOCATIONS_PER_PROFILE=2
+        ).dispatch_once()
+
+    mock_start.assert_not_awaited()
+    current = await get_job(sessionmaker, job.id)
+    assert current.status == BatchJobStatus.FAILED
+    assert current.queue_position is None
+
+
+async def test_dispatch_waits_for_admission(sessionmaker, mock_client):
+    job = await add_job(sessionmaker, status=BatchJobStatus.QUEUED, pid=None)
+    job_supervisor = queue_supervisor(sessionmaker, MAX_ALLOCATIONS_PER_PROFILE=1)
+
+    with patch.object(BatchJob, "start", start):
+        async with job_supervisor.admission:
+            dispatch = asyncio.create_task(job_supervisor.dispatch_once())
+            await asyncio.sleep(0.05)
+            # A request admitting a job holds the lock until it commits.
+            assert not dispatch.done()
+            assert (await get_job(sessionmaker, job.id)).status == BatchJobStatus.QUEUED
+        assert await dispatch == 1
@@ -1,8 +1,9 @@
 """Unit tests for BatchJob orchestration logic."""
 
 import datetime
+import os
 from unittest.mock import AsyncMock, Mock, patch
-from uuid import UUID
+from uuid import UUID, uuid4
 
 import pytest
 from blackfish.server.config import ContainerProvider
@@ -14,16 +15,24 @@ from blackfish.server.jobs.base import (
     BatchJobStatus,
     create_tigerflow_client,
     create_tigerflow_client_for_profile,
+    SlurmAllocation,
+    fetch_slurm_states,
 )
 from blackfish.server.jobs.client import (
+    LocalRunner,
     TigerFlowClient,
     TigerFlowError,
     TigerFlowPipelineProgress,
     TigerFlowProgress,
     TigerFlowReport,
     TigerFlowReportStatus,
+    TigerFlowTaskProgress,
     TigerFlowVersions,
 )
+from blackfish.server.jobs.cache import cache_dir, pipeline_key
+from blackfish.server.jobs.estimate import sample_dir
+from blackfish.server.jobs.manifest import manifest_path
+from blackfish.server.jobs.shards import merge_reports, shard_dir, shard_of
 from blackfish.server.jobs.tasks import (
     build_pipeline_config,
     get_default_input_ext,
@@ -161,6 +170,47 @@ class TestBatchJobStart:
             await job.start(MockAppConfig(), client)
 
 
+class TestBatchJobQueue:
+    """Tests for BatchJob.queue()."""
+
+    async def test_queue_runs_preflight_without_submitting(self) -> None:
+        """queue checks the job like start, but leaves it waiting for a slot."""
+        job = create_test_batch_job(status=None)
+        client = create_mock_client()
+        client.check_health.return_value = TigerFlowVersions(
+            tigerflow="0.2.0", tigerflow_ml="0.3.0"
+        )
+
+        submit = AsyncMock(return_value="99")
+        with patch.object(job, "_submit", new=submit):
+            await job.queue(MockAppConfig(), client)
+
+        submit.assert_not_called()
+        assert job.status == BatchJobStatus.QUEUED
+        assert job.pid is None
+        assert job.tigerflow_ml_version == "0.3.0"
+
+    async def test_queue_propagates_tigerflow_error(self) -> None:
+        """A job whose image isn't staged is rejected rather than queued."""
+        job = create_test_batch_job(status=None)
+        client = create_mock_client()
+        client.check_health.side_effect = TigerFlowError("missing", "host")
+
+        with pytest.raises(TigerFlowError):
+            await job.queue(MockAppConfig(), client)
+        assert job.status is None
+
+    async def test_queued_job_is_not_observed(self) -> None:
+        """refresh and poll leave a queued job alone: nothing runs yet."""
+        job = create_test_batch_job(status=BatchJobStatus.QUEUED, pid=None)
+        client = create_mock_client()
+
+        with patch.object(job, "_observe", new=AsyncMock()) as observe:
+            assert await job.refresh(client) == BatchJobStatus.QUEUED
+            assert await job.poll(client, MockAppConfig()) == BatchJobStatus.QUEUED
+        observe.assert_not_called()
+
+
 def make_mock_report(
     running: bool = True,
     pid: int | None = 12345,
@@ -191,6 +241,7 @@ def _drive_update(
     *,
     total: int,
     slurm_state: JobState,
+    elapsed: int | None = None,
     submit_job_id: str = "654321",
 ) -> AsyncMock:
     """Patch the update collaborators (input count, slurm state, resubmit).
@@ -199,7 +250,9 @@ def _drive_update(
     """
     submit = AsyncMock(return_value=submit_job_id)
     job._count_input_files = AsyncMock(return_value=total)  # type: ignore[method-assign]
-    job._slurm_state = AsyncMock(return_value=slurm_state)  # type: ignore[method-assign]
+    job._slurm_state = AsyncMock(  # type: ignore[method-assign]
+        return_value=SlurmAllocation(slurm_state, elapsed)
+    )
     job._submit = submit  # type: ignore[method-assign]
     return submit
 
@@ -237,6 +290,28 @@ class TestBatchJobUpdate:
         assert result == BatchJobStatus.PENDING
         submit.assert_not_called()
 
+    async def test_report_liveness_comes_from_the_allocation(self) -> None:
+        """A Slurm pipeline's pid is on a compute node; the allocation's state
+        says whether it runs. A job without an allocation leaves it to the
+        report reader."""
+        job = create_test_batch_job(status=BatchJobStatus.RUNNING, pid="123456")
+        client = create_mock_client()
+        client.report.return_value = make_mock_report(
+            finished=0, in_progress=0, staged=None, errored=0
+        )
+
+        _drive_update(job, total=10, slurm_state=JobState.PENDING)
+        await job.poll(client, MockAppConfig())
+        assert client.report.call_args.kwargs["running"] is False
+
+        _drive_update(job, total=10, slurm_state=JobState.RUNNING)
+        await job.poll(client, MockAppConfig())
+        assert client.report.call_args.kwargs["running"] is True
+
+        job.pid = f"local-{job.id.hex}"
+        await job.poll(client, MockAppConfig())
+        assert client.report.call_args.kwargs["running"] is None
+
     async def test_staged_reflects_true_remaining_when_pipeline_stopped(self) -> None:
         """Between allocations the report's pipeline.staged is null; staged must
         still reflect the real remaining against the input total, so the CLI's
@@ -295,6 +370,24 @@ class TestBatchJobUpdate:
         await job.poll(client, MockAppConfig())
         mock_remote.run.assert_not_called()
 
+    async def test_poll_records_per_stage_progress(self) -> None:
+        job = create_test_batch_job(status=BatchJobStatus.RUNNING)
+        client = create_mock_client()
+        report = make_mock_report(finished=2)
+        report.progress.tasks = [
+            TigerFlowTaskProgress(name="transcribe", processed=5, staged=1, failed=0),
+            TigerFlowTaskProgress(name="translate", processed=2, staged=3, failed=1),
+        ]
+        client.report.return_value = report
+        _drive_update(job, total=10, slurm_state=JobState.RUNNING)
+
+        await job.poll(client, MockAppConfig())
+
+        assert job.stage_progress == [
+            {"name": "transcribe", "processed": 5, "staged": 1, "failed": 0},
+            {"name": "translate", "processed": 2, "staged": 3, "failed": 1},
+        ]
+
     async def test_update_resubmits_when_ended_with_progress(self) -> None:
         """Allocation ended, progress advanced, under budget -> resubmit +
         RESUBMITTED."""
@@ -361,6 +454,92 @@ class TestBatchJobUpdate:
         assert job.stalled_restarts == 0
         assert job.processed_highwater == 6  # advanced at the boundary
 
+    @patch("blackfish.server.jobs.base.deserialize_profile")
+    async def test_resubmit_sizes_walltime_to_remaining_files(
+        self, mock_deserialize
+    ) -> None:
+        """A Slurm resubmit asks for the time the remaining files need, at
+        the last allocation's rate, within the partition limit."""
+        from blackfish.server.models.profile import SlurmProfile
+
+        mock_deserialize.return_value = SlurmProfile(
+            name="default",
+            host="localhost",
+            user="alice",
+            home_dir="/home/alice/.blackfish",
+            cache_dir="/scratch/cache",
+        )
+        job = create_test_batch_job(
+            status=BatchJobStatus.RUNNING, resources={"time": "1-00:00:00"}
+        )
+        client = create_mock_client()
+        client.report.return_value = make_mock_report(
+            finished=1440, in_progress=0, staged=None, errored=0
+        )
+        submit = _drive_update(
+            job, total=1448, slurm_state=JobState.TIMEOUT, elapsed=24 * 3600
+        )
+
+        assert await job.poll(client, MockAppConfig()) == BatchJobStatus.RESUBMITTED
+        submit.assert_called_once()
+        # 60 s/file over the last day: 8 files fit in 20 minutes.
+        assert job.allocation_time == "00:20:00"
+        client.runner.run.assert_called_with("cat /scratch/cache/resource_specs.yaml")
+
+        # That allocation managed one file: the 7 left would need hours, so
+        # the partition limit applies.
+        client.runner.run.return_value = (0, b"time:\n  max: 60\n", b"")
+        client.report.return_value = make_mock_report(
+            finished=1441, in_progress=0, staged=None, errored=0
+        )
+        _drive_update(job, total=1448, slurm_state=JobState.TIMEOUT, elapsed=20 * 60)
+
+        assert await job.poll(client, MockAppConfig()) == BatchJobStatus.RESUBMITTED
+        assert job.allocation_time == "01:00:00"
+
+    @patch("blackfish.server.jobs.base.deserialize_profile")
+    async def test_resubmit_sizes_walltime_to_time_the_allocation_ran(
+        self, mock_deserialize
+    ) -> None:
+        """An allocation that ended early (e.g. NODE_FAIL) is measured by the
+        time it ran, and resource specs without a time limit don't cap the
+        request at a default."""
+        from blackfish.server.models.profile import SlurmProfile
+
+        mock_deserialize.return_value = SlurmProfile(
+            name="default",
+            host="localhost",
+            user="alice",
+            home_dir="/home/alice/.blackfish",
+            cache_dir="/scratch/cache",
+        )
+        job = create_test_batch_job(
+            status=BatchJobStatus.RUNNING, resources={"time": "1-00:00:00"}
+        )
+        client = create_mock_client()
+        client.runner.run.return_value = (0, b"partitions: {}\n", b"")
+        client.report.return_value = make_mock_report(
+            finished=60, in_progress=0, staged=None, errored=0
+        )
+        _drive_update(job, total=1000, slurm_state=JobState.NODE_FAIL, elapsed=3600)
+
+        assert await job.poll(client, MockAppConfig()) == BatchJobStatus.RESUBMITTED
+        # 60 s/file: 940 files need ~19.6 hours with the margin, well past the
+        # 3 hours parse_resource_specs assumes when time.max isn't set.
+        assert job.allocation_time == "19:45:00"
+
+    async def test_resubmit_keeps_walltime_off_slurm(self) -> None:
+        """A local job (no profile here) isn't sized."""
+        job = create_test_batch_job(status=BatchJobStatus.RUNNING)
+        client = create_mock_client()
+        client.report.return_value = make_mock_report(
+            finished=5, in_progress=0, staged=None, errored=0
+        )
+        _drive_update(job, total=10, slurm_state=JobState.COMPLETED)
+
+        assert await job.poll(client, MockAppConfig()) == BatchJobStatus.RESUBMITTED
+        assert job.allocation_time is None
+
     async def test_update_stalls_when_no_progress(self) -> None:
         """Ended, no progress, stall budget reached -> STALLED."""
         job = create_test_batch_job(
@@ -522,6 +701,18 @@ class TestBatchJobStop:
 
         client.stop.assert_not_called()
 
+    async def test_stop_dequeues_queued_job(self) -> None:
+        """A queued job has nothing running: stop just takes it off the queue."""
+        job = create_test_batch_job(status=BatchJobStatus.QUEUED, pid=None)
+        job.queue_position = 2
+        client = create_mock_client()
+
+        await job.stop(client)
+
+        client.stop.assert_not_called()
+        assert job.status == BatchJobStatus.STOPPED
+        assert job.queue_position is None
+
     async def test_stop_calls_client_stop(self) -> None:
         """stop should call client.stop with output_dir."""
         job = create_test_batch_job(status=BatchJobStatus.RUNNING)
@@ -585,6 +776,7 @@ class TestBatchJobResume:
             restarts=20,
             stalled_restarts=1,
             processed_highwater=42,
+            allocation_time="00:20:00",
         )
         submit = AsyncMock(return_value="777")
         with patch.object(job, "_submit", new=submit):
@@ -595,6 +787,7 @@ class TestBatchJobResume:
         assert job.status == BatchJobStatus.RESUBMITTED
         assert job.restarts == 0
         assert job.stalled_restarts == 0
+        assert job.allocation_time is None
         # processed_highwater is intentionally preserved as the stall baseline.
         assert job.processed_highwater == 42
 
@@ -1103,6 +1296,59 @@ class TestTasks:
         rendered = job._pipeline_yaml()
         assert "output_ext: .txt" in rendered
 
+    def test_build_pipeline_config_chains_stages(self) -> None:
+        """Each stage depends on the one before and reads its outputs; a task
+        that appears twice gets a stage name of its own."""
+        config = build_pipeline_config(
+            task="transcribe",
+            input_ext=".wav",
+            output_ext=".txt",
+            stages=[
+                {"task": "translate", "params": {"target": "fr"}},
+                {"task": "translate", "output_ext": ".md"},
+            ],
+        )
+
+        assert [
+            (t["name"], t.get("depends_on"), t["input_ext"], t.get("output_ext"))
+            for t in config["tasks"]
+        ] == [
+            ("transcribe", None, ".wav", ".txt"),
+            ("translate", "transcribe", ".txt", ".txt"),
+            ("translate-2", "translate", ".txt", ".md"),
+        ]
+        assert config["tasks"][1]["params"] == {"target": "fr"}
+
+    def test_build_pipeline_config_rejects_stage_without_output_ext(self) -> None:
+        with pytest.raises(ValueError, match="'transcribe' needs an output extension"):
+            build_pipeline_config(
+                task="transcribe", input_ext=".wav", stages=[{"task": "translate"}]
+            )
+
+    def test_pipeline_config_passes_each_stage_its_model(self) -> None:
+        job = create_test_batch_job(
+            output_ext=".txt",
+            cache_dir="/scratch/models",
+            stages=[
+                {
+                    "task": "chat",
+                    "repo_id": "google/gemma-3-4b-it",
+                    "revision": "abc123",
+                    "params": {"prompt": "Summarize: {text}"},
+                }
+            ],
+        )
+
+        transcribe, chat = job.pipeline_config()["tasks"]
+
+        assert transcribe["params"]["model"] == "openai/whisper-large-v3"
+        assert chat["params"] == {
+            "model": "google/gemma-3-4b-it",
+            "revision": "abc123",
+            "cache_dir": "/scratch/models",
+            "prompt": "Summarize: {text}",
+        }
+
 
 class TestBatchJobImagePinning:
     """Tests for the persisted container image (``image_ref``).
@@ -1275,7 +1521,7 @@ class TestSlurmStateQuery:
     ) -> None:
         """-S excludes records that predate this job, so a recycled id can't
         match a years-old record from another user."""
-        mock_remote.run = AsyncMock(return_value=Mock(stdout=b"RUNNING"))
+        mock_remote.run = AsyncMock(return_value=Mock(stdout=b"RUNNING|00:10:00"))
         job = self._job(host="localhost", pid="12728301")
 
         await job._slurm_state()
@@ -1296,7 +1542,7 @@ class TestSlurmStateQuery:
         silently disable the liveness check. `env` is used rather than a shell
         prefix because the local path executes without a shell.
         """
-        mock_remote.run = AsyncMock(return_value=Mock(stdout=b"RUNNING"))
+        mock_remote.run = AsyncMock(return_value=Mock(stdout=b"RUNNING|00:10:00"))
         job = self._job(host="localhost", pid="12728301")
 
         await job._slurm_state()
@@ -1313,7 +1559,7 @@ class TestSlurmStateQuery:
         A fixed window (e.g. "now-1days") would hide any job that started
         earlier than that, leaving it permanently unobservable.
         """
-        mock_remote.run = AsyncMock(return_value=Mock(stdout=b"RUNNING"))
+        mock_remote.run = AsyncMock(return_value=Mock(stdout=b"RUNNING|00:10:00"))
         job = self._job(host="localhost", pid="12728301")
         job.created_at = datetime.datetime(
             2026, 1, 2, 3, 4, 5, tzinfo=datetime.timezone.utc
@@ -1330,7 +1576,7 @@ class TestSlurmStateQuery:
         mock_remote.run = AsyncMock()
         job = self._job(host="localhost", pid=None)
 
-        assert await job._slurm_state() == JobState.MISSING
+        assert await job._slurm_state() == SlurmAllocation(JobState.MISSING)
         mock_remote.run.assert_not_called()
 
     @patch("blackfish.server.jobs.base.remote")
@@ -1344,4 +1590,616 @@ class TestSlurmStateQuery:
         mock_remote.run = AsyncMock(side_effect=OSError("ssh exploded"))
         job = self._job(host="localhost", pid="12728301")
 
-        assert await job._slurm_state() == JobState.MISSING
+        assert await job._slurm_state() == SlurmAllocation(JobState.MISSING)
+
+    @patch("blackfish.server.jobs.base.remote")
+    async def test_reads_state_and_elapsed_time(self, mock_remote: Mock) -> None:
+        mock_remote.run = AsyncMock(return_value=Mock(stdout=b"NODE_FAIL|1-02:00:30\n"))
+        job = self._job(host="localhost", pid="12728301")
+
+        assert await job._slurm_state() == SlurmAllocation(
+            JobState.NODE_FAIL, 26 * 3600 + 30
+        )
+        cmd = mock_remote.run.call_args.args[0]
+        assert cmd[cmd.index("-o") + 1] == "State,Elapsed"
+
+
+class TestFetchSlurmStates:
+    """Tests for the batched sacct query in fetch_slurm_states()."""
+
+    def _job(self, pid: str | None, created: datetime.datetime, **kwargs) -> BatchJob:
+        job = create_test_batch_job(id=uuid4(), pid=pid, **kwargs)
+        job.created_at = created
+        return job
+
+    @patch("blackfish.server.jobs.base.remote")
+    async def test_one_query_per_cluster(self, mock_remote: Mock) -> None:
+        created = datetime.datetime(2026, 8, 21, 16, 0, tzinfo=datetime.timezone.utc)
+        della = [
+            self._job("101", created, host="della", user="test"),
+            self._job("102", created, host="della", user="test"),
+        ]
+        tiger = [self._job("201", created, host="tiger", user="test")]
+        outputs = {
+            "test@della": b"101|2026-08-21T16:01:00|RUNNING|00:59:00\n"
+            b"102|2026-08-21T16:02:00|PENDING|00:00:00\n",
+            "test@tiger": b"201|2026-08-21T16:03:00|TIMEOUT|01:00:00\n",
+        }
+        mock_remote.ssh = AsyncMock(
+            side_effect=lambda dest, cmd: Mock(stdout=outputs[dest])
+        )
+
+        states = await fetch_slurm_states(della + tiger)
+
+        assert mock_remote.ssh.await_count == 2
+        commands = {
+            call.args[0]: call.args[1] for call in mock_remote.ssh.await_args_list
+        }
+        della_cmd = commands["test@della"]
+        assert della_cmd[:3] == ["env", "TZ=UTC", "sacct"]
+        assert della_cmd[della_cmd.index("-j") + 1] == "101,102"
+        assert states == {
+            della[0].id: SlurmAllocation(JobState.RUNNING, 59 * 60),
+            della[1].id: SlurmAllocation(JobState.PENDING),
+            tiger[0].id: SlurmAllocation(JobState.TIMEOUT, 3600),
+        }
+
+    @patch("blackfish.server.jobs.base.remote")
+    async def test_query_uses_earliest_bound(self, mock_remote: Mock) -> None:
+        mock_remote.run = AsyncMock(return_value=Mock(stdout=b""))
+        jobs = [
+            self._job(
+                "1",
+                datetime.datetime(2026, 8, 21, 16, 0, tzinfo=datetime.timezone.utc),
+            ),
+            self._job(
+                "2",
+                datetime.datetime(2026, 1, 2, 3, 4, 5, tzinfo=datetime.timezone.utc),
+            ),
+        ]
+
+        states = await fetch_slurm_states(jobs)
+
+        cmd = mock_remote.run.call_args.args[0]
+        assert cmd[cmd.index("-S") + 1] == "2026-01-01T21:04:05"
+        assert set(states.values()) == {SlurmAllocation(JobState.MISSING)}
+
+    @patch("blackfish.server.jobs.base.remote")
+    async def test_records_before_a_jobs_own_bound_are_ignored(
+        self, mock_remote: Mock
+    ) -> None:
+        """The shared bound is the earliest job's, so it can return an old
+        record whose recycled id matches a newer job. That record belongs to
+        another job and must not be read as this one's state."""
+        old = self._job(
+            "1", datetime.datetime(2026, 1, 2, tzinfo=datetime.timezone.utc)
+        )
+        new = self._job(
+            "2", datetime.datetime(2026, 8, 21, tzinfo=datetime.timezone.utc)
+        )
+        mock_remote.run = AsyncMock(
+            return_value=Mock(
+                stdout=b"1|2026-01-02T00:10:00|RUNNING|00:01:00\n"
+                b"2|2026-03-01T00:00:00|COMPLETED|00:02:00\n"
+                b"2|2026-08-21T00:05:00|RUNNING|00:03:00\n"
+            )
+        )
+
+        states = await fetch_slurm_states([old, new])
+
+        assert states == {
+            old.id: SlurmAllocation(JobState.RUNNING, 60),
+            new.id: SlurmAllocation(JobState.RUNNING, 180),
+        }
+
+    @patch("blackfish.server.jobs.base.remote")
+    async def test_job_array_is_alive_while_any_task_is(
+        self, mock_remote: Mock
+    ) -> None:
+        created = datetime.datetime(2026, 8, 21, tzinfo=datetime.timezone.utc)
+        running = self._job("300", created, shards=3)
+        ended = self._job("400", created, shards=2)
+        mock_remote.run = AsyncMock(
+            return_value=Mock(
+                stdout=b"300_0|2026-08-21T00:05:00|COMPLETED|00:10:00\n"
+                b"300_1|2026-08-21T00:05:00|RUNNING|00:20:00\n"
+                b"300_[2]|2026-08-21T00:05:00|PENDING|00:00:00\n"
+                b"400_0|2026-08-21T00:05:00|COMPLETED|00:40:00\n"
+                b"400_1|2026-08-21T00:05:00|TIMEOUT|01:00:00\n"
+            )
+        )
+
+        states = await fetch_slurm_states([running, ended])
+
+        # An array's elapsed time is its longest-running task's.
+        assert states == {
+            running.id: SlurmAllocation(JobState.RUNNING, 20 * 60),
+            ended.id: SlurmAllocation(JobState.COMPLETED, 3600),
+        }
+
+    @patch("blackfish.server.jobs.base.remote")
+    async def test_failures_are_missing(self, mock_remote: Mock) -> None:
+        created = datetime.datetime(2026, 8, 21, tzinfo=datetime.timezone.utc)
+        no_pid = self._job(None, created)
+        failed = self._job("1", created, host="della", user="test")
+        mock_remote.ssh = AsyncMock(side_effect=OSError("ssh exploded"))
+
+        states = await fetch_slurm_states([no_pid, failed])
+
+        assert states == {
+            no_pid.id: SlurmAllocation(JobState.MISSING),
+            failed.id: SlurmAllocation(JobState.MISSING),
+        }
+        mock_remote.ssh.assert_awaited_once()
+
+
+class TestInputManifest:
+    """Tests for the cached input manifest behind ``_count_input_files``."""
+
+    @pytest.fixture
+    def job(self, tmp_path) -> BatchJob:
+        input_dir = tmp_path / "input"
+        input_dir.mkdir()
+        for name in ("b.wav", "a.wav", "notes.txt"):
+            (input_dir / name).write_text("")
+        (input_dir / "nested").mkdir()
+        # Old enough that the scan doesn't share its second.
+        os.utime(input_dir, (1_700_000_000, 1_700_000_000))
+        return create_test_batch_job(
+            input_dir=str(input_dir), output_dir=str(tmp_path / "output")
+        )
+
+    @staticmethod
+    def client() -> Mock:
+        client = Mock()
+        client.runner.run = AsyncMock(side_effect=LocalRunner().run)
+        return client
+
+    async def test_scan_writes_manifest_and_records_count(self, job) -> None:
+        client = self.client()
+
+        assert await job._count_input_files(client) == 2
+
+        assert job.input_count == 2
+        assert job.input_mtime == 1_700_000_000
+        with open(manifest_path(job.output_dir)) as f:
+            assert f.read().splitlines() == ["a.wav", "b.wav"]
+
+    async def test_count_reused_while_directory_unchanged(self, job) -> None:
+        client = self.client()
+        await job._count_input_files(client)
+        client.runner.run.reset_mock()
+
+        assert await job._count_input_files(client) == 2
+
+        # Only the directory is stat'ed.
+        [call] = client.runner.run.await_args_list
+        assert "find" not in call.args[0]
+
+    async def test_directory_change_triggers_rescan(self, job) -> None:
+        client = self.client()
+        await job._count_input_files(client)
+
+        os.remove(os.path.join(job.input_dir, "a.wav"))
+        os.utime(job.input_dir, (1_700_000_100, 1_700_000_100))
+
+        assert await job._count_input_files(client) == 1
+        assert job.input_mtime == 1_700_000_100
+        with open(manifest_path(job.output_dir)) as f:
+            assert f.read().splitlines() == ["b.wav"]
+
+    async def test_mtime_not_kept_when_scan_races_a_change(self, job) -> None:
+        os.utime(job.input_dir)  # modified this second
+        client = self.client()
+
+        assert await job._count_input_files(client) == 2
+
+        assert job.input_mtime is None
+        client.runner.run.reset_mock()
+        await job._count_input_files(client)
+        assert "find" in client.runner.run.await_args.args[0]
+
+    async def test_failed_scan_is_inconclusive(self, job, tmp_path) -> None:
+        job.input_dir = str(tmp_path / "missing")
+
+        assert await job._count_input_files(self.client()) is None
+        assert job.input_count is None
+
+    async def test_start_builds_manifest(self, job) -> None:
+        client = create_mock_client()
+        client.check_health.return_value = TigerFlowVersions(
+            tigerflow="0.1.0", tigerflow_ml="0.1.0"
+        )
+        client.runner = LocalRunner()
+
+        with patch.object(BatchJob, "_submit", AsyncMock(return_value="12345")):
+            await job.start(MockAppConfig(), client)
+
+        assert job.input_count == 2
+        assert os.path.exists(manifest_path(job.output_dir))
+
+
+class TestShardedJobs:
+    """Tests for batch jobs split across a Slurm job array."""
+
+    @pytest.fixture
+    def job(self, tmp_path) -> BatchJob:
+        input_dir = tmp_path / "input"
+        input_dir.mkdir()
+        for i in range(12):
+            (input_dir / f"{i:02d}.wav").write_text("")
+        return create_test_batch_job(
+            input_dir=str(input_dir), output_dir=str(tmp_path / "output"), shards=3
+        )
+
+    @staticmethod
+    def shard_inputs(job: BatchJob, shard: int) -> list[str]:
+        with open(f"{shard_dir(job.output_dir, shard)}/inputs.txt") as f:
+            return f.read().splitlines()
+
+    async def test_stage_splits_inputs_into_disjoint_views(self, job) -> None:
+        client = Mock()
+        client.runner = LocalRunner()
+        await job._scan_inputs(client)
+
+        counts = await job._stage_shards(client)
+
+        shards = [self.shard_inputs(job, k) for k in range(3)]
+        assert counts == [len(names) for names in shards]
+        assert sorted(sum(shards, [])) == [f"{i:02d}.wav" for i in range(12)]
+        for k in range(3):
+            directory = shard_dir(job.output_dir, k)
+            for name in self.shard_inputs(job, k):
+                assert shard_of(name, 3) == k
+                link = os.path.join(directory, "input", name)
+                assert os.readlink(link) == os.path.join(job.input_dir, name)
+            # Outputs of every shard land in the job's own task directory.
+            assert os.path.realpath(
+                os.path.join(directory, "output", "transcribe")
+            ) == os.path.join(job.output_dir, "transcribe")
+            assert os.path.isdir(os.path.join(directory, "output", ".tigerflow"))
+
+        # New inputs join a shard; existing ones stay where they were.
+        open(os.path.join(job.input_dir, "12.wav"), "w").close()
+        await job._scan_inputs(client)
+        assert sum(await job._stage_shards(client)) == 13
+        for k in range(3):
+            assert set(shards[k]) <= set(self.shard_inputs(job, k))
+
+    @patch("blackfish.server.jobs.base.deserialize_profile")
+    def test_render_script_runs_a_job_array(self, mock_deserialize: Mock) -> None:
+        from blackfish.server.models.profile import SlurmProfile
+
+        mock_deserialize.return_value = SlurmProfile(
+            name="della",
+            host="della.princeton.edu",
+            user="alice",
+            home_dir="/home/alice/.blackfish",
+            cache_dir="/scratch/cache",
+        )
+        job = create_test_batch_job(shards=3)
+
+        script = job._render_script(MockAppConfig())
+        assert "#SBATCH --array=0,1,2" in script
+        assert (
+            "/data/output/.blackfish/shards/$SLURM_ARRAY_TASK_ID/input "
+            "/data/output/.blackfish/shards/$SLURM_ARRAY_TASK_ID/output"
+        ) in script
+
+        assert "#SBATCH --array=1\n" in job._render_script(MockAppConfig(), [1])
+        assert "--array" not in create_test_batch_job()._render_script(MockAppConfig())
+
+    @patch("blackfish.server.jobs.base.deserialize_profile")
+    async def test_start_rejects_sharding_without_slurm(
+        self, mock_deserialize: Mock
+    ) -> None:
+        from blackfish.server.models.profile import LocalProfile
+
+        mock_deserialize.return_value = LocalProfile(
+            name="local", home_dir="/home/alice/.blackfish", cache_dir="/cache"
+        )
+        client = create_resume_client()
+
+        with pytest.raises(ValueError, match="Slurm profile"):
+            await create_test_batch_job(shards=2).start(MockAppConfig(), client)
+        client.check_health.assert_not_called()
+
+    async def test_poll_aggregates_shards_and_resubmits_unfinished(self) -> None:
+        job = create_test_batch_job(
+            status=BatchJobStatus.RUNNING, shards=3, processed_highwater=2
+        )
+        client = create_mock_client()
+        finished = {0: 4, 1: 2, 2: 3}
+        client.report.side_effect = lambda output_dir, running: make_mock_report(
+            finished=finished[int(output_dir.split("/")[-2])],
+            in_progress=0,
+            staged=None,
+            errored=0,
+        )
+        submit = _drive_update(job, total=12, slurm_state=JobState.TIMEOUT)
+        job._stage_shards = AsyncMock(return_value=[4, 4, 4])  # type: ignore[method-assign]
+
+        result = await job.poll(client, MockAppConfig())
+
+        assert result == BatchJobStatus.RESUBMITTED
+        assert job.finished == 9
+        assert job.staged == 3
+        assert job.processed_highwater == 9
+        assert client.last_report.progress.pipeline.finished == 9
+        # Shard 0 has finished all of its inputs.
+        submit.assert_awaited_once()
+        assert submit.await_args.args[1] == [1, 2]
+
+    async def test_stop_stops_every_shard(self) -> None:
+        job = create_test_batch_job(status=BatchJobStatus.RUNNING, shards=2)
+        client = create_mock_client()
+
+        await job.stop(client)
+
+        assert sorted(call.args[0] for call in client.stop.await_args_list) == [
+            "/data/output/.blackfish/shards/0/output",
+            "/data/output/.blackfish/shards/1/output",
+        ]
+
+    def test_merge_reports_sums_progress(self) -> None:
+        merged = merge_reports(
+            [
+                make_mock_report(running=False, pid=None, finished=2, staged=None),
+                make_mock_report(running=True, pid=7, finished=3, errored=1, staged=4),
+            ]
+        )
+
+        assert merged.status.running is True
+        assert merged.status.pid == 7
+        pipeline = merged.progress.pipeline
+        assert (pipeline.finished, pipeline.in_progress, pipeline.staged) == (5, 6, 4)
+        assert pipeline.errored == 1
+
+
+class TestSampleJobs:
+    """Tests for batch jobs run on a sample of their inputs for an estimate."""
+
+    @pytest.fixture
+    def job(self, tmp_path) -> BatchJob:
+        input_dir = tmp_path / "input"
+        input_dir.mkdir()
+        for i in range(12):
+            (input_dir / f"{i:02d}.wav").write_text("")
+        return create_test_batch_job(
+            input_dir=str(input_dir), output_dir=str(tmp_path / "output"), sample=5
+        )
+
+    @staticmethod
+    def sampled(job: BatchJob) -> list[str]:
+        with open(f"{sample_dir(job.output_dir, job.id.hex)}/inputs.txt") as f:
+            return f.read().splitlines()
+
+    async def test_start_stages_a_sample(self, job) -> None:
+        client = create_mock_client()
+        client.check_health.return_value = TigerFlowVersions(
+            tigerflow="0.1.0", tigerflow_ml="0.1.0"
+        )
+        client.runner = LocalRunner()
+
+        with patch.object(BatchJob, "_submit", AsyncMock(return_value="12345")):
+            await job.start(MockAppConfig(), client)
+
+        sample = self.sampled(job)
+        assert len(set(sample)) == 5
+        assert set(sample) <= {f"{i:02d}.wav" for i in range(12)}
+        pipeline_input, pipeline_output = job.pipeline_paths()
+        assert sorted(os.listdir(pipeline_input)) == sorted(sample)
+        for name in sample:
+            link = os.path.join(pipeline_input, name)
+            assert os.readlink(link) == os.path.join(job.input_dir, name)
+        assert os.path.isdir(os.path.join(pipeline_output, ".tigerflow"))
+        # The whole input is counted, but the job is done with its sample.
+        assert job.input_count == 12
+        assert await job._count_input_files(client) == 5
+
+        # A resumed sample keeps its files.
+        await job._require_sample(client)
+        assert self.sampled(job) == sample
+
+    @patch("blackfish.server.jobs.base.deserialize_profile")
+    def test_render_script_runs_the_sample(self, mock_deserialize: Mock) -> None:
+        from blackfish.server.models.profile import SlurmProfile
+
+        mock_deserialize.return_value = SlurmProfile(
+            name="della",
+            host="della.princeton.edu",
+            user="alice",
+            home_dir="/home/alice/.blackfish",
+            cache_dir="/scratch/cache",
+        )
+        job = create_test_batch_job(sample=5, resources={"time": "1-00:00:00"})
+        directory = sample_dir(job.output_dir, job.id.hex)
+
+        script = job._render_script(MockAppConfig())
+
+        assert f"{directory}/input {directory}/output" in script
+        assert "#SBATCH --time=00:30:00" in script
+        # The estimate projects the whole job with the time it requests.
+        assert job.walltime(mock_deserialize.return_value) == "1-00:00:00"
+
+    @patch("blackfish.server.jobs.base.deserialize_profile")
+    async def test_start_rejects_sharded_sample(self, mock_deserialize: Mock) -> None:
+        from blackfish.server.models.profile import SlurmProfile
+
+        mock_deserialize.return_value = SlurmProfile(
+            name="della",
+            host="della.princeton.edu",
+            user="alice",
+            home_dir="/home/alice/.blackfish",
+            cache_dir="/scratch/cache",
+        )
+        client = create_resume_client()
+
+        with pytest.raises(ValueError, match="can't be sharded"):
+            await create_test_batch_job(shards=2, sample=5).start(
+                MockAppConfig(), client
+            )
+        client.check_health.assert_not_called()
+
+
+class TestResultCache:
+    """Tests for batch jobs reusing outputs through the result cache."""
+
+    @pytest.fixture
+    def input_dir(self, tmp_path) -> str:
+        input_dir = tmp_path / "input"
+        input_dir.mkdir()
+        for i in range(4):
+            (input_dir / f"{i:02d}.wav").write_text(f"audio {i}")
+        return str(input_dir)
+
+    @staticmethod
+    def job(tmp_path, input_dir: str, output: str) -> BatchJob:
+        return create_test_batch_job(
+            id=uuid4(),
+            input_dir=input_dir,
+            output_dir=str(tmp_path / output),
+            result_cache=str(tmp_path / "cache" / "results"),
+        )
+
+    @staticmethod
+    def client() -> AsyncMock:
+        client = create_resume_client()
+        client.runner = LocalRunner()
+        return client
+
+    @staticmethod
+    def process(job: BatchJob) -> None:
+        """Write the outputs the pipeline would for the job's inputs."""
+        os.makedirs(os.path.join(job.output_dir, "transcribe"), exist_ok=True)
+        for name in os.listdir(job.pipeline_paths()[0]):
+            stem = os.path.splitext(name)[0]
+            with open(
+                os.path.join(job.output_dir, "transcribe", f"{stem}.json"), "w"
+            ) as f:
+                f.write(f"transcript of {name}")
+
+    async def test_later_job_runs_only_uncached_inputs(
+        self, tmp_path, input_dir
+    ) -> None:
+        first = self.job(tmp_path, input_dir, "first")
+        client = self.client()
+        with patch.object(BatchJob, "_submit", AsyncMock(return_value="12345")):
+            await first.start(MockAppConfig(), client)
+        assert first.cached == 0
+        assert len(os.listdir(first.pipeline_paths()[0])) == 4
+        self.process(first)
+        await first._store_cache(client, first.result_cache)
+
+        # A new file, and a copy of a processed one under another name.
+        (tmp_path / "input" / "new.wav").write_text("new audio")
+        (tmp_path / "input" / "copy.wav").write_text("audio 1")
+        second = self.job(tmp_path, input_dir, "second")
+        with patch.object(BatchJob, "_submit", AsyncMock(return_value="12346")):
+            await second.start(MockAppConfig(), client)
+
+        assert second.cached == 5
+        assert os.listdir(second.pipeline_paths()[0]) == ["new.wav"]
+        assert await second._count_input_files(client) == 1
+        output = os.path.join(second.output_dir, "transcribe", "copy.json")
+        with open(output) as f:
+            assert f.read() == "transcript of 01.wav"
+
+    async def test_outputs_are_not_shared_with_the_cache(
+        self, tmp_path, input_dir
+    ) -> None:
+        first = self.job(tmp_path, input_dir, "first")
+        client = self.client()
+        with patch.object(BatchJob, "_submit", AsyncMock(return_value="12345")):
+            await first.start(MockAppConfig(), client)
+        self.process(first)
+        await first._store_cache(client, first.result_cache)
+        second = self.job(tmp_path, input_dir, "second")
+        with patch.object(BatchJob, "_submit", AsyncMock(return_value="12346")):
+            await second.start(MockAppConfig(), client)
+
+        # Editing either job's output leaves the cache as it was.
+        for job in (first, second):
+            with open(os.path.join(job.output_dir, "transcribe", "00.json"), "w") as f:
+                f.write("edited")
+        third = self.job(tmp_path, input_dir, "third")
+        with patch.object(BatchJob, "_submit", AsyncMock(return_value="12347")):
+            await third.start(MockAppConfig(), client)
+
+        with open(os.path.join(third.output_dir, "transcribe", "00.json")) as f:
+            assert f.read() == "transcript of 00.wav"
+
+    async def test_input_names_escaped_by_the_hash_tool(
+        self, tmp_path, input_dir
+    ) -> None:
+        # sha256sum escapes a backslash in a name and marks the line.
+        (tmp_path / "input" / "a\\b.wav").write_text("audio a")
+        first = self.job(tmp_path, input_dir, "first")
+        client = self.client()
+        with patch.object(BatchJob, "_submit", AsyncMock(return_value="12345")):
+            await first.start(MockAppConfig(), client)
+        self.process(first)
+        await first._store_cache(client, first.result_cache)
+
+        second = self.job(tmp_path, input_dir, "second")
+        with patch.object(BatchJob, "_submit", AsyncMock(return_value="12346")):
+            await second.start(MockAppConfig(), client)
+
+        assert second.cached == 5
+        output = os.path.join(second.output_dir, "transcribe", "a\\b.json")
+        with open(output) as f:
+            assert f.read() == "transcript of a\\b.wav"
+
+    async def test_job_with_every_input_cached_is_not_submitted(
+        self, tmp_path, input_dir
+    ) -> None:
+        first = self.job(tmp_path, input_dir, "first")
+        client = self.client()
+        with patch.object(BatchJob, "_submit", AsyncMock(return_value="12345")):
+            await first.start(MockAppConfig(), client)
+        self.process(first)
+        await first._store_cache(client, first.result_cache)
+
+        # Dispatched from the allocation queue.
+        second = self.job(tmp_path, input_dir, "second")
+        second.status = BatchJobStatus.QUEUED
+        second.queue_position = 1
+        submit = AsyncMock(return_value="12346")
+        with patch.object(BatchJob, "_submit", submit):
+            await second.start(MockAppConfig(), client)
+
+        submit.assert_not_called()
+        assert second.status == BatchJobStatus.STOPPED
+        assert second.queue_position is None
+        assert len(os.listdir(os.path.join(second.output_dir, "transcribe"))) == 4
+
+    async def test_completion_fills_the_cache(self) -> None:
+        job = create_test_batch_job(
+            status=BatchJobStatus.RUNNING, result_cache="/cache/results"
+        )
+        client = create_mock_client()
+        client.report.return_value = make_mock_report(
+            finished=10, in_progress=0, staged=0, errored=0
+        )
+        _drive_update(job, total=10, slurm_state=JobState.RUNNING)
+        job._store_cache = AsyncMock()  # type: ignore[method-assign]
+
+        assert await job.poll(client, MockAppConfig()) == BatchJobStatus.STOPPED
+        job._store_cache.assert_awaited_once_with(client, "/cache/results")
+
+    def test_pipeline_key(self) -> None:
+        job = create_test_batch_job()
+        key = pipeline_key(job.pipeline_config())
+
+        job.cache_dir = "/elsewhere"
+        assert pipeline_key(job.pipeline_config()) == key
+        job.revision = "abc123"
+        assert pipeline_key(job.pipeline_config()) != key
+
+    def test_pipeline_reads_the_cache_view(self) -> None:
+        job = create_test_batch_job(result_cache="/cache/results")
+
+        assert job.pipeline_paths() == (
+            f"{cache_dir(job.output_dir)}/input",
+            job.output_dir,
+        )
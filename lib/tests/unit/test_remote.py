@@ -3,6 +3,8 @@
 `run` is exercised against real local subprocesses (echo / false / sleep).
 `ssh` and `scp` mock `asyncio.create_subprocess_exec` so the transport-error
 classification and command construction can be tested without a remote host.
+`ssh_lines` swaps the ``ssh`` invocation for a local shell so its streaming
+can be exercised against real pipes.
 """
 
 from __future__ import annotations
@@ -172,6 +174,65 @@ async def test_scp_timeout() -> None:
     assert proc.killed
 
 
+def _patch_ssh_with_shell(script: str, procs: list | None = None) -> mock._patch:
+    """Run ``script`` in a local shell in place of any ssh invocation."""
+    create = asyncio.create_subprocess_exec
+
+    async def fake_exec(*cmd, **kwargs):
+        assert cmd[0] == "ssh"
+        proc = await create("sh", "-c", script, **kwargs)
+        if procs is not None:
+            procs.append(proc)
+        return proc
+
+    return mock.patch("asyncio.create_subprocess_exec", side_effect=fake_exec)
+
+
+async def test_ssh_lines_streams_output() -> None:
+    # The second line only arrives after the first has been consumed.
+    with _patch_ssh_with_shell("echo one; sleep 0.2; echo two >&2; echo two"):
+        lines = []
+        async for line in remote.ssh_lines("user@host", ["find"]):
+            lines.append(line)
+    assert lines == [b"one\n", b"two\n"]
+
+
+async def test_ssh_lines_error_after_output() -> None:
+    with _patch_ssh_with_shell("echo partial; echo 'denied' >&2; exit 1"):
+        lines = []
+        with pytest.raises(RemoteCommandError) as exc_info:
+            async for line in remote.ssh_lines("user@host", ["find"]):
+                lines.append(line)
+    assert lines == [b"partial\n"]
+    assert exc_info.value.returncode == 1
+    assert exc_info.value.stderr == b"denied\n"
+
+
+async def test_ssh_lines_transport_failure() -> None:
+    with _patch_ssh_with_shell("echo 'Connection refused' >&2; exit 255"):
+        with pytest.raises(RemoteConnectionError):
+            async for _ in remote.ssh_lines("user@host", ["find"]):
+                pass
+
+
+async def test_ssh_lines_timeout() -> None:
+    with _patch_ssh_with_shell("echo one; sleep 5"):
+        lines = []
+        with pytest.raises(RemoteTimeout):
+            async for line in remote.ssh_lines("user@host", ["find"], timeout=0.5):
+                lines.append(line)
+    assert lines == [b"one\n"]
+
+
+async def test_ssh_lines_close_kills_process() -> None:
+    procs: list = []
+    with _patch_ssh_with_shell("while true; do echo y; done", procs):
+        output = remote.ssh_lines("user@host", ["yes"])
+        assert await anext(output) == b"y\n"
+        await output.aclose()
+    assert procs[0].returncode is not None
+
+
 @pytest.mark.parametrize(
     "stderr",
     [
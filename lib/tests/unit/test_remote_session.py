@@ -0,0 +1,69 @@
+"""Unit tests for the pooled SSH/SFTP sessions."""
+
+from unittest import mock
+
+import pytest
+
+from blackfish.server.remote import session
+from blackfish.server.remote.session import _IDLE_TIMEOUT_SECONDS
+
+HOST, USER = "della.princeton.edu", "shamu"
+
+
+@pytest.fixture
+def connections():
+    """Give each test a fresh pool whose connections are mocks."""
+    with (
+        mock.patch.object(session, "_pool", session._SessionPool()),
+        mock.patch.object(session, "Connection") as connection,
+    ):
+        yield connection
+
+
+def go_idle() -> None:
+    session._pool.get(HOST, USER)._last_used -= _IDLE_TIMEOUT_SECONDS + 1
+
+
+def test_idle_session_is_reopened(connections):
+    with session.acquire(HOST, USER):
+        pass
+    go_idle()
+
+    with session.acquire(HOST, USER):
+        pass
+
+    assert connections.call_count == 2
+    connections.return_value.close.assert_called_once()
+
+
+def test_open_channel_keeps_session_from_idling(connections):
+    with session.channel(HOST, USER):
+        # A long stream on the channel outlasts the idle timeout...
+        go_idle()
+        with session.acquire(HOST, USER):
+            pass
+        # ...without another consumer closing the connection under it.
+        connections.return_value.close.assert_not_called()
+
+    # Closing the channel counts as a use, so the session isn't idle either.
+    with session.acquire(HOST, USER):
+        pass
+    assert connections.call_count == 1
+    assert session._pool.get(HOST, USER)._open_channels == 0
+
+
+def test_borrowed_channel_keeps_session_from_idling(connections):
+    with session.borrow(HOST, USER):
+        go_idle()
+        with session.acquire(HOST, USER):
+            pass
+        connections.return_value.close.assert_not_called()
+
+
+def test_execute_releases_its_channel(connections):
+    chan = connections.return_value.client.get_transport.return_value.open_session
+    chan.return_value.recv_exit_status.return_value = 0
+    chan.return_value.makefile.return_value.read.return_value = b"ok\n"
+
+    assert session.execute(HOST, USER, "true")[:2] == (0, b"ok\n")
+    assert session._pool.get(HOST, USER)._open_channels == 0
@@ -0,0 +1,287 @@
+"""Tests for reading TigerFlow reports directly from the output directory."""
+
+import json
+import os
+from pathlib import Path
+from unittest import mock
+
+import pytest
+from paramiko import SFTPAttributes
+
+from blackfish.server.config import ContainerProvider
+from blackfish.server.images import DEFAULT_IMAGES
+from blackfish.server.jobs.client import TigerFlowClient, TigerFlowError
+from blackfish.server.jobs.report import ReportReader, _LocalFilesystem
+
+pytestmark = pytest.mark.anyio
+
+
+class FakeSFTP:
+    """Minimal SFTP client backed by the local filesystem."""
+
+    def __init__(self):
+        self.close = mock.MagicMock()
+
+    def normalize(self, path):
+        return os.path.realpath(path)
+
+    def stat(self, path):
+        return SFTPAttributes.from_stat(os.stat(path))
+
+    def listdir_attr(self, path):
+        # SFTP servers list entries with lstat attributes.
+        return [
+            SFTPAttributes.from_stat(os.lstat(e.path), e.name) for e in os.scandir(path)
+        ]
+
+    def open(self, path, mode="r"):
+        return open(path, "rb")
+
+
+class TestReportReader:
+    async def test_reads_stopped_pipeline(self, tigerflow_output: Path) -> None:
+        report = await ReportReader("localhost").read(str(tigerflow_output))
+
+        assert report.status.running is False
+        assert report.status.pid is None
+        pipeline = report.progress.pipeline
+        assert (pipeline.finished, pipeline.in_progress, pipeline.errored) == (2, 1, 2)
+        # Nothing is staged once the pipeline has stopped.
+        assert pipeline.staged is None
+        assert [
+            (t.name, t.processed, t.staged, t.failed) for t in report.progress.tasks
+        ] == [
+            ("transcribe", 2, 3, 1),
+            ("translate", 1, 0, 1),
+        ]
+
+        transcribe = report.metrics["transcribe"]
+        assert transcribe.count == 2
+        assert transcribe.durations == [2500.0, 2500.0]
+        assert [f.status for f in transcribe.files] == ["success", "success", "error"]
+
+        [error] = report.errors["transcribe"]
+        assert error.file == "e.wav"
+        assert error.exception_type == "ValueError"
+        assert error.timestamp == "2026-04-03T10:00:05+00:00"
+        # An unreadable error file still counts, with what can be inferred.
+        [unreadable] = report.errors["translate"]
+        assert (unreadable.file, unreadable.message, unreadable.timestamp) == (
+            "f",
+            "",
+            None,
+        )
+
+    async def test_reads_running_pipeline(self, tigerflow_output: Path) -> None:
+        (tigerflow_output / ".tigerflow" / "run.pid").write_text(str(os.getpid()))
+
+        report = await ReportReader("localhost").read(str(tigerflow_output))
+
+        assert report.status.running is True
+        assert report.status.pid == os.getpid()
+        assert report.progress.pipeline.staged == 1
+
+    async def test_running_from_the_caller(self, tigerflow_output: Path) -> None:
+        # Under Slurm on this host (Open OnDemand), the recorded pid belongs to
+        # a compute node; a process here with the same pid says nothing.
+        (tigerflow_output / ".tigerflow" / "run.pid").write_text(str(os.getpid()))
+
+        report = await ReportReader("localhost").read(
+            str(tigerflow_output), running=False
+        )
+
+        assert report.status.running is False
+        assert report.progress.pipeline.staged is None
+
+    async def test_missing_output_dir(self, tmp_path: Path) -> None:
+        with pytest.raises(TigerFlowError, match="does not exist"):
+            await ReportReader("localhost").read(str(tmp_path / "missing"))
+
+    async def test_not_a_pipeline_dir(self, tmp_path: Path) -> None:
+        with pytest.raises(TigerFlowError, match="missing .tigerflow"):
+            await ReportReader("localhost").read(str(tmp_path))
+
+    async def test_reads_remote_pipeline_over_sftp(
+        self, tigerflow_output: Path
+    ) -> None:
+        sftp = FakeSFTP()
+        connection = mock.MagicMock()
+        connection.return_value.sftp.return_value = sftp
+        connection.return_value.client.open_sftp.return_value = sftp
+        with (
+            mock.patch("blackfish.server.remote.session.Connection", connection),
+            mock.patch("blackfish.server.remote.execute") as execute,
+        ):
+            reader = ReportReader("della", "test")
+            remote = await reader.read(str(tigerflow_output), running=True)
+            unknown = await reader.read(str(tigerflow_output))
+        local = await ReportReader("localhost").read(str(tigerflow_output))
+
+        # The pid is on a compute node: liveness comes from the caller.
+        execute.assert_not_called()
+        assert remote.status.running is True
+        assert unknown.status.running is False
+        assert remote.progress.pipeline.staged == 1
+        assert remote.progress.tasks == local.progress.tasks
+        assert remote.metrics == local.metrics
+        assert remote.errors == local.errors
+
+
+class TestClientReportFallback:
+    def _client(self, reader) -> TigerFlowClient:
+        runner = mock.AsyncMock()
+        runner.host = "localhost"
+        return TigerFlowClient(
+            runner=runner,
+            home_dir="/home/user",
+            image=DEFAULT_IMAGES["tigerflow_ml"],
+            provider=ContainerProvider.Apptainer,
+            cache_dir="/cache",
+            reader=reader,
+        )
+
+    async def test_reader_skips_the_container(self, tigerflow_output: Path) -> None:
+        client = self._client(ReportReader("localhost"))
+
+        report = await client.report(str(tigerflow_output))
+
+        assert report.progress.pipeline.finished == 2
+        client.runner.run.assert_not_called()
+
+    async def test_missing_pipeline_dir_is_not_retried(self, tmp_path: Path) -> None:
+        client = self._client(ReportReader("localhost"))
+
+        with pytest.raises(TigerFlowError):
+            await client.report(str(tmp_path))
+        client.runner.run.assert_not_called()
+
+    async def test_falls_back_to_the_container(self) -> None:
+        reader = mock.MagicMock()
+        reader.read = mock.AsyncMock(side_effect=OSError("Connection reset"))
+        client = self._client(reader)
+        client.runner.run.return_value = (1, b"", b"no image")
+
+        with pytest.raises(TigerFlowError, match="no image"):
+            await client.report("/data/out")
+
+        assert (
+            "tigerflow report /data/out --json" in client.runner.run.call_args.args[0]
+        )
+
+
+class TestIncrementalMetrics:
+    @staticmethod
+    def _log(output: Path) -> Path:
+        return output / ".tigerflow" / "transcribe" / "logs" / "123" / "task-123.log"
+
+    @staticmethod
+    def _metric(file: str) -> str:
+        data = {
+            "file": file,
+            "started_at": "2026-04-03T11:00:00+00:00",
+            "finished_at": "2026-04-03T11:00:01+00:00",
+            "status": "success",
+        }
+        return f"2026-04-03 11:00:01 | METRICS | {json.dumps(data)}\n"
+
+    async def test_only_new_records_are_read(self, tigerflow_output: Path) -> None:
+        reader = ReportReader("localhost", incremental=True)
+        log = self._log(tigerflow_output)
+
+        with mock.patch.object(
+            _LocalFilesystem,
+            "read_from",
+            autospec=True,
+            side_effect=_LocalFilesystem.read_from,
+        ) as read_from:
+            await reader.read(str(tigerflow_output))
+            reader.acknowledge()
+            assert sorted(call.args[2] for call in read_from.call_args_list) == [0, 0]
+            read_from.reset_mock()
+
+            # Nothing new: no log is read at all, and no record is listed.
+            report = await reader.read(str(tigerflow_output))
+            reader.acknowledge()
+            read_from.assert_not_called()
+            assert report.metrics["transcribe"].count == 2
+            assert report.metrics["transcribe"].files == []
+
+            size = log.stat().st_size
+            with log.open("a") as f:
+                f.write(self._metric("c.wav"))
+            report = await reader.read(str(tigerflow_output))
+
+        [call] = read_from.call_args_list
+        assert call.args[1:] == (str(log), size)
+        # The summary covers every record; the files only the new one.
+        transcribe = report.metrics["transcribe"]
+        assert (transcribe.count, transcribe.avg_ms) == (3, 2000.0)
+        assert [f.file for f in transcribe.files] == ["c.wav"]
+        assert transcribe.durations == [1000.0]
+        assert report.progress.tasks[0].processed == 3
+
+    async def test_unacknowledged_records_are_listed_again(
+        self, tigerflow_output: Path
+    ) -> None:
+        reader = ReportReader("localhost", incremental=True)
+        await reader.read(str(tigerflow_output))
+
+        report = await reader.read(str(tigerflow_output))
+        assert len(report.metrics["transcribe"].files) == 3
+
+        reader.acknowledge()
+        report = await reader.read(str(tigerflow_output))
+        assert report.metrics["transcribe"].files == []
+
+    async def test_full_reader_lists_every_record(self, tigerflow_output: Path) -> None:
+        reader = ReportReader("localhost")
+        await reader.read(str(tigerflow_output))
+        reader.acknowledge()
+
+        report = await reader.read(str(tigerflow_output))
+
+        assert len(report.metrics["transcribe"].files) == 3
+
+    async def test_partial_line_waits_for_the_rest(
+        self, tigerflow_output: Path
+    ) -> None:
+        reader = ReportReader("localhost", incremental=True)
+        log = self._log(tigerflow_output)
+        await reader.read(str(tigerflow_output))
+
+        line = self._metric("c.wav")
+        with log.open("a") as f:
+            f.write(line[:20])
+        report = await reader.read(str(tigerflow_output))
+        assert report.metrics["transcribe"].count == 2
+
+        with log.open("a") as f:
+            f.write(line[20:])
+        report = await reader.read(str(tigerflow_output))
+        assert report.metrics["transcribe"].count == 3
+
+    async def test_truncated_log_is_read_again(self, tigerflow_output: Path) -> None:
+        reader = ReportReader("localhost", incremental=True)
+        log = self._log(tigerflow_output)
+        await reader.read(str(tigerflow_output))
+        reader.acknowledge()
+
+        log.write_text(self._metric("c.wav"))
+        report = await reader.read(str(tigerflow_output))
+
+        transcribe = report.metrics["transcribe"]
+        assert [f.file for f in transcribe.files] == ["c.wav"]
+        assert (transcribe.count, transcribe.min_ms, transcribe.max_ms) == (
+            1,
+            1000.0,
+            1000.0,
+        )
+
+    async def test_removed_log_is_forgotten(self, tigerflow_output: Path) -> None:
+        reader = ReportReader("localhost", incremental=True)
+        await reader.read(str(tigerflow_output))
+
+        self._log(tigerflow_output).unlink()
+        report = await reader.read(str(tigerflow_output))
+
+        assert "transcribe" not in report.metrics
@@ -34,6 +34,7 @@ class TestReadFile:
 
         mock_sftp = mock.MagicMock()
         mock_sftp.open.return_value = mock_file
+        mock_sftp.stat.return_value.st_size = len(b"file content")
         mock_sftp.__enter__ = mock.MagicMock(return_value=mock_sftp)
         mock_sftp.__exit__ = mock.MagicMock(return_value=False)
 
@@ -51,6 +52,7 @@ class TestReadFile:
 
     def test_read_file_not_found(self, remote_profile):
         mock_sftp = mock.MagicMock()
+        mock_sftp.stat.side_effect = FileNotFoundError()
         mock_sftp.open.side_effect = FileNotFoundError()
         mock_sftp.__enter__ = mock.MagicMock(return_value=mock_sftp)
         mock_sftp.__exit__ = mock.MagicMock(return_value=False)
@@ -68,6 +70,7 @@ class TestReadFile:
 
     def test_read_file_permission_denied(self, remote_profile):
         mock_sftp = mock.MagicMock()
+        mock_sftp.stat.side_effect = PermissionError()
         mock_sftp.open.side_effect = PermissionError()
         mock_sftp.__enter__ = mock.MagicMock(return_value=mock_sftp)
         mock_sftp.__exit__ = mock.MagicMock(return_value=False)
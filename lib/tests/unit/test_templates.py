@@ -98,6 +98,9 @@ def _batch_ctx(provider: str) -> dict:
         "pipeline_path": PIPELINE_PATH,
         "input_dir": INPUT_DIR,
         "output_dir": OUTPUT_DIR,
+        "pipeline_input": INPUT_DIR,
+        "pipeline_output": OUTPUT_DIR,
+        "array": None,
         "cache_dir": CACHE_DIR,
         "idle_timeout": IDLE_TIMEOUT,
     }
@@ -0,0 +1,244 @@
+"""Tests for parallel, ranged SFTP transfers.
+
+The SFTP client and the command channel are backed by the local filesystem
+and a local shell, so chunked writes, retries and digest verification run
+against real files.
+"""
+
+import io
+import os
+import subprocess
+from unittest import mock
+
+import pytest
+from paramiko import SFTPAttributes
+
+from blackfish.server import sftp, transfer
+from blackfish.server.models.profile import SlurmProfile
+
+
+HOST = "remote.example.com"
+USER = "testuser"
+
+
+class FakeFile(io.FileIO):
+    def set_pipelined(self, pipelined=True):
+        pass
+
+
+class FakeSFTP:
+    """Minimal SFTP client backed by the local filesystem."""
+
+    def __init__(self):
+        self.close = mock.MagicMock()
+        self.fail_opens: dict[str, int] = {}
+
+    def open(self, path, mode="r"):
+        remaining = self.fail_opens.get(mode, 0)
+        if remaining:
+            self.fail_opens[mode] = remaining - 1
+            raise EOFError("Channel closed")
+        if mode == "r+b":
+            return FakeFile(path, "r+")
+        return FakeFile(path, mode.replace("b", ""))
+
+    def stat(self, path):
+        return SFTPAttributes.from_stat(os.stat(path))
+
+    def remove(self, path):
+        os.remove(path)
+
+    def posix_rename(self, old_path, new_path):
+        os.replace(old_path, new_path)
+
+    def utime(self, path, times):
+        os.utime(path, times)
+
+
+class FakeChannel:
+    """Session channel that runs its command in a local shell."""
+
+    def __init__(self):
+        self._result = None
+
+    def settimeout(self, timeout):
+        pass
+
+    def exec_command(self, command):
+        self._result = subprocess.run(command, shell=True, capture_output=True)
+
+    def makefile(self, mode):
+        return io.BytesIO(self._result.stdout)
+
+    def makefile_stderr(self, mode):
+        return io.BytesIO(self._result.stderr)
+
+    def recv_exit_status(self):
+        return self._result.returncode
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def fake_sftp():
+    sftp_client = FakeSFTP()
+    connection = mock.MagicMock()
+    connection.return_value.sftp.return_value = sftp_client
+    connection.return_value.client.open_sftp.return_value = sftp_client
+    transport = connection.return_value.client.get_transport.return_value
+    transport.open_session.side_effect = FakeChannel
+    with mock.patch("blackfish.server.remote.session.Connection", connection):
+        yield sftp_client
+
+
+@pytest.fixture
+def content():
+    return os.urandom(10_500)
+
+
+class TestUpload:
+    def test_upload_file_in_chunks(self, fake_sftp, tmp_path, content):
+        source = tmp_path / "shard.bin"
+        source.write_bytes(content)
+        destination = tmp_path / "remote" / "shard.bin"
+        destination.parent.mkdir()
+        progress = []
+
+        written = transfer.upload(
+            HOST,
+            USER,
+            str(source),
+            str(destination),
+            streams=3,
+            chunk_size=1000,
+            mtime=1_700_000_000,
+            progress=progress.append,
+        )
+
+        assert written == len(content)
+        assert destination.read_bytes() == content
+        assert destination.stat().st_mtime == 1_700_000_000
+        assert sorted(progress) == [500] + [1000] * 10
+        # The part file was renamed into place.
+        assert os.listdir(destination.parent) == ["shard.bin"]
+
+    def test_upload_bytes_replaces_destination(self, fake_sftp, tmp_path, content):
+        destination = tmp_path / "shard.bin"
+        destination.write_bytes(b"old content that is longer than nothing")
+
+        transfer.upload(HOST, USER, content, str(destination), chunk_size=4096)
+
+        assert destination.read_bytes() == content
+
+    def test_upload_retries_failed_chunk(self, fake_sftp, tmp_path, content):
+        destination = tmp_path / "shard.bin"
+        fake_sftp.fail_opens["r+b"] = 2
+
+        with mock.patch.object(transfer, "_RETRY_DELAY_SECONDS", 0):
+            transfer.upload(
+                HOST, USER, content, str(destination), streams=1, chunk_size=1000
+            )
+
+        assert destination.read_bytes() == content
+
+    def test_upload_gives_up_after_repeated_failures(
+        self, fake_sftp, tmp_path, content
+    ):
+        destination = tmp_path / "shard.bin"
+        fake_sftp.fail_opens["r+b"] = 100
+
+        with (
+            mock.patch.object(transfer, "_RETRY_DELAY_SECONDS", 0),
+            pytest.raises(transfer.TransferError, match="after 3 attempts"),
+        ):
+            transfer.upload(HOST, USER, content, str(destination), chunk_size=1000)
+
+        assert os.listdir(tmp_path) == []
+
+    def test_upload_resends_chunks_that_fail_verification(
+        self, fake_sftp, tmp_path, content
+    ):
+        destination = tmp_path / "shard.bin"
+        writes = []
+
+        class CorruptingFile(FakeFile):
+            def write(self, data):
+                writes.append(self.tell())
+                # Corrupt the first write of the third chunk.
+                if self.tell() == 2000 and writes.count(2000) == 1:
+                    data = b"\0" * len(data)
+                return super().write(data)
+
+        open_ = fake_sftp.open
+
+        def open_part(path, mode="r"):
+            if mode == "r+b":
+                return CorruptingFile(path, "r+")
+            return open_(path, mode)
+
+        fake_sftp.open = open_part
+        transfer.upload(HOST, USER, content, str(destination), chunk_size=1000)
+
+        assert destination.read_bytes() == content
+        assert writes.count(2000) == 2
+        assert len(writes) == 12
+
+    def test_upload_without_remote_digests(self, fake_sftp, tmp_path, content):
+        destination = tmp_path / "shard.bin"
+
+        with mock.patch.object(transfer.remote, "execute", side_effect=OSError):
+            transfer.upload(HOST, USER, content, str(destination), chunk_size=1000)
+
+        assert destination.read_bytes() == content
+
+
+class TestDownload:
+    def test_download_to_file(self, fake_sftp, tmp_path, content):
+        source = tmp_path / "remote.bin"
+        source.write_bytes(content)
+        destination = tmp_path / "local" / "shard.bin"
+        destination.parent.mkdir()
+
+        result = transfer.download(
+            HOST, USER, str(source), str(destination), streams=3, chunk_size=1000
+        )
+
+        assert result is None
+        assert destination.read_bytes() == content
+        assert os.listdir(destination.parent) == ["shard.bin"]
+
+    def test_download_to_memory(self, fake_sftp, tmp_path, content):
+        source = tmp_path / "remote.bin"
+        source.write_bytes(content)
+
+        result = transfer.download(HOST, USER, str(source), chunk_size=4096)
+
+        assert result == content
+
+    def test_download_missing_file(self, fake_sftp, tmp_path):
+        with pytest.raises(FileNotFoundError):
+            transfer.download(HOST, USER, str(tmp_path / "missing.bin"))
+
+
+def test_read_and_write_file_use_parallel_transfer(fake_sftp, tmp_path, content):
+    profile = SlurmProfile(
+        name="remote",
+        host=HOST,
+        user=USER,
+        home_dir="/home/testuser",
+        cache_dir="/home/testuser/.cache",
+    )
+    path = str(tmp_path / "large.bin")
+
+    with (
+        mock.patch.object(transfer, "PARALLEL_THRESHOLD", 1000),
+        mock.patch.object(transfer, "upload", wraps=transfer.upload) as upload,
+        mock.patch.object(transfer, "download", wraps=transfer.download) as download,
+    ):
+        response = sftp.write_file(profile, path, content)
+        assert response.size == len(content)
+        assert sftp.read_file(profile, path) == content
+
+    upload.assert_called_once()
+    download.assert_called_once()
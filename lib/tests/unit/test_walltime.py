@@ -0,0 +1,58 @@
+"""Unit tests for walltime sizing of batch job resubmissions."""
+
+import pytest
+
+from blackfish.server.jobs.walltime import (
+    format_walltime,
+    resubmit_walltime,
+    walltime_seconds,
+)
+
+DAY = 24 * 3600
+
+
+class TestWalltimeSeconds:
+    @pytest.mark.parametrize(
+        "value,expected",
+        [
+            ("30", 30 * 60),
+            ("30:15", 30 * 60 + 15),
+            ("02:30:00", 2 * 3600 + 30 * 60),
+            ("1-12", 36 * 3600),
+            ("1-12:30", 36 * 3600 + 30 * 60),
+            ("1-00:00:10", 24 * 3600 + 10),
+        ],
+    )
+    def test_parses_slurm_formats(self, value, expected):
+        assert walltime_seconds(value) == expected
+
+    @pytest.mark.parametrize("value", ["UNLIMITED", "", "1:2:3:4", "1-1:2:3:4"])
+    def test_rejects_other_values(self, value):
+        assert walltime_seconds(value) is None
+
+    @pytest.mark.parametrize("seconds", [0, 59, 3600 + 5, 86400, 2 * 86400 + 3661])
+    def test_formats_round_trip(self, seconds):
+        assert walltime_seconds(format_walltime(seconds)) == seconds
+
+
+class TestResubmitWalltime:
+    def test_sizes_to_remaining_files_with_margin(self):
+        # A day at 60 s/file: 8 files left need 8 min, 10 with the margin,
+        # plus 10 to start.
+        assert resubmit_walltime("1-00:00:00", DAY, 1440, 8) == "00:20:00"
+        # Rounded up to 5 minutes.
+        assert resubmit_walltime("1-00:00:00", DAY, 1440, 9) == "00:25:00"
+
+    def test_never_exceeds_requested_or_partition_limit(self):
+        assert resubmit_walltime("02:00:00", 7200, 10, 1000) is None
+        assert resubmit_walltime("1-00:00:00", 3600, 10, 1000, 180) == "03:00:00"
+
+    def test_measures_the_time_the_allocation_ran(self):
+        # A 24h allocation that failed after 30 min processed 15 files: 120
+        # s/file, not the 5760 its walltime would suggest.
+        assert resubmit_walltime("1-00:00:00", 30 * 60, 15, 10) == "00:35:00"
+
+    def test_keeps_requested_without_progress_or_elapsed_time(self):
+        assert resubmit_walltime("1-00:00:00", DAY, 0, 10) is None
+        assert resubmit_walltime("1-00:00:00", None, 10, 10) is None
+        assert resubmit_walltime("UNLIMITED", DAY, 10, 10) is None
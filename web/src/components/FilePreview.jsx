@@ -7,6 +7,8 @@ import { fileSize, isRemoteProfile } from "@/lib/util";
 import { MAX_PREVIEW_SIZE, truncateTextPreview } from "@/lib/fileApi";
 import PropTypes from "prop-types";
 
+const PREVIEW_THUMBNAIL_SIZE = 512;
+
 function FilePreview({ file, profile = null }) {
     const [textContent, setTextContent] = useState(null);
     const [textLoading, setTextLoading] = useState(false);
@@ -16,7 +18,8 @@ function FilePreview({ file, profile = null }) {
         ? `&profile=${encodeURIComponent(profile.name)}`
         : "";
 
-    const isFileTooLarge = file && file.size > MAX_PREVIEW_SIZE;
+    // Images are previewed through server-side thumbnails, so their size doesn't matter.
+    const isFileTooLarge = file && file.type !== "image" && file.size > MAX_PREVIEW_SIZE;
 
     useEffect(() => {
         if (file && file.type === "text" && !isFileTooLarge) {
@@ -91,7 +94,7 @@ function FilePreview({ file, profile = null }) {
                 ) : file.type === "image" ? (
                     <div className="relative">
                         <img
-                            src={`${blackfishApiURL}/api/image?path=${encodeURIComponent(file.path)}${profileParam}`}
+                            src={`${blackfishApiURL}/api/image/thumbnail?path=${encodeURIComponent(file.path)}&size=${PREVIEW_THUMBNAIL_SIZE}${profileParam}`}
                             alt={file.name}
                             className="w-full h-full object-contain rounded-lg border border-gray-200 dark:border-gray-700"
                         />
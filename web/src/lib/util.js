@@ -41,6 +41,7 @@ export const ServiceStatus = Object.freeze({
 });
 
 export const BatchJobStatus = Object.freeze({
+  QUEUED: "queued",
   SUBMITTED: "submitted",
   RESUBMITTED: "resubmitted",
   PENDING: "pending",
@@ -49,12 +50,14 @@ export const BatchJobStatus = Object.freeze({
   BROKEN: "broken",
   STALLED: "stalled",
   EXHAUSTED: "exhausted",
+  FAILED: "failed",
 });
 
-// A batch job is "active" (in flight) while its allocation is submitted,
-// queued, or running — i.e. any non-terminal status. Stop is offered for
-// active jobs; delete only for terminal ones.
+// A batch job is "active" (in flight) while it waits for an allocation or its
+// allocation is submitted, queued, or running — i.e. any non-terminal status.
+// Stop is offered for active jobs; delete only for terminal ones.
 const BATCH_JOB_ACTIVE_STATUSES = new Set([
+  BatchJobStatus.QUEUED,
   BatchJobStatus.SUBMITTED,
   BatchJobStatus.RESUBMITTED,
   BatchJobStatus.PENDING,
@@ -412,13 +412,13 @@ describe("Utils", () => {
 
   describe("isBatchJobActive", () => {
     it("is true for in-flight statuses", () => {
-      for (const s of ["submitted", "resubmitted", "pending", "running"]) {
+      for (const s of ["queued", "submitted", "resubmitted", "pending", "running"]) {
         expect(isBatchJobActive(s)).toBe(true);
       }
     });
 
     it("is false for terminal statuses", () => {
-      for (const s of ["stopped", "stalled", "exhausted", "broken"]) {
+      for (const s of ["stopped", "stalled", "exhausted", "broken", "failed"]) {
         expect(isBatchJobActive(s)).toBe(false);
       }
     });
@@ -432,7 +432,7 @@ describe("Utils", () => {
     });
 
     it("is false for broken (not resumable) and active statuses", () => {
-      for (const s of ["broken", "submitted", "resubmitted", "pending", "running"]) {
+      for (const s of ["broken", "failed", "submitted", "resubmitted", "pending", "running"]) {
         expect(isBatchJobResumable(s)).toBe(false);
       }
     });
@@ -7,8 +7,10 @@ import {
     TrashIcon,
     ExclamationTriangleIcon,
     PlayIcon,
+    ArrowDownTrayIcon,
 } from "@heroicons/react/24/outline";
 import StatusBadge from "./StatusBadge";
+import { blackfishApiURL } from "@/config";
 import { isBatchJobActive, isBatchJobResumable, batchProgress } from "@/lib/util";
 import PropTypes from "prop-types";
 
@@ -264,6 +266,18 @@ function JobDetailsPanel({ job, onStopJob, onResumeJob, onDeleteJob, jobActions
                                 </span>
                             </div>
                         )}
+                        {job.output_dir && (
+                            <div className="flex justify-end">
+                                <a
+                                    href={`${blackfishApiURL}/api/jobs/${job.id}/archive`}
+                                    download
+                                    className="inline-flex items-center gap-1 text-xs text-blue-600 dark:text-blue-400 hover:underline"
+                                >
+                                    <ArrowDownTrayIcon className="h-3.5 w-3.5" />
+                                    Download outputs (.tar)
+                                </a>
+                            </div>
+                        )}
                     </div>
                 </div>
             )}
@@ -211,3 +211,27 @@ describe("JobDetailsPanel image reference", () => {
     expect(screen.queryByText("Image:")).not.toBeInTheDocument();
   });
 });
+
+describe("JobDetailsPanel output download", () => {
+  const job = (extra = {}) => ({
+    id: "job-001",
+    name: "Batch Translation",
+    status: "stopped",
+    task: "translate",
+    repo_id: "google/gemma-3-4b-it",
+    ...extra,
+  });
+
+  test("links to the streaming archive of the output directory", () => {
+    render(<JobDetailsPanel job={job({ output_dir: "/scratch/out" })} />);
+    const link = screen.getByRole("link", { name: /download outputs/i });
+    expect(link.getAttribute("href")).toMatch(/\/api\/jobs\/job-001\/archive$/);
+  });
+
+  test("omits the link when the job has no output directory", () => {
+    render(<JobDetailsPanel job={job()} />);
+    expect(
+      screen.queryByRole("link", { name: /download outputs/i }),
+    ).not.toBeInTheDocument();
+  });
+});
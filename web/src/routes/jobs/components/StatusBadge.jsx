@@ -25,6 +25,8 @@ function StatusBadge({ status, errored = 0, pulse = false }) {
                           ring: "ring-green-600/20 dark:ring-green-500/30",
                           label: "Running",
                       };
+            case "queued":
+                return { ...YELLOW, label: "Queued" };
             case "submitted":
                 return { ...YELLOW, label: "Submitted" };
             case "resubmitted":
@@ -35,6 +37,8 @@ function StatusBadge({ status, errored = 0, pulse = false }) {
                 return { ...RED, label: "Stalled" };
             case "exhausted":
                 return { ...RED, label: "Exhausted" };
+            case "failed":
+                return { ...RED, label: "Failed" };
             case "broken":
                 return {
                     bg: "bg-orange-50 dark:bg-orange-900/30",